@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Streamable HTTP传输压测脚本
+模拟多个MCP客户端并发调用工具，统计吞吐量和延迟分布
+
+用法：
+    python mcp_server.py --http                      # 先启动HTTP服务
+    python benchmarks/http_load_test.py --clients 8 --requests 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+from config import HTTP_HOST, HTTP_PATH, HTTP_PORT
+
+KEYWORDS = ["行情", "K线", "交易接口", "回测", "持仓", "订阅", "期货", "history"]
+
+
+async def run_client(url: str, client_id: int, request_count: int, tool: str, latencies: list, errors: list):
+    """模拟一个客户端：建立会话后顺序调用工具"""
+    async with streamablehttp_client(url) as (read_stream, write_stream, _):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+
+            for i in range(request_count):
+                keyword = KEYWORDS[(client_id + i) % len(KEYWORDS)]
+                start_time = time.perf_counter()
+                try:
+                    result = await session.call_tool(tool, {"keyword": keyword, "max_results": 5})
+                    if result.isError:
+                        errors.append(keyword)
+                except Exception as e:
+                    errors.append(str(e))
+                latencies.append(time.perf_counter() - start_time)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Streamable HTTP传输压测")
+    parser.add_argument("--url", default=f"http://{HTTP_HOST}:{HTTP_PORT}{HTTP_PATH}/", help="MCP端点地址")
+    parser.add_argument("--clients", type=int, default=8, help="模拟的客户端数量")
+    parser.add_argument("--requests", type=int, default=20, help="每个客户端的请求数")
+    parser.add_argument("--tool", default="search_documents_local", help="调用的工具名称")
+    args = parser.parse_args()
+
+    latencies, errors = [], []
+    start_time = time.perf_counter()
+    await asyncio.gather(*[
+        run_client(args.url, i, args.requests, args.tool, latencies, errors)
+        for i in range(args.clients)
+    ])
+    elapsed = time.perf_counter() - start_time
+
+    latencies.sort()
+    print(f"客户端数: {args.clients}, 总请求数: {len(latencies)}, 错误数: {len(errors)}")
+    print(f"总耗时: {elapsed:.2f}s, 吞吐量: {len(latencies) / elapsed:.1f} req/s")
+    if latencies:
+        print(f"延迟(ms): avg={statistics.mean(latencies) * 1000:.1f} "
+              f"p50={latencies[len(latencies) // 2] * 1000:.1f} "
+              f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} "
+              f"max={latencies[-1] * 1000:.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+搜索后端对比基准
+在临时目录中用合成页面建立索引，分别用Whoosh、numpy BM25F和SQLite FTS5后端执行各种搜索模式，
+统计延迟分布，并检查各后端前几个结果与Whoosh是否一致
+
+用法：
+    python benchmarks/search_backend_benchmark.py --docs 2000 --queries 100
+    python benchmarks/search_backend_benchmark.py --backends whoosh,sqlite --modes search,phrase
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services import NumpyBM25FEngine, SQLiteSearchEngine, WhooshSearchEngine
+from services.whoosh_service import custom_terms
+
+PAGE_HTML = """
+<html><head><title>{title}</title><meta name="keywords" content="{tags}"></head>
+<body><div class="content"><h1>{title}</h1><h2>{heading}</h2><p>{content}</p>
+<pre><code>{code}</code></pre></div></body></html>
+"""
+
+FILLER = ["如何", "使用", "设置", "返回", "参数", "说明", "示例", "数据", "函数", "获取", "支持", "默认"]
+FUNCTIONS = ["history", "history_n", "subscribe", "order_volume", "order_target_percent", "get_instruments",
+             "get_fundamentals", "current", "schedule", "set_token"]
+
+
+def rank_only(engine, rng) -> dict:
+    """只执行关键词查询的评分和排序，不读取存储字段和生成高亮（SQLite后端执行完整的关键词搜索）"""
+    keyword = rng.choice(custom_terms) + " " + rng.choice(custom_terms)
+    if isinstance(engine, SQLiteSearchEngine):
+        return engine.search(keyword)
+    query, _ = engine._keyword_query(keyword)
+    with engine.index.searcher(weighting=engine.scorer) as searcher:
+        return {"results": [{"url": hit["url"]} for hit in engine._search_hits(searcher, query, 20)]}
+
+
+MODES = {
+    "rank": rank_only,
+    "search": lambda engine, rng: engine.search(rng.choice(custom_terms) + " " + rng.choice(custom_terms)),
+    "fuzzy": lambda engine, rng: engine.fuzzy_search(rng.choice(FUNCTIONS)[:-1] + "x"),
+    "boolean": lambda engine, rng: engine.boolean_search(f"{rng.choice(custom_terms)} AND {rng.choice(FILLER)}"),
+    "phrase": lambda engine, rng: engine.phrase_search(rng.choice(custom_terms) + rng.choice(FILLER)),
+    "tag": lambda engine, rng: engine.tag_search(rng.choice(custom_terms[:20]), rng.choice(custom_terms)),
+    "hybrid": lambda engine, rng: engine.search_hybrid(rng.choice(custom_terms) + " " + rng.choice(FILLER)),
+}
+
+
+def build_pages(directory: Path, count: int, seed: int) -> list:
+    """生成合成页面"""
+    rng = random.Random(seed)
+    pages = []
+    for i in range(count):
+        file_path = directory / f"page-{i}.html"
+        sentences = ["".join(rng.sample(custom_terms + FILLER, 6)) + "。" for _ in range(rng.randint(10, 60))]
+        file_path.write_text(PAGE_HTML.format(
+            title="".join(rng.sample(custom_terms, 2)),
+            tags=",".join(rng.sample(custom_terms[:20], 2)),
+            heading=f"{rng.choice(FUNCTIONS)} - {rng.choice(custom_terms)}",
+            content="".join(sentences),
+            code=f"{rng.choice(FUNCTIONS)}(symbol='SHSE.600000', frequency='1d')",
+        ), encoding="utf-8")
+        pages.append({"file_path": str(file_path), "url": f"https://www.myquant.cn/docs2/synthetic/{i}.html"})
+    return pages
+
+
+def build_index(engine, pages: list, batch: int):
+    """分批写入索引（Whoosh每批一个段）"""
+    start_time = time.perf_counter()
+    for i in range(0, len(pages), batch):
+        engine.add_documents(pages[i:i + batch])
+    print(f"{type(engine).__name__} 建立索引: {len(pages)}个文档, 耗时{time.perf_counter() - start_time:.1f}s")
+    return engine
+
+
+def percentiles(latencies: list) -> str:
+    latencies = sorted(latencies)
+    return (f"p50={latencies[len(latencies) // 2] * 1000:7.2f} "
+            f"p95={latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000:7.2f}")
+
+
+def run_mode(engine, mode: str, queries: int, seed: int) -> tuple:
+    """执行一种搜索模式，返回(延迟列表, 每次查询的前5个URL)"""
+    rng = random.Random(seed)
+    latencies, top_urls = [], []
+    for _ in range(queries):
+        start_time = time.perf_counter()
+        result = MODES[mode](engine, rng)
+        latencies.append(time.perf_counter() - start_time)
+        top_urls.append([item["url"] for item in result["results"][:5]])
+    return latencies, top_urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="搜索后端对比基准")
+    parser.add_argument("--docs", type=int, default=2000, help="合成文档数")
+    parser.add_argument("--batch", type=int, default=200, help="每次提交的文档数")
+    parser.add_argument("--queries", type=int, default=100, help="每种模式的查询次数")
+    parser.add_argument("--modes", default=",".join(MODES), help="逗号分隔的搜索模式")
+    parser.add_argument("--backends", default="whoosh,numpy,sqlite", help="逗号分隔的搜索后端，第一个作为一致率的基准")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    backends = args.backends.split(",")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pages = build_pages(Path(tmp_dir), args.docs, args.seed)
+        index_dir = Path(tmp_dir) / "index"
+        engines = {}
+        if {"whoosh", "numpy"} & set(backends):
+            whoosh_engine = build_index(WhooshSearchEngine(index_dir), pages, args.batch)
+            # numpy后端读取同一个Whoosh索引
+            engines["whoosh"], engines["numpy"] = whoosh_engine, NumpyBM25FEngine(index_dir)
+        if "sqlite" in backends:
+            engines["sqlite"] = build_index(SQLiteSearchEngine(index_dir), pages, args.batch)
+        engines = {backend: engines[backend] for backend in backends}
+
+        # 预热：补建向量索引、拼写纠错词典和numpy倒排表
+        for engine in engines.values():
+            start_time = time.perf_counter()
+            for mode in MODES:
+                MODES[mode](engine, random.Random(args.seed))
+            print(f"{type(engine).__name__} 预热耗时: {time.perf_counter() - start_time:.2f}s")
+
+        print(f"{'模式':<8} " + " ".join(f"{backend + '(ms)':<28} 前5一致率" for backend in backends))
+        for mode in args.modes.split(","):
+            columns = []
+            baseline_urls = None
+            for backend, engine in engines.items():
+                latencies, top_urls = run_mode(engine, mode, args.queries, args.seed)
+                baseline_urls = baseline_urls or top_urls
+                agreement = sum(a == b for a, b in zip(baseline_urls, top_urls)) / len(top_urls)
+                columns.append(f"{percentiles(latencies):<28} {agreement:>8.0%}")
+            print(f"{mode:<8} " + " ".join(columns))
+
+
+if __name__ == "__main__":
+    main()
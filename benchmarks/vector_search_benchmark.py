@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+向量检索延迟基准
+以现有索引中的文档为样本，打乱句子顺序生成指定倍数规模的合成语料，
+统计向量索引的建立耗时以及向量检索、RRF融合的延迟分布
+
+用法：
+    python benchmarks/vector_search_benchmark.py --scale 10 --queries 200
+"""
+
+import argparse
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from whoosh import index
+
+from config import HYBRID_CANDIDATES, INDEX_DIR
+from services import WhooshSearchEngine
+from services.vector_index import VectorIndex, reciprocal_rank_fusion
+from services.whoosh_service import CURRENT_POINTER, custom_terms
+
+KEYWORDS = ["行情", "K线", "交易接口", "回测", "持仓", "订阅", "期货", "history", "如何设置滑点", "查询历史成交"]
+
+_SENTENCE_PATTERN = re.compile(r"[^。！？\n]+[。！？\n]?")
+
+
+def load_samples(index_dir: Path) -> list:
+    """读取现有索引中的文档作为样本，没有索引时用专业术语拼出样本"""
+    if (index_dir / CURRENT_POINTER).exists() or index.exists_in(index_dir):
+        engine = WhooshSearchEngine(index_dir)
+        with engine.index.searcher() as searcher:
+            samples = [dict(fields) for fields in searcher.all_stored_fields()]
+        if samples:
+            return samples
+
+    rng = random.Random(0)
+    return [
+        {"url": f"sample-{i}", "title": " ".join(rng.sample(custom_terms, 3)),
+         "content": "。".join(" ".join(rng.sample(custom_terms, 8)) for _ in range(20))}
+        for i in range(100)
+    ]
+
+
+def synthesize(samples: list, count: int, seed: int) -> list:
+    """以样本为基础打乱句子顺序生成count个文档"""
+    rng = random.Random(seed)
+    documents = []
+    for i in range(count):
+        sample = samples[i % len(samples)]
+        sentences = _SENTENCE_PATTERN.findall(sample.get("content") or "")
+        rng.shuffle(sentences)
+        documents.append({
+            "url": f"synthetic-{i}",
+            "title": sample.get("title") or "",
+            "headings": sample.get("headings") or "",
+            "content": "".join(sentences),
+            "code_blocks": sample.get("code_blocks") or "",
+        })
+    return documents
+
+
+def percentiles(latencies: list) -> str:
+    latencies = sorted(latencies)
+    return (f"p50={latencies[len(latencies) // 2] * 1000:.2f} "
+            f"p95={latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000:.2f} "
+            f"max={latencies[-1] * 1000:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量检索延迟基准")
+    parser.add_argument("--index-dir", type=Path, default=INDEX_DIR, help="提供样本文档的索引目录")
+    parser.add_argument("--scale", type=int, default=10, help="合成语料相对于样本文档数的倍数")
+    parser.add_argument("--docs", type=int, default=None, help="直接指定合成文档数（覆盖--scale）")
+    parser.add_argument("--queries", type=int, default=200, help="查询次数")
+    parser.add_argument("--batch", type=int, default=50, help="每次写入的文档数（模拟索引提交）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    samples = load_samples(args.index_dir)
+    doc_count = args.docs or len(samples) * args.scale
+    documents = synthesize(samples, doc_count, args.seed)
+    print(f"样本文档数: {len(samples)}, 合成文档数: {doc_count}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vectors = VectorIndex(Path(tmp_dir))
+
+        start_time = time.perf_counter()
+        for i in range(0, len(documents), args.batch):
+            vectors.write(documents[i:i + args.batch])
+        elapsed = time.perf_counter() - start_time
+        stats = vectors.get_stats()
+        print(f"建立耗时: {elapsed:.2f}s ({doc_count / elapsed:.0f} docs/s), "
+              f"矩阵大小: {stats['size_bytes'] / 1024 / 1024:.1f}MB")
+
+        search_latencies, fusion_latencies = [], []
+        rng = random.Random(args.seed)
+        for i in range(args.queries):
+            keyword = KEYWORDS[i % len(KEYWORDS)]
+            start_time = time.perf_counter()
+            hits = vectors.search(keyword, HYBRID_CANDIDATES)
+            search_latencies.append(time.perf_counter() - start_time)
+
+            # 用打乱的向量结果模拟BM25排名，只衡量融合本身的开销
+            keyword_ranking = [url for url, _ in hits]
+            rng.shuffle(keyword_ranking)
+            start_time = time.perf_counter()
+            reciprocal_rank_fusion([keyword_ranking, [url for url, _ in hits]])
+            fusion_latencies.append(time.perf_counter() - start_time)
+
+        print(f"向量检索延迟(ms): {percentiles(search_latencies)}")
+        print(f"RRF融合延迟(ms): {percentiles(fusion_latencies)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,9 @@ DOCS_DIR = ROOT_DIR / "data" / "docs"
 # Whoosh索引目录
 INDEX_DIR = ROOT_DIR / "data" / "index"
 
+# 重建索引时保留的索引代数量（含当前代），旧代供切换瞬间仍在读取的进程使用
+INDEX_KEEP_GENERATIONS = 2
+
 # 掘金量化搜索API地址
 MYQUANT_SEARCH_API = "https://www.myquant.cn/Search/indexes/mq-website-docs/search"
 
@@ -62,10 +65,63 @@ DOC_DOWNLOAD_HEADERS = {
     "sec-ch-ua-platform": '"Windows"',
 }
 
+# 完整搜索的默认延迟预算（秒），超时后返回已索引内容，None表示不限制
+SEARCH_DEADLINE = 10.0
+
+# 批量搜索：一次调用最多执行的查询数
+SEARCH_BATCH_MAX_QUERIES = 20
+
+# 熔断器配置（掘金量化API和文档站点）
+CIRCUIT_FAILURE_THRESHOLD = 3  # 连续失败次数达到阈值后打开熔断器
+CIRCUIT_RECOVERY_TIMEOUT = 30.0  # 秒，熔断器打开后经过该时间进行半开探测
+
+# 搜索守护进程配置：一个长期运行的进程加载索引和缓存，
+# 各客户端的mcp_server.py进程作为轻量的stdio代理转发工具调用
+DAEMON_SOCKET = ROOT_DIR / "data" / "search_daemon.sock"  # Unix域套接字路径
+DAEMON_MODE = "auto"  # auto: 守护进程运行时作为代理，否则在本进程内搜索；off: 总是在本进程内搜索
+DAEMON_MAX_MESSAGE_SIZE = 16 * 1024 * 1024  # 单条消息的最大字节数
+
+# Streamable HTTP传输配置：一个服务进程通过HTTP为多个MCP客户端提供服务
+HTTP_HOST = "127.0.0.1"  # 只监听本机
+HTTP_PORT = 8765
+HTTP_PATH = "/mcp"  # MCP端点路径
+HTTP_MAX_CONCURRENT_PER_CLIENT = 4  # 每个客户端会话同时处理的请求数
+HTTP_MAX_CONCURRENT = 32  # 所有客户端同时处理的请求总数
+HTTP_QUEUE_TIMEOUT = 30.0  # 秒，等待处理名额的最长时间，超时返回429
+HTTP_TIMING_WINDOW = 1000  # 耗时分位数统计保留的最近请求数
+
 # 并发下载配置
 MAX_CONCURRENT_DOWNLOADS = 5
 REQUEST_DELAY = 1.0  # 秒
 
+# 全站镜像配置
+MIRROR_STATE_FILE = ROOT_DIR / "data" / "mirror_state.json"  # 爬取队列持久化文件
+MIRROR_URL_PREFIX = "https://www.myquant.cn/docs2/"  # 只镜像该前缀下的页面
+MIRROR_PAGE_SIZE = 100  # API分页发现的每页数量
+MIRROR_INDEX_BATCH_SIZE = 20  # 每累积多少个页面提交一次索引
+MIRROR_MAX_ATTEMPTS = 3  # 单个页面的最大下载尝试次数
+
+# 索引写入配置：所有写请求由单个写入任务合并提交
+INDEX_WRITER_BATCH_SIZE = 50  # 累积多少个文档提交一次
+INDEX_WRITER_FLUSH_INTERVAL = 0.2  # 秒，首个请求到达后最多等待多久提交
+
+# 多进程写入协调：同一时间只有持有写入租约（文件锁）的进程写索引
+INDEX_LEASE_FILE = ROOT_DIR / "data" / "index_writer.lock"  # 写入租约锁文件
+INDEX_SPOOL_DIR = ROOT_DIR / "data" / "spool"  # 未取得租约时转交写请求的目录
+INDEX_LEASE_TIMEOUT = 2.0  # 秒，等待租约的最长时间，超时后转交给租约持有者
+INDEX_LEASE_RETRY_INTERVAL = 0.05  # 秒，等待租约时的重试间隔
+INDEX_SPOOL_POLL_INTERVAL = 2.0  # 秒，空闲时检查转交目录的间隔
+
+# 后台段合并配置：写入空闲时按段大小分层合并小段，清理删除过多的段
+INDEX_MERGE_IDLE_SECONDS = 30.0  # 秒，写入空闲多久后检查是否需要合并
+INDEX_MERGE_FACTOR = 10  # 同一层（文档数同一数量级）的段达到该数量时合并
+INDEX_MERGE_DELETED_RATIO = 0.3  # 已删除文档占比达到该值的段单独重写
+INDEX_MERGE_HISTORY_SIZE = 20  # 统计信息中保留的最近合并记录数
+
+# 索引补录队列配置（已下载但未成功索引的页面）
+INGEST_QUEUE_FILE = ROOT_DIR / "data" / "ingest_queue.json"  # 补录队列持久化文件
+INGEST_BATCH_SIZE = 50  # 补录时每批提交的页面数
+
 # Whoosh索引配置
 WHOOSH_SCHEMA_CONFIG = {
     "title": "TEXT",
@@ -80,6 +136,55 @@ WHOOSH_SCHEMA_CONFIG = {
 # 缓存配置
 CACHE_TTL = 300  # 秒（5分钟）
 
+# 发现请求配置
+DISCOVERY_PAGE_SIZE = 100  # 每页请求数量，超出时按偏移并发分页请求
+DISCOVERY_MAX_WORKERS = 4  # 并发分页请求数
+DISCOVERY_ATTRIBUTES = [  # 只请求发现流程用到的属性
+    "objectID", "url", "anchor", "content",
+    "hierarchy_lvl0", "hierarchy_lvl1", "hierarchy_lvl2", "hierarchy_lvl3",
+    "hierarchy_lvl4", "hierarchy_lvl5", "hierarchy_lvl6",
+    "document_type", "language", "category",
+]
+
+# 发现结果（MeiliSearch API响应）磁盘缓存配置
+DISCOVERY_CACHE_DIR = ROOT_DIR / "data" / "cache" / "discovery"
+DISCOVERY_CACHE_TTL = 6 * 60 * 60  # 秒（6小时）
+DISCOVERY_NEGATIVE_TTL = 60  # 秒，空结果或请求失败的负缓存时间
+
+# 本地发现配置：本地索引命中数不少于该值时不再调用远程API
+DISCOVER_MIN_LOCAL_HITS = 5
+DISCOVER_FILTER_OVERFETCH = 5  # 有索引无法过滤的元数据条件时，本地检索多取的倍数
+
+# 拼写纠错配置：基于索引词表的删除邻域词典，用于模糊搜索和无结果时的纠错建议
+SPELLING_MAX_DISTANCE = 2  # 最大编辑距离
+SPELLING_PREFIX_LENGTH = 7  # 生成删除变体时只取词的前几个字符
+SPELLING_MAX_CANDIDATES = 5  # 每个查询词最多使用的候选词数
+SPELLING_MAX_SUGGESTIONS = 3  # 无结果时最多返回的纠错建议数
+PINYIN_MAX_EXPANSIONS = 5  # 拼音/首字母查询最多展开的中文词数
+
+# 前缀补全配置：标题、小节标题、标签和代码标识符，按文档频率排序
+SUGGEST_MAX_RESULTS = 10  # 默认返回的补全数量
+SUGGEST_REFRESH_INTERVAL = 5.0  # 秒，检查其他进程是否提交了新文档的最短间隔
+
+# 混合检索配置：本地哈希特征向量与BM25结果按倒数排名融合（RRF），不依赖网络或外部模型
+VECTOR_DIM = 1024  # 向量维数（特征哈希的桶数）
+VECTOR_FIELD_WEIGHTS = {"title": 3.0, "headings": 2.0, "content": 1.0, "code_blocks": 1.0}
+HYBRID_CANDIDATES = 50  # BM25和向量检索各自召回的候选数
+HYBRID_RRF_K = 60  # RRF平滑常数，越大排名靠后的结果权重衰减越慢
+
+# 分面过滤和计数：SDK语言（language）和文档栏目（section）在写入索引时从URL路径得到，与标签（tags）一起
+# 按取值预先计算文档位图，在评分前过滤命中，并随搜索结果返回命中文档的各取值计数（需要numpy）
+FACET_FIELDS = ("language", "section", "tags")
+FACET_MAX_VALUES = 10  # 每个分面最多返回的取值数，按命中文档数降序
+
+# 搜索后端："whoosh"、"numpy"（在numpy数组上计算BM25F评分，索引读写仍使用Whoosh）
+# 或 "sqlite"（SQLite FTS5单文件索引，存放在INDEX_DIR中）
+SEARCH_BACKEND = "whoosh"
+
+# SQLite FTS5后端配置：WAL模式，读取不阻塞写入，多个进程可同时搜索
+SQLITE_INDEX_FILE = "index.sqlite3"  # INDEX_DIR中的索引文件名
+SQLITE_BUSY_TIMEOUT = 30.0  # 秒，其他连接正在写入时等待写锁的最长时间
+
 # 搜索结果高亮配置
 HIGHLIGHT_PRE = "<mark>"
 HIGHLIGHT_POST = "</mark>"
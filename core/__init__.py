@@ -1,3 +1,9 @@
-from .search_flow import SearchFlow
+# SearchFlow按需导入：作为守护进程代理运行时不加载jieba词典和搜索索引
+__all__ = ["SearchFlow"]
 
-__all__ = ["SearchFlow"]
\ No newline at end of file
+
+def __getattr__(name):
+    if name == "SearchFlow":
+        from .search_flow import SearchFlow
+        return SearchFlow
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,251 @@
+import asyncio
+import itertools
+import json
+import socket
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from config import DAEMON_MAX_MESSAGE_SIZE, DAEMON_SOCKET
+from utils import logger
+
+
+def daemon_supported() -> bool:
+    """当前平台是否支持Unix域套接字"""
+    return hasattr(socket, "AF_UNIX")
+
+
+class SearchDaemon:
+    """
+    搜索守护进程
+
+    在一个长期运行的进程中加载jieba词典、搜索索引和各级缓存，通过Unix域套接字
+    为多个客户端的stdio代理提供工具调用，缓存在会话之间持续有效。
+
+    协议为逐行JSON：请求 {"id", "tool", "arguments"}，响应 {"id", "result"} 或 {"id", "error"}。
+    同一连接上的多个请求并发执行，响应按完成顺序返回。
+    """
+
+    def __init__(self, search_flow=None, socket_path: Path = DAEMON_SOCKET):
+        if search_flow is None:
+            from .search_flow import SearchFlow
+            search_flow = SearchFlow()
+        self.search_flow = search_flow
+        self.socket_path = socket_path
+
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.connection_count = 0
+        self.active_connections = 0
+        self.request_count = 0
+        self.error_count = 0
+
+    async def start(self) -> None:
+        """开始监听套接字，已有守护进程在运行时抛出RuntimeError"""
+        if self.socket_path.exists():
+            if await DaemonClient(self.socket_path).ping():
+                raise RuntimeError(f"搜索守护进程已在运行: {self.socket_path}")
+            # 上次异常退出遗留的套接字文件
+            self.socket_path.unlink()
+
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self._server = await asyncio.start_unix_server(
+            self._handle_connection, path=str(self.socket_path), limit=DAEMON_MAX_MESSAGE_SIZE
+        )
+        logger.info(f"搜索守护进程已启动: {self.socket_path}")
+
+    async def serve_forever(self) -> None:
+        """启动并持续提供服务"""
+        await self.start()
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self) -> None:
+        """停止服务并删除套接字文件"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.search_flow.index_writer.stop()
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """处理一个代理连接"""
+        self.connection_count += 1
+        self.active_connections += 1
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(request: Dict[str, Any]) -> None:
+            response = await self._handle_request(request)
+            data = json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n"
+            async with write_lock:
+                writer.write(data)
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.error(f"守护进程收到无效请求: {e}")
+                    continue
+
+                task = asyncio.create_task(respond(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            logger.warning(f"代理连接中断: {e}")
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            self.active_connections -= 1
+            writer.close()
+
+    async def _handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """执行一次工具调用"""
+        from .tools import dispatch_tool
+
+        request_id = request.get("id")
+        name = request.get("tool", "")
+        self.request_count += 1
+
+        if name == "ping":
+            return {"id": request_id, "result": {"status": "ok"}}
+
+        try:
+            result = await dispatch_tool(self.search_flow, name, request.get("arguments") or {})
+            if name == "get_system_stats":
+                result["daemon"] = self.get_stats()
+            return {"id": request_id, "result": result}
+        except Exception as e:
+            self.error_count += 1
+            logger.error(f"守护进程工具调用失败: {name}, 错误: {e}", exc_info=True)
+            return {"id": request_id, "error": str(e)}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取守护进程统计信息"""
+        return {
+            "socket_path": str(self.socket_path),
+            "connections": self.connection_count,
+            "active_connections": self.active_connections,
+            "requests": self.request_count,
+            "errors": self.error_count,
+        }
+
+
+class DaemonClient:
+    """
+    搜索守护进程客户端
+
+    在一个连接上复用多个并发请求，按请求id把响应分发给对应的调用方。
+    """
+
+    def __init__(self, socket_path: Path = DAEMON_SOCKET):
+        self.socket_path = socket_path
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._connect_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self) -> bool:
+        """连接守护进程，返回是否连接成功"""
+        if self.connected:
+            return True
+        if not daemon_supported() or not self.socket_path.exists():
+            return False
+
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+
+        async with self._connect_lock:
+            if self.connected:
+                return True
+            try:
+                self._reader, self._writer = await asyncio.open_unix_connection(
+                    str(self.socket_path), limit=DAEMON_MAX_MESSAGE_SIZE
+                )
+            except OSError as e:
+                logger.debug(f"连接搜索守护进程失败: {self.socket_path}, 错误: {e}")
+                return False
+
+            self._reader_task = asyncio.create_task(self._read_responses())
+            return True
+
+    async def _read_responses(self) -> None:
+        """读取响应并分发给等待的调用方"""
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self._pending.pop(response.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except (ConnectionError, ValueError) as e:
+            logger.warning(f"读取守护进程响应失败: {e}")
+        finally:
+            self._writer = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("搜索守护进程连接已断开"))
+            self._pending.clear()
+
+    async def call(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        通过守护进程执行工具调用
+
+        Raises:
+            ConnectionError: 无法连接守护进程或连接中断
+            RuntimeError: 守护进程返回的工具调用错误
+        """
+        if not await self.connect():
+            raise ConnectionError(f"无法连接搜索守护进程: {self.socket_path}")
+
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+
+        request = {"id": request_id, "tool": name, "arguments": arguments}
+        try:
+            self._writer.write(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+            await self._writer.drain()
+        except (AttributeError, ConnectionError) as e:
+            self._pending.pop(request_id, None)
+            raise ConnectionError(f"搜索守护进程连接已断开: {e}")
+
+        response = await future
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+    async def ping(self) -> bool:
+        """检查守护进程是否可用"""
+        try:
+            await self.call("ping", {})
+            return True
+        except (ConnectionError, RuntimeError):
+            return False
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """关闭连接"""
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None:
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
+        self._writer = None
@@ -0,0 +1,193 @@
+import asyncio
+import contextlib
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from config import (
+    HTTP_MAX_CONCURRENT,
+    HTTP_MAX_CONCURRENT_PER_CLIENT,
+    HTTP_PATH,
+    HTTP_QUEUE_TIMEOUT,
+    HTTP_TIMING_WINDOW,
+)
+from utils import logger, LatencyTracker
+
+ASGIApp = Callable[[Dict[str, Any], Callable, Callable], Awaitable[None]]
+
+# MCP Streamable HTTP规范中的会话标识请求头
+SESSION_HEADER = b"mcp-session-id"
+
+
+def _client_key(scope: Dict[str, Any]) -> str:
+    """以MCP会话标识区分客户端，尚未建立会话时使用客户端地址"""
+    for name, value in scope.get("headers", []):
+        if name.lower() == SESSION_HEADER:
+            return value.decode("latin-1")
+    client = scope.get("client") or ("unknown", 0)
+    return f"{client[0]}:{client[1]}"
+
+
+async def _send_json(send: Callable, status: int, payload: Dict[str, Any]) -> None:
+    """直接发送JSON响应"""
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    按客户端会话限制并发的ASGI中间件
+
+    只限制POST请求（工具调用等JSON-RPC消息）；GET请求是长期保持的服务端推送流，不占用名额。
+    单个客户端的并发数和全部客户端的总并发数都有上限，等待超时返回429。
+    """
+
+    def __init__(self, app: ASGIApp, per_client: int = HTTP_MAX_CONCURRENT_PER_CLIENT,
+                 total: int = HTTP_MAX_CONCURRENT, queue_timeout: float = HTTP_QUEUE_TIMEOUT):
+        self.app = app
+        self.per_client = per_client
+        self.total = total
+        self.queue_timeout = queue_timeout
+
+        self._total_semaphore: Optional[asyncio.Semaphore] = None
+        self._client_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._client_users: Dict[str, int] = {}
+        self.rejected_count = 0
+        self.in_flight = 0
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or scope.get("method") != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        if self._total_semaphore is None:
+            self._total_semaphore = asyncio.Semaphore(self.total)
+
+        key = _client_key(scope)
+        client_semaphore = self._client_semaphores.setdefault(key, asyncio.Semaphore(self.per_client))
+        self._client_users[key] = self._client_users.get(key, 0) + 1
+
+        acquired = []
+        try:
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                for semaphore in (client_semaphore, self._total_semaphore):
+                    remaining = max(0.0, deadline - time.monotonic())
+                    await asyncio.wait_for(semaphore.acquire(), timeout=remaining)
+                    acquired.append(semaphore)
+            except asyncio.TimeoutError:
+                self.rejected_count += 1
+                logger.warning(f"HTTP请求等待处理名额超时: 客户端 {key}")
+                await _send_json(send, 429, {"error": "too many concurrent requests", "client": key})
+                return
+
+            self.in_flight += 1
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self.in_flight -= 1
+        finally:
+            for semaphore in acquired:
+                semaphore.release()
+            # 客户端没有进行中的请求时释放其信号量，避免会话结束后持续占用内存
+            self._client_users[key] -= 1
+            if not self._client_users[key]:
+                del self._client_users[key]
+                del self._client_semaphores[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取并发限制统计信息"""
+        return {
+            "in_flight": self.in_flight,
+            "active_clients": len(self._client_semaphores),
+            "rejected": self.rejected_count,
+            "per_client_limit": self.per_client,
+            "total_limit": self.total,
+        }
+
+
+class RequestTimingMiddleware:
+    """
+    记录请求级耗时的ASGI中间件
+
+    耗时从收到请求到应用处理结束（包括流式响应发送完毕），响应头中附带
+    Server-Timing（到开始发送响应为止的耗时）。
+    """
+
+    def __init__(self, app: ASGIApp, tracker: Optional[LatencyTracker] = None):
+        self.app = app
+        self.tracker = tracker if tracker is not None else LatencyTracker(HTTP_TIMING_WINDOW)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status = 500
+
+        async def timed_send(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed_ms = (time.perf_counter() - start_time) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", f"app;dur={elapsed_ms:.1f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            self.tracker.record(f"{scope.get('method', '')} {scope.get('path', '')}",
+                                time.perf_counter() - start_time, ok=status < 400)
+
+
+def create_http_app(server, tool_timings: Optional[LatencyTracker] = None,
+                    per_client: int = HTTP_MAX_CONCURRENT_PER_CLIENT,
+                    total: int = HTTP_MAX_CONCURRENT,
+                    queue_timeout: float = HTTP_QUEUE_TIMEOUT):
+    """
+    创建Streamable HTTP传输的ASGI应用
+
+    Args:
+        server: MCP Server实例
+        tool_timings: 工具调用耗时统计，在/stats中一并返回
+
+    Returns:
+        Starlette应用，MCP端点为HTTP_PATH，另提供/stats统计端点
+    """
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.routing import Mount, Route
+
+    session_manager = StreamableHTTPSessionManager(app=server)
+
+    async def handle_mcp(scope, receive, send):
+        await session_manager.handle_request(scope, receive, send)
+
+    limiter = ConcurrencyLimitMiddleware(handle_mcp, per_client, total, queue_timeout)
+    timing = RequestTimingMiddleware(limiter)
+
+    async def stats(request):
+        return JSONResponse({
+            "requests": timing.tracker.get_stats(),
+            "tools": tool_timings.get_stats() if tool_timings is not None else {},
+            "concurrency": limiter.get_stats(),
+        })
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        async with session_manager.run():
+            yield
+
+    return Starlette(
+        routes=[Mount(HTTP_PATH, app=timing), Route("/stats", stats)],
+        lifespan=lifespan,
+    )
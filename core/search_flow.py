@@ -1,73 +1,203 @@
 import asyncio
-from typing import List, Dict, Any, Optional
+import re
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Set, Tuple
 from pathlib import Path
 from services import (
     AdvancedMyQuantAPIService,
     SmartDownloader,
-    WhooshSearchEngine
+    SearchEngine,
+    IngestQueue,
+    IndexReconciler,
+    IndexWriterActor,
+    SegmentMergeScheduler,
+    WriterLease,
+    create_search_engine
 )
-from config import MAX_RESULTS, CACHE_TTL
-from utils import logger, log_search_operation, log_search_result
+from services.discovery_cache import normalize_keyword
+from config import (
+    MAX_RESULTS, CACHE_TTL, DISCOVER_FILTER_OVERFETCH, DISCOVER_MIN_LOCAL_HITS, FACET_FIELDS, SEARCH_BACKEND, SEARCH_BATCH_MAX_QUERIES, SEARCH_DEADLINE,
+    SUGGEST_MAX_RESULTS
+)
+from utils import logger, log_search_operation, log_search_result, SingleFlight
 
 class SearchFlow:
     """完整搜索流程控制器"""
     
-    def __init__(self):
+    def __init__(self, api_service: Optional[AdvancedMyQuantAPIService] = None,
+                 downloader: Optional[SmartDownloader] = None,
+                 search_engine: Optional[SearchEngine] = None,
+                 ingest_queue: Optional[IngestQueue] = None,
+                 lease: Optional[WriterLease] = None):
         # 初始化各服务
-        self.api_service = AdvancedMyQuantAPIService()
-        self.downloader = SmartDownloader()
-        self.search_engine = WhooshSearchEngine()
+        self.api_service = api_service or AdvancedMyQuantAPIService()
+        self.downloader = downloader or SmartDownloader()
+        self.search_engine = search_engine or create_search_engine(SEARCH_BACKEND)
         self.cache = {}
+
+        # 所有索引写入由单个写入任务合并提交，避免并发writer冲突；
+        # 多个服务进程共用索引时通过写入租约协调
+        lease = lease if lease is not None else WriterLease()
+        self.index_writer = IndexWriterActor(
+            self.search_engine, lease=lease,
+            merge_scheduler=SegmentMergeScheduler(self.search_engine, lease),
+            on_spooled_written=self._on_spooled_written
+        )
+
+        # 已下载但未成功索引的页面，在后续请求或对账时补录
+        self.ingest_queue = ingest_queue if ingest_queue is not None else IngestQueue()
+        self.reconciler = IndexReconciler(self.downloader, self.search_engine, self.ingest_queue, lease=lease)
+
+        # 进行中请求合并：相同关键词共享一次发现调用，相同URL共享一次下载和索引
+        self._discovery_flight = SingleFlight("discovery")
+        self._url_flight = SingleFlight("download_index")
+
+        # 后台刷新（stale-while-revalidate）状态
+        self._last_refreshed: Dict[str, float] = {}
+        self._refreshing: Set[str] = set()
+        self._background_tasks: Set[asyncio.Task] = set()
     
-    async def _download_and_index(self, urls: List[str]) -> Dict[str, Any]:
-        """下载文档并建立索引（智能跳过已存在的文档）"""
-        # 下载文档
-        download_results = await self.downloader.download_urls(urls)
-
-        # 准备索引的文件-URL对（只包含真正成功下载的，排除跳过的）
-        file_url_pairs = []
-        for url, result in download_results.items():
-            if result is True:  # 只有真正成功下载的文件才需要索引
-                file_path = self.downloader.get_file_path(url)
-                file_url_pairs.append({
+    async def _discover(self, keyword: str, limit: int = 50):
+        """调用掘金量化API发现相关文档，相同关键词的并发请求只调用一次API"""
+        api_response, _ = await self._discovery_flight.do(
+            (normalize_keyword(keyword), limit),
+            lambda: asyncio.to_thread(self.api_service.search, keyword, limit)
+        )
+        return api_response
+
+    async def _download_and_index_url(self, url: str) -> Dict[str, Any]:
+        """下载单个文档并建立索引，异常只使本URL失败，不影响同一次搜索中的其他URL"""
+        try:
+            download_result = await self.downloader.download_url(url)
+        except Exception as e:
+            logger.error(f"下载失败: {url}, 错误: {e}")
+            return {'download': False, 'index': None}
+
+        index_result = None
+        if download_result is True:
+            # 先记入补录队列再索引，索引失败或进程中断后仍可补录
+            self.ingest_queue.add([url])
+
+        # 新下载的文件，以及之前下载后索引失败、仍在补录队列中的文件需要索引
+        if download_result is True or (download_result is None and url in self.ingest_queue):
+            file_path = self.downloader.get_file_path(url)
+            try:
+                index_result = await self.index_writer.add([{
                     'file_path': str(file_path),
                     'url': url
-                })
-
-        # 建立索引（智能跳过已存在的文档）
-        if file_url_pairs:
-            index_results = self.search_engine.add_documents(file_url_pairs)
-        else:
-            index_results = {
-                'total_count': 0,
-                'success_count': 0,
-                'failure_count': 0,
-                'skipped_count': len(urls)
-            }
+                }])
+            except Exception as e:
+                # 批量提交失败时同批次的请求都会收到异常，页面保留在补录队列中
+                logger.error(f"索引失败: {url}, 错误: {e}")
+                index_result = {
+                    'total_count': 1,
+                    'success_count': 0,
+                    'failure_count': 1,
+                    'skipped_count': 0,
+                    'failed_urls': [url]
+                }
+
+            if index_result['failed_urls']:
+                self.ingest_queue.record_failures([url])
+            elif not index_result.get('spooled_count'):
+                # 转交给租约持有者的文档尚未写入索引，保留在补录队列中，由代写结果更新
+                self.ingest_queue.remove([url])
+
+        return {'download': download_result, 'index': index_result}
+
+    def _on_spooled_written(self, spooled_writes: List[Tuple[Tuple[str, List[Any]], Dict[str, Any]]]) -> None:
+        """代写其他进程转交的请求后更新补录队列：成功的页面移出，失败的记录失败次数"""
+        indexed_urls = []
+        failed_urls = []
+        for (operation, items), result in spooled_writes:
+            if operation == 'delete':
+                continue
+            failed = set(result['failed_urls'])
+            failed_urls.extend(failed)
+            indexed_urls.extend(item['url'] for item in items if item['url'] not in failed)
+
+        # 转交的页面由其他进程入队，先读取队列文件中其他进程的改动
+        self.ingest_queue.reload()
+        self.ingest_queue.remove(indexed_urls)
+        if failed_urls:
+            self.ingest_queue.record_failures(failed_urls)
+
+    async def _download_and_index(self, urls: List[str],
+                                  progress: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """下载文档并建立索引（智能跳过已存在的文档，合并进行中的相同URL）"""
+        async def process(url: str):
+            url_result = await self._url_flight.do(url, lambda: self._download_and_index_url(url))
+            if progress is not None:
+                progress['completed_urls'] += 1
+            return url_result
+
+        url_results = await asyncio.gather(*[process(url) for url in urls])
+
+        download_results = {}
+        index_results = {
+            'total_count': 0,
+            'success_count': 0,
+            'failure_count': 0,
+            'skipped_count': 0,
+            'spooled_count': 0,
+            'failed_urls': []
+        }
+        shared_inflight = 0
+
+        for url, (url_result, shared) in zip(urls, url_results):
+            download_result = url_result['download']
+            if shared:
+                # 其他调用已完成下载和索引，本次调用视为跳过
+                shared_inflight += 1
+                download_results[url] = None if download_result is True else download_result
+                continue
+
+            download_results[url] = download_result
+            if url_result['index']:
+                # 只有转交给租约持有者的结果带有spooled_count
+                for key, value in url_result['index'].items():
+                    if key in index_results:
+                        index_results[key] += value
+
+        # 没有需要索引的文档时，所有URL都视为跳过索引
+        if not index_results['total_count']:
+            index_results['skipped_count'] = len(urls)
 
         # 计算实际统计
         newly_downloaded = sum(1 for result in download_results.values() if result is True)
         newly_indexed = index_results.get('success_count', 0)
         skipped_docs = len([result for result in download_results.values() if result is None])
         skipped_indexing = index_results.get('skipped_count', 0)
+        # 转交的文档在租约持有者提交后才可检索，单独报告，不计入新索引
+        pending_spooled = index_results['spooled_count']
 
         return {
             'download_results': download_results,
             'index_results': index_results,
             'newly_downloaded': newly_downloaded,
             'newly_indexed': newly_indexed,
+            'pending_spooled': pending_spooled,
             'skipped_existing_downloads': skipped_docs,
             'skipped_existing_indexing': skipped_indexing,
-            'total_skipped': skipped_docs + skipped_indexing
+            'total_skipped': skipped_docs + skipped_indexing,
+            'shared_inflight': shared_inflight
         }
     
-    async def search(self, keyword: str, max_results: int = MAX_RESULTS) -> Dict[str, Any]:
-        """完整搜索流程"""
+    async def search(self, keyword: str, max_results: int = MAX_RESULTS,
+                     filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """完整搜索流程，filters为分面过滤条件（见SearchEngine）"""
         log_context = log_search_operation(logger, keyword, max_results=max_results)
         
         try:
             # 直接使用现有索引进行搜索
-            search_result = self.search_engine.search(keyword, max_results=max_results)
+            search_result = self.search_engine.search(keyword, max_results=max_results, filters=filters)
+
+            # 没有结果时给出拼写纠错建议
+            if not search_result['total_hits']:
+                suggestions = self.search_engine.suggest_queries(keyword)
+                if suggestions:
+                    search_result['did_you_mean'] = suggestions
             
             # 记录搜索结果
             log_search_result(logger, log_context, search_result['total_hits'])
@@ -84,14 +214,90 @@ class SearchFlow:
                 "error": str(e)
             }
     
-    async def full_search(self, keyword: str, max_results: int = MAX_RESULTS) -> Dict[str, Any]:
-        """完整搜索流程（包含API调用和下载）"""
-        log_context = log_search_operation(logger, keyword, max_results=max_results)
+    async def _refresh(self, keyword: str, progress: Dict[str, Any]) -> Dict[str, Any]:
+        """发现相关文档并下载、索引，progress记录当前所处阶段"""
+        progress['stage'] = 'discovery'
+        api_response = await self._discover(keyword, limit=50)
+        urls = self.api_service.extract_unique_urls(api_response)
+        self.downloader.record_metadata(self.api_service.extract_url_metadata(api_response))
+        progress['api_hits'] = len(api_response.hits)
+        progress['total_urls'] = len(urls)
+
+        download_index_result = None
+        if urls:
+            progress['stage'] = 'download_index'
+            download_index_result = await self._download_and_index(urls, progress)
+
+        # 发现成功即视为已刷新（包括没有相关文档的情况），API失败或熔断时下次仍会重试
+        if api_response.succeeded:
+            self._last_refreshed[normalize_keyword(keyword)] = time.time()
+
+        progress['stage'] = 'done'
+        return {
+            'api_response': api_response,
+            'urls': urls,
+            'download_index_result': download_index_result
+        }
+
+    def _run_in_background(self, coro) -> asyncio.Task:
+        """在后台运行协程并保留任务引用，避免任务被垃圾回收"""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._on_background_done)
+        return task
+
+    def _on_background_done(self, task: asyncio.Task) -> None:
+        """后台任务结束时记录异常"""
+        self._background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"后台刷新失败: {task.exception()}")
+
+    def schedule_ingest_drain(self) -> Optional[asyncio.Task]:
+        """
+        在后台补录上次运行遗留在补录队列中的页面，需在事件循环中调用
+
+        Returns:
+            补录任务，队列为空时返回None
+        """
+        if not len(self.ingest_queue):
+            return None
+        logger.info(f"补录队列中有{len(self.ingest_queue)}个页面，在后台补录")
+        return self._run_in_background(self.reconciler.drain_async(self.index_writer))
+
+    async def full_search(self, keyword: str, max_results: int = MAX_RESULTS,
+                          deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        完整搜索流程（包含API调用和下载）
+
+        Args:
+            keyword: 搜索关键词
+            max_results: 最大返回结果数
+            deadline: 延迟预算（秒），超时后检索已索引的内容并返回，
+                      未完成的下载和索引在后台继续执行；None表示不限制
+        """
+        log_context = log_search_operation(logger, keyword, max_results=max_results, deadline=deadline)
         
         try:
-            # 1. 调用掘金量化API获取相关文档URL
-            api_response = self.api_service.search(keyword, limit=50)
-            urls = self.api_service.extract_unique_urls(api_response)
+            # 熔断器打开时立即降级为本地搜索
+            open_breakers = self._open_breakers()
+            if open_breakers:
+                return self._local_fallback(keyword, max_results, open_breakers, log_context)
+
+            # 1-2. 调用掘金量化API获取相关文档URL，下载到本地并建立索引
+            progress = {'stage': 'pending', 'completed_urls': 0}
+            if deadline is None:
+                refresh = await self._refresh(keyword, progress)
+            else:
+                refresh_task = self._run_in_background(self._refresh(keyword, progress))
+                done, _ = await asyncio.wait({refresh_task}, timeout=deadline)
+
+                if not done:
+                    return self._partial_search(keyword, max_results, progress, log_context)
+
+                refresh = refresh_task.result()
+            urls = refresh['urls']
+            api_response = refresh['api_response']
+            download_index_result = refresh['download_index_result']
             
             if not urls:
                 log_search_result(logger, log_context, 0)
@@ -102,9 +308,6 @@ class SearchFlow:
                     "message": "未找到相关文档"
                 }
             
-            # 2. 下载URL到本地并建立索引
-            download_index_result = await self._download_and_index(urls)
-            
             # 3. 本地Whoosh检索
             search_result = self.search_engine.search(keyword, max_results=max_results)
             
@@ -115,9 +318,16 @@ class SearchFlow:
             search_result['api_hits'] = len(api_response.hits)
             search_result['newly_downloaded'] = download_index_result['newly_downloaded']
             search_result['newly_indexed'] = download_index_result['newly_indexed']
+            search_result['pending_spooled'] = download_index_result['pending_spooled']
+            if download_index_result['pending_spooled']:
+                search_result['message'] = (
+                    f"{download_index_result['pending_spooled']}个新文档已转交给持有索引写入租约的进程，"
+                    "提交后才可检索，本次结果可能不包含这些文档"
+                )
             search_result['skipped_existing_downloads'] = download_index_result['skipped_existing_downloads']
             search_result['skipped_existing_indexing'] = download_index_result['skipped_existing_indexing']
             search_result['total_skipped'] = download_index_result['total_skipped']
+            search_result['shared_inflight'] = download_index_result['shared_inflight']
             search_result['processing_efficiency'] = {
                 'total_urls': len(urls),
                 'download_skip_ratio': download_index_result['skipped_existing_downloads'] / len(urls) if urls else 0,
@@ -125,6 +335,8 @@ class SearchFlow:
                 'total_efficiency': download_index_result['total_skipped'] / len(urls) if urls else 0,
                 'time_saved': download_index_result['total_skipped'] > 0
             }
+            search_result['deadline_exceeded'] = False
+            search_result['truncated_stages'] = []
             
             return search_result
             
@@ -137,14 +349,96 @@ class SearchFlow:
                 "results": [],
                 "error": str(e)
             }
+
+    def _open_breakers(self) -> List[str]:
+        """返回当前处于打开状态的熔断器名称"""
+        breakers = [self.api_service.breaker, self.downloader.breaker]
+        return [breaker.name for breaker in breakers if breaker.is_open]
+
+    def _local_fallback(self, keyword: str, max_results: int, open_breakers: List[str],
+                        log_context: Dict[str, Any]) -> Dict[str, Any]:
+        """远程服务熔断时仅使用本地索引检索"""
+        logger.warning(f"熔断器已打开 {open_breakers}，降级为本地搜索: {keyword}")
+
+        search_result = self.search_engine.search(keyword, max_results=max_results)
+        log_search_result(logger, log_context, search_result['total_hits'])
+
+        search_result['circuit_open'] = open_breakers
+        search_result['deadline_exceeded'] = False
+        search_result['truncated_stages'] = ['discovery', 'download_index']
+        search_result['message'] = "远程服务暂不可用（熔断中），仅返回本地索引的检索结果"
+
+        return search_result
+
+    def _partial_search(self, keyword: str, max_results: int, progress: Dict[str, Any],
+                        log_context: Dict[str, Any]) -> Dict[str, Any]:
+        """超过延迟预算时检索已索引的内容，并报告被截断的阶段"""
+        stages = ['discovery', 'download_index']
+        current_stage = progress['stage'] if progress['stage'] in stages else 'discovery'
+        truncated_stages = stages[stages.index(current_stage):]
+
+        logger.warning(f"搜索超过延迟预算: {keyword}, 截断阶段: {truncated_stages}")
+
+        search_result = self.search_engine.search(keyword, max_results=max_results)
+        log_search_result(logger, log_context, search_result['total_hits'])
+
+        search_result['deadline_exceeded'] = True
+        search_result['truncated_stages'] = truncated_stages
+        search_result['api_hits'] = progress.get('api_hits')
+        search_result['pending_urls'] = progress.get('total_urls', 0) - progress['completed_urls']
+        search_result['message'] = "超过延迟预算，返回已索引内容的检索结果，剩余下载和索引在后台继续"
+
+        return search_result
     
-    async def boolean_search(self, query_string: str, max_results: int = MAX_RESULTS) -> Dict[str, Any]:
+    def _get_staleness(self, keyword: str) -> Dict[str, Any]:
+        """计算本地数据相对于该关键词上次完整刷新的陈旧程度"""
+        last_refreshed = self._last_refreshed.get(normalize_keyword(keyword))
+        index_modified = self.search_engine.last_modified()
+
+        return {
+            "last_refreshed_at": datetime.fromtimestamp(last_refreshed).isoformat() if last_refreshed else None,
+            "age_seconds": round(time.time() - last_refreshed, 1) if last_refreshed else None,
+            "index_updated_at": datetime.fromtimestamp(index_modified).isoformat() if index_modified > 0 else None
+        }
+
+    def _schedule_refresh(self, keyword: str) -> bool:
+        """在后台调度完整刷新（API发现、下载和索引），返回是否新调度了刷新任务"""
+        key = normalize_keyword(keyword)
+        last_refreshed = self._last_refreshed.get(key)
+
+        if key in self._refreshing:
+            return False
+        if last_refreshed and time.time() - last_refreshed < CACHE_TTL:
+            return False
+
+        async def refresh():
+            try:
+                await self.full_search(keyword)
+            finally:
+                self._refreshing.discard(key)
+
+        self._refreshing.add(key)
+        self._run_in_background(refresh())
+        return True
+
+    async def stale_search(self, keyword: str, max_results: int = MAX_RESULTS) -> Dict[str, Any]:
+        """立即返回本地索引结果，并在后台刷新（stale-while-revalidate）"""
+        search_result = await self.search(keyword, max_results=max_results)
+
+        search_result['staleness'] = self._get_staleness(keyword)
+        search_result['refresh_scheduled'] = self._schedule_refresh(keyword)
+        search_result['refresh_in_progress'] = normalize_keyword(keyword) in self._refreshing
+
+        return search_result
+
+    async def boolean_search(self, query_string: str, max_results: int = MAX_RESULTS,
+                             filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
         """布尔查询搜索流程"""
         log_context = log_search_operation(logger, query_string, max_results=max_results, search_type="boolean")
         
         try:
             # 直接使用现有索引进行布尔搜索
-            search_result = self.search_engine.boolean_search(query_string, max_results=max_results)
+            search_result = self.search_engine.boolean_search(query_string, max_results=max_results, filters=filters)
             
             # 记录搜索结果
             log_search_result(logger, log_context, search_result['total_hits'])
@@ -161,13 +455,14 @@ class SearchFlow:
                 "error": str(e)
             }
     
-    async def phrase_search(self, phrase: str, max_results: int = MAX_RESULTS) -> Dict[str, Any]:
+    async def phrase_search(self, phrase: str, max_results: int = MAX_RESULTS,
+                            filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
         """短语搜索流程"""
         log_context = log_search_operation(logger, phrase, max_results=max_results, search_type="phrase")
         
         try:
             # 直接使用现有索引进行短语搜索
-            search_result = self.search_engine.phrase_search(phrase, max_results=max_results)
+            search_result = self.search_engine.phrase_search(phrase, max_results=max_results, filters=filters)
             
             # 记录搜索结果
             log_search_result(logger, log_context, search_result['total_hits'])
@@ -184,13 +479,14 @@ class SearchFlow:
                 "error": str(e)
             }
     
-    async def fuzzy_search(self, term: str, max_distance: int = 2, max_results: int = MAX_RESULTS) -> Dict[str, Any]:
+    async def fuzzy_search(self, term: str, max_distance: int = 2, max_results: int = MAX_RESULTS,
+                           filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
         """模糊搜索流程"""
         log_context = log_search_operation(logger, term, max_results=max_results, search_type="fuzzy")
         
         try:
             # 直接使用现有索引进行模糊搜索
-            search_result = self.search_engine.fuzzy_search(term, max_distance, max_results=max_results)
+            search_result = self.search_engine.fuzzy_search(term, max_distance, max_results=max_results, filters=filters)
             
             # 记录搜索结果
             log_search_result(logger, log_context, search_result['total_hits'])
@@ -207,13 +503,39 @@ class SearchFlow:
                 "error": str(e)
             }
     
-    async def tag_search(self, tag: str, keyword: str = "", max_results: int = MAX_RESULTS) -> Dict[str, Any]:
+    async def hybrid_search(self, keyword: str, max_results: int = MAX_RESULTS,
+                            filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """混合检索流程（BM25与本地向量检索按排名融合）"""
+        log_context = log_search_operation(logger, keyword, max_results=max_results, search_type="hybrid")
+
+        try:
+            # 矩阵运算和首次补建向量索引在线程中执行，不阻塞事件循环
+            search_result = await asyncio.to_thread(self.search_engine.search_hybrid, keyword, max_results,
+                                                  filters=filters)
+
+            # 记录搜索结果
+            log_search_result(logger, log_context, search_result['total_hits'])
+
+            return search_result
+
+        except Exception as e:
+            logger.error(f"混合检索流程失败: {keyword}, 错误: {e}")
+            log_search_result(logger, log_context, 0)
+            return {
+                "query": keyword,
+                "total_hits": 0,
+                "results": [],
+                "error": str(e)
+            }
+
+    async def tag_search(self, tag: str, keyword: str = "", max_results: int = MAX_RESULTS,
+                         filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
         """标签搜索流程"""
         log_context = log_search_operation(logger, keyword or tag, max_results=max_results, search_type="tag", tag=tag)
         
         try:
             # 直接使用现有索引进行标签搜索
-            search_result = self.search_engine.tag_search(tag, keyword, max_results=max_results)
+            search_result = self.search_engine.tag_search(tag, keyword, max_results=max_results, filters=filters)
             
             # 记录搜索结果
             log_search_result(logger, log_context, search_result['total_hits'])
@@ -229,7 +551,213 @@ class SearchFlow:
                 "results": [],
                 "error": str(e)
             }
-    
+
+    @staticmethod
+    def _refresh_keyword(query: Dict[str, Any]) -> str:
+        """批量查询在完整模式下用于发现和下载文档的关键词"""
+        mode = query.get("mode", "keyword")
+        text = query.get("query", "")
+        if mode == "boolean":
+            # 去掉布尔运算符、字段前缀和括号
+            text = re.sub(r'\b(AND|OR|NOT)\b|[a-zA-Z_]+:|["()]', " ", text)
+        return " ".join(text.split())
+
+    async def batch_search(self, queries: List[Dict[str, Any]], dedupe: bool = False, mode: str = "local",
+                           deadline: Optional[float] = SEARCH_DEADLINE) -> Dict[str, Any]:
+        """
+        批量搜索流程
+
+        完整模式下先并发执行各查询的发现、下载和索引（网络等待可以重叠），
+        然后在同一个索引快照上依次执行全部查询，只占用一个线程。
+        """
+        if len(queries) > SEARCH_BATCH_MAX_QUERIES:
+            return {
+                "total_queries": len(queries),
+                "results": [],
+                "error": f"一次最多执行{SEARCH_BATCH_MAX_QUERIES}个查询",
+            }
+
+        refreshes = []
+        if mode == "full":
+            keywords = list(dict.fromkeys(filter(None, map(self._refresh_keyword, queries))))
+            refreshes = await asyncio.gather(*(self.full_search(keyword, 50, deadline) for keyword in keywords))
+
+        start_time = time.perf_counter()
+        try:
+            batch_result = await asyncio.to_thread(self.search_engine.search_batch, queries, dedupe)
+        except Exception as e:
+            logger.error(f"批量搜索流程失败: {len(queries)}个查询, 错误: {e}")
+            return {"total_queries": len(queries), "results": [], "error": str(e)}
+        logger.info(f"批量搜索完成: {len(queries)}个查询, {batch_result['unique_urls']}个不同文档, "
+                    f"耗时{(time.perf_counter() - start_time) * 1000:.1f}ms")
+
+        # 报告被延迟预算截断的阶段
+        truncated_stages = [stage for refresh in refreshes if refresh.get("deadline_exceeded")
+                            for stage in refresh["truncated_stages"]]
+        if truncated_stages:
+            batch_result["deadline_exceeded"] = True
+            batch_result["truncated_stages"] = list(dict.fromkeys(truncated_stages))
+        return batch_result
+
+    async def lookup_api(self, name: str, language: Optional[str] = None,
+                         max_results: int = MAX_RESULTS) -> Dict[str, Any]:
+        """SDK符号查找流程"""
+        log_context = log_search_operation(logger, name, max_results=max_results, search_type="symbol",
+                                           language=language)
+
+        try:
+            # 按名称精确查找符号表，不经过全文检索
+            lookup_result = self.search_engine.lookup_symbol(name, language, max_results=max_results)
+
+            # 记录查找结果
+            log_search_result(logger, log_context, lookup_result['total_hits'])
+
+            return lookup_result
+
+        except Exception as e:
+            logger.error(f"SDK符号查找失败: {name}, 错误: {e}")
+            log_search_result(logger, log_context, 0)
+            return {
+                "query": name,
+                "language": language,
+                "total_hits": 0,
+                "symbols": [],
+                "error": str(e)
+            }
+
+    async def suggest(self, prefix: str, limit: int = SUGGEST_MAX_RESULTS) -> Dict[str, Any]:
+        """前缀补全流程（只查询内存中的补全索引）"""
+        try:
+            return self.search_engine.suggest(prefix, limit)
+        except Exception as e:
+            logger.error(f"前缀补全失败: {prefix}, 错误: {e}")
+            return {"prefix": prefix, "suggestions": [], "error": str(e)}
+
+    async def discover(self, keyword: str, limit: int = 100,
+                       filters: Optional[Dict[str, List[str]]] = None,
+                       mode: str = "local") -> Dict[str, Any]:
+        """
+        发现相关文档（只返回URL和元数据）
+
+        Args:
+            keyword: 搜索关键词
+            limit: 返回结果数量
+            filters: 过滤条件（document_type、language、category）
+            mode: local表示优先使用本地索引和文档元数据，命中不足时才调用远程API；
+                  full表示总是调用远程API
+        """
+        filters = {name: values for name, values in (filters or {}).items() if values}
+
+        local_result = None
+        if mode != "full":
+            local_result = self._local_discover(keyword, limit, filters)
+            if local_result['total_hits'] >= min(limit, DISCOVER_MIN_LOCAL_HITS):
+                return local_result
+
+        remote_result = await self._remote_discover(keyword, limit, filters)
+
+        # 远程API不可用（熔断、断网）时使用本地结果
+        if not remote_result['total_hits'] and local_result and local_result['total_hits']:
+            local_result['message'] = "远程API无结果或不可用，返回本地文档目录中的发现结果"
+            return local_result
+
+        return remote_result
+
+    def _local_discover(self, keyword: str, limit: int,
+                        filters: Dict[str, List[str]]) -> Dict[str, Any]:
+        """
+        使用本地索引检索，并结合下载时记录的文档元数据生成发现结果
+
+        索引分面能表达的条件（如language）直接交给索引过滤；其余条件按文档元数据过滤，
+        此时多取DISCOVER_FILTER_OVERFETCH倍的命中。没有记录对应元数据的文档不排除。
+        """
+        start_time = time.time()
+        index_filters = {name: values for name, values in filters.items() if name in FACET_FIELDS}
+        metadata_filters = {name: values for name, values in filters.items() if name not in FACET_FIELDS}
+        max_results = limit * DISCOVER_FILTER_OVERFETCH if metadata_filters else limit
+        search_result = self.search_engine.search(keyword, max_results=max_results, filters=index_filters or None)
+
+        document_summaries = []
+        for hit in search_result['results']:
+            metadata = self.downloader.get_metadata(hit['url']) or {}
+            if any(metadata.get(name) and metadata[name] not in values for name, values in metadata_filters.items()):
+                continue
+
+            content = hit['content'] or ""
+            document_summaries.append({
+                "title": metadata.get('title') or hit['title'] or "未知标题",
+                "url": hit['url'],
+                "summary": content[:200] + "..." if len(content) > 200 else content,
+                "document_type": metadata.get('document_type') or "unknown",
+                "language": metadata.get('language') or "unknown",
+                "relevance_score": hit['score'],
+                "hierarchy": metadata.get('hierarchy', []),
+                "anchors": metadata.get('anchors', []),
+            })
+            if len(document_summaries) >= limit:
+                break
+
+        return {
+            "query": keyword,
+            "source": "local",
+            "total_hits": len(document_summaries),
+            "document_summaries": document_summaries[:20],
+            "unique_urls": [summary['url'] for summary in document_summaries],
+            "processing_time_ms": int((time.time() - start_time) * 1000),
+            "document_categories": self._count_categories(
+                [summary['hierarchy'] for summary in document_summaries]
+            ),
+            "search_filters": filters,
+            "estimated_total_hits": len(document_summaries),
+        }
+
+    async def _remote_discover(self, keyword: str, limit: int,
+                               filters: Dict[str, List[str]]) -> Dict[str, Any]:
+        """调用远程API发现文档，并记录页面元数据"""
+        api_response = await asyncio.to_thread(self.api_service.search, keyword, limit, filters or None)
+        self.downloader.record_metadata(self.api_service.extract_url_metadata(api_response))
+
+        document_summaries = []
+        for hit in api_response.hits[:20]:
+            content = hit.content or ""
+            document_summaries.append({
+                "title": hit.title or "未知标题",
+                "url": hit.url,
+                "summary": content[:200] + "..." if len(content) > 200 else content,
+                "document_type": hit.document_type or "unknown",
+                "language": hit.language or "unknown",
+                "relevance_score": getattr(hit, "relevance_score", 0),
+                "hierarchy": hit.hierarchy,
+            })
+
+        return {
+            "query": keyword,
+            "source": "remote",
+            "total_hits": len(api_response.hits),
+            "document_summaries": document_summaries,
+            "unique_urls": self.api_service.extract_unique_urls(api_response),
+            "processing_time_ms": api_response.processing_time_ms,
+            "document_categories": self.api_service.get_document_categories(api_response),
+            "search_filters": filters,
+            "estimated_total_hits": api_response.estimated_total_hits,
+        }
+
+    @staticmethod
+    def _count_categories(hierarchies: List[List[str]]) -> Dict[str, Any]:
+        """按层级统计文档分类（与API结果的分类统计口径一致）"""
+        counters = [{}, {}, {}]
+        for hierarchy in hierarchies:
+            for level, counter in enumerate(counters):
+                if len(hierarchy) > level:
+                    value = hierarchy[level] if level == 0 else hierarchy[level].lower()
+                    counter[value] = counter.get(value, 0) + 1
+
+        return {
+            'total_documents': len(hierarchies),
+            'document_types': counters[0],
+            'languages': counters[1],
+            'categories': counters[2]
+        }
         
     def get_stats(self) -> Dict[str, Any]:
         """获取系统统计信息"""
@@ -240,5 +768,20 @@ class SearchFlow:
         return {
             "downloader": download_stats,
             "search_engine": index_stats,
+            "discovery_cache": self.api_service.cache.get_stats(),
+            "inflight_coalescing": {
+                "discovery": self._discovery_flight.get_stats(),
+                "download_index": self._url_flight.get_stats()
+            },
+            "circuit_breakers": {
+                self.api_service.breaker.name: self.api_service.breaker.get_state(),
+                self.downloader.breaker.name: self.downloader.breaker.get_state()
+            },
+            "index_writer": self.index_writer.get_stats(),
+            "ingest_queue": self.ingest_queue.get_stats(),
+            "background_refresh": {
+                "in_progress": len(self._refreshing),
+                "refreshed_keywords": len(self._last_refreshed)
+            },
             "cache_size": len(self.cache)
         }
\ No newline at end of file
@@ -0,0 +1,162 @@
+import re
+from typing import Any, Dict, List
+
+from config import MAX_RESULTS, SEARCH_DEADLINE, SUGGEST_MAX_RESULTS
+
+from .search_flow import SearchFlow
+
+
+def _facet_filters(arguments: Dict[str, Any]) -> Dict[str, List[str]]:
+    """工具参数中的分面过滤条件：SDK语言和文档栏目"""
+    return {field: [arguments[field]] for field in ("language", "section") if arguments.get(field)}
+
+
+async def dispatch_tool(search_flow: SearchFlow, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    执行MCP工具调用，返回结果字典
+
+    stdio服务进程和搜索守护进程共用该函数，保证两种模式下的工具行为一致。
+
+    Raises:
+        ValueError: 未知的工具名称
+    """
+    result = None
+    refresh = None
+
+    if name == "search_documents":
+        keyword = arguments.get("keyword", "")
+        max_results = arguments.get("max_results", MAX_RESULTS)
+        mode = arguments.get("mode", "full")
+        deadline = arguments.get("deadline_seconds", SEARCH_DEADLINE)
+
+        if mode == "stale":
+            result = await search_flow.stale_search(keyword, max_results)
+        else:
+            result = await search_flow.full_search(keyword, max_results, deadline)
+
+    elif name == "search_boolean":
+        query_string = arguments.get("query_string", "")
+        max_results = arguments.get("max_results", MAX_RESULTS)
+        mode = arguments.get("mode", "full")
+        deadline = arguments.get("deadline_seconds", SEARCH_DEADLINE)
+
+        if mode == "full":
+            # 提取关键词进行完整搜索
+            keywords = []
+            for match in re.finditer(r'"([^"]+)"|(\w+)', query_string):
+                keyword = match.group(1) or match.group(2)
+                if keyword.lower() not in [
+                    "and",
+                    "or",
+                    "not",
+                    "title:",
+                    "content:",
+                ]:
+                    keywords.append(keyword)
+
+            if keywords:
+                combined_keyword = " ".join(keywords)
+                refresh = await search_flow.full_search(combined_keyword, 50, deadline)
+
+        result = await search_flow.boolean_search(query_string, max_results, _facet_filters(arguments))
+
+    elif name == "search_phrase":
+        phrase = arguments.get("phrase", "")
+        max_results = arguments.get("max_results", MAX_RESULTS)
+        mode = arguments.get("mode", "full")
+        deadline = arguments.get("deadline_seconds", SEARCH_DEADLINE)
+
+        if mode == "full":
+            refresh = await search_flow.full_search(phrase, 50, deadline)
+
+        result = await search_flow.phrase_search(phrase, max_results, _facet_filters(arguments))
+
+    elif name == "search_fuzzy":
+        term = arguments.get("term", "")
+        max_distance = arguments.get("max_distance", 2)
+        max_results = arguments.get("max_results", MAX_RESULTS)
+        mode = arguments.get("mode", "full")
+        deadline = arguments.get("deadline_seconds", SEARCH_DEADLINE)
+
+        if mode == "full":
+            refresh = await search_flow.full_search(term, 50, deadline)
+
+        result = await search_flow.fuzzy_search(term, max_distance, max_results, _facet_filters(arguments))
+
+    elif name == "search_tag":
+        tag = arguments.get("tag", "")
+        keyword = arguments.get("keyword", "")
+        max_results = arguments.get("max_results", MAX_RESULTS)
+        mode = arguments.get("mode", "full")
+        deadline = arguments.get("deadline_seconds", SEARCH_DEADLINE)
+
+        if mode == "full" and keyword:
+            refresh = await search_flow.full_search(keyword, 50, deadline)
+
+        result = await search_flow.tag_search(tag, keyword, max_results, _facet_filters(arguments))
+
+    elif name == "search_hybrid":
+        keyword = arguments.get("keyword", "")
+        max_results = arguments.get("max_results", MAX_RESULTS)
+        mode = arguments.get("mode", "full")
+        deadline = arguments.get("deadline_seconds", SEARCH_DEADLINE)
+
+        if mode == "full":
+            refresh = await search_flow.full_search(keyword, 50, deadline)
+
+        result = await search_flow.hybrid_search(keyword, max_results, _facet_filters(arguments))
+
+    elif name == "search_batch":
+        queries = arguments.get("queries", [])
+        dedupe = arguments.get("dedupe", False)
+        mode = arguments.get("mode", "local")
+        deadline = arguments.get("deadline_seconds", SEARCH_DEADLINE)
+        result = await search_flow.batch_search(queries, dedupe, mode, deadline)
+
+    elif name == "search_documents_local":
+        keyword = arguments.get("keyword", "")
+        max_results = arguments.get("max_results", MAX_RESULTS)
+        result = await search_flow.search(keyword, max_results, _facet_filters(arguments))
+
+    elif name == "lookup_api":
+        api_name = arguments.get("name", "")
+        language = arguments.get("language")
+        max_results = arguments.get("max_results", MAX_RESULTS)
+        result = await search_flow.lookup_api(api_name, language, max_results)
+
+    elif name == "suggest":
+        prefix = arguments.get("prefix", "")
+        limit = arguments.get("limit", SUGGEST_MAX_RESULTS)
+        result = await search_flow.suggest(prefix, limit)
+
+    elif name == "get_system_stats":
+        result = search_flow.get_stats()
+
+    elif name == "discover_documents":
+        keyword = arguments.get("keyword", "")
+        limit = arguments.get("limit", 100)
+        doc_type = arguments.get("doc_type")
+        language = arguments.get("language")
+        category = arguments.get("category")
+        mode = arguments.get("mode", "local")
+
+        # 构建过滤条件
+        filters = {}
+        if doc_type:
+            filters["document_type"] = [doc_type]
+        if language:
+            filters["language"] = [language]
+        if category:
+            filters["category"] = [category]
+
+        result = await search_flow.discover(keyword, limit, filters, mode)
+        result["usage_note"] = "此工具仅用于发现相关文档。如需获取具体内容和详细搜索，请使用 search_documents 等搜索工具"
+    else:
+        raise ValueError(f"Unknown tool: {name}")
+
+    # 完整模式下报告被延迟预算截断的阶段
+    if refresh and refresh.get("deadline_exceeded"):
+        result["deadline_exceeded"] = True
+        result["truncated_stages"] = refresh["truncated_stages"]
+
+    return result
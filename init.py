@@ -2,9 +2,13 @@ import asyncio
 from pathlib import Path
 from services.search_service import SearchService
 from services.downloader import SmartDownloader
-from services.whoosh_service import WhooshSearchEngine
+from services.backends import create_search_engine
+from services.myquant_api import EnhancedMyQuantAPIService
+from services.mirror import SiteMirror
+from services.ingest_queue import IngestQueue, IndexReconciler
+from services.write_lease import WriterLease
 from utils import logger
-from config import DOCS_DIR, INDEX_DIR
+from config import DOCS_DIR, INDEX_DIR, SEARCH_BACKEND
 
 async def initialize_docs(test_mode=False, test_limit=5):
     """初始化文档下载和索引
@@ -20,7 +24,7 @@ async def initialize_docs(test_mode=False, test_limit=5):
     # 初始化服务
     search_service = SearchService()
     downloader = SmartDownloader()
-    search_engine = WhooshSearchEngine()
+    search_engine = create_search_engine(SEARCH_BACKEND)
     
     # 根据模式设置搜索限制
     search_limit = test_limit if test_mode else 100
@@ -61,15 +65,49 @@ async def initialize_docs(test_mode=False, test_limit=5):
         if file_path.exists():
             file_url_pairs.append({"file_path": file_path, "url": url})
     
-    # 批量添加到索引
+    # 批量添加到索引（与运行中的服务进程共用索引，需持有写入租约）
     if file_url_pairs:
-        result = search_engine.add_documents(file_url_pairs)
+        with WriterLease().lock:
+            result = search_engine.add_documents(file_url_pairs)
         logger.info(f"索引完成: {result}")
     else:
         logger.info("没有新文档需要索引")
     
     logger.info("初始化完成")
 
+async def mirror_site(max_pages=None, reset=False, seed_urls=()):
+    """全站镜像：分页发现并跟随页面链接下载整个文档站点，支持中断后续爬
+    
+    Args:
+        max_pages: 本次运行最多处理的页面数，None表示处理到队列为空
+        reset: 是否丢弃已保存的爬取进度，从头开始
+        seed_urls: 额外的起始URL
+    """
+    DOCS_DIR.mkdir(parents=True, exist_ok=True)
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    
+    mirror = SiteMirror(
+        downloader=SmartDownloader(),
+        search_engine=create_search_engine(SEARCH_BACKEND),
+        api_service=EnhancedMyQuantAPIService()
+    )
+    
+    if reset:
+        logger.info("清空镜像进度，从头开始")
+        mirror.reset()
+    
+    stats = await mirror.run(seed_urls=seed_urls, max_pages=max_pages)
+    logger.info(f"镜像完成: 已完成 {stats['done']} 个, 待处理 {stats['pending']} 个, 失败 {stats['failed']} 个")
+
+def reconcile_index():
+    """对比下载目录和索引，只补录索引中缺失的页面"""
+    reconciler = IndexReconciler(SmartDownloader(), create_search_engine(SEARCH_BACKEND), IngestQueue())
+    result = reconciler.reconcile()
+    logger.info(
+        f"对账完成: 已下载 {result['catalog']} 个, 缺失 {result['missing']} 个, "
+        f"补录成功 {result['indexed']} 个, 失败 {result['failed']} 个"
+    )
+
 if __name__ == "__main__":
     import argparse
     
@@ -77,8 +115,18 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="初始化文档下载和索引")
     parser.add_argument("--test", action="store_true", help="启用测试模式，只下载少量文档")
     parser.add_argument("--limit", type=int, default=5, help="测试模式下下载的文档数量限制 (默认: 5)")
+    parser.add_argument("--mirror", action="store_true", help="全站镜像模式，枚举并下载整个文档站点，中断后再次运行会继续")
+    parser.add_argument("--max-pages", type=int, default=None, help="镜像模式下本次运行最多处理的页面数")
+    parser.add_argument("--reset", action="store_true", help="镜像模式下丢弃已保存的进度，从头开始")
+    parser.add_argument("--seed", action="append", default=[], help="镜像模式下额外的起始URL，可重复指定")
+    parser.add_argument("--reconcile", action="store_true", help="对比已下载文档和索引，只补录索引中缺失的页面")
     
     args = parser.parse_args()
     
-    # 运行初始化
-    asyncio.run(initialize_docs(test_mode=args.test, test_limit=args.limit))
\ No newline at end of file
+    if args.reconcile:
+        reconcile_index()
+    elif args.mirror:
+        asyncio.run(mirror_site(max_pages=args.max_pages, reset=args.reset, seed_urls=args.seed))
+    else:
+        # 运行初始化
+        asyncio.run(initialize_docs(test_mode=args.test, test_limit=args.limit))
\ No newline at end of file
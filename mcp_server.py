@@ -1,20 +1,64 @@
 import asyncio
+import json
+import time
 from typing import Sequence
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import TextContent, Tool
 
-from config import MAX_RESULTS
-from core import SearchFlow
-from utils import logger
+from config import (
+    DAEMON_MODE, DAEMON_SOCKET, HTTP_HOST, HTTP_PATH, HTTP_PORT, HTTP_TIMING_WINDOW,
+    MAX_RESULTS, SEARCH_BATCH_MAX_QUERIES, SEARCH_DEADLINE, SUGGEST_MAX_RESULTS
+)
+from core.daemon import DaemonClient, SearchDaemon, daemon_supported
+from utils import logger, LatencyTracker
 
 # 创建MCP Server实例
 server = Server("myquant-doc-mcp-service")
 
-# 创建搜索流程实例
-search_flow = SearchFlow()
+# 搜索流程实例，首次在本进程内执行工具调用时创建（代理模式下不加载索引和分词词典）
+search_flow = None
 
+# 搜索守护进程客户端，仅在代理模式下使用
+daemon_client = None
+
+# 工具调用耗时统计
+tool_timings = LatencyTracker(HTTP_TIMING_WINDOW)
+
+
+def get_search_flow():
+    """获取本进程内的搜索流程实例"""
+    global search_flow
+    if search_flow is None:
+        from core import SearchFlow
+
+        search_flow = SearchFlow()
+        # 首次使用时（已在事件循环中）补录上次运行未完成索引的页面
+        search_flow.schedule_ingest_drain()
+    return search_flow
+
+
+# 本地搜索的分面过滤参数：SDK语言和文档栏目在写入索引时从文档URL路径得到
+FACET_FILTER_PROPERTIES = {
+    "language": {
+        "type": "string",
+        "description": "SDK语言过滤 (python, cpp, csharp, matlab)",
+        "enum": ["python", "cpp", "csharp", "matlab"],
+    },
+    "section": {
+        "type": "string",
+        "description": "文档栏目过滤：文档URL中docs2/之后的第一段目录（如 sdk、faq），各栏目的文档数见结果中的facets",
+    },
+}
+
+
+# 会触发完整搜索的工具共用的延迟预算参数
+DEADLINE_PROPERTY = {
+    "type": "number",
+    "description": "完整搜索的延迟预算（秒），超时后返回已索引内容的检索结果，剩余下载在后台继续",
+    "default": SEARCH_DEADLINE,
+}
 
 # 注册工具列表
 @server.list_tools()
@@ -36,6 +80,13 @@ async def list_tools() -> list[Tool]:
                         "description": "最大返回结果数",
                         "default": MAX_RESULTS,
                     },
+                    "mode": {
+                        "type": "string",
+                        "description": "搜索模式：full（等待API调用、下载和索引完成后检索）或 stale（立即返回本地索引结果，并在后台刷新，结果中附带数据陈旧程度）",
+                        "enum": ["full", "stale"],
+                        "default": "full",
+                    },
+                    "deadline_seconds": DEADLINE_PROPERTY,
                 },
                 "required": ["keyword"],
             },
@@ -55,12 +106,14 @@ async def list_tools() -> list[Tool]:
                         "description": "最大返回结果数",
                         "default": MAX_RESULTS,
                     },
+                    **FACET_FILTER_PROPERTIES,
                     "mode": {
                         "type": "string",
                         "description": "搜索模式：full（完整搜索，确保最新内容）或 local（仅本地搜索，快速但可能使用过时内容）",
                         "enum": ["full", "local"],
                         "default": "full",
                     },
+                    "deadline_seconds": DEADLINE_PROPERTY,
                 },
                 "required": ["query_string"],
             },
@@ -77,12 +130,14 @@ async def list_tools() -> list[Tool]:
                         "description": "最大返回结果数",
                         "default": MAX_RESULTS,
                     },
+                    **FACET_FILTER_PROPERTIES,
                     "mode": {
                         "type": "string",
                         "description": "搜索模式：full（完整搜索）或 local（仅本地搜索）",
                         "enum": ["full", "local"],
                         "default": "full",
                     },
+                    "deadline_seconds": DEADLINE_PROPERTY,
                 },
                 "required": ["phrase"],
             },
@@ -106,12 +161,14 @@ async def list_tools() -> list[Tool]:
                         "description": "最大返回结果数",
                         "default": MAX_RESULTS,
                     },
+                    **FACET_FILTER_PROPERTIES,
                     "mode": {
                         "type": "string",
                         "description": "搜索模式：full（完整搜索）或 local（仅本地搜索）",
                         "enum": ["full", "local"],
                         "default": "full",
                     },
+                    "deadline_seconds": DEADLINE_PROPERTY,
                 },
                 "required": ["term"],
             },
@@ -133,16 +190,93 @@ async def list_tools() -> list[Tool]:
                         "description": "最大返回结果数",
                         "default": MAX_RESULTS,
                     },
+                    **FACET_FILTER_PROPERTIES,
                     "mode": {
                         "type": "string",
                         "description": "搜索模式：full（完整搜索）或 local（仅本地搜索）",
                         "enum": ["full", "local"],
                         "default": "full",
                     },
+                    "deadline_seconds": DEADLINE_PROPERTY,
                 },
                 "required": ["tag"],
             },
         ),
+        Tool(
+            name="search_hybrid",
+            description="掘金量化文档混合检索：关键词检索（BM25）与本地语义向量检索按排名融合，能找到用词不同但内容相近的文档，适用于描述性的自然语言问题",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "keyword": {"type": "string", "description": "搜索关键词或自然语言问题"},
+                    "max_results": {
+                        "type": "integer",
+                        "description": "最大返回结果数",
+                        "default": MAX_RESULTS,
+                    },
+                    **FACET_FILTER_PROPERTIES,
+                    "mode": {
+                        "type": "string",
+                        "description": "搜索模式：full（完整搜索）或 local（仅本地搜索）",
+                        "enum": ["full", "local"],
+                        "default": "full",
+                    },
+                    "deadline_seconds": DEADLINE_PROPERTY,
+                },
+                "required": ["keyword"],
+            },
+        ),
+        Tool(
+            name="search_batch",
+            description="批量搜索：一次执行多个相关查询（每个查询可使用不同的搜索方式和参数），在同一个索引快照上执行并一次返回，可去除各查询之间重复的文档，适用于需要连续发起多个搜索的场景",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "queries": {
+                        "type": "array",
+                        "description": f"查询列表，最多{SEARCH_BATCH_MAX_QUERIES}个",
+                        "maxItems": SEARCH_BATCH_MAX_QUERIES,
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "mode": {
+                                    "type": "string",
+                                    "description": "搜索方式：keyword（关键词）、boolean（布尔查询）、phrase（精确短语）、fuzzy（模糊）、tag（标签过滤）或 hybrid（混合检索）",
+                                    "enum": ["keyword", "boolean", "phrase", "fuzzy", "tag", "hybrid"],
+                                    "default": "keyword",
+                                },
+                                "query": {"type": "string", "description": "查询内容，tag方式下为可选的组合关键词"},
+                                "tag": {"type": "string", "description": "tag方式的标签名称"},
+                                "max_distance": {
+                                    "type": "integer",
+                                    "description": "fuzzy方式的最大编辑距离",
+                                    "default": 2,
+                                },
+                                "max_results": {
+                                    "type": "integer",
+                                    "description": "最大返回结果数",
+                                    "default": MAX_RESULTS,
+                                },
+                                **FACET_FILTER_PROPERTIES,
+                            },
+                        },
+                    },
+                    "dedupe": {
+                        "type": "boolean",
+                        "description": "是否去除重复文档：前面的查询已返回的文档不再重复返回，只列出URL",
+                        "default": False,
+                    },
+                    "mode": {
+                        "type": "string",
+                        "description": "搜索模式：local（仅本地搜索）或 full（先并发发现和下载各查询的相关文档）",
+                        "enum": ["local", "full"],
+                        "default": "local",
+                    },
+                    "deadline_seconds": DEADLINE_PROPERTY,
+                },
+                "required": ["queries"],
+            },
+        ),
         Tool(
             name="search_documents_local",
             description="快速本地搜索（仅使用现有索引，可能使用过时内容但响应更快），适用于已知内容没有变化或需要快速查询的场景",
@@ -158,10 +292,51 @@ async def list_tools() -> list[Tool]:
                         "description": "最大返回结果数",
                         "default": MAX_RESULTS,
                     },
+                    **FACET_FILTER_PROPERTIES,
                 },
                 "required": ["keyword"],
             },
         ),
+        Tool(
+            name="lookup_api",
+            description="按名称精确查找掘金量化SDK函数（如 history、order_volume、subscribe），直接返回函数原型、参数表、返回值和文档链接，不进行全文检索，适用于已知函数名的场景",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "name": {
+                        "type": "string",
+                        "description": "函数或对象名，不区分大小写，可带模块前缀（如 gm.api.history）",
+                    },
+                    "language": {
+                        "type": "string",
+                        "description": "SDK语言过滤 (python, cpp, csharp, matlab)",
+                        "enum": ["python", "cpp", "csharp", "matlab"],
+                    },
+                    "max_results": {
+                        "type": "integer",
+                        "description": "最大返回结果数",
+                        "default": MAX_RESULTS,
+                    },
+                },
+                "required": ["name"],
+            },
+        ),
+        Tool(
+            name="suggest",
+            description="按前缀补全文档标题、小节标题、标签和SDK函数名，按出现的文档数排序，用于在完整搜索前确定准确的页面标题或函数名",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "prefix": {"type": "string", "description": "已输入的前缀，不区分大小写"},
+                    "limit": {
+                        "type": "integer",
+                        "description": "返回的补全数量",
+                        "default": SUGGEST_MAX_RESULTS,
+                    },
+                },
+                "required": ["prefix"],
+            },
+        ),
         Tool(
             name="get_system_stats",
             description="获取系统统计信息，包括下载文档数量、索引文档数量等",
@@ -194,6 +369,12 @@ async def list_tools() -> list[Tool]:
                         "description": "功能分类过滤 (api, data, trading, sdk, tools)",
                         "enum": ["api", "data", "trading", "sdk", "tools"],
                     },
+                    "mode": {
+                        "type": "string",
+                        "description": "发现模式：local（默认，优先使用本地索引和文档元数据，本地命中不足时才调用API，断网时仍可使用）、full（总是调用远程API）",
+                        "enum": ["local", "full"],
+                        "default": "local",
+                    },
                 },
                 "required": ["keyword"],
             },
@@ -205,143 +386,34 @@ async def list_tools() -> list[Tool]:
 @server.call_tool()
 async def call_tool(name: str, arguments: dict) -> Sequence[TextContent]:
     """处理工具调用请求"""
+    start_time = time.perf_counter()
     try:
         result = None
+        if daemon_client is not None:
+            try:
+                result = await daemon_client.call(name, arguments)
+            except ConnectionError as e:
+                # 守护进程不可用时在本进程内执行
+                logger.warning(f"搜索守护进程不可用，改为本进程内执行: {e}")
 
-        if name == "search_documents":
-            keyword = arguments.get("keyword", "")
-            max_results = arguments.get("max_results", MAX_RESULTS)
-            result = await search_flow.full_search(keyword, max_results)
-
-        elif name == "search_boolean":
-            query_string = arguments.get("query_string", "")
-            max_results = arguments.get("max_results", MAX_RESULTS)
-            mode = arguments.get("mode", "full")
-
-            if mode == "full":
-                # 提取关键词进行完整搜索
-                keywords = []
-                import re
-
-                for match in re.finditer(r'"([^"]+)"|(\w+)', query_string):
-                    keyword = match.group(1) or match.group(2)
-                    if keyword.lower() not in [
-                        "and",
-                        "or",
-                        "not",
-                        "title:",
-                        "content:",
-                    ]:
-                        keywords.append(keyword)
-
-                if keywords:
-                    combined_keyword = " ".join(keywords)
-                    await search_flow.full_search(combined_keyword, 50)
-
-            result = await search_flow.boolean_search(query_string, max_results)
-
-        elif name == "search_phrase":
-            phrase = arguments.get("phrase", "")
-            max_results = arguments.get("max_results", MAX_RESULTS)
-            mode = arguments.get("mode", "full")
-
-            if mode == "full":
-                await search_flow.full_search(phrase, 50)
-
-            result = await search_flow.phrase_search(phrase, max_results)
-
-        elif name == "search_fuzzy":
-            term = arguments.get("term", "")
-            max_distance = arguments.get("max_distance", 2)
-            max_results = arguments.get("max_results", MAX_RESULTS)
-            mode = arguments.get("mode", "full")
-
-            if mode == "full":
-                await search_flow.full_search(term, 50)
-
-            result = await search_flow.fuzzy_search(term, max_distance, max_results)
-
-        elif name == "search_tag":
-            tag = arguments.get("tag", "")
-            keyword = arguments.get("keyword", "")
-            max_results = arguments.get("max_results", MAX_RESULTS)
-            mode = arguments.get("mode", "full")
-
-            if mode == "full" and keyword:
-                await search_flow.full_search(keyword, 50)
-
-            result = await search_flow.tag_search(tag, keyword, max_results)
-
-        elif name == "search_documents_local":
-            keyword = arguments.get("keyword", "")
-            max_results = arguments.get("max_results", MAX_RESULTS)
-            result = await search_flow.search(keyword, max_results)
-
-        elif name == "get_system_stats":
-            result = search_flow.get_stats()
-
-        elif name == "discover_documents":
-            keyword = arguments.get("keyword", "")
-            limit = arguments.get("limit", 100)
-            doc_type = arguments.get("doc_type")
-            language = arguments.get("language")
-            category = arguments.get("category")
-
-            # 构建过滤条件
-            filters = {}
-            if doc_type:
-                filters["document_type"] = [doc_type]
-            if language:
-                filters["language"] = [language]
-            if category:
-                filters["category"] = [category]
-
-            api_response = search_flow.api_service.search(keyword, limit, filters)
-            urls = search_flow.api_service.extract_unique_urls(api_response)
-            categories = search_flow.api_service.get_document_categories(api_response)
-
-            # 格式化文档摘要信息
-            document_summaries = []
-            for hit in api_response.hits[:20]:
-                content = hit.content or ""
-                summary = content[:200] + "..." if len(content) > 200 else content
-
-                document_summaries.append(
-                    {
-                        "title": hit.title or "未知标题",
-                        "url": hit.url,
-                        "summary": summary,
-                        "document_type": getattr(hit, "document_type", "unknown"),
-                        "language": getattr(hit, "language", "unknown"),
-                        "relevance_score": getattr(hit, "relevance_score", 0),
-                    }
-                )
-
-            result = {
-                "query": keyword,
-                "total_hits": len(api_response.hits),
-                "document_summaries": document_summaries,
-                "unique_urls": urls,
-                "processing_time_ms": api_response.processing_time_ms,
-                "document_categories": categories,
-                "search_filters": filters,
-                "estimated_total_hits": api_response.estimated_total_hits,
-                "usage_note": "此工具仅用于发现相关文档。如需获取具体内容和详细搜索，请使用 search_documents 等搜索工具",
-            }
-        else:
-            raise ValueError(f"Unknown tool: {name}")
+        if result is None:
+            from core.tools import dispatch_tool
 
-        # 将结果转换为JSON字符串并返回
-        import json
+            result = await dispatch_tool(get_search_flow(), name, arguments)
 
+        tool_timings.record(name, time.perf_counter() - start_time)
+        if name == "get_system_stats":
+            result["tool_timings"] = tool_timings.get_stats()
+
+        # 将结果转换为JSON字符串并返回
         result_str = json.dumps(result, ensure_ascii=False, indent=2)
 
         return [TextContent(type="text", text=result_str)]
 
     except Exception as e:
+        tool_timings.record(name, time.perf_counter() - start_time, ok=False)
         logger.error(f"工具调用失败: {name}, 错误: {e}", exc_info=True)
         error_result = {"error": str(e), "tool": name, "arguments": arguments}
-        import json
 
         return [
             TextContent(
@@ -352,7 +424,16 @@ async def call_tool(name: str, arguments: dict) -> Sequence[TextContent]:
 
 async def main():
     """主函数"""
-    logger.info("启动 myquant-doc-mcp-service (stdio模式)")
+    global daemon_client
+
+    if DAEMON_MODE == "auto" and daemon_supported():
+        client = DaemonClient()
+        if await client.connect():
+            daemon_client = client
+            logger.info(f"启动 myquant-doc-mcp-service (stdio代理模式，守护进程: {DAEMON_SOCKET})")
+
+    if daemon_client is None:
+        logger.info("启动 myquant-doc-mcp-service (stdio模式)")
 
     async with stdio_server() as (read_stream, write_stream):
         await server.run(
@@ -360,5 +441,35 @@ async def main():
         )
 
 
+def run_http(host: str = HTTP_HOST, port: int = HTTP_PORT):
+    """以Streamable HTTP传输运行，一个进程同时为多个MCP客户端提供服务"""
+    import uvicorn
+
+    from core.http_transport import create_http_app
+
+    logger.info(f"启动 myquant-doc-mcp-service (Streamable HTTP模式): http://{host}:{port}{HTTP_PATH}")
+    uvicorn.run(create_http_app(server, tool_timings), host=host, port=port, log_level="warning")
+
+
+async def run_daemon():
+    """以搜索守护进程模式运行"""
+    logger.info("启动 myquant-doc-mcp-service (守护进程模式)")
+    await SearchDaemon(get_search_flow()).serve_forever()
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    import argparse
+
+    parser = argparse.ArgumentParser(description="掘金量化文档MCP服务")
+    parser.add_argument("--daemon", action="store_true", help="以搜索守护进程模式运行，供多个stdio代理共享")
+    parser.add_argument("--http", action="store_true", help="使用Streamable HTTP传输代替stdio，供多个客户端连接")
+    parser.add_argument("--host", default=HTTP_HOST, help=f"HTTP模式监听地址 (默认: {HTTP_HOST})")
+    parser.add_argument("--port", type=int, default=HTTP_PORT, help=f"HTTP模式监听端口 (默认: {HTTP_PORT})")
+    args = parser.parse_args()
+
+    if args.daemon:
+        asyncio.run(run_daemon())
+    elif args.http:
+        run_http(args.host, args.port)
+    else:
+        asyncio.run(main())
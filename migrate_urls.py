@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+URL规范化迁移脚本
+将已下载文档和索引中的URL迁移为规范化URL，合并同一页面因锚点、
+查询参数或编码差异产生的重复文件和重复索引文档
+"""
+
+from services import SmartDownloader, WhooshSearchEngine, WriterLease
+from utils import logger
+
+
+def migrate_urls():
+    """执行迁移"""
+    logger.info("开始URL规范化迁移...")
+
+    downloader = SmartDownloader()
+    file_result = downloader.migrate_canonical_urls()
+    logger.info(f"文档目录: 重命名 {file_result['renamed']} 个, 合并 {file_result['merged']} 个")
+
+    search_engine = WhooshSearchEngine()
+    with WriterLease().lock:
+        index_result = search_engine.migrate_canonical_urls(file_path_for=downloader.get_file_path)
+    logger.info(f"搜索索引: 更新 {index_result['updated']} 个, 删除重复 {index_result['merged']} 个")
+
+    stats = search_engine.get_index_stats()
+    logger.info(f"迁移完成，当前索引文档数: {stats['total_docs']}")
+
+
+if __name__ == "__main__":
+    migrate_urls()
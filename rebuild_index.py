@@ -1,15 +1,15 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 """
-重建Whoosh索引脚本
+重建索引脚本（使用SEARCH_BACKEND配置的搜索后端）
 用于从已下载的文档重建搜索索引
 """
 
 import json
 from pathlib import Path
 
-from config import DOCS_DIR
-from services import WhooshSearchEngine
+from config import DOCS_DIR, SEARCH_BACKEND
+from services import WriterLease, create_search_engine
 from utils import logger
 
 
@@ -45,9 +45,11 @@ def rebuild_index():
     if missing_files:
         logger.warning(f"缺失文件: {len(missing_files)}")
 
-    # 重建索引
-    search_engine = WhooshSearchEngine()
-    results = search_engine.rebuild_index(file_url_pairs)
+    # 重建索引：在新的索引代中建立，完成后原子切换，运行中的服务可继续搜索。
+    # 重建期间持有写入租约，服务进程的写请求转存到转交目录，切换后写入新的代
+    search_engine = create_search_engine(SEARCH_BACKEND)
+    with WriterLease().lock:
+        results = search_engine.rebuild_index(file_url_pairs)
 
     logger.info("索引重建完成！")
     logger.info(f"总文档数: {results['total_count']}")
@@ -60,6 +62,7 @@ def rebuild_index():
     logger.info(f"\n索引统计:")
     logger.info(f"  文档总数: {stats['total_docs']}")
     logger.info(f"  索引目录: {stats['index_dir']}")
+    logger.info(f"  索引代: {stats['generation']}")
     logger.info(f"  评分算法: {stats['scorer']}")
 
 
@@ -5,8 +5,19 @@ from .myquant_api import (
     Language,
     Category
 )
+from .discovery_cache import DiscoveryCache
 from .downloader import SmartDownloader
+from .vector_index import VectorIndex, reciprocal_rank_fusion
+from .search_engine import SearchEngine
 from .whoosh_service import WhooshSearchEngine
+from .numpy_bm25 import NumpyBM25FEngine
+from .sqlite_service import SQLiteSearchEngine
+from .backends import create_search_engine
+from .mirror import SiteMirror
+from .ingest_queue import IngestQueue, IndexReconciler
+from .write_lease import WriterLease
+from .merge_scheduler import SegmentMergeScheduler
+from .index_writer import IndexWriterActor
 
 __all__ = [
     "EnhancedMyQuantAPIService",
@@ -14,6 +25,19 @@ __all__ = [
     "DocumentType",
     "Language",
     "Category",
+    "DiscoveryCache",
     "SmartDownloader",
-    "WhooshSearchEngine"
+    "VectorIndex",
+    "reciprocal_rank_fusion",
+    "SearchEngine",
+    "WhooshSearchEngine",
+    "NumpyBM25FEngine",
+    "SQLiteSearchEngine",
+    "create_search_engine",
+    "SiteMirror",
+    "IngestQueue",
+    "IndexReconciler",
+    "WriterLease",
+    "SegmentMergeScheduler",
+    "IndexWriterActor"
 ]
\ No newline at end of file
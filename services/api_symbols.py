@@ -0,0 +1,179 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from bs4 import Tag
+
+HEADING_TAGS = ["h1", "h2", "h3", "h4", "h5", "h6"]
+
+# 标题以标识符开头，如 "history - 查询历史行情"、"order_volume（按指定量委托）"
+_HEADING_NAME_PATTERN = re.compile(r"^([A-Za-z_][\w.]*)\s*(?:[-—–:：(（]|$)")
+
+# URL路径中的SDK语言段
+_LANGUAGE_ALIASES = {
+    "python": "python",
+    "cpp": "cpp",
+    "c++": "cpp",
+    "csharp": "csharp",
+    "c#": "csharp",
+    "matlab": "matlab",
+}
+
+# 参数表和返回值表的表头关键字
+_PARAMETER_HEADERS = ("参数",)
+_RETURN_HEADERS = ("字段", "属性", "返回")
+_TYPE_HEADERS = ("类型",)
+_DESCRIPTION_HEADERS = ("说明", "描述", "含义", "备注")
+
+
+def sdk_language(url: str) -> str:
+    """从文档URL路径推断SDK语言，无法判断时返回空字符串"""
+    for segment in url.lower().split("?")[0].split("/"):
+        if segment in _LANGUAGE_ALIASES:
+            return _LANGUAGE_ALIASES[segment]
+    return ""
+
+
+def symbol_key(name: str) -> str:
+    """符号表键：小写，带模块前缀的名称只取最后一段（gm.api.history -> history）"""
+    return name.rsplit(".", 1)[-1].lower()
+
+
+def _heading_level(tag: Tag) -> int:
+    return int(tag.name[1])
+
+
+def _section(heading: Tag) -> List[Tag]:
+    """标题之后、下一个同级或更高级标题之前的兄弟元素"""
+    level = _heading_level(heading)
+    elements = []
+    for sibling in heading.find_next_siblings():
+        if sibling.name in HEADING_TAGS and _heading_level(sibling) <= level:
+            break
+        elements.append(sibling)
+    return elements
+
+
+def _extract_call(text: str, name: str) -> Optional[str]:
+    """从代码文本中截取 name(...) 形式的函数原型，括号按配对截取"""
+    match = re.search(rf"(?<![\w.]){re.escape(name)}\s*\(", text)
+    if match is None:
+        return None
+
+    depth = 0
+    for position in range(match.end() - 1, len(text)):
+        if text[position] == "(":
+            depth += 1
+        elif text[position] == ")":
+            depth -= 1
+            if depth == 0:
+                return re.sub(r"\s+", " ", text[match.start():position + 1])
+    return None
+
+
+def _find_signature(section: List[Tag], name: str) -> Optional[str]:
+    """在小节的代码块中查找函数原型"""
+    short_name = name.rsplit(".", 1)[-1]
+    for element in section:
+        code_elements = [element] if element.name in ("pre", "code") else []
+        code_elements += element.find_all(["pre", "code"])
+        for code in code_elements:
+            text = code.get_text()
+            signature = _extract_call(text, name) or _extract_call(text, short_name)
+            if signature:
+                return signature
+    return None
+
+
+def _column(headers: List[str], keywords: Tuple[str, ...], default: int) -> int:
+    for i, header in enumerate(headers):
+        if any(keyword in header for keyword in keywords):
+            return i
+    return default
+
+
+def _parse_table(table: Tag) -> Tuple[List[str], List[Dict[str, str]]]:
+    """解析参数/字段表，返回 (表头, [{name, type, description}])"""
+    rows = table.find_all("tr")
+    if not rows:
+        return [], []
+
+    headers = [cell.get_text(strip=True) for cell in rows[0].find_all(["th", "td"])]
+    type_column = _column(headers, _TYPE_HEADERS, 1)
+    description_column = _column(headers, _DESCRIPTION_HEADERS, len(headers) - 1)
+
+    entries = []
+    for row in rows[1:]:
+        cells = [cell.get_text(" ", strip=True) for cell in row.find_all(["td", "th"])]
+        if not cells or not cells[0]:
+            continue
+        entries.append({
+            "name": cells[0],
+            "type": cells[type_column] if type_column < len(cells) else "",
+            "description": cells[description_column] if 0 < description_column < len(cells) else "",
+        })
+    return headers, entries
+
+
+def _parse_tables(section: List[Tag]) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+    """按表头区分参数表和返回值表"""
+    parameters: List[Dict[str, str]] = []
+    returns: List[Dict[str, str]] = []
+    for element in section:
+        tables = [element] if element.name == "table" else element.find_all("table")
+        for table in tables:
+            headers, entries = _parse_table(table)
+            if not headers:
+                continue
+            if any(keyword in headers[0] for keyword in _PARAMETER_HEADERS):
+                parameters.extend(entries)
+            elif any(keyword in headers[0] for keyword in _RETURN_HEADERS):
+                returns.extend(entries)
+    return parameters, returns
+
+
+def extract_symbols(root: Tag, url: str) -> List[Dict[str, Any]]:
+    """
+    从文档中提取SDK符号
+
+    以标识符开头的标题视为一个API条目，在其小节中查找函数原型、参数表和返回值表；
+    既没有函数原型也没有参数表的标题不收录。
+
+    Returns:
+        [{name, language, signature, description, parameters, returns, anchor}]
+    """
+    language = sdk_language(url)
+    symbols = []
+    for heading in root.find_all(HEADING_TAGS):
+        text = heading.get_text(" ", strip=True).lstrip("#").strip()
+        match = _HEADING_NAME_PATTERN.match(text)
+        if match is None:
+            continue
+
+        name = match.group(1)
+        section = _section(heading)
+        signature = _find_signature(section, name)
+        parameters, returns = _parse_tables(section)
+        if signature is None and not parameters:
+            continue
+
+        symbols.append({
+            "name": name,
+            "language": language,
+            "signature": signature or "",
+            "description": text[match.end():].strip(" -—–:：()（）"),
+            "parameters": parameters,
+            "returns": returns,
+            "anchor": heading.get("id", ""),
+        })
+    return symbols
+
+
+def dump_symbols(symbols: List[Dict[str, Any]]) -> str:
+    """序列化为紧凑的JSON，存入索引的存储字段"""
+    return json.dumps(symbols, ensure_ascii=False, separators=(",", ":"))
+
+
+def load_symbols(data: Optional[str]) -> List[Dict[str, Any]]:
+    """从存储字段读取符号表"""
+    return json.loads(data) if data else []
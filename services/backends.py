@@ -0,0 +1,27 @@
+from pathlib import Path
+
+from config import INDEX_DIR
+from utils import logger
+
+from .numpy_bm25 import NumpyBM25FEngine, numpy_available
+from .search_engine import SearchEngine
+from .sqlite_service import SQLiteSearchEngine
+from .whoosh_service import WhooshSearchEngine
+
+
+def create_search_engine(backend: str, index_dir: Path = INDEX_DIR) -> SearchEngine:
+    """
+    按配置创建搜索引擎
+
+    Args:
+        backend: "whoosh"、"numpy" 或 "sqlite"；未安装numpy时numpy后端降级为Whoosh
+    """
+    if backend == "sqlite":
+        return SQLiteSearchEngine(index_dir)
+    if backend == "numpy":
+        if numpy_available():
+            return NumpyBM25FEngine(index_dir)
+        logger.warning("未安装numpy，搜索后端降级为whoosh")
+    elif backend != "whoosh":
+        raise ValueError(f"未知的搜索后端: {backend}")
+    return WhooshSearchEngine(index_dir)
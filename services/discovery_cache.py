@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import DISCOVERY_CACHE_DIR, DISCOVERY_CACHE_TTL, DISCOVERY_NEGATIVE_TTL
+from utils import logger
+
+
+def normalize_keyword(keyword: str) -> str:
+    """规范化搜索关键词：去除首尾空白、合并连续空白并转为小写"""
+    return " ".join((keyword or "").split()).lower()
+
+
+class DiscoveryCache:
+    """MeiliSearch发现结果的磁盘缓存，支持TTL和负缓存"""
+
+    def __init__(self, cache_dir: Path = DISCOVERY_CACHE_DIR,
+                 ttl: float = DISCOVERY_CACHE_TTL,
+                 negative_ttl: float = DISCOVERY_NEGATIVE_TTL):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, keyword: str, limit: int,
+                 filters: Optional[Dict[str, List[str]]] = None,
+                 offset: int = 0) -> str:
+        """根据规范化关键词、分页参数和过滤条件生成缓存键"""
+        normalized_filters = {
+            name: sorted(values)
+            for name, values in sorted((filters or {}).items())
+            if values
+        }
+        raw_key = json.dumps(
+            [normalize_keyword(keyword), limit, offset, normalized_filters],
+            ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.sha1(raw_key.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取未过期的缓存响应，不存在或已过期时返回None"""
+        entry_path = self._entry_path(key)
+
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"发现缓存读取失败: {entry_path}, 错误: {e}")
+            self.misses += 1
+            return None
+
+        if time.time() - entry.get('created_at', 0) > entry.get('ttl', 0):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry.get('response')
+
+    def set(self, key: str, response: Dict[str, Any], negative: bool = False) -> None:
+        """写入缓存，负缓存（空结果或请求失败）使用较短的TTL"""
+        entry = {
+            'created_at': time.time(),
+            'ttl': self.negative_ttl if negative else self.ttl,
+            'negative': negative,
+            'response': response,
+        }
+
+        entry_path = self._entry_path(key)
+        tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, entry_path)
+        except OSError as e:
+            logger.warning(f"发现缓存写入失败: {entry_path}, 错误: {e}")
+
+    def clear(self) -> int:
+        """清空缓存，返回删除的条目数"""
+        deleted_count = 0
+        for entry_path in self.cache_dir.glob("*.json"):
+            try:
+                entry_path.unlink()
+                deleted_count += 1
+            except OSError as e:
+                logger.error(f"删除缓存文件失败: {entry_path}, 错误: {e}")
+        return deleted_count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        return {
+            'entries': len(list(self.cache_dir.glob("*.json"))),
+            'hits': self.hits,
+            'misses': self.misses,
+            'ttl': self.ttl,
+            'negative_ttl': self.negative_ttl,
+            'cache_dir': str(self.cache_dir),
+        }
@@ -2,14 +2,15 @@ import asyncio
 import aiohttp
 import json
 import hashlib
+import os
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Tuple, Any
+from typing import List, Dict, Tuple, Any, Optional, Set
 from config import (
     DOCS_DIR, DOC_DOWNLOAD_HEADERS, MAX_CONCURRENT_DOWNLOADS,
     REQUEST_DELAY
 )
-from utils import logger
+from utils import logger, CircuitBreaker, FileLock, canonicalize_url
 
 class SmartDownloader:
     """智能文档下载器"""
@@ -18,8 +19,15 @@ class SmartDownloader:
         self.docs_dir = docs_dir
         self.headers = DOC_DOWNLOAD_HEADERS
         self.url_map_file = docs_dir / "url_map.json"
+        self.url_map_lock_file = docs_dir / "url_map.lock"
         self.url_map = self._load_url_map()
+        # 本进程删除的记录，保存时不能被磁盘上的旧记录恢复
+        self._removed_filenames = set()
         self.request_delay = request_delay
+        self._semaphore = None
+        self.breaker = CircuitBreaker("document_host")
+        # 发现阶段得到、尚未下载的页面元数据，下载成功时写入URL映射
+        self._pending_metadata: Dict[str, Dict[str, Any]] = {}
     
     def _load_url_map(self) -> Dict[str, Dict[str, Any]]:
         """加载URL映射文件"""
@@ -32,10 +40,48 @@ class SmartDownloader:
                 return {}
         return {}
     
+    def _write_url_map(self, url_map: Dict[str, Any], removed_filenames: Set[str]) -> Dict[str, Any]:
+        """
+        写入URL映射文件，返回合并后的映射
+
+        多个服务进程共用下载目录，保存时在文件锁内先合并磁盘上其他进程写入的记录，
+        再原子替换文件，避免互相覆盖。
+        """
+        with FileLock(self.url_map_lock_file):
+            merged_map = self._load_url_map()
+            for filename in removed_filenames:
+                merged_map.pop(filename, None)
+            merged_map.update(url_map)
+
+            tmp_file = self.url_map_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(merged_map, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.url_map_file)
+        return merged_map
+
     def _save_url_map(self) -> None:
         """保存URL映射文件"""
-        with open(self.url_map_file, 'w', encoding='utf-8') as f:
-            json.dump(self.url_map, f, ensure_ascii=False, indent=2)
+        self.url_map = self._write_url_map(self.url_map, self._removed_filenames)
+        self._removed_filenames.clear()
+
+    async def _save_url_map_async(self) -> None:
+        """
+        在线程中保存URL映射文件，等待文件锁时不阻塞事件循环
+
+        保存使用调用时的快照，等待期间事件循环上新增、修改或删除的记录保留在内存中，
+        由各自的保存写入文件。
+        """
+        snapshot = dict(self.url_map)
+        removed_filenames = set(self._removed_filenames)
+        merged_map = await asyncio.to_thread(self._write_url_map, snapshot, removed_filenames)
+
+        for filename, info in self.url_map.items():
+            if snapshot.get(filename) is not info:
+                merged_map[filename] = info
+        self._removed_filenames -= removed_filenames
+        for filename in self._removed_filenames:
+            merged_map.pop(filename, None)
+        self.url_map = merged_map
     
     def _file_exists(self, filename: str) -> bool:
         """检查文件是否存在"""
@@ -43,8 +89,8 @@ class SmartDownloader:
         return file_path.exists()
     
     def url_to_filename(self, url: str) -> str:
-        """将URL转换为唯一的文件名"""
-        url_hash = hashlib.md5(url.encode('utf-8')).hexdigest()
+        """将URL转换为唯一的文件名（基于规范化URL，锚点、查询参数和编码差异不产生新文件）"""
+        url_hash = hashlib.md5(canonicalize_url(url).encode('utf-8')).hexdigest()
         return f"{url_hash}.html"
     
     def get_file_path(self, url: str) -> Path:
@@ -71,8 +117,10 @@ class SmartDownloader:
         # 请求频率控制
         await asyncio.sleep(self.request_delay)
         
+        url = canonicalize_url(url)
         file_path = self.get_file_path(url)
         filename = file_path.name
+        host_failed = False
         
         try:
             async with aiohttp.ClientSession(headers=self.headers) as session:
@@ -97,17 +145,30 @@ class SmartDownloader:
                         'downloaded_at': datetime.now().isoformat(),
                         'file_size': len(html_content.encode('utf-8'))
                     }
+                    if url in self._pending_metadata:
+                        self.url_map[filename]['metadata'] = self._pending_metadata.pop(url)
                     
-                    self._save_url_map()
+                    await self._save_url_map_async()
                     logger.info(f"下载成功: {url} -> {filename}")
                     return True
                     
-        except aiohttp.ClientError as e:
+        except aiohttp.ClientResponseError as e:
+            # 4xx说明站点可达，只有服务端错误才计入熔断
+            host_failed = e.status >= 500
+            logger.error(f"下载失败: {url}, 错误: {str(e)}")
+            return False
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            host_failed = True
             logger.error(f"下载失败: {url}, 错误: {str(e)}")
             return False
         except Exception as e:
             logger.error(f"下载失败: {url}, 错误: {str(e)}")
             return False
+        finally:
+            if host_failed:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
     
     async def _concurrent_download(self, urls: List[str], max_concurrent: int) -> Dict[str, bool]:
         """并发下载实现，控制并发数和请求间隔"""
@@ -116,6 +177,9 @@ class SmartDownloader:
         
         async def download_with_semaphore(url):
             async with semaphore:
+                if not self.breaker.allow_request():
+                    logger.warning(f"文档站点熔断器已打开，跳过下载: {url}")
+                    return False
                 return await self._download_single_url_async(url)
         
         # 执行并发下载
@@ -132,6 +196,26 @@ class SmartDownloader:
         
         return results
     
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """获取跨调用共享的下载并发信号量"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+        return self._semaphore
+    
+    async def download_url(self, url: str) -> Optional[bool]:
+        """下载单个URL，已存在时跳过（返回None），并发数在所有调用间共享"""
+        new_urls, _ = self.filter_new_urls([url])
+        if not new_urls:
+            return None
+        
+        # 文档站点熔断时直接失败，不再等待请求超时
+        if not self.breaker.allow_request():
+            logger.warning(f"文档站点熔断器已打开，跳过下载: {url}")
+            return False
+        
+        async with self._get_semaphore():
+            return await self._download_single_url_async(url)
+    
     async def download_urls(self, urls: List[str], max_concurrent: int = MAX_CONCURRENT_DOWNLOADS) -> Dict[str, bool]:
         """智能批量下载，支持并发控制和去重"""
         # 过滤新URL
@@ -159,6 +243,96 @@ class SmartDownloader:
 
         return results
     
+    def migrate_canonical_urls(self) -> Dict[str, int]:
+        """
+        将URL映射迁移到规范化URL，合并同一页面的重复下载
+
+        Returns:
+            迁移统计：renamed（重命名的文件数）、merged（合并删除的重复文件数）
+        """
+        migrated_map = {}
+        renamed_count = 0
+        merged_count = 0
+
+        def is_canonical(item):
+            filename, info = item
+            return isinstance(info, dict) and self.url_to_filename(info.get('url', '')) == filename
+
+        # 先处理已经是规范化文件名的记录，重复记录合并到这些记录上
+        for filename, info in sorted(self.url_map.items(), key=lambda item: not is_canonical(item)):
+            if not isinstance(info, dict) or 'url' not in info:
+                migrated_map[filename] = info
+                continue
+
+            canonical = canonicalize_url(info['url'])
+            new_filename = self.url_to_filename(canonical)
+            old_path = self.docs_dir / filename
+
+            if new_filename in migrated_map:
+                # 规范化后的页面已有记录，删除重复文件
+                if new_filename != filename and old_path.exists():
+                    old_path.unlink()
+                merged_count += 1
+                continue
+
+            if new_filename != filename and old_path.exists():
+                old_path.replace(self.docs_dir / new_filename)
+                renamed_count += 1
+
+            migrated_map[new_filename] = {**info, 'url': canonical}
+
+        self._removed_filenames.update(set(self.url_map) - set(migrated_map))
+        self.url_map = migrated_map
+        self._save_url_map()
+
+        logger.info(f"URL规范化迁移完成: {renamed_count}个文件重命名, {merged_count}个重复文件合并")
+        return {'renamed': renamed_count, 'merged': merged_count}
+    
+    @staticmethod
+    def _merge_metadata(existing: Dict[str, Any], metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """合并页面元数据：锚点取并集，其他字段以新的非空值为准"""
+        merged = dict(existing)
+        for key, value in metadata.items():
+            if key == 'anchors':
+                anchors = list(existing.get('anchors', []))
+                anchors.extend(anchor for anchor in value if anchor not in anchors)
+                merged['anchors'] = anchors
+            elif value:
+                merged[key] = value
+        return merged
+
+    def record_metadata(self, url_metadata: Dict[str, Dict[str, Any]]) -> int:
+        """
+        记录发现阶段得到的页面元数据（层级、锚点、文档类型等）
+
+        已下载的页面直接写入URL映射，未下载的页面在下载成功时写入。
+
+        Returns:
+            写入URL映射的页面数
+        """
+        updated_count = 0
+        for url, metadata in url_metadata.items():
+            url = canonicalize_url(url)
+            info = self.url_map.get(self.url_to_filename(url))
+            if isinstance(info, dict):
+                info['metadata'] = self._merge_metadata(info.get('metadata', {}), metadata)
+                updated_count += 1
+            else:
+                self._pending_metadata[url] = self._merge_metadata(
+                    self._pending_metadata.get(url, {}), metadata
+                )
+
+        if updated_count:
+            self._save_url_map()
+        return updated_count
+
+    def get_metadata(self, url: str) -> Optional[Dict[str, Any]]:
+        """获取已下载页面的元数据，没有记录时返回None"""
+        info = self.url_map.get(self.url_to_filename(url))
+        if isinstance(info, dict):
+            return info.get('metadata')
+        return None
+    
     def get_url_map(self) -> Dict[str, Dict[str, Any]]:
         """获取URL到文件路径的映射关系"""
         return self.url_map
@@ -207,6 +381,7 @@ class SmartDownloader:
                 if file_path.exists():
                     file_path.unlink()
                     del self.url_map[filename]
+                    self._removed_filenames.add(filename)
                     deleted_count += 1
             except Exception as e:
                 logger.error(f"删除文件失败: {file_path}, 错误: {e}")
@@ -0,0 +1,139 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Mapping, Optional, Tuple
+
+from config import FACET_FIELDS, FACET_MAX_VALUES
+
+try:
+    import numpy as np
+except ImportError:  # 未安装numpy时过滤改用查询执行，不返回分面计数
+    np = None
+
+
+def facets_available() -> bool:
+    """是否安装了numpy"""
+    return np is not None
+
+
+def normalize_filters(filters: Optional[Mapping[str, Any]]) -> Dict[str, List[str]]:
+    """
+    规范化分面过滤条件：单个字符串视为一个取值，去掉空值；language和section转为小写
+
+    Raises:
+        ValueError: 未知的分面
+    """
+    normalized = {}
+    for field, values in (filters or {}).items():
+        if field not in FACET_FIELDS:
+            raise ValueError(f"未知的分面: {field}")
+        if isinstance(values, str):
+            values = [values]
+        values = [str(value).strip() for value in values if value and str(value).strip()]
+        if field != "tags":
+            values = [value.lower() for value in values]
+        if values:
+            normalized[field] = list(dict.fromkeys(values))
+    return normalized
+
+
+class FacetBitsets:
+    """
+    一个索引版本上各分面取值的文档位图
+
+    每个取值的文档集合压缩为位图（np.packbits，低位在前，与whoosh.idsets.BitSet的布局相同），
+    同一分面的所有取值按行堆叠为uint8矩阵。过滤条件在同一分面内OR、不同分面之间AND，
+    对矩阵的行按位运算即可得到允许的文档。
+    计数使用同一份数据的(文档号, 取值)对：标签这类取值很多的分面逐行求popcount的开销与取值数成正比，
+    按命中位图取出对后bincount只与对的总数有关。
+    """
+
+    def __init__(self, doc_count: int, postings: Mapping[str, Mapping[str, Iterable[int]]]):
+        """
+        Args:
+            doc_count: 文档号的上界（包括已删除的文档）
+            postings: {分面: {取值: 文档号}}
+        """
+        self.doc_count = doc_count
+        self.values: Dict[str, List[str]] = {}
+        self._rows: Dict[str, Dict[str, int]] = {}
+        self._matrices: Dict[str, "np.ndarray"] = {}
+        self._pairs: Dict[str, Tuple["np.ndarray", "np.ndarray"]] = {}
+        for field in FACET_FIELDS:
+            field_postings = postings.get(field, {})
+            values = sorted(value for value in field_postings if value)
+            matrix = np.zeros((len(values), (doc_count + 7) // 8), dtype=np.uint8)
+            pair_docnums = [np.empty(0, dtype=np.int64)]
+            pair_rows = [np.empty(0, dtype=np.int64)]
+            for row, value in enumerate(values):
+                docnums = np.unique(np.fromiter(field_postings[value], dtype=np.int64))
+                matrix[row] = self.pack(docnums)
+                pair_docnums.append(docnums)
+                pair_rows.append(np.full(len(docnums), row, dtype=np.int64))
+            self.values[field] = values
+            self._rows[field] = {value: row for row, value in enumerate(values)}
+            self._matrices[field] = matrix
+            self._pairs[field] = (np.concatenate(pair_docnums), np.concatenate(pair_rows))
+
+    def pack(self, docnums: Iterable[int]) -> "np.ndarray":
+        """文档号压缩为位图"""
+        if not isinstance(docnums, np.ndarray):
+            docnums = np.fromiter(docnums, dtype=np.int64)
+        bits = np.zeros(self.doc_count, dtype=bool)
+        bits[docnums] = True
+        return np.packbits(bits, bitorder="little")
+
+    def allowed(self, filters: Mapping[str, List[str]]) -> "np.ndarray":
+        """满足过滤条件的文档位图，没有任何文档的取值不匹配文档"""
+        mask = np.full((self.doc_count + 7) // 8, 0xFF, dtype=np.uint8)
+        for field, values in filters.items():
+            rows = [self._rows[field][value] for value in values if value in self._rows[field]]
+            if not rows:
+                return np.zeros_like(mask)
+            mask &= np.bitwise_or.reduce(self._matrices[field][rows], axis=0)
+        return mask
+
+    def counts(self, docnums: Iterable[int], allowed: Optional[Any] = None,
+               limit: int = FACET_MAX_VALUES) -> Dict[str, Dict[str, int]]:
+        """
+        命中文档在各分面取值上的文档数
+
+        Args:
+            docnums: 命中的文档号（未经分面过滤）
+            allowed: 过滤条件允许的文档位图（支持缓冲区协议的字节序列），None表示不过滤
+            limit: 每个分面最多返回的取值数
+
+        Returns:
+            {分面: {取值: 文档数}}，按文档数降序，不包括文档数为0的取值
+        """
+        matched = self.pack(docnums)
+        if allowed is not None:
+            matched &= np.frombuffer(allowed, dtype=np.uint8)
+        matched = np.unpackbits(matched, count=self.doc_count, bitorder="little").view(bool)
+
+        facets = {}
+        for field in FACET_FIELDS:
+            docnums, rows = self._pairs[field]
+            counts = np.bincount(rows[matched[docnums]], minlength=len(self.values[field]))
+            # 文档数相同时按取值排列
+            order = np.argsort(-counts, kind="stable")[:limit]
+            facets[field] = {self.values[field][row]: int(counts[row]) for row in order if counts[row]}
+        return facets
+
+
+class FacetCache:
+    """按索引版本缓存分面位图，只保留最近使用的几个版本（快照期间的旧版本和当前版本）"""
+
+    def __init__(self, size: int = 2):
+        self.size = size
+        self._entries: Dict[Hashable, FacetBitsets] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, build: Callable[[], FacetBitsets]) -> FacetBitsets:
+        """key对应版本的分面位图，没有缓存时调用build建立"""
+        with self._lock:
+            bitsets = self._entries.pop(key, None)
+            if bitsets is None:
+                bitsets = build()
+            self._entries[key] = bitsets
+            while len(self._entries) > self.size:
+                del self._entries[next(iter(self._entries))]
+            return bitsets
@@ -0,0 +1,256 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import INDEX_SPOOL_POLL_INTERVAL, INDEX_WRITER_BATCH_SIZE, INDEX_WRITER_FLUSH_INTERVAL
+from utils import logger
+
+from .merge_scheduler import SegmentMergeScheduler
+from .search_engine import SearchEngine
+from .write_lease import WriterLease
+
+# 停止写入任务的哨兵请求
+_STOP = object()
+
+# 代写的转交请求：(写操作, 写入结果)
+SpooledWrites = List[Tuple[Tuple[str, List[Any]], Dict[str, Any]]]
+
+
+class IndexWriterActor:
+    """
+    索引写入任务
+
+    Whoosh同一时间只允许一个writer，并发调用add_documents会遇到LockError。
+    所有写请求（添加、更新、删除）通过队列交给单个后台任务，按文档数量或等待时间
+    合并成一次提交；调用方等待的future在提交完成、文档对搜索可见后才返回。
+
+    多个进程共用索引时，提交前需取得写入租约（lease）；等待超时的批次转交给
+    租约持有者，调用方得到spooled_count而不是等待锁，空闲时也会定期代写转交的请求。
+    转交的文档此时尚未写入索引；代写后通过on_spooled_written回调报告各请求的结果，
+    以便更新补录队列。
+
+    配置了段合并调度时，写入空闲超过merge_scheduler.idle_seconds后由本任务执行合并，
+    与写请求串行，不会和批量提交争用writer。
+    """
+
+    def __init__(self, search_engine: SearchEngine,
+                 batch_size: int = INDEX_WRITER_BATCH_SIZE,
+                 flush_interval: float = INDEX_WRITER_FLUSH_INTERVAL,
+                 lease: Optional[WriterLease] = None,
+                 spool_poll_interval: float = INDEX_SPOOL_POLL_INTERVAL,
+                 merge_scheduler: Optional[SegmentMergeScheduler] = None,
+                 on_spooled_written: Optional[Callable[[SpooledWrites], None]] = None):
+        self.search_engine = search_engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lease = lease
+        self.spool_poll_interval = spool_poll_interval
+        self.merge_scheduler = merge_scheduler
+        self.on_spooled_written = on_spooled_written
+        self._last_activity = time.monotonic()
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.commit_count = 0
+        self.request_count = 0
+        self.document_count = 0
+        self.failed_commit_count = 0
+
+    def _ensure_started(self) -> asyncio.Queue:
+        """在当前事件循环中启动写入任务（首次使用或事件循环变化时）"""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+        return self._queue
+
+    async def _submit(self, operation: str, items: List[Any]) -> Dict[str, Any]:
+        """提交写请求并等待其所在批次提交完成"""
+        future = asyncio.get_running_loop().create_future()
+        self._ensure_started().put_nowait((operation, items, future))
+        self.request_count += 1
+        return await future
+
+    async def add(self, file_url_pairs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """添加文档（已存在的跳过），返回值与add_documents相同"""
+        return await self._submit("add", file_url_pairs)
+
+    async def update(self, file_url_pairs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """重新解析并替换文档"""
+        return await self._submit("update", file_url_pairs)
+
+    async def delete(self, urls: List[str]) -> Dict[str, Any]:
+        """按URL删除文档"""
+        return await self._submit("delete", urls)
+
+    def _idle_timeout(self) -> Optional[float]:
+        """空闲等待请求的超时时间，None表示一直等待"""
+        timeouts = []
+        if self.lease is not None:
+            timeouts.append(self.spool_poll_interval)
+        if self.merge_scheduler is not None:
+            timeouts.append(self.merge_scheduler.idle_seconds)
+        return min(timeouts) if timeouts else None
+
+    async def _collect_batch(self) -> Tuple[List[Tuple[str, List[Any], asyncio.Future]], bool]:
+        """
+        等待第一个请求，然后在时间窗口内继续收集，直到达到批量大小
+
+        Returns:
+            (请求批次, 是否收到停止请求)
+        """
+        batch = []
+        document_count = 0
+        deadline = None
+
+        while document_count < self.batch_size:
+            if deadline is None:
+                idle_timeout = self._idle_timeout()
+                if idle_timeout is None:
+                    request = await self._queue.get()
+                else:
+                    # 空闲超时返回空批次，由主循环检查转交的请求和段合并
+                    try:
+                        request = await asyncio.wait_for(self._queue.get(), timeout=idle_timeout)
+                    except asyncio.TimeoutError:
+                        return batch, False
+                deadline = time.monotonic() + self.flush_interval
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            if request is _STOP:
+                return batch, True
+            batch.append(request)
+            document_count += len(request[1])
+
+        return batch, False
+
+    async def _commit(self, batch: List[Tuple[str, List[Any], asyncio.Future]]) -> None:
+        """在一次提交中执行整批写请求，并通知各调用方"""
+        operations = [(operation, items) for operation, items, _ in batch]
+
+        try:
+            # Whoosh写入是阻塞操作，放到线程中执行，避免阻塞事件循环
+            results, spooled_writes = await asyncio.to_thread(self._write, operations)
+        except Exception as e:
+            self.failed_commit_count += 1
+            logger.error(f"索引批量提交失败: {len(batch)}个请求, 错误: {e}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.commit_count += 1
+        self.document_count += sum(len(items) for _, items in operations)
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+        self._report_spooled(spooled_writes)
+
+    def _report_spooled(self, spooled_writes: SpooledWrites) -> None:
+        """在事件循环中报告代写的转交请求的结果"""
+        if not spooled_writes or self.on_spooled_written is None:
+            return
+        try:
+            self.on_spooled_written(spooled_writes)
+        except Exception as e:
+            logger.error(f"处理代写结果失败: {e}")
+
+    def _write(self, operations: List[Tuple[str, List[Any]]]) -> Tuple[List[Dict[str, Any]], SpooledWrites]:
+        """
+        执行写入；共享索引时先取得租约，并在同一次提交中代写其他进程转交的请求
+
+        在写入线程中调用，租约等待不会阻塞事件循环。
+
+        Returns:
+            (本批写操作的结果, 代写的转交请求及其结果)
+        """
+        if self.lease is None:
+            return self.search_engine.write_batch(operations), []
+
+        if not self.lease.acquire():
+            if operations:
+                self.lease.spool(operations)
+            return [self._spooled_result(operation, items) for operation, items in operations], []
+
+        try:
+            spool_files, spooled_operations = self.lease.load_spooled()
+            results = self.search_engine.write_batch(operations + spooled_operations)
+            self.lease.clear_spooled(spool_files)
+            if spool_files:
+                logger.info(f"代写转交的索引请求: {len(spool_files)}个文件, {len(spooled_operations)}个请求")
+            return results[:len(operations)], list(zip(spooled_operations, results[len(operations):]))
+        finally:
+            self.lease.release()
+
+    @staticmethod
+    def _spooled_result(operation: str, items: List[Any]) -> Dict[str, Any]:
+        """转交给租约持有者的写请求结果"""
+        if operation == "delete":
+            return {"deleted_count": 0, "spooled_count": len(items)}
+        return {
+            "total_count": len(items),
+            "success_count": 0,
+            "failure_count": 0,
+            "skipped_count": 0,
+            "failed_urls": [],
+            "spooled_count": len(items),
+        }
+
+    async def _run(self) -> None:
+        """写入任务主循环"""
+        while True:
+            batch, stopping = await self._collect_batch()
+            if batch:
+                await self._commit(batch)
+                self._last_activity = time.monotonic()
+            elif self.lease is not None and self.lease.has_spooled():
+                try:
+                    _, spooled_writes = await asyncio.to_thread(self._write, [])
+                except Exception as e:
+                    logger.error(f"代写转交的索引请求失败: {e}")
+                else:
+                    self._report_spooled(spooled_writes)
+                self._last_activity = time.monotonic()
+            elif not stopping and self._merge_due():
+                await asyncio.to_thread(self.merge_scheduler.maybe_merge)
+                self._last_activity = time.monotonic()
+            if stopping:
+                return
+
+    def _merge_due(self) -> bool:
+        """写入空闲时间是否已达到段合并检查间隔"""
+        return (self.merge_scheduler is not None
+                and time.monotonic() - self._last_activity >= self.merge_scheduler.idle_seconds)
+
+    async def stop(self) -> None:
+        """停止写入任务，停止前已提交的请求会先完成写入"""
+        if self._task is not None and not self._task.done():
+            self._queue.put_nowait(_STOP)
+            await self._task
+        self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取写入统计信息"""
+        return {
+            'running': self._task is not None and not self._task.done(),
+            'queued_requests': self._queue.qsize() if self._queue is not None else 0,
+            'requests': self.request_count,
+            'commits': self.commit_count,
+            'failed_commits': self.failed_commit_count,
+            'documents': self.document_count,
+            'avg_requests_per_commit': round(self.request_count / self.commit_count, 2) if self.commit_count else 0,
+            'batch_size': self.batch_size,
+            'flush_interval': self.flush_interval,
+            'lease': self.lease.get_stats() if self.lease is not None else None,
+            'merge': self.merge_scheduler.get_stats() if self.merge_scheduler is not None else None,
+        }
@@ -0,0 +1,218 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from config import INGEST_BATCH_SIZE, INGEST_QUEUE_FILE
+from utils import logger, FileLock, canonicalize_url
+
+from .downloader import SmartDownloader
+from .index_writer import IndexWriterActor
+from .search_engine import SearchEngine
+from .write_lease import WriterLease
+
+
+class IngestQueue:
+    """
+    索引补录队列
+
+    记录已下载但尚未成功写入索引的页面，持久化到磁盘，
+    进程重启或索引失败后可以只补录这些页面，而不必重建整个索引。
+    多个进程共用队列文件时，保存前在文件锁内与磁盘上的队列合并，只写回本进程改动的条目。
+    """
+
+    def __init__(self, queue_file: Path = INGEST_QUEUE_FILE):
+        self.queue_file = queue_file
+        self.lock_file = queue_file.with_suffix('.lock')
+        self.entries: Dict[str, Dict[str, Any]] = self._load()
+        self._changed: Set[str] = set()
+        self._removed: Set[str] = set()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """加载补录队列"""
+        if self.queue_file.exists():
+            try:
+                with open(self.queue_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.error(f"补录队列文件解析失败: {self.queue_file}, 错误: {e}")
+        return {}
+
+    def _save(self) -> None:
+        """与磁盘上的队列合并后原子地保存，不覆盖其他进程的改动"""
+        with FileLock(self.lock_file):
+            merged = self._load()
+            for url in self._removed:
+                merged.pop(url, None)
+            # 按本进程的入队顺序写回改动的条目
+            for url, entry in self.entries.items():
+                if url in self._changed:
+                    merged[url] = entry
+            tmp_file = self.queue_file.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(merged, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.queue_file)
+        self.entries = merged
+        self._changed.clear()
+        self._removed.clear()
+
+    def reload(self) -> None:
+        """重新读取队列文件，得到其他进程入队的页面"""
+        self.entries = self._load()
+
+    def __contains__(self, url: str) -> bool:
+        return canonicalize_url(url) in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, urls: Iterable[str]) -> int:
+        """将页面加入队列，返回新增数量"""
+        added = 0
+        for url in urls:
+            url = canonicalize_url(url)
+            if url not in self.entries:
+                self.entries[url] = {'enqueued_at': datetime.now().isoformat(), 'attempts': 0}
+                self._changed.add(url)
+                self._removed.discard(url)
+                added += 1
+        if added:
+            self._save()
+        return added
+
+    def remove(self, urls: Iterable[str]) -> int:
+        """将已成功索引的页面移出队列，返回移除数量"""
+        removed = 0
+        for url in urls:
+            url = canonicalize_url(url)
+            if self.entries.pop(url, None) is not None:
+                self._changed.discard(url)
+                self._removed.add(url)
+                removed += 1
+        if removed:
+            self._save()
+        return removed
+
+    def record_failures(self, urls: Iterable[str]) -> None:
+        """记录索引失败，页面保留在队列中等待下次补录"""
+        for url in urls:
+            url = canonicalize_url(url)
+            entry = self.entries.get(url)
+            if entry is not None:
+                entry['attempts'] += 1
+                entry['last_failed_at'] = datetime.now().isoformat()
+                self._changed.add(url)
+        self._save()
+
+    def pending(self) -> List[str]:
+        """按入队顺序返回待补录的页面"""
+        return list(self.entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取队列统计信息"""
+        return {
+            'pending': len(self.entries),
+            'failed_attempts': sum(entry['attempts'] for entry in self.entries.values()),
+            'queue_file': str(self.queue_file),
+        }
+
+
+class IndexReconciler:
+    """
+    索引对账
+
+    将下载目录（url_map）中的页面与索引中url字段的词项列表对比，
+    只补录缺失的页面，恢复成本与缺失页面数成正比而不是与文档总数成正比。
+    每批写入前等待写入租约，与服务进程和其他命令行工具的写入错开。
+    """
+
+    def __init__(self, downloader: SmartDownloader, search_engine: SearchEngine,
+                 queue: IngestQueue, batch_size: int = INGEST_BATCH_SIZE,
+                 lease: Optional[WriterLease] = None):
+        self.downloader = downloader
+        self.search_engine = search_engine
+        self.queue = queue
+        self.batch_size = batch_size
+        self.lease = lease if lease is not None else WriterLease()
+
+    def catalog_urls(self) -> Set[str]:
+        """下载目录中文件存在的页面URL"""
+        return {
+            canonicalize_url(info['url'])
+            for filename, info in self.downloader.get_url_map().items()
+            if isinstance(info, dict) and info.get('url') and (self.downloader.docs_dir / filename).exists()
+        }
+
+    def _batches(self) -> Iterable[Tuple[List[str], List[Dict[str, Any]]]]:
+        """按批次返回队列中的页面及其文件-URL对"""
+        pending = self.queue.pending()
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            yield batch, [
+                {'file_path': str(self.downloader.get_file_path(url)), 'url': url}
+                for url in batch
+            ]
+
+    def _record_batch(self, batch: List[str], result: Dict[str, Any]) -> int:
+        """成功的页面移出队列，失败的保留并计数，返回失败数量；转交给租约持有者的批次仍保留在队列中"""
+        if result.get('spooled_count'):
+            return 0
+        failed_urls = set(result['failed_urls'])
+        self.queue.remove(url for url in batch if url not in failed_urls)
+        if failed_urls:
+            self.queue.record_failures(failed_urls)
+        return len(failed_urls)
+
+    def drain(self) -> Dict[str, int]:
+        """分批索引队列中的页面，成功的移出队列，失败的保留"""
+        indexed_count = 0
+        failed_count = 0
+
+        for batch, file_url_pairs in self._batches():
+            with self.lease.lock:
+                result = self.search_engine.add_documents(file_url_pairs)
+            indexed_count += result['success_count']
+            failed_count += self._record_batch(batch, result)
+
+        return {'indexed': indexed_count, 'failed': failed_count}
+
+    async def drain_async(self, index_writer: IndexWriterActor) -> Dict[str, int]:
+        """
+        通过写入任务分批索引队列中的页面，供服务进程在事件循环中使用
+
+        写入与其他请求合并提交，租约由写入任务取得；提交失败的批次保留在队列中。
+        """
+        indexed_count = 0
+        failed_count = 0
+
+        for batch, file_url_pairs in self._batches():
+            try:
+                result = await index_writer.add(file_url_pairs)
+            except Exception as e:
+                logger.error(f"补录批次提交失败: {len(batch)}个页面, 错误: {e}")
+                result = {'success_count': 0, 'failed_urls': batch}
+            indexed_count += result['success_count']
+            failed_count += self._record_batch(batch, result)
+
+        logger.info(f"补录队列处理完成: 成功{indexed_count}个, 失败{failed_count}个")
+        return {'indexed': indexed_count, 'failed': failed_count}
+
+    def reconcile(self) -> Dict[str, int]:
+        """
+        对比下载目录和索引，补录缺失的页面
+
+        Returns:
+            对账统计：catalog（已下载页面数）、missing（索引缺失的页面数）、
+            indexed（本次补录成功数）、failed（本次补录失败数）
+        """
+        catalog = self.catalog_urls()
+        missing = catalog - self.search_engine.indexed_urls()
+        self.queue.add(sorted(missing))
+
+        result = self.drain()
+        logger.info(
+            f"索引对账完成: 已下载{len(catalog)}个, 缺失{len(missing)}个, "
+            f"补录成功{result['indexed']}个, 失败{result['failed']}个"
+        )
+        return {'catalog': len(catalog), 'missing': len(missing), **result}
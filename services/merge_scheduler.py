@@ -0,0 +1,100 @@
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from config import (
+    INDEX_MERGE_DELETED_RATIO,
+    INDEX_MERGE_FACTOR,
+    INDEX_MERGE_HISTORY_SIZE,
+    INDEX_MERGE_IDLE_SECONDS,
+)
+from utils import logger
+
+from .search_engine import SearchEngine
+from .write_lease import WriterLease
+
+
+class SegmentMergeScheduler:
+    """
+    后台段合并调度
+
+    full_search逐批写入的文档会在索引中留下大量小段，每次查询都要逐段读取。
+    索引写入任务空闲一段时间后调用maybe_merge，按分层策略合并小段；
+    合并在新段中完成后一次提交，进行中的搜索继续读取旧段。
+    """
+
+    def __init__(self, search_engine: SearchEngine,
+                 lease: Optional[WriterLease] = None,
+                 idle_seconds: float = INDEX_MERGE_IDLE_SECONDS,
+                 factor: int = INDEX_MERGE_FACTOR,
+                 deleted_ratio: float = INDEX_MERGE_DELETED_RATIO,
+                 history_size: int = INDEX_MERGE_HISTORY_SIZE):
+        self.search_engine = search_engine
+        self.lease = lease
+        self.idle_seconds = idle_seconds
+        self.factor = factor
+        self.deleted_ratio = deleted_ratio
+
+        self.history = deque(maxlen=history_size)
+        self.check_count = 0
+        self.merge_count = 0
+        self.failed_merge_count = 0
+        self.last_check_at: Optional[float] = None
+
+    def maybe_merge(self) -> Optional[Dict[str, Any]]:
+        """
+        需要时执行一次合并（阻塞操作，在写入线程中调用）
+
+        共享索引时只在能立即取得写入租约时合并，其他进程正在写入则留到下次空闲。
+
+        Returns:
+            合并记录，未合并时返回None
+        """
+        self.check_count += 1
+        self.last_check_at = time.time()
+
+        if self.lease is not None and not self.lease.lock.try_acquire():
+            logger.debug("其他进程持有写入租约，跳过本次段合并")
+            return None
+
+        try:
+            start_time = time.perf_counter()
+            result = self.search_engine.merge_segments(self.factor, self.deleted_ratio)
+        except Exception as e:
+            self.failed_merge_count += 1
+            logger.error(f"索引段合并失败: {e}")
+            return None
+        finally:
+            if self.lease is not None:
+                self.lease.release()
+
+        if not result["merged_segments"]:
+            return None
+
+        record = {
+            "merged_at": self.last_check_at,
+            "duration_ms": round((time.perf_counter() - start_time) * 1000, 1),
+            **result,
+        }
+        self.merge_count += 1
+        self.history.append(record)
+        return record
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取段合并统计信息"""
+        try:
+            segment_count = self.search_engine.segment_stats()["segment_count"]
+        except Exception as e:
+            logger.warning(f"获取索引段信息失败: {e}")
+            segment_count = None
+
+        return {
+            'segment_count': segment_count,
+            'checks': self.check_count,
+            'merges': self.merge_count,
+            'failed_merges': self.failed_merge_count,
+            'last_check_at': self.last_check_at,
+            'idle_seconds': self.idle_seconds,
+            'factor': self.factor,
+            'history': list(self.history),
+        }
@@ -0,0 +1,240 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from config import (
+    MAX_CONCURRENT_DOWNLOADS,
+    MIRROR_INDEX_BATCH_SIZE,
+    MIRROR_MAX_ATTEMPTS,
+    MIRROR_PAGE_SIZE,
+    MIRROR_STATE_FILE,
+    MIRROR_URL_PREFIX,
+)
+from utils import logger, canonicalize_url
+
+from .downloader import SmartDownloader
+from .myquant_api import EnhancedMyQuantAPIService
+from .search_engine import SearchEngine
+from .write_lease import WriterLease
+
+
+class SiteMirror:
+    """
+    全站文档镜像
+
+    通过MeiliSearch分页发现和页面链接跟随枚举整个文档站点，
+    爬取队列持久化到磁盘，中断后再次运行会从中断处继续。
+    """
+
+    def __init__(self, downloader: SmartDownloader, search_engine: SearchEngine,
+                 api_service: Optional[EnhancedMyQuantAPIService] = None,
+                 state_file: Path = MIRROR_STATE_FILE,
+                 url_prefix: str = MIRROR_URL_PREFIX,
+                 page_size: int = MIRROR_PAGE_SIZE,
+                 max_concurrent: int = MAX_CONCURRENT_DOWNLOADS,
+                 index_batch_size: int = MIRROR_INDEX_BATCH_SIZE,
+                 lease: Optional[WriterLease] = None):
+        self.downloader = downloader
+        self.search_engine = search_engine
+        self.api_service = api_service
+        self.state_file = state_file
+        self.url_prefix = url_prefix
+        self.page_size = page_size
+        self.max_concurrent = max_concurrent
+        self.index_batch_size = index_batch_size
+        self.lease = lease if lease is not None else WriterLease()
+
+        self.state = self._load_state()
+        self._index_batch: List[Dict[str, Any]] = []
+        self.indexed_count = 0
+
+    def _load_state(self) -> Dict[str, Any]:
+        """加载爬取状态"""
+        if self.state_file.exists():
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                logger.info(
+                    f"恢复镜像进度: {len(state['done'])}个已完成, {len(state['pending'])}个待处理"
+                )
+                return state
+            except (OSError, json.JSONDecodeError, KeyError) as e:
+                logger.error(f"镜像状态文件解析失败: {self.state_file}, 错误: {e}")
+
+        return {'pending': [], 'done': [], 'failed': {}, 'api_discovery_done': False}
+
+    def _save_state(self) -> None:
+        """原子地保存爬取状态"""
+        self.state['updated_at'] = datetime.now().isoformat()
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.state_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.state_file)
+
+    def reset(self) -> None:
+        """清空爬取状态，下次运行从头开始"""
+        self.state = {'pending': [], 'done': [], 'failed': {}, 'api_discovery_done': False}
+        if self.state_file.exists():
+            self.state_file.unlink()
+
+    def _normalize(self, url: str, base_url: str = "") -> Optional[str]:
+        """规范化链接，站点范围外的链接返回None"""
+        url = canonicalize_url(urljoin(base_url, url.strip()))
+        if not url.startswith(self.url_prefix):
+            return None
+        if not (url.endswith('.html') or url.endswith('/')):
+            return None
+        return url
+
+    def enqueue(self, urls: Iterable[str]) -> int:
+        """将未见过的URL加入爬取队列，返回新增数量"""
+        seen = set(self.state['pending']) | set(self.state['done']) | set(self.state['failed'])
+        added = 0
+        for url in urls:
+            normalized = self._normalize(url)
+            if normalized and normalized not in seen:
+                self.state['pending'].append(normalized)
+                seen.add(normalized)
+                added += 1
+        return added
+
+    def extract_links(self, file_path: Path, page_url: str) -> List[str]:
+        """从已下载页面中提取站内链接"""
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                soup = BeautifulSoup(f.read(), 'html.parser')
+        except OSError as e:
+            logger.error(f"读取页面失败: {file_path}, 错误: {e}")
+            return []
+
+        links = []
+        for a in soup.find_all('a', href=True):
+            normalized = self._normalize(a['href'], page_url)
+            if normalized:
+                links.append(normalized)
+        return links
+
+    async def discover_from_api(self) -> int:
+        """通过MeiliSearch分页并发枚举站点文档，返回新增URL数量"""
+        if self.api_service is None or self.state.get('api_discovery_done'):
+            return 0
+
+        first_page = await asyncio.to_thread(self.api_service.search, "", self.page_size, None, 0)
+        total = first_page.estimatedTotalHits
+        offsets = range(self.page_size, total, self.page_size)
+
+        pages = [first_page] + list(await asyncio.gather(*[
+            asyncio.to_thread(self.api_service.search, "", self.page_size, None, offset)
+            for offset in offsets
+        ]))
+
+        added = 0
+        for page in pages:
+            added += self.enqueue(self.api_service.extract_unique_urls(page))
+            self.downloader.record_metadata(self.api_service.extract_url_metadata(page))
+
+        self.state['api_discovery_done'] = bool(first_page.hits)
+        self._save_state()
+        logger.info(f"API分页发现完成: 预计{total}条记录, {len(pages)}页, 新增{added}个URL")
+        return added
+
+    def _flush_index_batch(self) -> None:
+        """将累积的文档批量写入索引，写入前等待写入租约"""
+        if not self._index_batch:
+            return
+        with self.lease.lock:
+            result = self.search_engine.add_documents(self._index_batch)
+        self.indexed_count += result['success_count']
+        self._index_batch = []
+
+    async def _process_url(self, url: str) -> None:
+        """下载单个页面，提取链接并加入索引批次"""
+        result = await self.downloader.download_url(url)
+
+        if result is False:
+            failed = self.state['failed']
+            failed[url] = failed.get(url, 0) + 1
+            self.state['pending'].remove(url)
+            if failed[url] < MIRROR_MAX_ATTEMPTS:
+                # 失败的页面放回队尾，后续重试
+                self.state['pending'].append(url)
+            return
+
+        file_path = self.downloader.get_file_path(url)
+        self.enqueue(self.extract_links(file_path, url))
+
+        self.state['pending'].remove(url)
+        self.state['done'].append(url)
+        self.state['failed'].pop(url, None)
+
+        # 索引提交后再持久化进度，已完成的页面一定已经写入索引
+        self._index_batch.append({'file_path': str(file_path), 'url': url})
+        if len(self._index_batch) >= self.index_batch_size:
+            self._flush_index_batch()
+            self._save_state()
+
+    async def run(self, seed_urls: Iterable[str] = (), max_pages: Optional[int] = None) -> Dict[str, Any]:
+        """
+        执行镜像爬取
+
+        Args:
+            seed_urls: 额外的起始URL
+            max_pages: 本次运行最多处理的页面数，None表示处理到队列为空
+
+        Returns:
+            本次运行的统计信息
+        """
+        self.enqueue(seed_urls)
+        await self.discover_from_api()
+
+        processed = 0
+        in_progress = set()
+
+        async def worker():
+            nonlocal processed
+            while True:
+                candidates = [url for url in self.state['pending'] if url not in in_progress]
+                if not candidates or (max_pages is not None and processed >= max_pages):
+                    if not in_progress:
+                        return
+                    # 其他worker可能还会发现新链接
+                    await asyncio.sleep(0.05)
+                    continue
+
+                url = candidates[0]
+                in_progress.add(url)
+                processed += 1
+                try:
+                    await self._process_url(url)
+                finally:
+                    in_progress.discard(url)
+
+        try:
+            await asyncio.gather(*[worker() for _ in range(self.max_concurrent)])
+        finally:
+            # 中断时也写入已完成的索引批次和爬取进度，保证可以续爬
+            self._flush_index_batch()
+            self._save_state()
+
+        stats = self.get_stats()
+        stats['processed'] = processed
+        stats['indexed'] = self.indexed_count
+        logger.info(f"镜像运行结束: {stats}")
+        return stats
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取爬取进度统计"""
+        return {
+            'pending': len(self.state['pending']),
+            'done': len(self.state['done']),
+            'failed': len(self.state['failed']),
+            'api_discovery_done': self.state.get('api_discovery_done', False),
+            'state_file': str(self.state_file),
+        }
@@ -1,9 +1,21 @@
-from typing import List, Optional, Dict, Any
+import json
+from typing import List, Optional, Dict, Any, Tuple
 import requests
-from pydantic import BaseModel, Field
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import BaseModel, ConfigDict, Field, field_serializer, field_validator
 from enum import Enum
-from config import MYQUANT_SEARCH_API, REQUEST_HEADERS
-from utils import logger, log_api_call, log_api_result
+from config import (
+    MYQUANT_SEARCH_API, REQUEST_HEADERS,
+    DISCOVERY_ATTRIBUTES, DISCOVERY_PAGE_SIZE, DISCOVERY_MAX_WORKERS
+)
+from utils import logger, log_api_call, log_api_result, CircuitBreaker, canonicalize_url, split_anchor
+from .discovery_cache import DiscoveryCache
+
+# 发现流程使用的层级字段
+HIERARCHY_FIELDS = tuple(f"hierarchy_lvl{i}" for i in range(7))
+
+# 发现流程使用的分类字段（与API过滤条件同名）
+CLASSIFICATION_FIELDS = ("document_type", "language", "category")
 
 class DocumentType(str, Enum):
     API = "api"
@@ -54,70 +66,81 @@ class MeiliSearchRequest(BaseModel):
         description="过滤条件"
     )
 
-class FormattedHierarchy(BaseModel):
-    """格式化层级信息"""
-    hierarchy_radio_lvl0: Optional[str] = None
-    hierarchy_radio_lvl1: Optional[str] = None
-    hierarchy_radio_lvl2: Optional[str] = None
-    hierarchy_radio_lvl3: Optional[str] = None
-    hierarchy_radio_lvl4: Optional[str] = None
-    hierarchy_radio_lvl5: Optional[str] = None
-
-class FormattedHierarchy(BaseModel):
-    """格式化层级信息"""
-    hierarchy_radio_lvl0: Optional[str] = None
-    hierarchy_radio_lvl1: Optional[str] = None
-    hierarchy_radio_lvl2: Optional[str] = None
-    hierarchy_radio_lvl3: Optional[str] = None
-    hierarchy_radio_lvl4: Optional[str] = None
-    hierarchy_radio_lvl5: Optional[str] = None
-
-class DocumentHit(BaseModel):
-    """文档搜索结果项"""
-    content: Optional[str] = None
-    objectID: str  # 注意：API返回的是 objectID 而不是 object_id
-    anchor: Optional[str] = None
-    url: str
-    hierarchy_radio_lvl0: Optional[str] = None
-    hierarchy_radio_lvl1: Optional[str] = None
-    hierarchy_radio_lvl2: Optional[str] = None
-    hierarchy_radio_lvl3: Optional[str] = None
-    hierarchy_radio_lvl4: Optional[str] = None
-    hierarchy_radio_lvl5: Optional[str] = None
-    hierarchy_lvl0: Optional[str] = None
-    hierarchy_lvl1: Optional[str] = None
-    hierarchy_lvl2: Optional[str] = None
-    hierarchy_lvl3: Optional[str] = None
-    hierarchy_lvl4: Optional[str] = None
-    hierarchy_lvl5: Optional[str] = None
-    hierarchy_lvl6: Optional[str] = None
-    _formatted: Optional[FormattedHierarchy] = None
+class HitRecord:
+    """轻量的搜索结果记录，只保存发现流程用到的属性，避免逐条pydantic校验"""
+
+    __slots__ = ("objectID", "url", "anchor", "content") + HIERARCHY_FIELDS + CLASSIFICATION_FIELDS
+
+    def __init__(self, objectID: str = "", url: str = "", anchor: Optional[str] = None,
+                 content: Optional[str] = None, **attributes: Optional[str]):
+        self.objectID = objectID
+        self.url = url
+        self.anchor = anchor
+        self.content = content
+        for name in HIERARCHY_FIELDS + CLASSIFICATION_FIELDS:
+            setattr(self, name, attributes.get(name))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HitRecord":
+        """从API返回的原始字典构建记录，忽略未使用的属性"""
+        record = cls.__new__(cls)
+        record.objectID = str(data.get("objectID") or data.get("object_id") or "")
+        record.url = data.get("url") or ""
+        record.anchor = data.get("anchor")
+        record.content = data.get("content")
+        for name in HIERARCHY_FIELDS + CLASSIFICATION_FIELDS:
+            setattr(record, name, data.get(name))
+        return record
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典，用于缓存序列化"""
+        return {name: getattr(self, name) for name in self.__slots__}
 
     # 为向后兼容添加属性访问器
     @property
     def id(self) -> str:
         return self.objectID
 
+    @property
+    def object_id(self) -> str:
+        return self.objectID
+
     @property
     def title(self) -> str:
-        # 从内容或格式化信息中提取标题
-        if self._formatted and hasattr(self._formatted, 'hierarchy_radio_lvl0'):
-            return self._formatted.hierarchy_radio_lvl0 or ""
+        # 优先使用最深一级的层级标题，其次使用内容开头
+        for name in reversed(HIERARCHY_FIELDS):
+            value = getattr(self, name)
+            if value:
+                return value
         content = self.content or ""
         return content[:100] if content else "未知标题"
 
     @property
-    def object_id(self) -> str:
-        return self.objectID
+    def hierarchy(self) -> List[str]:
+        """非空的层级标题列表"""
+        return [getattr(self, name) for name in HIERARCHY_FIELDS if getattr(self, name)]
 
 class MeiliSearchResponse(BaseModel):
     """MeiliSearch标准响应模型"""
-    hits: List[DocumentHit]
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    hits: List[HitRecord]
     query: str
     processingTimeMs: int  # 注意：API返回的是 processingTimeMs
     limit: int
     offset: int
     estimatedTotalHits: int  # 注意：API返回的是 estimatedTotalHits
+    # 本地字段，不是API返回的属性：请求失败或熔断时返回的空响应为False，随缓存一起保存
+    succeeded: bool = True
+
+    @field_validator("hits", mode="before")
+    @classmethod
+    def _decode_hits(cls, hits: List[Any]) -> List[HitRecord]:
+        return [hit if isinstance(hit, HitRecord) else HitRecord.from_dict(hit) for hit in hits]
+
+    @field_serializer("hits")
+    def _encode_hits(self, hits: List[HitRecord]) -> List[Dict[str, Any]]:
+        return [hit.to_dict() for hit in hits]
 
     # 为向后兼容添加属性访问器
     @property
@@ -131,9 +154,11 @@ class MeiliSearchResponse(BaseModel):
 class EnhancedMyQuantAPIService:
     """增强的掘金量化API服务"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[DiscoveryCache] = None):
         self.api_url = MYQUANT_SEARCH_API
         self.headers = REQUEST_HEADERS
+        self.cache = cache if cache is not None else DiscoveryCache()
+        self.breaker = CircuitBreaker("myquant_api")
     
     def build_search_request(self, keyword: str, limit: int = 500,
                           filters: Optional[Dict[str, List[str]]] = None) -> MeiliSearchRequest:
@@ -145,23 +170,115 @@ class EnhancedMyQuantAPIService:
             request.filter = filters
         
         return request
+
+    @staticmethod
+    def build_filter_expression(filters: Dict[str, List[str]]) -> List[List[str]]:
+        """
+        把过滤条件转换为MeiliSearch的数组形式过滤表达式
+
+        外层数组之间为AND，内层数组中的取值为OR，如
+        {"language": ["python", "cpp"]} -> [['language = "python"', 'language = "cpp"']]
+        """
+        expression = []
+        for name, values in filters.items():
+            values = [value for value in values if value]
+            if values:
+                expression.append([f'{name} = {json.dumps(value, ensure_ascii=False)}' for value in values])
+        return expression
+
+    def _empty_response(self, keyword: str, limit: int, offset: int = 0) -> MeiliSearchResponse:
+        """构建请求失败时的空搜索响应"""
+        return MeiliSearchResponse(
+            hits=[],
+            query=keyword,
+            processingTimeMs=0,
+            limit=limit,
+            offset=offset,
+            estimatedTotalHits=0,
+            succeeded=False
+        )
     
     def search(self, keyword: str, limit: int = 500,
-                filters: Optional[Dict[str, List[str]]] = None) -> MeiliSearchResponse:
-        """执行MeiliSearch API调用"""
+                filters: Optional[Dict[str, List[str]]] = None,
+                offset: int = 0) -> MeiliSearchResponse:
+        """执行MeiliSearch API调用（优先使用磁盘缓存）"""
         
-        log_context = log_api_call(logger, "search", keyword=keyword, limit=limit, filters=filters)
-        request = self.build_search_request(keyword, limit, filters)
+        cache_key = self.cache.make_key(keyword, limit, filters, offset)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"发现缓存命中: {keyword}")
+            return MeiliSearchResponse.model_validate(cached)
+
+        # 熔断器打开时直接返回空结果，不写入缓存
+        if not self.breaker.allow_request():
+            logger.warning(f"API熔断器已打开，跳过请求: {keyword}")
+            return self._empty_response(keyword, limit, offset)
+
+        search_response, succeeded = self._fetch_pages(keyword, limit, filters, offset)
+
+        # 空结果和失败请求使用负缓存，避免重复的未命中每次都等待超时
+        self.cache.set(
+            cache_key,
+            search_response.model_dump(),
+            negative=not succeeded or not search_response.hits
+        )
+
+        return search_response
+
+    def _fetch_pages(self, keyword: str, limit: int,
+                     filters: Optional[Dict[str, List[str]]] = None,
+                     offset: int = 0) -> Tuple[MeiliSearchResponse, bool]:
+        """按页请求结果，首页确定总数后并发请求剩余的偏移页"""
+        page_size = min(limit, DISCOVERY_PAGE_SIZE)
+        first_page, succeeded = self._fetch(keyword, page_size, filters, offset)
+        if not succeeded or limit <= page_size:
+            return first_page, succeeded
+
+        end = offset + min(limit, first_page.estimatedTotalHits)
+        page_offsets = list(range(offset + page_size, end, page_size))
+        if not page_offsets:
+            return first_page, succeeded
+
+        with ThreadPoolExecutor(max_workers=DISCOVERY_MAX_WORKERS) as executor:
+            pages = list(executor.map(
+                lambda page_offset: self._fetch(
+                    keyword, min(page_size, end - page_offset), filters, page_offset
+                ),
+                page_offsets
+            ))
+
+        hits = list(first_page.hits)
+        for page, page_succeeded in pages:
+            hits.extend(page.hits)
+            succeeded = succeeded and page_succeeded
+
+        return MeiliSearchResponse(
+            hits=hits,
+            query=keyword,
+            processingTimeMs=max([first_page.processingTimeMs] + [page.processingTimeMs for page, _ in pages]),
+            limit=limit,
+            offset=offset,
+            estimatedTotalHits=first_page.estimatedTotalHits,
+            succeeded=succeeded
+        ), succeeded
+
+    def _fetch(self, keyword: str, limit: int,
+               filters: Optional[Dict[str, List[str]]] = None,
+               offset: int = 0) -> Tuple[MeiliSearchResponse, bool]:
+        """请求MeiliSearch API，返回响应和请求是否成功"""
+        
+        log_context = log_api_call(logger, "search", keyword=keyword, limit=limit, offset=offset, filters=filters)
         
         try:
-            # 使用成功的请求格式（基于reference案例）
+            # 只请求发现流程用到的属性，不请求高亮和裁剪
             request_data = {
                 "q": keyword,
                 "limit": limit,
-                "attributesToHighlight": ["*"],
-                "attributesToCrop": ["content"],
-                "cropLength": 50
+                "offset": offset,
+                "attributesToRetrieve": DISCOVERY_ATTRIBUTES
             }
+            if filters:
+                request_data["filter"] = self.build_filter_expression(filters)
 
             # 使用完整的请求头（基于成功案例）
             response = requests.post(
@@ -176,51 +293,82 @@ class EnhancedMyQuantAPIService:
             logger.debug(f"API响应状态: {response.status_code}")
             logger.debug(f"API响应内容: {response.text[:500]}...")
 
+            # 服务端错误视为站点故障，其余响应说明站点可达
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
             if response.status_code != 200:
                 logger.error(f"API请求失败: {response.status_code} - {response.text[:200]}")
                 # 返回空响应而不是抛出异常
-                return MeiliSearchResponse(
-                    hits=[],
-                    query=keyword,
-                    processing_time_ms=0,
-                    limit=limit,
-                    offset=0,
-                    estimated_total_hits=0
-                )
+                return self._empty_response(keyword, limit, offset), False
 
             # 使用Pydantic验证响应
             search_response = MeiliSearchResponse.model_validate(response.json())
 
             log_api_result(logger, log_context, search_response)
 
-            return search_response
+            return search_response, True
             
         except requests.exceptions.RequestException as e:
             logger.error(f"API请求失败: {e}")
+            self.breaker.record_failure()
             # 返回空响应
-            return MeiliSearchResponse(
-                hits=[],
-                query=keyword,
-                processing_time_ms=0,
-                limit=limit,
-                offset=0,
-                estimated_total_hits=0
-            )
+            return self._empty_response(keyword, limit, offset), False
         except Exception as e:
             logger.error(f"响应解析失败: {e}")
-            return MeiliSearchResponse(
-                hits=[],
-                query=keyword,
-                processing_time_ms=0,
-                limit=limit,
-                offset=0,
-                estimated_total_hits=0
-            )
+            return self._empty_response(keyword, limit, offset), False
     
     def extract_unique_urls(self, response: MeiliSearchResponse) -> List[str]:
-        """提取唯一URL列表"""
-        urls = [hit.url for hit in response.hits if hit.url]
-        return list(set(urls))  # 去重
+        """提取唯一URL列表（按规范化URL去重，同一页面的不同锚点只保留一个URL）"""
+        urls = [canonicalize_url(hit.url) for hit in response.hits if hit.url]
+        return list(dict.fromkeys(urls))  # 保持顺序的去重
+
+    def extract_url_anchors(self, response: MeiliSearchResponse) -> Dict[str, List[str]]:
+        """按规范化URL汇总各页面命中的章节锚点"""
+        url_anchors: Dict[str, List[str]] = {}
+        for hit in response.hits:
+            if not hit.url:
+                continue
+            url, anchor = split_anchor(hit.url)
+            anchors = url_anchors.setdefault(url, [])
+            for value in (anchor, hit.anchor):
+                if value and value not in anchors:
+                    anchors.append(value)
+        return url_anchors
+
+    def extract_url_metadata(self, response: MeiliSearchResponse) -> Dict[str, Dict[str, Any]]:
+        """
+        按规范化URL汇总页面元数据，用于持久化到本地文档目录
+
+        Returns:
+            {url: {'title', 'hierarchy', 'anchors', 'document_type', 'language', 'category'}}
+        """
+        url_anchors = self.extract_url_anchors(response)
+        url_metadata: Dict[str, Dict[str, Any]] = {}
+
+        for hit in response.hits:
+            if not hit.url:
+                continue
+            url = canonicalize_url(hit.url)
+            hierarchy = hit.hierarchy
+            metadata = url_metadata.get(url)
+
+            # 层级最浅的命中代表页面本身，其层级即页面的层级路径
+            if metadata is None or (hierarchy and len(hierarchy) < len(metadata['hierarchy'])):
+                metadata = url_metadata[url] = {
+                    'title': hierarchy[-1] if hierarchy else hit.title,
+                    'hierarchy': hierarchy,
+                    'anchors': url_anchors.get(url, []),
+                    **{name: (metadata or {}).get(name) for name in CLASSIFICATION_FIELDS},
+                }
+
+            for name in CLASSIFICATION_FIELDS:
+                if metadata[name] is None and getattr(hit, name):
+                    metadata[name] = getattr(hit, name)
+
+        return url_metadata
     
     def get_document_categories(self, response: MeiliSearchResponse) -> Dict[str, Any]:
         """统计文档分类信息"""
@@ -230,18 +378,18 @@ class EnhancedMyQuantAPIService:
         
         for hit in response.hits:
             # 统计文档类型
-            if hasattr(hit, '_formatted') and hit._formatted and hasattr(hit._formatted, 'hierarchy_radio_lvl0') and hit._formatted.hierarchy_radio_lvl0:
-                doc_type = hit._formatted.hierarchy_radio_lvl0
+            if hit.hierarchy_lvl0:
+                doc_type = hit.hierarchy_lvl0
                 doc_types[doc_type] = doc_types.get(doc_type, 0) + 1
             
             # 统计编程语言
-            if hasattr(hit, '_formatted') and hit._formatted and hasattr(hit._formatted, 'hierarchy_radio_lvl1') and hit._formatted.hierarchy_radio_lvl1:
-                language = hit._formatted.hierarchy_radio_lvl1.lower()
+            if hit.hierarchy_lvl1:
+                language = hit.hierarchy_lvl1.lower()
                 languages[language] = languages.get(language, 0) + 1
             
             # 统计功能分类
-            if hasattr(hit, '_formatted') and hit._formatted and hasattr(hit._formatted, 'hierarchy_radio_lvl2') and hit._formatted.hierarchy_radio_lvl2:
-                category = hit._formatted.hierarchy_radio_lvl2.lower()
+            if hit.hierarchy_lvl2:
+                category = hit.hierarchy_lvl2.lower()
                 categories[category] = categories.get(category, 0) + 1
         
         return {
@@ -311,11 +459,4 @@ class AdvancedMyQuantAPIService(EnhancedMyQuantAPIService):
             
         except Exception as e:
             logger.error(f"最近文档搜索失败: {e}")
-            return MeiliSearchResponse(
-                hits=[],
-                query="",
-                processing_time_ms=0,
-                limit=limit,
-                offset=0,
-                estimated_total_hits=0
-            )
\ No newline at end of file
+            return self._empty_response("", limit)
\ No newline at end of file
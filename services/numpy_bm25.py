@@ -0,0 +1,236 @@
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from whoosh.highlight import Highlighter, highlight
+from whoosh.query import Or, Term
+
+from config import INDEX_DIR
+
+from .whoosh_service import SPELLING_FIELDS, WhooshSearchEngine
+
+try:
+    import numpy as np
+except ImportError:  # 未安装numpy时只能使用Whoosh后端
+    np = None
+
+
+def numpy_available() -> bool:
+    """是否安装了numpy"""
+    return np is not None
+
+
+class SegmentPostings:
+    """
+    单个索引段的倒排表
+
+    所有(字段, 词)的倒排表按CSR格式拼接：第i个词的文档号和权重（已含字段权重的词频）
+    位于docs/weights的[indptr[i], indptr[i + 1])区间；另外保存各字段的文档长度。
+    索引段写入后不再变化，按段ID缓存，新提交只需要读取新增的段。
+    """
+
+    def __init__(self, leaf: Any, fields: Tuple[str, ...]):
+        self.slots: Dict[Tuple[str, bytes], int] = {}
+        indptr = [0]
+        docs: List[int] = []
+        weights: List[float] = []
+        for field in fields:
+            for term_bytes, _ in leaf.iter_field(field):
+                for docnum, weight in leaf.postings(field, term_bytes).items_as("weight"):
+                    docs.append(docnum)
+                    weights.append(weight)
+                self.slots[(field, term_bytes)] = len(indptr) - 1
+                indptr.append(len(docs))
+
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.docs = np.asarray(docs, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=np.float32)
+
+        doc_count = leaf.doc_count_all()
+        self.lengths = {
+            field: np.fromiter((leaf.doc_field_length(docnum, field, 0) for docnum in range(doc_count)),
+                               dtype=np.float32, count=doc_count)
+            for field in fields
+        }
+
+    def postings(self, field: str, term_bytes: bytes) -> Optional[Tuple["np.ndarray", "np.ndarray"]]:
+        """词的(文档号, 权重)数组，段中没有该词时返回None"""
+        slot = self.slots.get((field, term_bytes))
+        if slot is None:
+            return None
+        start, end = self.indptr[slot], self.indptr[slot + 1]
+        return self.docs[start:end], self.weights[start:end]
+
+
+class ScoredHit:
+    """numpy评分得到的命中结果，提供与whoosh.searching.Hit相同的字段读取和高亮接口"""
+
+    def __init__(self, searcher: Any, docnum: int, score: float, terms: Dict[str, Set[str]],
+                 highlighter: Highlighter):
+        self.searcher = searcher
+        self.docnum = docnum
+        self.score = score
+        self._terms = terms
+        # 同一次查询的结果共用一个Highlighter，查询词的高亮编号（term0, term1...）与Whoosh一致
+        self._highlighter = highlighter
+        self._fields: Optional[Dict[str, Any]] = None
+
+    def fields(self) -> Dict[str, Any]:
+        if self._fields is None:
+            self._fields = self.searcher.stored_fields(self.docnum)
+        return self._fields
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.fields().get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        return self.fields()[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.fields()
+
+    def highlights(self, fieldname: str, text: Optional[str] = None, top: int = 3, minscore: int = 1) -> str:
+        """高亮查询词，片段切分和格式与Whoosh默认的Highlighter一致"""
+        if text is None:
+            text = self[fieldname]
+        analyzer = self.searcher.schema[fieldname].analyzer
+        highlighter = self._highlighter
+        return highlight(text, self._terms.get(fieldname, set()), analyzer, highlighter.fragmenter,
+                         highlighter.formatter, top=top, scorer=highlighter.scorer, minscore=minscore,
+                         order=highlighter.order)
+
+
+class NumpyBM25FEngine(WhooshSearchEngine):
+    """
+    在numpy数组上计算BM25F评分的搜索引擎
+
+    索引的写入、存储和查询解析仍由Whoosh完成；对只由文本字段词项OR组合而成的查询
+    （关键词搜索、模糊搜索、混合检索的关键词部分），评分改为对CSR倒排表做向量化的
+    取数和累加，再用argpartition选出前k个，避免Whoosh逐条遍历倒排表的Python开销。
+    短语、布尔和标签过滤等其他查询仍交给Whoosh执行。
+    idf和平均字段长度取自Whoosh的searcher，得分与Whoosh的BM25F一致。
+    """
+
+    scored_fields = SPELLING_FIELDS
+
+    def __init__(self, index_dir: Path = INDEX_DIR):
+        super().__init__(index_dir)
+        self._segment_postings: Dict[str, SegmentPostings] = {}
+        # 段的删除标记会增加，按(段ID, 已删除文档数)缓存有效文档掩码
+        self._live_masks: Dict[Tuple[str, int], "np.ndarray"] = {}
+        self._postings_lock = threading.Lock()
+
+    def _flat_terms(self, query: Any) -> Optional[List[Tuple[str, str]]]:
+        """只由评分字段上的词项OR组合而成的查询返回其词项，其他查询返回None"""
+        if isinstance(query, Or):
+            if query.boost != 1 or query.minmatch or query.scale:
+                return None
+            subqueries = query.subqueries
+        else:
+            subqueries = [query]
+
+        terms = []
+        for subquery in subqueries:
+            if type(subquery) is not Term or subquery.boost != 1 or subquery.fieldname not in self.scored_fields:
+                return None
+            terms.append((subquery.fieldname, subquery.text))
+        return list(dict.fromkeys(terms))
+
+    def _leaves(self, searcher: Any) -> List[Tuple[SegmentPostings, Optional["np.ndarray"], int]]:
+        """searcher各段的(倒排表, 有效文档掩码, 文档号偏移)，新段首次使用时读取"""
+        leaves = []
+        with self._postings_lock:
+            segment_ids = set()
+            for leaf, offset in searcher.reader().leaf_readers():
+                segment = leaf.segment()
+                segment_id = segment.segment_id()
+                segment_ids.add(segment_id)
+
+                postings = self._segment_postings.get(segment_id)
+                if postings is None:
+                    postings = self._segment_postings[segment_id] = SegmentPostings(leaf, self.scored_fields)
+
+                live = None
+                if leaf.has_deletions():
+                    key = (segment_id, segment.deleted_count())
+                    live = self._live_masks.get(key)
+                    if live is None:
+                        live = self._live_masks[key] = np.fromiter(
+                            (not leaf.is_deleted(docnum) for docnum in range(leaf.doc_count_all())),
+                            dtype=np.float32, count=leaf.doc_count_all()
+                        )
+                leaves.append((postings, live, offset))
+
+            # 合并后不再存在的段
+            for segment_id in set(self._segment_postings) - segment_ids:
+                del self._segment_postings[segment_id]
+            for key in [key for key in self._live_masks if key[0] not in segment_ids]:
+                del self._live_masks[key]
+        return leaves
+
+    def _score(self, searcher: Any, terms: List[Tuple[str, str]]) -> "np.ndarray":
+        """计算所有文档的BM25F得分，未命中的文档得分为0"""
+        B, K1 = self.scorer.B, self.scorer.K1
+        scores = np.zeros(searcher.doc_count_all(), dtype=np.float64)
+        leaves = self._leaves(searcher)
+        for field, text in terms:
+            idf = searcher.idf(field, text)
+            avgfl = searcher.avg_field_length(field) or 1
+            term_bytes = self.schema[field].to_bytes(text)
+            for postings, live, offset in leaves:
+                found = postings.postings(field, term_bytes)
+                if found is None:
+                    continue
+                docs, weights = found
+                norms = K1 * ((1 - B) + B * postings.lengths[field][docs] / avgfl)
+                contributions = idf * weights * (K1 + 1) / (weights + norms)
+                if live is not None:
+                    contributions *= live[docs]
+                scores[offset + docs] += contributions
+        return scores
+
+    def _search_hits(self, searcher: Any, query: Any, limit: int, allowed: Optional[Any] = None) -> List[Any]:
+        terms = self._flat_terms(query)
+        if terms is None:
+            return super()._search_hits(searcher, query, limit, allowed)
+        if allowed is not None and not allowed:
+            return []
+
+        scores = self._score(searcher, terms)
+        if allowed is not None:
+            # 分面过滤：位图展开为0/1掩码，不允许的文档得分置0，不参与选取前k个
+            scores *= np.unpackbits(np.frombuffer(allowed.bits, dtype=np.uint8), count=len(scores), bitorder="little")
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > limit:
+            matched = matched[np.argpartition(-scores[matched], limit - 1)[:limit]]
+        # 得分相同时按文档号排列，与Whoosh一致
+        ranked = matched[np.lexsort((matched, -scores[matched]))]
+
+        terms_by_field: Dict[str, Set[str]] = {}
+        for field, text in terms:
+            terms_by_field.setdefault(field, set()).add(text)
+        highlighter = Highlighter()
+        return [
+            ScoredHit(searcher, int(docnum), float(scores[docnum]), terms_by_field, highlighter)
+            for docnum in ranked
+        ]
+
+    def _matched_docnums(self, searcher: Any, query: Any) -> Iterable[int]:
+        """词项OR组合的查询直接拼接各词的倒排表（可能重复），不经过Whoosh的匹配器"""
+        terms = self._flat_terms(query)
+        if terms is None:
+            return super()._matched_docnums(searcher, query)
+
+        matched = []
+        leaves = self._leaves(searcher)
+        for field, text in terms:
+            term_bytes = self.schema[field].to_bytes(text)
+            for postings, live, offset in leaves:
+                found = postings.postings(field, term_bytes)
+                if found is None:
+                    continue
+                docs = found[0]
+                if live is not None:
+                    docs = docs[live[docs] > 0]
+                matched.append(offset + docs)
+        return np.concatenate(matched) if matched else np.empty(0, dtype=np.int64)
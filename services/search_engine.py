@@ -0,0 +1,799 @@
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import quote
+
+import jieba
+import jieba.analyse
+from bs4 import BeautifulSoup
+
+from config import (
+    HYBRID_CANDIDATES, INDEX_MERGE_DELETED_RATIO, INDEX_MERGE_FACTOR, PINYIN_MAX_EXPANSIONS, SPELLING_MAX_CANDIDATES,
+    SPELLING_MAX_DISTANCE, SPELLING_MAX_SUGGESTIONS, SPELLING_PREFIX_LENGTH, SUGGEST_MAX_RESULTS,
+    SUGGEST_REFRESH_INTERVAL
+)
+from utils import (
+    logger, canonicalize_url, doc_section, is_latin_query, max_distance_for, PinyinIndex, PrefixIndex, SymSpellIndex
+)
+
+from .api_symbols import dump_symbols, extract_symbols, load_symbols, sdk_language, symbol_key
+
+# 预初始化jieba，避免首次搜索时的延迟
+logger.info("预初始化jieba分词器...")
+jieba.initialize()  # 预加载词典和模型
+
+# 添加专业术语到jieba词典，提高分词准确性
+custom_terms = [
+    "掘金量化",
+    "策略",
+    "回测",
+    "行情",
+    "交易",
+    "接口",
+    "SDK",
+    "实时行情",
+    "历史数据",
+    "K线",
+    "分笔",
+    "逐笔",
+    "委托",
+    "成交",
+    "持仓",
+    "账户",
+    "资金",
+    "风控",
+    "滑点",
+    "手续费",
+    "保证金",
+    "多因子",
+    "Alpha",
+    "量价",
+    "技术指标",
+    "基本面",
+    "股票",
+    "期货",
+    "期权",
+    "基金",
+    "债券",
+    "外汇",
+    "数字货币",
+    "Python",
+    "C++",
+    "C#",
+    "MATLAB",
+    "API",
+    "数据查询",
+    "下单",
+    "撤单",
+    "查询",
+    "订阅",
+    "推送",
+    "回调",
+    "事件",
+    "MACD",
+    "KDJ",
+    "RSI",
+    "布林带",
+    "均线",
+    "成交量",
+    "换手率",
+    "市盈率",
+    "市净率",
+    "ROE",
+    "毛利率",
+    "净利率",
+]
+
+for term in custom_terms:
+    jieba.add_word(term, freq=10000)  # 高频词，确保不被切分
+
+# 触发一次分词操作，完成完整的初始化
+list(jieba.cut("初始化测试"))
+logger.info("jieba分词器初始化完成，已加载专业术语词典")
+
+# 参与关键词搜索、模糊搜索和拼写纠错的文本字段
+SPELLING_FIELDS = ("title", "content", "headings", "code_blocks")
+
+# 文本字段的权重（Whoosh的field_boost、FTS5的bm25列权重）
+FIELD_BOOSTS = {"title": 3.0, "content": 1.0, "headings": 2.0, "code_blocks": 1.5}
+
+# 代码块中的函数调用名，作为补全项
+CODE_IDENTIFIER_PATTERN = re.compile(r"(?<![\w.])([A-Za-z_][A-Za-z0-9_]{2,})\s*\(")
+
+
+def search_terms(text: str) -> List[str]:
+    """搜索模式分词（更细粒度的切分），与索引文本字段时的分词一致"""
+    return [word.strip() for word in jieba.cut_for_search(text) if word.strip()]
+
+
+class SearchEngine(ABC):
+    """
+    搜索引擎接口
+
+    子类实现索引的存储、写入和各种查询；HTML解析、拼写纠错、拼音展开、前缀补全和
+    SDK符号查找在这里统一实现，只通过_index_version、_term_frequencies、
+    _stored_documents和_symbol_documents读取索引。
+
+    拼写纠错词典、拼音索引和前缀补全首次使用时从索引构建，之后由本进程的提交在write_batch中增量更新；
+    本进程重建索引时随之重建，其他进程的提交或更新、删除改写了已有文档时在后台线程中重建，
+    查询期间继续使用已有的版本，不在查询路径上扫描索引。
+
+    各查询的filters为分面过滤条件 {"language"/"section"/"tags": [取值]}，同一分面内OR、不同分面之间AND，
+    在评分前过滤命中；安装了numpy时结果中的facets为命中文档在各分面取值上的文档数。
+    """
+
+    def __init__(self):
+        # 拼写纠错词典和拼音索引，首次使用时从索引词表构建，之后在每次提交后补充新文档的词
+        self._spelling: Optional[SymSpellIndex] = None
+        self._pinyin: Optional[PinyinIndex] = None
+        self._vocabulary_version: Optional[Tuple[Optional[str], int]] = None
+        self._vocabulary_lock = threading.Lock()
+
+        # 前缀补全索引，首次补全时从存储字段构建，本进程的提交增量补充
+        self._completions: Optional[PrefixIndex] = None
+        self._completions_version: Optional[Tuple[Optional[str], int]] = None
+        self._completions_checked_at = 0.0
+        self._completions_lock = threading.Lock()
+
+        # 后台重建线程，按名称同时只运行一个
+        self._background_refreshes: Dict[str, threading.Thread] = {}
+        self._background_lock = threading.Lock()
+
+    @abstractmethod
+    def write_batch(self, operations: List[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        执行一批写操作，整批只提交一次
+
+        Args:
+            operations: 写操作列表，每项为 ("add", file_url_pairs)、
+                        ("update", file_url_pairs) 或 ("delete", urls)
+
+        Returns:
+            与operations一一对应的结果列表
+        """
+
+    @abstractmethod
+    def rebuild_index(self, file_url_pairs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """重建索引，重建期间的搜索继续使用旧索引"""
+
+    @abstractmethod
+    def search(self, keyword: str, max_results: int = 10,
+               filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """关键词搜索"""
+
+    @abstractmethod
+    def boolean_search(self, query_string: str, max_results: int = 10,
+                       filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """布尔查询搜索"""
+
+    @abstractmethod
+    def phrase_search(self, phrase: str, max_results: int = 10,
+                      filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """精确短语搜索"""
+
+    @abstractmethod
+    def fuzzy_search(self, term: str, max_distance: int = 2, max_results: int = 10,
+                     filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """模糊搜索"""
+
+    @abstractmethod
+    def tag_search(self, tag: str, keyword: str = "", max_results: int = 10,
+                   filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """标签过滤搜索"""
+
+    @abstractmethod
+    def get_index_stats(self) -> Dict[str, Any]:
+        """获取索引统计信息"""
+
+    @abstractmethod
+    def last_modified(self) -> float:
+        """获取索引最后一次提交的时间戳"""
+
+    @abstractmethod
+    def indexed_urls(self) -> Set[str]:
+        """索引中已有的文档URL集合"""
+
+    @abstractmethod
+    def _index_version(self) -> Tuple[Optional[str], int]:
+        """索引版本 (索引代, 提交序号)，重建后索引代改变，每次提交后提交序号增加"""
+
+    @abstractmethod
+    def _term_frequencies(self) -> Dict[str, int]:
+        """文本字段中所有词的文档频率（各字段累加）"""
+
+    def _document_terms(self, document: Dict[str, Any]) -> Counter:
+        """文档文本字段中的词及其文档频率增量，与_term_frequencies的统计方式一致（各字段累加）"""
+        return Counter(
+            term for field in SPELLING_FIELDS for term in set(search_terms(document.get(field) or ""))
+        )
+
+    @abstractmethod
+    def _stored_documents(self) -> List[Dict[str, Any]]:
+        """所有文档的存储字段"""
+
+    @abstractmethod
+    def _symbol_documents(self, key: str) -> List[Dict[str, Any]]:
+        """symbols字段包含该符号的文档的存储字段"""
+
+    def _parse_html(self, file_path: Path, url: str) -> Dict[str, Any]:
+        """增强的HTML文档解析，提取更多结构化内容"""
+        with open(file_path, "r", encoding="utf-8") as f:
+            html_content = f.read()
+
+        soup = BeautifulSoup(html_content, "html.parser")
+
+        # 移除脚本和样式标签
+        for script in soup(["script", "style", "nav", "footer", "header"]):
+            script.decompose()
+
+        # 提取标题
+        title = ""
+        if soup.title and soup.title.string:
+            title = str(soup.title.string).strip()
+
+        # 如果title标签没有内容，尝试从h1获取
+        if not title:
+            h1 = soup.find("h1")
+            if h1:
+                title = h1.get_text().strip()
+
+        # 提取正文内容 - 使用增强的多方法提取
+        content_parts = []
+
+        # 方法1: 尝试查找主要内容容器
+        content_containers = [
+            "content",
+            "main-content",
+            "theme-default-content",
+            "article-content",
+            "post-content",
+            "entry-content",
+            "page-content",
+            "documentation-content",
+        ]
+
+        main_content = None
+        for container_class in content_containers:
+            main_content = soup.find(["div", "main", "article"], class_=container_class)
+            if main_content:
+                break
+
+        # 如果找不到特定容器，使用main或article标签
+        if not main_content:
+            main_content = soup.find(["main", "article"])
+
+        # 如果还是找不到，使用body
+        if not main_content:
+            main_content = soup.body if soup.body else soup
+
+        # 提取段落文本
+        if main_content:
+            # 提取所有段落
+            for p in main_content.find_all("p"):
+                text = p.get_text(separator=" ", strip=True)
+                if text:
+                    content_parts.append(text)
+
+            # 提取列表项
+            for li in main_content.find_all("li"):
+                text = li.get_text(separator=" ", strip=True)
+                if text:
+                    content_parts.append(text)
+
+            # 提取表格内容
+            for table in main_content.find_all("table"):
+                for row in table.find_all("tr"):
+                    cells = [
+                        str(td.get_text(strip=True))
+                        for td in row.find_all(["td", "th"])
+                    ]
+                    if cells:
+                        content_parts.append(" | ".join(cells))
+
+            # 提取div中的文本（排除已提取的元素）
+            for div in main_content.find_all("div", recursive=False):
+                text = div.get_text(separator=" ", strip=True)
+                if text and len(text) > 10:  # 只添加有意义的文本
+                    content_parts.append(text)
+
+        # 合并内容并去重
+        content = "\n".join(dict.fromkeys(content_parts))  # 保持顺序的去重
+
+        # 如果内容太少，使用整个body的文本
+        if len(content) < 100 and soup.body:
+            content = soup.body.get_text(separator="\n", strip=True)
+
+        # 清理内容：移除多余空白、特殊字符
+        content = re.sub(r"\s+", " ", content)  # 多个空白符替换为单个空格
+        content = re.sub(r"\n+", "\n", content)  # 多个换行替换为单个换行
+
+        # 提取所有标题（h1-h6）
+        headings = []
+        for h in (
+            main_content.find_all(["h1", "h2", "h3", "h4", "h5", "h6"])
+            if main_content
+            else []
+        ):
+            heading_text = h.get_text(strip=True)
+            if heading_text:
+                headings.append(heading_text)
+        headings_text = "\n".join(headings)
+
+        # 提取代码块 - 包括code、pre标签
+        code_blocks = []
+        for code in main_content.find_all(["code", "pre"]) if main_content else []:
+            code_text = code.get_text(strip=True)
+            if code_text and len(code_text) > 2:  # 排除太短的代码片段
+                code_blocks.append(code_text)
+        code_blocks_text = "\n\n".join(code_blocks)
+
+        # 提取标签（从meta标签的keywords中提取）
+        tags = []
+        keywords_meta = soup.find("meta", attrs={"name": "keywords"})
+        if keywords_meta and keywords_meta.get("content"):
+            meta_content = keywords_meta.get("content")
+            if meta_content and isinstance(meta_content, str):
+                if "、" in meta_content:
+                    tags = [
+                        tag.strip() for tag in meta_content.split("、") if tag.strip()
+                    ]
+                else:
+                    tags = [
+                        tag.strip() for tag in meta_content.split(",") if tag.strip()
+                    ]
+
+        # 如果没有keywords meta标签，尝试从内容中提取关键词
+        if not tags:
+            # 使用jieba提取关键词
+            try:
+                keywords = jieba.analyse.extract_tags(
+                    content, topK=10, withWeight=False
+                )
+                tags = [str(k) for k in keywords[:5]]  # 只取前5个，确保是字符串
+            except Exception as e:
+                logger.debug(f"关键词提取失败: {e}")
+
+        # 提取SDK符号（函数原型、参数表、返回值表）
+        symbols = extract_symbols(main_content, url) if main_content else []
+
+        return {
+            "title": title,
+            "content": content,
+            "headings": headings_text,
+            "code_blocks": code_blocks_text,
+            "tags": ",".join(str(t) for t in tags),  # 确保所有元素都是字符串
+            "url": canonicalize_url(url),
+            "file_path": str(file_path),
+            # 分面：SDK语言和文档栏目取自URL路径
+            "language": sdk_language(url),
+            "section": doc_section(url),
+            "symbols": ",".join(dict.fromkeys(symbol_key(symbol["name"]) for symbol in symbols)),
+            "symbol_table": dump_symbols(symbols),
+        }
+
+    def add_document(self, file_path: Path, url: str) -> bool:
+        """添加单个文档到索引，已存在时替换"""
+        result = self.write_batch([("update", [{"file_path": str(file_path), "url": url}])])[0]
+        return result["success_count"] == 1
+
+    def add_documents(self, file_url_pairs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """批量添加文档到索引（智能跳过已存在的文档）"""
+        return self.write_batch([("add", file_url_pairs)])[0]
+
+    @staticmethod
+    def _skipped_result(items: List[Any]) -> Dict[str, Any]:
+        """所有文档均已存在时的写操作结果"""
+        return {
+            "total_count": len(items),
+            "success_count": 0,
+            "failure_count": 0,
+            "skipped_count": len(items),
+            "failed_urls": [],
+        }
+
+    def update_index(self, file_url_pairs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """更新索引"""
+        return self.add_documents(file_url_pairs)
+
+    def search_hybrid(self, keyword: str, max_results: int = 10, candidates: int = HYBRID_CANDIDATES,
+                      filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """混合检索，没有向量索引的后端只返回BM25关键词结果"""
+        search_result = self.search(keyword, max_results, filters)
+        search_result["results"] = search_result["results"][:max_results]
+        search_result["mode"] = "bm25"
+        return search_result
+
+    @contextmanager
+    def snapshot(self) -> Iterator[None]:
+        """
+        在同一个索引快照上执行当前线程的多个查询
+
+        快照期间其他线程和进程的提交不可见，各查询的结果互相一致；不支持快照的后端每个查询读取最新的索引。
+        """
+        yield
+
+    def search_batch(self, queries: List[Dict[str, Any]], dedupe: bool = False) -> Dict[str, Any]:
+        """
+        在同一个索引快照上依次执行多个查询
+
+        Args:
+            queries: 查询列表，每项为 {"mode", "query", "max_results", "tag", "max_distance", "language", "section"}，
+                     mode为keyword（默认）、boolean、phrase、fuzzy、tag或hybrid，language和section为分面过滤条件
+            dedupe: 为True时，前面的查询已返回过的文档不再重复返回，只在该查询的duplicate_urls中列出
+
+        Returns:
+            {"total_queries", "unique_urls", "results": [与queries一一对应的查询结果]}
+        """
+        seen_urls: Set[str] = set()
+        results = []
+        with self.snapshot():
+            for query in queries:
+                result = self._batch_query(query)
+                if dedupe:
+                    duplicate_urls = [item["url"] for item in result["results"] if item["url"] in seen_urls]
+                    if duplicate_urls:
+                        result["results"] = [item for item in result["results"] if item["url"] not in seen_urls]
+                        result["duplicate_urls"] = duplicate_urls
+                seen_urls.update(item["url"] for item in result["results"])
+                results.append(result)
+        return {"total_queries": len(queries), "unique_urls": len(seen_urls), "results": results}
+
+    def _batch_query(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """执行批量查询中的一个查询，失败时返回带error的空结果"""
+        mode = query.get("mode", "keyword")
+        text = query.get("query", "")
+        max_results = query.get("max_results", 10)
+        filters = {field: query[field] for field in ("language", "section") if query.get(field)}
+        try:
+            if mode == "keyword":
+                result = self.search(text, max_results, filters)
+                # 与单个本地搜索一样，没有结果时给出拼写纠错建议
+                if not result["total_hits"]:
+                    suggestions = self.suggest_queries(text)
+                    if suggestions:
+                        result["did_you_mean"] = suggestions
+            elif mode == "boolean":
+                result = self.boolean_search(text, max_results, filters)
+            elif mode == "phrase":
+                result = self.phrase_search(text, max_results, filters)
+            elif mode == "fuzzy":
+                result = self.fuzzy_search(text, query.get("max_distance", 2), max_results, filters)
+            elif mode == "tag":
+                result = self.tag_search(query.get("tag", ""), text, max_results, filters)
+            elif mode == "hybrid":
+                result = self.search_hybrid(text, max_results, filters=filters)
+            else:
+                raise ValueError(f"未知的查询模式: {mode}")
+        except Exception as e:
+            logger.error(f"批量搜索中的查询失败: {mode} {text}, 错误: {e}")
+            result = {"query": text, "total_hits": 0, "results": [], "error": str(e)}
+        result["mode"] = mode
+        return result
+
+    def segment_stats(self) -> Dict[str, Any]:
+        """获取索引的段信息，不分段存储的后端没有段"""
+        return {"segment_count": 0, "doc_count_all": 0, "deleted_count": 0, "segments": []}
+
+    def merge_segments(self, factor: int = INDEX_MERGE_FACTOR,
+                       deleted_ratio: float = INDEX_MERGE_DELETED_RATIO,
+                       optimize: bool = False) -> Dict[str, Any]:
+        """
+        合并索引段，不分段存储的后端无需合并
+
+        Returns:
+            {"segments_before", "segments_after", "merged_segments", "merged_docs"}
+        """
+        return {"segments_before": 0, "segments_after": 0, "merged_segments": 0, "merged_docs": 0}
+
+    def _refresh_in_background(self, name: str, refresh: Callable[[], None]) -> None:
+        """在后台线程中执行重建，同名的重建正在进行时不重复启动"""
+        with self._background_lock:
+            thread = self._background_refreshes.get(name)
+            if thread is not None and thread.is_alive():
+                return
+
+            def run() -> None:
+                try:
+                    refresh()
+                except Exception as e:
+                    logger.error(f"后台重建失败: {name}, 错误: {e}")
+
+            thread = threading.Thread(target=run, name=f"{name}-refresh", daemon=True)
+            self._background_refreshes[name] = thread
+            thread.start()
+
+    def _build_vocabulary(self) -> None:
+        """从索引词表构建拼写纠错词典和拼音索引，构建完成后替换正在使用的版本"""
+        version = self._index_version()
+        spelling = SymSpellIndex(SPELLING_MAX_DISTANCE, SPELLING_PREFIX_LENGTH)
+        pinyin = PinyinIndex()
+        for term in custom_terms:
+            pinyin.add(term)
+        for text, frequency in self._term_frequencies().items():
+            spelling.add(text, frequency)
+            pinyin.add(text, frequency)
+
+        with self._vocabulary_lock:
+            self._spelling = spelling
+            self._pinyin = pinyin
+            self._vocabulary_version = version
+        logger.info(f"拼写纠错词典构建完成: {len(spelling)}个词, 拼音索引{len(pinyin)}个词")
+
+    def _refresh_vocabulary(self) -> None:
+        """
+        查询前检查拼写纠错词典和拼音索引
+
+        首次使用时同步构建；索引有本进程之外的新版本时在后台重建，本次查询使用已有的版本。
+        """
+        if self._spelling is None:
+            self._build_vocabulary()
+            return
+
+        if self._index_version() != self._vocabulary_version:
+            self._refresh_in_background("vocabulary", self._build_vocabulary)
+
+    def _update_vocabulary(self, version_before: Tuple[Optional[str], int],
+                           documents: List[Dict[str, Any]], rewritten: bool) -> None:
+        """
+        提交后把新文档的词加入拼写纠错词典和拼音索引，文档频率在原有基础上累加
+
+        有更新、删除或其他进程的提交时已有词的文档频率无法增量得到，补充新词后在后台重建。
+        """
+        with self._vocabulary_lock:
+            if self._spelling is None:
+                return
+
+            added_count = 0
+            frequencies = sum((self._document_terms(document) for document in documents), Counter())
+            for term, count in frequencies.items():
+                frequency = self._spelling.frequency(term) + count
+                added_count += self._spelling.add(term, frequency)
+                self._pinyin.add(term, frequency)
+
+            up_to_date = not rewritten and self._vocabulary_version == version_before
+            if up_to_date:
+                self._vocabulary_version = self._index_version()
+            if added_count:
+                logger.info(f"拼写纠错词典更新: 新增{added_count}个词, 共{len(self._spelling)}个词, "
+                            f"拼音索引{len(self._pinyin)}个词")
+
+        if not up_to_date:
+            self._refresh_in_background("vocabulary", self._build_vocabulary)
+
+    def _rebuild_derived_indexes(self) -> None:
+        """重建索引后重建正在使用的拼写纠错词典、拼音索引和前缀补全"""
+        if self._spelling is not None:
+            self._build_vocabulary()
+        if self._completions is not None:
+            self._build_completions()
+
+    def spelling_index(self) -> SymSpellIndex:
+        """获取与当前索引版本一致的拼写纠错词典"""
+        self._refresh_vocabulary()
+        return self._spelling
+
+    def pinyin_index(self) -> PinyinIndex:
+        """获取与当前索引版本一致的拼音索引"""
+        self._refresh_vocabulary()
+        return self._pinyin
+
+    def expand_pinyin(self, keyword: str) -> Dict[str, List[str]]:
+        """
+        把拼音或首字母查询（如 "huice"、"hc"、"kxian"）展开为索引中的中文词
+
+        只处理纯拉丁字母的查询，本身就是索引词的部分不展开；多个词时同时尝试整体连写。
+
+        Returns:
+            {拼音: [中文词]}，无法展开时为空
+        """
+        if not is_latin_query(keyword):
+            return {}
+
+        self._refresh_vocabulary()
+        # 后台重建会整体替换两个词典，取同一版本的一对
+        with self._vocabulary_lock:
+            spelling, pinyin = self._spelling, self._pinyin
+        words = keyword.split()
+        if len(words) > 1:
+            words.append("".join(words))
+
+        expansions = {}
+        for word in words:
+            if word in spelling:
+                continue
+            terms = pinyin.lookup(word, PINYIN_MAX_EXPANSIONS)
+            if terms:
+                expansions[word] = terms
+        return expansions
+
+    def correct_terms(self, text: str, max_distance: int = SPELLING_MAX_DISTANCE) -> Dict[str, List[str]]:
+        """
+        为查询文本中的每个词查找索引中的候选词
+
+        Returns:
+            {查询词: [候选词]}，候选词按编辑距离和文档频率排序，查询词本身存在于索引中时排在首位
+        """
+        spelling = self.spelling_index()
+        corrections: Dict[str, List[str]] = {}
+        for word in search_terms(text):
+            if word in corrections:
+                continue
+            matches = spelling.lookup(word, max_distance_for(word, max_distance), SPELLING_MAX_CANDIDATES)
+            corrections[word] = [candidate for candidate, _, _ in matches]
+        return corrections
+
+    def _fuzzy_candidates(self, term: str, max_distance: int) -> Dict[str, List[str]]:
+        """
+        模糊搜索的候选词：与各查询词编辑距离不超过max_distance的索引词，
+        拼音或首字母查询同时展开为对应的中文词
+        """
+        corrections = self.correct_terms(term, max_distance)
+        # 拼写纠错只能在同一种文字内匹配，拼音查询另外展开为中文词
+        for word, terms in self.expand_pinyin(term).items():
+            corrections[word] = corrections.get(word, []) + terms
+        return corrections
+
+    def suggest_queries(self, keyword: str, limit: int = SPELLING_MAX_SUGGESTIONS) -> List[str]:
+        """
+        生成"您是不是要找"的纠错查询
+
+        把查询中不在索引里的词替换为候选词，第i个建议使用各词的第i个候选。
+
+        Returns:
+            纠错后的查询列表，所有词都在索引中或都没有候选时为空
+        """
+        corrections = {
+            word: candidates for word, candidates in self.correct_terms(keyword).items()
+            if candidates and candidates[0] != word
+        }
+        if not corrections:
+            return []
+
+        suggestions = []
+        for i in range(limit):
+            suggestion = keyword
+            for word, candidates in corrections.items():
+                suggestion = suggestion.replace(word, candidates[min(i, len(candidates) - 1)], 1)
+            if suggestion not in suggestions:
+                suggestions.append(suggestion)
+        return suggestions
+
+    @staticmethod
+    def _document_completions(fields: Dict[str, Any]) -> Dict[str, Tuple[str, Set[str]]]:
+        """文档的补全项：标题、小节标题、标签、SDK符号和代码中的函数调用名，按小写去重"""
+        candidates = [(fields.get("title") or "", "title")]
+        candidates += [(heading.lstrip("#").strip(), "heading")
+                       for heading in (fields.get("headings") or "").split("\n")]
+        candidates += [(tag, "tag") for tag in (fields.get("tags") or "").split(",")]
+        candidates += [(symbol["name"], "symbol") for symbol in load_symbols(fields.get("symbol_table"))]
+        candidates += [(name, "code") for name in CODE_IDENTIFIER_PATTERN.findall(fields.get("code_blocks") or "")]
+
+        completions: Dict[str, Tuple[str, Set[str]]] = {}
+        for text, kind in candidates:
+            text = text.strip()
+            if text:
+                completions.setdefault(text.lower(), (text, set()))[1].add(kind)
+        return completions
+
+    def _build_completions(self) -> None:
+        """从存储字段构建前缀补全索引，构建完成后替换正在使用的版本"""
+        version = self._index_version()
+        completions = PrefixIndex()
+        for fields in self._stored_documents():
+            for text, kinds in self._document_completions(fields).values():
+                completions.add(text, kinds)
+        completions.publish()
+
+        with self._completions_lock:
+            self._completions = completions
+            self._completions_version = version
+            self._completions_checked_at = time.monotonic()
+        logger.info(f"前缀补全索引构建完成: {len(completions)}个补全项")
+
+    def completion_index(self) -> PrefixIndex:
+        """
+        获取前缀补全索引
+
+        首次使用时同步构建。其他进程的提交最多每SUGGEST_REFRESH_INTERVAL秒检查一次，
+        发现索引变化时在后台重建，本次查询使用已有的版本；两次检查之间不访问索引存储。
+        """
+        if self._completions is None:
+            self._build_completions()
+            return self._completions
+
+        with self._completions_lock:
+            now = time.monotonic()
+            if now - self._completions_checked_at < SUGGEST_REFRESH_INTERVAL:
+                return self._completions
+            self._completions_checked_at = now
+            stale = self._index_version() != self._completions_version
+            completions = self._completions
+
+        if stale:
+            self._refresh_in_background("completions", self._build_completions)
+        return completions
+
+    def _update_completions(self, version_before: Tuple[Optional[str], int],
+                            documents: List[Dict[str, Any]], rewritten: bool) -> None:
+        """提交后把新文档的补全项合并进索引并发布；有更新、删除或其他进程的提交时在后台重建"""
+        with self._completions_lock:
+            up_to_date = not rewritten and self._completions_version == version_before
+            if up_to_date:
+                for document in documents:
+                    for text, kinds in self._document_completions(document).values():
+                        self._completions.add(text, kinds)
+                self._completions.publish()
+                self._completions_version = self._index_version()
+
+        if not up_to_date:
+            self._refresh_in_background("completions", self._build_completions)
+
+    def suggest(self, prefix: str, limit: int = SUGGEST_MAX_RESULTS) -> Dict[str, Any]:
+        """
+        前缀补全
+
+        Returns:
+            {"prefix", "suggestions": [{"text", "types", "doc_count"}]}
+        """
+        return {"prefix": prefix, "suggestions": self.completion_index().complete(prefix, limit)}
+
+    def lookup_symbol(self, name: str, language: Optional[str] = None, max_results: int = 10) -> Dict[str, Any]:
+        """
+        按名称精确查找SDK符号
+
+        通过symbols字段直接定位文档并读取存储的符号表，不经过全文检索评分。
+
+        Args:
+            name: 函数或对象名，不区分大小写，可带模块前缀（gm.api.history）
+            language: SDK语言过滤（python, cpp, csharp, matlab）
+
+        Returns:
+            {"query", "language", "total_hits", "symbols": [{name, language, signature,
+            description, parameters, returns, url, title}]}
+        """
+        key = symbol_key(name)
+        matches = []
+        for fields in self._symbol_documents(key):
+            for symbol in load_symbols(fields.get("symbol_table")):
+                if symbol_key(symbol["name"]) != key:
+                    continue
+                if language and symbol["language"] != language:
+                    continue
+                anchor = symbol.pop("anchor", "")
+                symbol["url"] = f"{fields['url']}#{quote(anchor)}" if anchor else fields["url"]
+                symbol["title"] = fields.get("title", "")
+                matches.append(symbol)
+
+        # 名称完全一致的排在前面
+        matches.sort(key=lambda symbol: symbol["name"] != name)
+        return {
+            "query": name,
+            "language": language,
+            "total_hits": len(matches),
+            "symbols": matches[:max_results],
+        }
+
+    def migrate_canonical_urls(self, file_path_for: Optional[Callable[[str], Any]] = None) -> Dict[str, int]:
+        """将索引中的url迁移为规范化URL；写入时已规范化URL的后端无需迁移"""
+        return {"updated": 0, "merged": 0}
+
+    @staticmethod
+    def _format_document(fields: Any, score: float = 0.0) -> Dict[str, Any]:
+        """按存储字段格式化结果，内容高亮使用开头的片段"""
+        title = fields.get("title", "") or ""
+        content = fields.get("content", "") or ""
+        return {
+            "title": title,
+            "content": content[:500],  # 返回更多原始内容
+            "url": fields.get("url", ""),
+            "score": score,
+            "highlights": {
+                "title": title,
+                "content": content[:300] + ("..." if len(content) > 300 else ""),
+            },
+        }
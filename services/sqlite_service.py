@@ -0,0 +1,605 @@
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import jieba
+
+from config import FACET_FIELDS, HIGHLIGHT_POST, HIGHLIGHT_PRE, INDEX_DIR, SQLITE_BUSY_TIMEOUT, SQLITE_INDEX_FILE
+from utils import logger, canonicalize_url
+
+from .facets import FacetBitsets, FacetCache, facets_available, normalize_filters
+from .search_engine import FIELD_BOOSTS, SPELLING_FIELDS, SearchEngine, search_terms
+
+# 分词结果用零宽空格连接后写入FTS5：unicode61分词器把它当作分隔符，
+# 去掉零宽空格即可还原原文，snippet()返回的片段也可以直接显示
+TOKEN_SEPARATOR = "\u200b"
+
+# 搜索模式分词比精确模式多出的子词（如"实时行情"中的"实时"、"行情"）写在对应的子词列中，
+# 召回和评分与Whoosh的搜索模式分词一致，短语匹配和高亮只使用精确模式的列
+SUBWORD_SUFFIX = "_sub"
+FTS_COLUMNS = SPELLING_FIELDS + tuple(field + SUBWORD_SUFFIX for field in SPELLING_FIELDS)
+
+# 字段过滤和短语匹配使用的列
+TEXT_COLUMNS_FILTER = "{" + " ".join(SPELLING_FIELDS) + "}"
+
+SCHEMA_SQL = f"""
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE documents (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    file_path TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    symbols TEXT NOT NULL,
+    symbol_table TEXT NOT NULL,
+    language TEXT NOT NULL DEFAULT '',
+    section TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX documents_language ON documents (language);
+CREATE INDEX documents_section ON documents (section);
+CREATE TABLE document_tags (doc_id INTEGER NOT NULL, tag TEXT NOT NULL, PRIMARY KEY (doc_id, tag)) WITHOUT ROWID;
+CREATE INDEX document_tags_tag ON document_tags (tag);
+CREATE TABLE document_symbols (doc_id INTEGER NOT NULL, symbol TEXT NOT NULL, PRIMARY KEY (doc_id, symbol)) WITHOUT ROWID;
+CREATE INDEX document_symbols_symbol ON document_symbols (symbol);
+CREATE VIRTUAL TABLE documents_fts USING fts5({', '.join(FTS_COLUMNS)}, tokenize = 'unicode61');
+CREATE VIRTUAL TABLE documents_vocab USING fts5vocab(documents_fts, 'row');
+"""
+
+# 命中结果读取的字段，title等文本字段取自FTS表
+RESULT_COLUMNS = ("d.url, d.file_path, d.tags, d.symbols, d.symbol_table, "
+                  "f.title, f.content, f.headings, f.code_blocks")
+
+
+def _quote(text: str) -> str:
+    """FTS5字符串（双引号内的文本按分词器切分，多个词为短语）"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _any_of(terms: List[str]) -> Optional[str]:
+    """词项OR组合的MATCH表达式，没有有效词项时返回None"""
+    terms = [term for term in dict.fromkeys(terms) if re.search(r"\w", term)]
+    return " OR ".join(_quote(term) for term in terms) if terms else None
+
+
+def _phrase(text: str) -> Optional[str]:
+    """精确模式分词后的短语，没有有效词项时返回None"""
+    if not re.search(r"\w", text):
+        return None
+    return _quote(TOKEN_SEPARATOR.join(jieba.cut(text)))
+
+
+class SQLiteSearchEngine(SearchEngine):
+    """
+    基于SQLite FTS5的搜索引擎
+
+    索引是单个数据库文件，使用WAL模式：读取不阻塞写入，多个进程可以同时搜索，
+    写入整批在一个事务中提交；重建在一个事务中清空并重新写入，提交前的搜索仍读取旧数据。
+    文本按jieba分词后写入FTS5，评分使用bm25()，列权重与Whoosh的字段权重一致，
+    高亮使用highlight()/snippet()。
+    """
+
+    def __init__(self, index_dir: Path = INDEX_DIR):
+        super().__init__()
+        self.index_dir = index_dir
+        self.path = index_dir / SQLITE_INDEX_FILE
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        # sqlite3连接不能跨线程使用，每个线程使用自己的连接
+        self._local = threading.local()
+        # 分面位图，按索引版本缓存
+        self._facets = FacetCache()
+        self._create_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # 自动提交模式，写入时显式开启事务
+            connection = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """写事务，开始时即取得写锁，其他进程正在写入时最多等待SQLITE_BUSY_TIMEOUT秒"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    @contextmanager
+    def snapshot(self) -> Iterator[None]:
+        """在同一个读事务中执行当前线程的多个查询（WAL模式下读事务固定在开始时的快照）"""
+        connection = self._connection()
+        if connection.in_transaction:
+            yield
+            return
+        connection.execute("BEGIN")
+        try:
+            # 读事务在第一次读取时才取得快照
+            connection.execute("SELECT 1 FROM meta").fetchone()
+            yield
+        finally:
+            connection.execute("COMMIT")
+
+    def _create_schema(self) -> None:
+        """创建数据库表，已存在时直接使用"""
+        with self._transaction() as connection:
+            if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'documents_fts'").fetchone():
+                logger.info(f"使用现有索引: {self.path}")
+                self._add_facet_columns(connection)
+                return
+
+            for statement in SCHEMA_SQL.strip().split(";\n"):
+                connection.execute(statement)
+            # bm25的列权重：子词列与对应字段相同
+            weights = ", ".join(str(FIELD_BOOSTS[column.removesuffix(SUBWORD_SUFFIX)]) for column in FTS_COLUMNS)
+            connection.execute("INSERT INTO documents_fts (documents_fts, rank) VALUES ('rank', ?)",
+                               (f"bm25({weights})",))
+            connection.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [
+                ("generation", self._new_generation()), ("commit", "0"), ("last_modified", str(time.time())),
+            ])
+            logger.info(f"创建新索引: {self.path}")
+
+    @staticmethod
+    def _add_facet_columns(connection: sqlite3.Connection) -> None:
+        """为旧版本建立的索引补充分面列，已有文档在重建索引或重新写入后才有取值"""
+        columns = {row["name"] for row in connection.execute("PRAGMA table_info(documents)")}
+        for column in ("language", "section"):
+            if column not in columns:
+                logger.info(f"为索引补充新字段: {column}")
+                connection.execute(f"ALTER TABLE documents ADD COLUMN {column} TEXT NOT NULL DEFAULT ''")
+                connection.execute(f"CREATE INDEX documents_{column} ON documents ({column})")
+
+    @staticmethod
+    def _new_generation() -> str:
+        return f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+
+    def _meta(self) -> Dict[str, str]:
+        return {row["key"]: row["value"] for row in self._connection().execute("SELECT key, value FROM meta")}
+
+    @staticmethod
+    def _touch(connection: sqlite3.Connection, generation: Optional[str] = None) -> None:
+        """记录一次提交，重建时同时更换索引代"""
+        connection.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'commit'")
+        connection.execute("UPDATE meta SET value = ? WHERE key = 'last_modified'", (str(time.time()),))
+        if generation is not None:
+            connection.execute("UPDATE meta SET value = ? WHERE key = 'generation'", (generation,))
+
+    @staticmethod
+    def _fts_values(document: Dict[str, Any]) -> List[str]:
+        """文本字段的FTS列值：精确模式分词结果，以及搜索模式多出的子词"""
+        words_by_field = {field: list(jieba.cut(document.get(field) or "")) for field in SPELLING_FIELDS}
+        values = [TOKEN_SEPARATOR.join(words_by_field[field]) for field in SPELLING_FIELDS]
+        for field in SPELLING_FIELDS:
+            # 两个字以内的词没有子词
+            subwords = [subword for word in words_by_field[field] if len(word) > 2
+                        for subword in jieba.cut_for_search(word) if subword != word]
+            values.append(TOKEN_SEPARATOR.join(subwords))
+        return values
+
+    @staticmethod
+    def _delete(connection: sqlite3.Connection, url: str) -> int:
+        """删除URL对应的文档，返回删除的文档数"""
+        row = connection.execute("SELECT id FROM documents WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return 0
+        for statement in ("DELETE FROM documents_fts WHERE rowid = ?", "DELETE FROM documents WHERE id = ?",
+                          "DELETE FROM document_tags WHERE doc_id = ?",
+                          "DELETE FROM document_symbols WHERE doc_id = ?"):
+            connection.execute(statement, (row["id"],))
+        return 1
+
+    def _insert(self, connection: sqlite3.Connection, document: Dict[str, Any]) -> None:
+        doc_id = connection.execute(
+            "INSERT INTO documents (url, file_path, tags, symbols, symbol_table, language, section) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (document["url"], document["file_path"], document["tags"], document["symbols"],
+             document["symbol_table"], document["language"], document["section"]),
+        ).lastrowid
+        connection.execute(
+            f"INSERT INTO documents_fts (rowid, {', '.join(FTS_COLUMNS)}) "
+            f"VALUES (?{', ?' * len(FTS_COLUMNS)})",
+            (doc_id, *self._fts_values(document)),
+        )
+        tags = {tag.strip() for tag in document["tags"].split(",") if tag.strip()}
+        connection.executemany("INSERT INTO document_tags (doc_id, tag) VALUES (?, ?)",
+                               [(doc_id, tag) for tag in tags])
+        symbols = {symbol for symbol in document["symbols"].split(",") if symbol}
+        connection.executemany("INSERT INTO document_symbols (doc_id, symbol) VALUES (?, ?)",
+                               [(doc_id, symbol) for symbol in symbols])
+
+    def _apply(self, connection: sqlite3.Connection,
+               operations: List[Tuple[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], bool]:
+        """
+        在事务中执行写操作
+
+        Returns:
+            (与operations一一对应的结果列表, 新增的文档, 是否有写入或删除)
+        """
+        results = []
+        written_documents = []
+        changed = False
+        for operation, items in operations:
+            if operation == "delete":
+                deleted_count = sum(self._delete(connection, canonicalize_url(url)) for url in items)
+                changed = changed or deleted_count > 0
+                results.append({"deleted_count": deleted_count})
+                continue
+
+            success_count = 0
+            skipped_count = 0
+            failed_urls = []
+            for item in items:
+                url = item["url"]
+                if operation == "add" and connection.execute(
+                        "SELECT 1 FROM documents WHERE url = ?", (canonicalize_url(url),)).fetchone():
+                    skipped_count += 1
+                    continue
+
+                try:
+                    document = self._parse_html(Path(item["file_path"]), url)
+                    replaced = self._delete(connection, document["url"])
+                    self._insert(connection, document)
+                    if not replaced:
+                        written_documents.append(document)
+                    changed = True
+                    success_count += 1
+                except Exception as e:
+                    failed_urls.append(url)
+                    logger.error(f"添加新文档失败: {url}, 错误: {e}")
+
+            results.append({
+                "total_count": len(items),
+                "success_count": success_count,
+                "failure_count": len(failed_urls),
+                "skipped_count": skipped_count,
+                "failed_urls": failed_urls,
+            })
+
+        if changed:
+            self._touch(connection)
+        return results, written_documents, changed
+
+    def write_batch(self, operations: List[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        在一个事务中执行一批写操作，整批只提交一次
+
+        Args:
+            operations: 写操作列表，每项为 ("add", file_url_pairs)、
+                        ("update", file_url_pairs) 或 ("delete", urls)
+
+        Returns:
+            与operations一一对应的结果列表
+        """
+        version_before = self._index_version()
+        with self._transaction() as connection:
+            results, written_documents, changed = self._apply(connection, operations)
+
+        if changed:
+            # 提交后增量更新拼写纠错词典、拼音索引和前缀补全
+            rewritten = any(operation != "add" for operation, _ in operations)
+            self._update_vocabulary(version_before, written_documents, rewritten)
+            if self._completions is not None:
+                self._update_completions(version_before, written_documents, rewritten)
+
+        written_count = sum(result.get("success_count", 0) for result in results)
+        skipped_count = sum(result.get("skipped_count", 0) for result in results)
+        logger.info(f"索引更新完成: {written_count}个文档写入, {skipped_count}个已存在跳过")
+        return results
+
+    def rebuild_index(self, file_url_pairs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        重建索引
+
+        在一个事务中清空并重新写入全部文档，提交前其他连接继续读取旧数据，
+        中途失败时回滚，旧索引保持不变。
+        """
+        generation = self._new_generation()
+        logger.info(f"开始重建索引: {self.path}")
+        with self._transaction() as connection:
+            for table in ("documents_fts", "documents", "document_tags", "document_symbols"):
+                connection.execute(f"DELETE FROM {table}")
+            results, _, _ = self._apply(connection, [("add", file_url_pairs)])
+            # 重建后的索引合并为一个b-tree段
+            connection.execute("INSERT INTO documents_fts (documents_fts) VALUES ('optimize')")
+            self._touch(connection, generation)
+        logger.info(f"索引已切换到新的代: {generation}")
+        self._rebuild_derived_indexes()
+        return results[0]
+
+    @staticmethod
+    def _filter_sql(filters: Optional[Dict[str, List[str]]]) -> Tuple[str, Dict[str, str]]:
+        """分面过滤条件的WHERE子句（以AND开头，没有过滤条件时为空）和命名参数"""
+        clauses = []
+        parameters = {}
+        for field, values in normalize_filters(filters).items():
+            names = []
+            for position, value in enumerate(values):
+                names.append(f":{field}_{position}")
+                parameters[f"{field}_{position}"] = value
+            if field == "tags":
+                clauses.append(f"d.id IN (SELECT doc_id FROM document_tags WHERE tag IN ({', '.join(names)}))")
+            else:
+                clauses.append(f"d.{field} IN ({', '.join(names)})")
+        return "".join(f" AND {clause}" for clause in clauses), parameters
+
+    def _facet_bitsets(self) -> Optional[FacetBitsets]:
+        """当前读取的索引版本的分面位图（文档号为documents的id），未安装numpy时返回None"""
+        if not facets_available():
+            return None
+
+        def build() -> FacetBitsets:
+            connection = self._connection()
+            postings: Dict[str, Dict[str, List[int]]] = {field: {} for field in FACET_FIELDS}
+            doc_count = 0
+            for row in connection.execute("SELECT id, language, section FROM documents"):
+                doc_count = max(doc_count, row["id"] + 1)
+                postings["language"].setdefault(row["language"], []).append(row["id"])
+                postings["section"].setdefault(row["section"], []).append(row["id"])
+            for row in connection.execute("SELECT doc_id, tag FROM document_tags"):
+                postings["tags"].setdefault(row["tag"], []).append(row["doc_id"])
+            return FacetBitsets(doc_count, postings)
+
+        return self._facets.get(self._index_version(), build)
+
+    def _facet_counts(self, matched_sql: str, parameters: Dict[str, Any]) -> Optional[Dict[str, Dict[str, int]]]:
+        """
+        命中文档（经过分面过滤，不受返回数量限制）在各分面取值上的文档数，未安装numpy时返回None
+
+        matched_sql查询命中文档的id，只取文档号不评分；需要在snapshot()中与位图读取同一个版本。
+        """
+        bitsets = self._facet_bitsets()
+        if bitsets is None:
+            return None
+        rows = self._connection().execute(matched_sql, parameters)
+        return bitsets.counts(row[0] for row in rows)
+
+    def _query_results(self, match: Optional[str], limit: int, original_query: str,
+                       filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """按分面过滤执行MATCH查询并格式化结果，附上分面计数"""
+        if match is None:
+            return self._format_results([], original_query)
+        filter_sql, parameters = self._filter_sql(filters)
+        with self.snapshot():
+            search_result = self._format_results(self._hits(match, limit, filters), original_query)
+            facets = self._facet_counts(
+                "SELECT d.id FROM documents_fts f JOIN documents d ON d.id = f.rowid "
+                f"WHERE documents_fts MATCH :match{filter_sql}",
+                {"match": match, **parameters},
+            )
+        if facets is not None:
+            search_result["facets"] = facets
+        return search_result
+
+    def _hits(self, match: Optional[str], limit: int,
+              filters: Optional[Dict[str, List[str]]] = None) -> List[sqlite3.Row]:
+        """执行MATCH查询，返回按bm25得分降序排列的命中结果，分面过滤在排序之前执行"""
+        if match is None:
+            return []
+        filter_sql, parameters = self._filter_sql(filters)
+        sql = (f"SELECT {RESULT_COLUMNS}, -f.rank AS score, "
+               "highlight(documents_fts, 0, :pre, :post) AS title_highlight, "
+               "snippet(documents_fts, 1, :pre, :post, '...', 48) AS content_highlight, "
+               "snippet(documents_fts, 2, :pre, :post, '...', 24) AS headings_highlight "
+               "FROM documents_fts f JOIN documents d ON d.id = f.rowid "
+               f"WHERE documents_fts MATCH :match{filter_sql} ORDER BY f.rank LIMIT :limit")
+        parameters.update({"pre": HIGHLIGHT_PRE, "post": HIGHLIGHT_POST, "match": match, "limit": limit})
+        return self._connection().execute(sql, parameters).fetchall()
+
+    @staticmethod
+    def _fields(row: sqlite3.Row) -> Dict[str, Any]:
+        """查询结果行的存储字段"""
+        fields = {key: row[key] for key in ("url", "file_path", "tags", "symbols", "symbol_table")}
+        for field in SPELLING_FIELDS:
+            fields[field] = row[field].replace(TOKEN_SEPARATOR, "")
+        return fields
+
+    def _format_results(self, rows: List[sqlite3.Row], original_query: str) -> Dict[str, Any]:
+        """格式化搜索结果，高亮取自highlight()/snippet()，字段中没有命中时与Whoosh后端一样使用开头的片段"""
+        formatted_results = []
+        for row in rows:
+            entry = self._format_document(self._fields(row), row["score"])
+            title_highlight = row["title_highlight"].replace(TOKEN_SEPARATOR, "")
+            if HIGHLIGHT_PRE in title_highlight:
+                entry["highlights"]["title"] = title_highlight
+            for column in ("content_highlight", "headings_highlight"):
+                snippet = row[column].replace(TOKEN_SEPARATOR, "")
+                if HIGHLIGHT_PRE in snippet:
+                    entry["highlights"]["content"] = snippet
+                    break
+            formatted_results.append(entry)
+        return {
+            "query": original_query,
+            "total_hits": len(formatted_results),
+            "results": formatted_results,
+        }
+
+    def search(self, keyword: str, max_results: int = 10,
+               filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """关键词搜索 - 查询词在所有文本字段中OR组合"""
+        # 拼音或首字母查询展开为对应的中文词，与原查询OR组合
+        expansions = self.expand_pinyin(keyword)
+        query_text = " ".join([keyword] + [term for terms in expansions.values() for term in terms])
+        search_result = self._query_results(_any_of(search_terms(query_text)), max_results * 2, keyword, filters)
+        if expansions:
+            search_result["pinyin_expansions"] = expansions
+        return search_result
+
+    @staticmethod
+    def _boolean_match(query_string: str) -> str:
+        """
+        把Whoosh风格的布尔查询转换为FTS5表达式
+
+        支持AND/OR/NOT、括号、"短语"和 字段:词；相邻的词之间为AND。
+        """
+        parts = []
+        for token in re.findall(r'"[^"]*"|[()]|[^\s()"]+', query_string):
+            if token in ("AND", "OR", "NOT", "(", ")"):
+                # FTS5的NOT是二元运算符，"a AND NOT b"写作"a NOT b"
+                if token == "NOT" and parts and parts[-1] == "AND":
+                    parts.pop()
+                parts.append(token)
+                continue
+
+            field, _, text = token.partition(":")
+            if not text or field not in SPELLING_FIELDS:
+                field, text = None, token
+            phrase = _phrase(text.strip('"'))
+            if phrase is None:
+                continue
+            if field is not None:
+                phrase = f"{{{field} {field}{SUBWORD_SUFFIX}}} : {phrase}"
+            parts.append(phrase)
+        return " ".join(parts)
+
+    def boolean_search(self, query_string: str, max_results: int = 10,
+                       filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """布尔查询搜索"""
+        try:
+            try:
+                return self._query_results(self._boolean_match(query_string) or None, max_results * 2,
+                                           query_string, filters)
+
+            except sqlite3.OperationalError as e:
+                logger.warning(f"布尔查询解析失败: {query_string}, 错误: {e}")
+
+                # 降级：提取关键词进行OR搜索
+                cleaned_query = re.sub(r"\b(AND|OR|NOT)\b", " ", query_string, flags=re.IGNORECASE)
+                cleaned_query = re.sub(r"[a-zA-Z_]+:", "", cleaned_query)
+                cleaned_query = re.sub(r'["\(\)]', " ", cleaned_query)
+                cleaned_query = " ".join(cleaned_query.split())
+
+                if cleaned_query:
+                    logger.info(f"使用简化查询: '{cleaned_query}' 替代原查询")
+                    return self._query_results(_any_of(search_terms(cleaned_query)), max_results * 2,
+                                               query_string, filters)
+                return {
+                    "query": query_string,
+                    "total_hits": 0,
+                    "results": [],
+                    "note": "查询中没有有效的搜索关键词",
+                }
+
+        except Exception as e:
+            logger.error(f"布尔搜索失败: {query_string}, 错误: {e}")
+            return {
+                "query": query_string,
+                "total_hits": 0,
+                "results": [],
+                "error": str(e),
+            }
+
+    def phrase_search(self, phrase: str, max_results: int = 10,
+                      filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """精确短语搜索 - 在多个字段中搜索（子词列不参与）"""
+        match = _phrase(phrase)
+        return self._query_results(f"{TEXT_COLUMNS_FILTER} : {match}" if match else None, max_results * 2,
+                                   phrase, filters)
+
+    def fuzzy_search(self, term: str, max_distance: int = 2, max_results: int = 10,
+                     filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """
+        模糊搜索 - 在多个字段中搜索
+
+        先通过拼写纠错词典（FTS5词表）找出与各查询词编辑距离不超过max_distance的索引词，
+        再用这些词做OR查询；拼音或首字母查询同时展开为对应的中文词。
+        """
+        corrections = self._fuzzy_candidates(term, max_distance)
+        candidates = [candidate for candidates in corrections.values() for candidate in candidates]
+        search_result = self._query_results(_any_of(candidates), max_results * 2, term, filters)
+        search_result["corrections"] = corrections
+        return search_result
+
+    def tag_search(self, tag: str, keyword: str = "", max_results: int = 10,
+                   filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """标签过滤搜索：有关键词时标签作为分面过滤条件"""
+        tag = tag.strip()
+        if keyword:
+            # 标签 + 关键词组合搜索
+            return self._query_results(_any_of(search_terms(keyword)), max_results * 2, f"tag:{tag} {keyword}",
+                                       {**(filters or {}), "tags": [tag]})
+
+        # 仅标签搜索：没有可评分的查询词，得分均为1，标签较少的文档排在前面
+        filter_sql, parameters = self._filter_sql(filters)
+        parameters.update({"tag": tag, "limit": max_results * 2})
+        with self.snapshot():
+            rows = self._connection().execute(
+                f"SELECT {RESULT_COLUMNS}, 1.0 AS score FROM document_tags t "
+                "JOIN documents d ON d.id = t.doc_id JOIN documents_fts f ON f.rowid = d.id "
+                f"WHERE t.tag = :tag{filter_sql} ORDER BY length(d.tags), d.id LIMIT :limit",
+                parameters,
+            ).fetchall()
+            facets = self._facet_counts(
+                f"SELECT d.id FROM document_tags t JOIN documents d ON d.id = t.doc_id WHERE t.tag = :tag{filter_sql}",
+                parameters,
+            )
+        search_result = {
+            "query": f"tag:{tag} {keyword}",
+            "total_hits": len(rows),
+            "results": [self._format_document(self._fields(row), row["score"]) for row in rows],
+        }
+        if facets is not None:
+            search_result["facets"] = facets
+        return search_result
+
+    def _index_version(self) -> Tuple[Optional[str], int]:
+        meta = self._meta()
+        return meta["generation"], int(meta["commit"])
+
+    def _term_frequencies(self) -> Dict[str, int]:
+        # fts5vocab的row表：每个词出现在多少个文档中（所有列合计）
+        return {row["term"]: row["doc"] for row in self._connection().execute("SELECT term, doc FROM documents_vocab")}
+
+    def _document_terms(self, document: Dict[str, Any]) -> Counter:
+        # unicode61分词器把分词结果转为小写，并在标点（包括下划线）处继续切分；fts5vocab按文档计数
+        return Counter({part for term in super()._document_terms(document)
+                        for part in re.findall(r"[^\W_]+", term.lower())})
+
+    def _stored_documents(self) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            f"SELECT {RESULT_COLUMNS} FROM documents d JOIN documents_fts f ON f.rowid = d.id"
+        ).fetchall()
+        return [self._fields(row) for row in rows]
+
+    def _symbol_documents(self, key: str) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            f"SELECT {RESULT_COLUMNS} FROM document_symbols s "
+            "JOIN documents d ON d.id = s.doc_id JOIN documents_fts f ON f.rowid = d.id WHERE s.symbol = ?",
+            (key,),
+        ).fetchall()
+        return [self._fields(row) for row in rows]
+
+    def get_index_stats(self) -> Dict[str, Any]:
+        """获取索引统计信息"""
+        connection = self._connection()
+        meta = self._meta()
+        return {
+            "total_docs": connection.execute("SELECT count(*) FROM documents").fetchone()[0],
+            "index_dir": str(self.index_dir),
+            "index_path": str(self.path),
+            "generation": meta["generation"],
+            "commit": int(meta["commit"]),
+            "journal_mode": connection.execute("PRAGMA journal_mode").fetchone()[0],
+            "file_size": self.path.stat().st_size,
+            "fts_columns": list(FTS_COLUMNS),
+            "scorer": "bm25",
+        }
+
+    def last_modified(self) -> float:
+        """获取索引最后一次提交的时间戳"""
+        return float(self._meta()["last_modified"])
+
+    def indexed_urls(self) -> Set[str]:
+        """索引中已有的文档URL集合"""
+        return {row["url"] for row in self._connection().execute("SELECT url FROM documents")}
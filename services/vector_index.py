@@ -0,0 +1,263 @@
+import json
+import os
+import re
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import jieba
+
+from config import HYBRID_RRF_K, VECTOR_DIM, VECTOR_FIELD_WEIGHTS
+from utils import logger, FileLock
+
+try:
+    import numpy as np
+except ImportError:  # 未安装numpy时不提供向量检索
+    np = None
+
+# 连续的中文字符片段，额外生成字符二元组，弥补分词不一致
+_CJK_SPAN_PATTERN = re.compile(r"[一-鿿]{2,}")
+
+VECTORS_FILE = "vectors.f32"
+META_FILE = "vectors.json"
+DF_FILE = "df.npy"
+
+
+def vectors_available() -> bool:
+    """是否安装了numpy"""
+    return np is not None
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = HYBRID_RRF_K) -> List[Tuple[Hashable, float]]:
+    """
+    倒数排名融合（RRF）：每个结果的得分为其在各路排名中 1/(k + 名次) 之和
+
+    Returns:
+        [(结果, 融合得分)]，按得分降序排列
+    """
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class HashedVectorizer:
+    """
+    哈希特征向量化
+
+    特征为jieba搜索模式分词结果和中文字符二元组，用crc32哈希到固定维数，
+    不需要预先建立词表，新文档可以直接增量加入。
+    """
+
+    def __init__(self, dim: int = VECTOR_DIM, field_weights: Optional[Dict[str, float]] = None):
+        self.dim = dim
+        self.field_weights = field_weights or VECTOR_FIELD_WEIGHTS
+
+    def _features(self, text: str) -> Iterable[str]:
+        for word in jieba.cut_for_search(text):
+            word = word.strip().lower()
+            if word:
+                yield word
+        for span in _CJK_SPAN_PATTERN.findall(text):
+            for i in range(len(span) - 1):
+                yield span[i:i + 2]
+
+    def term_frequencies(self, fields: Dict[str, Any]) -> "np.ndarray":
+        """按字段权重累加的特征词频向量"""
+        counts = np.zeros(self.dim, dtype=np.float32)
+        for field, weight in self.field_weights.items():
+            text = fields.get(field) or ""
+            if not text:
+                continue
+            buckets = [zlib.crc32(feature.encode("utf-8")) % self.dim for feature in self._features(text)]
+            if buckets:
+                counts += weight * np.bincount(buckets, minlength=self.dim).astype(np.float32)
+        return counts
+
+
+class VectorIndex:
+    """
+    基于内存映射矩阵的文档向量索引
+
+    每个文档一行（log词频 × idf，L2归一化），行追加写入vectors.f32并以numpy.memmap读取，
+    查询时整体做一次矩阵向量乘法（暴力检索）。删除和更新只把旧行标记为删除，重建索引时清除。
+    元数据（每行对应的URL，已删除的行为null）和特征文档频率在每次写入后原子替换，
+    其他进程发现元数据文件变化时重新加载。
+    """
+
+    def __init__(self, directory: Path, vectorizer: Optional[HashedVectorizer] = None):
+        self.directory = directory
+        self.vectorizer = vectorizer or HashedVectorizer()
+        self.dim = self.vectorizer.dim
+        self.write_lock = FileLock(directory / "vectors.lock")
+        self._lock = threading.Lock()
+
+        self._urls: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._df = None
+        self._matrix = None
+        self._meta_version: Optional[Tuple[int, int]] = None
+
+    def __len__(self) -> int:
+        self._reload_if_changed()
+        return len(self._rows)
+
+    def _meta_stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = (self.directory / META_FILE).stat()
+            return stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+
+    def _reload_if_changed(self) -> None:
+        """元数据文件变化时（本进程或其他进程写入后）重新加载"""
+        meta_version = self._meta_stat()
+        if meta_version is not None and meta_version == self._meta_version:
+            return
+
+        with self._lock:
+            self._urls, self._df, self._matrix = [], np.zeros(self.dim, dtype=np.float64), None
+            if meta_version is not None:
+                meta = json.loads((self.directory / META_FILE).read_text(encoding="utf-8"))
+                if meta.get("dim") != self.dim:
+                    logger.warning(f"向量维数与配置不一致，需要重建向量索引: {meta.get('dim')} != {self.dim}")
+                else:
+                    self._urls = meta["urls"]
+                    self._df = np.load(self.directory / DF_FILE)
+                    if self._urls:
+                        self._matrix = np.memmap(self.directory / VECTORS_FILE, dtype=np.float32, mode="r",
+                                                 shape=(len(self._urls), self.dim))
+            self._rows = {url: row for row, url in enumerate(self._urls) if url is not None}
+            self._meta_version = meta_version
+
+    @staticmethod
+    def _idf(df: "np.ndarray", doc_count: int) -> "np.ndarray":
+        return (np.log((1 + doc_count) / (1 + df)) + 1.0).astype(np.float32)
+
+    @staticmethod
+    def _weight(frequencies: "np.ndarray", idf: "np.ndarray") -> "np.ndarray":
+        vector = np.log1p(frequencies) * idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def write(self, documents: List[Dict[str, Any]], deleted_urls: Iterable[str] = (), reset: bool = False) -> int:
+        """
+        写入文档向量
+
+        文档向量按写入时的文档频率计算idf，之后不再随语料变化更新，重建索引时统一重新计算。
+
+        Args:
+            documents: 解析后的文档字段（含url），已存在的URL会替换
+            deleted_urls: 要删除的URL
+            reset: 清空后重新写入（重建）
+
+        Returns:
+            写入的文档数
+        """
+        with self.write_lock:
+            return self._write_locked(documents, deleted_urls, reset)
+
+    def build_if_empty(self, load_documents: Callable[[], List[Dict[str, Any]]]) -> int:
+        """
+        向量索引为空时（如升级前建立的索引）从已有文档补建
+
+        Args:
+            load_documents: 返回全部文档字段的函数，只在需要补建时调用
+
+        Returns:
+            写入的文档数
+        """
+        if len(self):
+            return 0
+        with self.write_lock:
+            self._reload_if_changed()
+            if self._rows:
+                return 0
+            documents = load_documents()
+            if documents:
+                logger.info(f"建立向量索引: {len(documents)}个文档")
+            return self._write_locked(documents, (), reset=True)
+
+    def _write_locked(self, documents: List[Dict[str, Any]], deleted_urls: Iterable[str], reset: bool) -> int:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if reset:
+            for name in (VECTORS_FILE, META_FILE, DF_FILE):
+                (self.directory / name).unlink(missing_ok=True)
+        self._reload_if_changed()
+
+        urls = list(self._urls)
+        df = self._df.copy()
+        removed_urls = set(deleted_urls) | {document["url"] for document in documents}
+        for url in removed_urls:
+            row = self._rows.get(url)
+            if row is not None:
+                df -= self._matrix[row] != 0
+                urls[row] = None
+
+        frequencies = [self.vectorizer.term_frequencies(document) for document in documents]
+        for counts in frequencies:
+            df += counts != 0
+
+        if documents:
+            doc_count = len(self._rows) - len(removed_urls & self._rows.keys()) + len(documents)
+            idf = self._idf(df, doc_count)
+            matrix = np.stack([self._weight(counts, idf) for counts in frequencies]).astype(np.float32)
+            with open(self.directory / VECTORS_FILE, "r+b" if urls else "wb") as f:
+                # 截掉上次写入中断时遗留的不完整数据
+                f.truncate(len(urls) * self.dim * 4)
+                f.seek(0, os.SEEK_END)
+                f.write(matrix.tobytes())
+            urls.extend(document["url"] for document in documents)
+
+        self._save_meta(urls, df)
+        # 下次读取时重新映射追加后的矩阵
+        self._meta_version = None
+        return len(documents)
+
+    def _save_meta(self, urls: List[Optional[str]], df: "np.ndarray") -> None:
+        """原子替换特征文档频率和元数据文件（元数据最后写入，作为提交点）"""
+        tmp_df = self.directory / f"{DF_FILE}.tmp"
+        with open(tmp_df, "wb") as f:
+            np.save(f, df)
+        os.replace(tmp_df, self.directory / DF_FILE)
+
+        tmp_meta = self.directory / f"{META_FILE}.tmp"
+        tmp_meta.write_text(json.dumps({"dim": self.dim, "urls": urls}, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_meta, self.directory / META_FILE)
+
+    def search(self, text: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        余弦相似度最高的文档
+
+        Returns:
+            [(url, 相似度)]，按相似度降序排列
+        """
+        self._reload_if_changed()
+        with self._lock:
+            if self._matrix is None or not self._rows:
+                return []
+
+            idf = self._idf(self._df, len(self._rows))
+            query = self._weight(self.vectorizer.term_frequencies({"content": text}), idf)
+            if not query.any():
+                return []
+
+            scores = np.asarray(self._matrix @ query)
+            live_rows = np.fromiter(self._rows.values(), dtype=np.int64)
+            live_scores = scores[live_rows]
+            limit = min(limit, len(live_rows))
+            top = np.argpartition(-live_scores, limit - 1)[:limit]
+            top = top[np.argsort(-live_scores[top])]
+            return [(self._urls[live_rows[i]], float(live_scores[i])) for i in top if live_scores[i] > 0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取向量索引统计信息"""
+        self._reload_if_changed()
+        return {
+            "documents": len(self._rows),
+            "rows": len(self._urls),
+            "dim": self.dim,
+            "size_bytes": len(self._urls) * self.dim * 4,
+        }
@@ -1,92 +1,34 @@
+import math
+import os
 import re
+import shutil
+import threading
+import time
+import uuid
+from array import array
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import jieba
-import jieba.analyse
-from bs4 import BeautifulSoup
 from whoosh import index
+from whoosh.index import Index
 from whoosh.analysis import Token, Tokenizer
-from whoosh.fields import ID, KEYWORD, TEXT, Schema
+from whoosh.fields import ID, KEYWORD, STORED, TEXT, Schema
+from whoosh.idsets import BitSet
 from whoosh.qparser import MultifieldParser, OrGroup, QueryParser
-from whoosh.query import And, Every, Or
+from whoosh.query import And, Or, Term
 from whoosh.scoring import BM25F
 
-from config import INDEX_DIR
-from utils import logger
-
-# 预初始化jieba，避免首次搜索时的延迟
-logger.info("预初始化jieba分词器...")
-jieba.initialize()  # 预加载词典和模型
-
-# 添加专业术语到jieba词典，提高分词准确性
-custom_terms = [
-    "掘金量化",
-    "策略",
-    "回测",
-    "行情",
-    "交易",
-    "接口",
-    "SDK",
-    "实时行情",
-    "历史数据",
-    "K线",
-    "分笔",
-    "逐笔",
-    "委托",
-    "成交",
-    "持仓",
-    "账户",
-    "资金",
-    "风控",
-    "滑点",
-    "手续费",
-    "保证金",
-    "多因子",
-    "Alpha",
-    "量价",
-    "技术指标",
-    "基本面",
-    "股票",
-    "期货",
-    "期权",
-    "基金",
-    "债券",
-    "外汇",
-    "数字货币",
-    "Python",
-    "C++",
-    "C#",
-    "MATLAB",
-    "API",
-    "数据查询",
-    "下单",
-    "撤单",
-    "查询",
-    "订阅",
-    "推送",
-    "回调",
-    "事件",
-    "MACD",
-    "KDJ",
-    "RSI",
-    "布林带",
-    "均线",
-    "成交量",
-    "换手率",
-    "市盈率",
-    "市净率",
-    "ROE",
-    "毛利率",
-    "净利率",
-]
-
-for term in custom_terms:
-    jieba.add_word(term, freq=10000)  # 高频词，确保不被切分
-
-# 触发一次分词操作，完成完整的初始化
-list(jieba.cut("初始化测试"))
-logger.info("jieba分词器初始化完成，已加载专业术语词典")
+from config import (
+    FACET_FIELDS, HYBRID_CANDIDATES, INDEX_DIR, INDEX_KEEP_GENERATIONS, INDEX_LEASE_TIMEOUT, INDEX_MERGE_DELETED_RATIO, INDEX_MERGE_FACTOR
+)
+from utils import logger, canonicalize_url
+
+# custom_terms、SPELLING_FIELDS仍可从本模块导入
+from .facets import FacetBitsets, FacetCache, facets_available, normalize_filters
+from .search_engine import FIELD_BOOSTS, SPELLING_FIELDS, SearchEngine, custom_terms  # noqa: F401
+from .vector_index import VectorIndex, reciprocal_rank_fusion, vectors_available
 
 
 class ImprovedChineseTokenizer(Tokenizer):
@@ -150,304 +92,462 @@ class ImprovedChineseTokenizer(Tokenizer):
             pos += 1
 
 
+# 记录当前索引代的指针文件名和代目录名前缀
+CURRENT_POINTER = "CURRENT"
+GENERATION_PREFIX = "gen-"
+# 向量索引存放在每个代目录（旧版布局为index_dir）下的子目录中，随代一起切换和清理
+VECTOR_DIR_NAME = "vectors"
+
+
+def plan_tiered_merge(segments: List[Any], factor: int = INDEX_MERGE_FACTOR,
+                      deleted_ratio: float = INDEX_MERGE_DELETED_RATIO) -> List[Any]:
+    """
+    分层合并策略：按文档数的数量级（以factor为底的对数）把段分层，
+    某一层的段数达到factor时合并这一层；已删除文档占比过高的段也会被重写。
+
+    Returns:
+        需要合并的段列表，为空表示无需合并
+    """
+    tiers: Dict[int, List[Any]] = {}
+    selected = []
+    for segment in segments:
+        doc_count = segment.doc_count_all()
+        if doc_count and segment.deleted_count() / doc_count >= deleted_ratio:
+            selected.append(segment)
+        else:
+            tiers.setdefault(int(math.log(max(doc_count, 1), factor)), []).append(segment)
+
+    for tier_segments in tiers.values():
+        if len(tier_segments) >= factor:
+            selected.extend(tier_segments)
+    return selected
+
+
 def improved_chinese_analyzer():
     """创建改进的中文分析器"""
     return ImprovedChineseTokenizer()
 
 
-class WhooshSearchEngine:
+class WhooshSearchEngine(SearchEngine):
     """优化的Whoosh搜索引擎"""
 
     def __init__(self, index_dir: Path = INDEX_DIR):
+        super().__init__()
         self.index_dir = index_dir
 
-        # 使用改进的Schema，添加字段权重
+        # 使用改进的Schema，文本字段权重见FIELD_BOOSTS
         self.schema = Schema(
             title=TEXT(
-                stored=True, analyzer=improved_chinese_analyzer(), field_boost=3.0
+                stored=True, analyzer=improved_chinese_analyzer(), field_boost=FIELD_BOOSTS["title"]
             ),
             content=TEXT(
-                stored=True, analyzer=improved_chinese_analyzer(), field_boost=1.0
+                stored=True, analyzer=improved_chinese_analyzer(), field_boost=FIELD_BOOSTS["content"]
             ),
             headings=TEXT(
-                stored=True, analyzer=improved_chinese_analyzer(), field_boost=2.0
+                stored=True, analyzer=improved_chinese_analyzer(), field_boost=FIELD_BOOSTS["headings"]
             ),
             code_blocks=TEXT(
-                stored=True, analyzer=improved_chinese_analyzer(), field_boost=1.5
+                stored=True, analyzer=improved_chinese_analyzer(), field_boost=FIELD_BOOSTS["code_blocks"]
             ),
             tags=KEYWORD(stored=True, commas=True, field_boost=2.5),
             url=ID(stored=True, unique=True),
             file_path=ID(stored=True),
+            # 分面：从URL路径得到的SDK语言和文档栏目
+            language=ID(stored=True),
+            section=ID(stored=True),
+            # SDK符号表：symbols按名称精确查找，symbol_table存放函数原型、参数和返回值
+            symbols=KEYWORD(lowercase=True, commas=True),
+            symbol_table=STORED(),
         )
 
-        self.index = self._get_or_create_index()
+        # 索引按代（generation）存放在index_dir的子目录中，CURRENT文件记录当前代，
+        # 重建时写入新的代目录，完成后原子替换CURRENT，正在进行的搜索不受影响
+        self.pointer_file = self.index_dir / CURRENT_POINTER
+        self.generation: Optional[str] = None
+        self._pointer_mtime: Optional[int] = None
+        self._index = self._get_or_create_index()
 
         # 使用BM25F评分算法，支持字段权重
         self.scorer = BM25F()
 
-    def _get_or_create_index(self) -> index.Index:
-        """获取或创建索引"""
-        if index.exists_in(self.index_dir):
-            logger.info(f"使用现有索引: {self.index_dir}")
-            return index.open_dir(self.index_dir)
-        else:
-            logger.info(f"创建新索引: {self.index_dir}")
-            return index.create_in(self.index_dir, self.schema)
-
-    def _parse_html(self, file_path: Path, url: str) -> Dict[str, Any]:
-        """增强的HTML文档解析，提取更多结构化内容"""
-        with open(file_path, "r", encoding="utf-8") as f:
-            html_content = f.read()
-
-        soup = BeautifulSoup(html_content, "html.parser")
-
-        # 移除脚本和样式标签
-        for script in soup(["script", "style", "nav", "footer", "header"]):
-            script.decompose()
-
-        # 提取标题
-        title = ""
-        if soup.title and soup.title.string:
-            title = str(soup.title.string).strip()
-
-        # 如果title标签没有内容，尝试从h1获取
-        if not title:
-            h1 = soup.find("h1")
-            if h1:
-                title = h1.get_text().strip()
-
-        # 提取正文内容 - 使用增强的多方法提取
-        content_parts = []
-
-        # 方法1: 尝试查找主要内容容器
-        content_containers = [
-            "content",
-            "main-content",
-            "theme-default-content",
-            "article-content",
-            "post-content",
-            "entry-content",
-            "page-content",
-            "documentation-content",
-        ]
-
-        main_content = None
-        for container_class in content_containers:
-            main_content = soup.find(["div", "main", "article"], class_=container_class)
-            if main_content:
-                break
-
-        # 如果找不到特定容器，使用main或article标签
-        if not main_content:
-            main_content = soup.find(["main", "article"])
-
-        # 如果还是找不到，使用body
-        if not main_content:
-            main_content = soup.body if soup.body else soup
-
-        # 提取段落文本
-        if main_content:
-            # 提取所有段落
-            for p in main_content.find_all("p"):
-                text = p.get_text(separator=" ", strip=True)
-                if text:
-                    content_parts.append(text)
-
-            # 提取列表项
-            for li in main_content.find_all("li"):
-                text = li.get_text(separator=" ", strip=True)
-                if text:
-                    content_parts.append(text)
-
-            # 提取表格内容
-            for table in main_content.find_all("table"):
-                for row in table.find_all("tr"):
-                    cells = [
-                        str(td.get_text(strip=True))
-                        for td in row.find_all(["td", "th"])
-                    ]
-                    if cells:
-                        content_parts.append(" | ".join(cells))
-
-            # 提取div中的文本（排除已提取的元素）
-            for div in main_content.find_all("div", recursive=False):
-                text = div.get_text(separator=" ", strip=True)
-                if text and len(text) > 10:  # 只添加有意义的文本
-                    content_parts.append(text)
-
-        # 合并内容并去重
-        content = "\n".join(dict.fromkeys(content_parts))  # 保持顺序的去重
-
-        # 如果内容太少，使用整个body的文本
-        if len(content) < 100 and soup.body:
-            content = soup.body.get_text(separator="\n", strip=True)
-
-        # 清理内容：移除多余空白、特殊字符
-        content = re.sub(r"\s+", " ", content)  # 多个空白符替换为单个空格
-        content = re.sub(r"\n+", "\n", content)  # 多个换行替换为单个换行
-
-        # 提取所有标题（h1-h6）
-        headings = []
-        for h in (
-            main_content.find_all(["h1", "h2", "h3", "h4", "h5", "h6"])
-            if main_content
-            else []
-        ):
-            heading_text = h.get_text(strip=True)
-            if heading_text:
-                headings.append(heading_text)
-        headings_text = "\n".join(headings)
-
-        # 提取代码块 - 包括code、pre标签
-        code_blocks = []
-        for code in main_content.find_all(["code", "pre"]) if main_content else []:
-            code_text = code.get_text(strip=True)
-            if code_text and len(code_text) > 2:  # 排除太短的代码片段
-                code_blocks.append(code_text)
-        code_blocks_text = "\n\n".join(code_blocks)
-
-        # 提取标签（从meta标签的keywords中提取）
-        tags = []
-        keywords_meta = soup.find("meta", attrs={"name": "keywords"})
-        if keywords_meta and keywords_meta.get("content"):
-            meta_content = keywords_meta.get("content")
-            if meta_content and isinstance(meta_content, str):
-                if "、" in meta_content:
-                    tags = [
-                        tag.strip() for tag in meta_content.split("、") if tag.strip()
-                    ]
-                else:
-                    tags = [
-                        tag.strip() for tag in meta_content.split(",") if tag.strip()
-                    ]
 
-        # 如果没有keywords meta标签，尝试从内容中提取关键词
-        if not tags:
-            # 使用jieba提取关键词
-            try:
-                keywords = jieba.analyse.extract_tags(
-                    content, topK=10, withWeight=False
-                )
-                tags = [str(k) for k in keywords[:5]]  # 只取前5个，确保是字符串
-            except Exception as e:
-                logger.debug(f"关键词提取失败: {e}")
+        # 混合检索的向量索引，按目录缓存
+        self._vector_indexes: Dict[str, VectorIndex] = {}
+        self._vector_lock = threading.Lock()
 
-        return {
-            "title": title,
-            "content": content,
-            "headings": headings_text,
-            "code_blocks": code_blocks_text,
-            "tags": ",".join(str(t) for t in tags),  # 确保所有元素都是字符串
-            "url": url,
-            "file_path": str(file_path),
-        }
+        # 各线程进入snapshot()时打开的searcher
+        self._snapshot = threading.local()
 
-    def add_document(self, file_path: Path, url: str) -> bool:
-        """添加单个文档到索引"""
-        try:
-            document = self._parse_html(file_path, url)
+        # 分面位图，按索引版本缓存
+        self._facets = FacetCache()
 
-            with self.index.writer() as writer:
-                writer.add_document(**document)
+    @property
+    def index(self) -> Index:
+        """当前代的索引，其他进程或线程切换了代时自动重新打开"""
+        try:
+            pointer_mtime = self.pointer_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            pointer_mtime = None
+
+        if pointer_mtime != self._pointer_mtime:
+            generation = self._read_pointer()
+            if generation is not None and generation != self.generation:
+                logger.info(f"切换到新的索引代: {generation}")
+                self._index = self._open_index(self.index_dir / generation)
+                self.generation = generation
+            self._pointer_mtime = pointer_mtime
+        return self._index
+
+    def _read_pointer(self) -> Optional[str]:
+        """读取CURRENT文件记录的当前代，不存在时返回None"""
+        try:
+            generation = self.pointer_file.read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            return None
+        if not generation or not (self.index_dir / generation).is_dir():
+            logger.error(f"索引代指针无效: {generation!r}")
+            return None
+        return generation
+
+    def _write_pointer(self, generation: str) -> None:
+        """原子替换CURRENT文件，切换当前代"""
+        tmp_file = self.pointer_file.with_name(f"{CURRENT_POINTER}.{uuid.uuid4().hex}.tmp")
+        tmp_file.write_text(generation, encoding="utf-8")
+        os.replace(tmp_file, self.pointer_file)
+
+    def _create_generation(self) -> Tuple[str, Index]:
+        """创建一个空的新代目录"""
+        # 代目录名按创建时间排序，清理时据此区分新旧
+        generation = f"{GENERATION_PREFIX}{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        generation_dir = self.index_dir / generation
+        generation_dir.mkdir(parents=True)
+        return generation, index.create_in(generation_dir, self.schema)
+
+    def _open_index(self, path: Path) -> Index:
+        """打开索引，为旧版本建立的索引补充新增的字段"""
+        existing_index = index.open_dir(path)
+        missing_fields = [name for name in self.schema.names() if name not in existing_index.schema]
+        if not missing_fields:
+            return existing_index
+
+        # 已有文档在重建索引或重新写入后才会有新字段的内容
+        logger.info(f"为索引补充新字段: {missing_fields}")
+        try:
+            writer = existing_index.writer(timeout=INDEX_LEASE_TIMEOUT)
+            for name in missing_fields:
+                writer.add_field(name, self.schema[name])
+            writer.commit(merge=False)
+        except index.LockError as e:
+            logger.warning(f"索引被占用，暂未补充新字段: {e}")
+            return existing_index
+        return index.open_dir(path)
+
+    def _get_or_create_index(self) -> Index:
+        """获取或创建索引"""
+        generation = self._read_pointer()
+        if generation is not None:
+            logger.info(f"使用现有索引: {self.index_dir / generation}")
+            self.generation = generation
+            self._pointer_mtime = self.pointer_file.stat().st_mtime_ns
+            return self._open_index(self.index_dir / generation)
 
-            logger.info(f"文档添加到索引: {url}")
-            return True
+        if index.exists_in(self.index_dir):
+            # 分代之前的旧版索引直接存放在index_dir中，首次重建后迁移到代目录
+            logger.info(f"使用现有索引: {self.index_dir}")
+            return self._open_index(self.index_dir)
 
-        except Exception as e:
-            logger.error(f"添加文档失败: {url}, 错误: {e}")
-            return False
+        generation, new_index = self._create_generation()
+        self._write_pointer(generation)
+        logger.info(f"创建新索引: {self.index_dir / generation}")
+        self.generation = generation
+        self._pointer_mtime = self.pointer_file.stat().st_mtime_ns
+        return new_index
 
-    def add_documents(self, file_url_pairs: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """批量添加文档到索引（智能跳过已存在的文档）"""
-        success_count = 0
-        skipped_count = 0
-        total_count = len(file_url_pairs)
+    def write_batch(self, operations: List[Tuple[str, Any]],
+                    target: Optional[Index] = None) -> List[Dict[str, Any]]:
+        """
+        在一个writer中执行一批写操作，整批只提交一次
 
-        # 检查哪些文档已经在索引中
-        with self.index.searcher() as searcher:
-            existing_urls = set()
-            # 使用Every查询获取所有文档
-            all_docs = searcher.search(Every(), limit=None)
-            for doc in all_docs:
-                existing_urls.add(doc.get("url", ""))
-
-        # 只处理不在索引中的文档
-        new_documents = []
-        for item in file_url_pairs:
-            url = item["url"]
-            if url not in existing_urls:
-                new_documents.append(item)
-            else:
-                skipped_count += 1
+        Args:
+            operations: 写操作列表，每项为 ("add", file_url_pairs)、
+                        ("update", file_url_pairs) 或 ("delete", urls)
+            target: 写入的索引，默认为当前代
 
-        if not new_documents:
-            logger.info(
-                f"所有文档已存在，跳过索引: {skipped_count}/{total_count}个文档"
-            )
-            return {
-                "total_count": total_count,
-                "success_count": 0,
-                "failure_count": 0,
-                "skipped_count": skipped_count,
+        Returns:
+            与operations一一对应的结果列表
+        """
+        target_index = target if target is not None else self.index
+
+        # 检查哪些待添加的文档已经在索引中（按url词项逐个查找，避免遍历全部文档）
+        with target_index.searcher() as searcher:
+            existing_urls = {
+                canonicalize_url(item["url"])
+                for operation, items in operations if operation == "add"
+                for item in items
+                if searcher.document_number(url=canonicalize_url(item["url"])) is not None
             }
 
-        # 只为新文档创建索引
-        for item in new_documents:
-            file_path = Path(item["file_path"])
-            url = item["url"]
-
-            try:
-                document = self._parse_html(file_path, url)
-
-                with self.index.writer() as writer:
-                    writer.add_document(**document)
-
-                success_count += 1
-            except Exception as e:
-                logger.error(f"添加新文档失败: {url}, 错误: {e}")
-
-        logger.info(
-            f"索引更新完成: {success_count}个新文档添加, {skipped_count}个已存在跳过"
+        needs_writer = any(
+            operation != "add" or any(canonicalize_url(item["url"]) not in existing_urls for item in items)
+            for operation, items in operations
         )
+        if not needs_writer:
+            logger.info(f"所有文档已存在，跳过索引: {len(existing_urls)}个文档")
+            return [self._skipped_result(items) for _, items in operations]
+
+        # 整批文档共用一个writer并只提交一次
+        results = []
+        written_documents = []
+        vector_documents = []
+        deleted_urls = []
+        version_before = (self.generation, target_index.latest_generation())
+        with target_index.writer() as writer:
+            for operation, items in operations:
+                if operation == "delete":
+                    deleted_count = sum(writer.delete_by_term("url", canonicalize_url(url)) for url in items)
+                    deleted_urls.extend(canonicalize_url(url) for url in items)
+                    results.append({"deleted_count": deleted_count})
+                    continue
+
+                success_count = 0
+                skipped_count = 0
+                failed_urls = []
+                for item in items:
+                    url = item["url"]
+                    if operation == "add" and canonicalize_url(url) in existing_urls:
+                        skipped_count += 1
+                        continue
+
+                    try:
+                        document = self._parse_html(Path(item["file_path"]), url)
+                        if operation == "update":
+                            writer.update_document(**document)
+                        else:
+                            writer.add_document(**document)
+                            written_documents.append(document)
+                        vector_documents.append(document)
+                        existing_urls.add(document["url"])
+                        success_count += 1
+                    except Exception as e:
+                        failed_urls.append(url)
+                        logger.error(f"添加新文档失败: {url}, 错误: {e}")
+
+                results.append({
+                    "total_count": len(items),
+                    "success_count": success_count,
+                    "failure_count": len(failed_urls),
+                    "skipped_count": skipped_count,
+                    "failed_urls": failed_urls,
+                })
+
+        if vector_documents or deleted_urls:
+            self._update_vectors(target_index, vector_documents, deleted_urls)
+
+        # 提交后增量更新拼写纠错词典、拼音索引和前缀补全，查询时无需再扫描索引
+        if target is None:
+            rewritten = any(operation != "add" for operation, _ in operations)
+            self._update_vocabulary(version_before, vector_documents, rewritten)
+            if self._completions is not None:
+                self._update_completions(version_before, written_documents, rewritten)
+
+        written_count = sum(result.get("success_count", 0) for result in results)
+        skipped_count = sum(result.get("skipped_count", 0) for result in results)
+        logger.info(f"索引更新完成: {written_count}个文档写入, {skipped_count}个已存在跳过")
+
+        return results
+
+
+    def _keyword_query(self, keyword: str) -> Tuple[Any, Dict[str, List[str]]]:
+        """
+        构造关键词搜索的查询
 
-        return {
-            "total_count": total_count,
-            "success_count": success_count,
-            "failure_count": len(new_documents) - success_count,
-            "skipped_count": skipped_count,
-        }
-
-    def update_index(self, file_url_pairs: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """更新索引"""
-        return self.add_documents(file_url_pairs)
+        Returns:
+            (查询, 拼音展开结果)
+        """
+        # 拼音或首字母查询展开为对应的中文词，与原查询OR组合
+        expansions = self.expand_pinyin(keyword)
+        query_text = " ".join([keyword] + [term for terms in expansions.values() for term in terms])
+
+        # 使用MultifieldParser在多个字段中搜索
+        parser = MultifieldParser(
+            ["title", "content", "headings", "code_blocks"],
+            self.schema,
+            group=OrGroup,  # 使用OR组合，扩大搜索范围
+        )
 
-    def search(self, keyword: str, max_results: int = 10) -> Dict[str, Any]:
-        """增强的关键词搜索 - 使用多字段搜索和OR组合"""
+        try:
+            query = parser.parse(query_text)
+        except Exception as e:
+            logger.warning(f"查询解析失败: {query_text}, 错误: {e}")
+            # 降级为简单搜索
+            parser = QueryParser("content", self.schema)
+            query = parser.parse(query_text)
+        return query, expansions
+
+    @contextmanager
+    def snapshot(self) -> Iterator[None]:
+        """在同一个searcher上执行当前线程的多个查询，嵌套调用时沿用外层的searcher"""
+        if getattr(self._snapshot, "searcher", None) is not None:
+            yield
+            return
         with self.index.searcher(weighting=self.scorer) as searcher:
-            # 使用MultifieldParser在多个字段中搜索
-            parser = MultifieldParser(
-                ["title", "content", "headings", "code_blocks"],
-                self.schema,
-                group=OrGroup,  # 使用OR组合，扩大搜索范围
-            )
-
+            self._snapshot.searcher = searcher
             try:
-                query = parser.parse(keyword)
-            except Exception as e:
-                logger.warning(f"查询解析失败: {keyword}, 错误: {e}")
-                # 降级为简单搜索
-                parser = QueryParser("content", self.schema)
-                query = parser.parse(keyword)
+                yield
+            finally:
+                self._snapshot.searcher = None
+
+    @contextmanager
+    def _searcher(self) -> Iterator[Any]:
+        """查询使用的searcher：快照期间共用快照的searcher，否则打开当前代的新searcher"""
+        searcher = getattr(self._snapshot, "searcher", None)
+        if searcher is not None:
+            yield searcher
+            return
+        with self.index.searcher(weighting=self.scorer) as searcher:
+            yield searcher
+
+    def _facet_bitsets(self, searcher) -> Optional[FacetBitsets]:
+        """searcher读取的索引版本的分面位图，按各段的(段ID, 已删除文档数)缓存；未安装numpy时返回None"""
+        if not facets_available():
+            return None
+        reader = searcher.reader()
+        leaves = list(reader.leaf_readers())
+        key = (self.generation, tuple((leaf.segment().segment_id(), leaf.segment().deleted_count())
+                                      for leaf, _ in leaves if hasattr(leaf, "segment")))
+
+        def build() -> FacetBitsets:
+            # 分面字段的倒排表（不包括已删除的文档），文档号加上段的偏移
+            postings: Dict[str, Dict[str, List[int]]] = {}
+            for field in FACET_FIELDS:
+                values = postings[field] = {}
+                for leaf, offset in leaves:
+                    for term_bytes, _ in leaf.iter_field(field):
+                        docnums = values.setdefault(self.schema[field].from_bytes(term_bytes), [])
+                        docnums.extend(offset + docnum for docnum in leaf.postings(field, term_bytes).all_ids())
+            return FacetBitsets(reader.doc_count_all(), postings)
+
+        return self._facets.get(key, build)
+
+    def _allowed_docs(self, searcher, filters: Optional[Dict[str, List[str]]]) -> Optional[Any]:
+        """
+        分面过滤条件允许的文档，作为Whoosh的filter在评分前过滤命中；没有过滤条件时返回None
 
-            results = searcher.search(query, limit=max_results * 2)  # 多取一些结果
-            return self._format_results(list(results), keyword, searcher)
+        有分面位图时直接用位图构造BitSet（布局相同），未安装numpy时执行过滤查询得到文档号集合。
+        """
+        filters = normalize_filters(filters)
+        if not filters:
+            return None
+        bitsets = self._facet_bitsets(searcher)
+        if bitsets is None:
+            query = And([Or([Term(field, value) for value in values]) for field, values in filters.items()])
+            return set(searcher.docs_for_query(query))
+        allowed = BitSet()
+        allowed.bits = array("B", bitsets.allowed(filters).tobytes())
+        return allowed
+
+    def _search_hits(self, searcher, query: Any, limit: int, allowed: Optional[Any] = None) -> List[Any]:
+        """执行查询，返回按得分降序排列的命中结果，allowed为分面过滤允许的文档"""
+        if allowed is not None and not allowed:
+            # Whoosh把空的filter当作不过滤
+            return []
+        return list(searcher.search(query, limit=limit, filter=allowed))
+
+    def _matched_docnums(self, searcher, query: Any) -> Iterable[int]:
+        """查询命中的全部文档号，不评分"""
+        return searcher.docs_for_query(query)
+
+    def _facet_counts(self, searcher, query: Any, allowed: Optional[Any]) -> Optional[Dict[str, Dict[str, int]]]:
+        """命中文档（经过分面过滤，不受返回数量限制）在各分面取值上的文档数，未安装numpy时返回None"""
+        bitsets = self._facet_bitsets(searcher)
+        if bitsets is None:
+            return None
+        return bitsets.counts(self._matched_docnums(searcher, query), allowed.bits if allowed is not None else None)
+
+    def _query_results(self, searcher, query: Any, limit: int, original_query: str,
+                       filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """按分面过滤执行查询并格式化结果，附上分面计数"""
+        allowed = self._allowed_docs(searcher, filters)
+        results = self._search_hits(searcher, query, limit, allowed)
+        search_result = self._format_results(results, original_query, searcher)
+        facets = self._facet_counts(searcher, query, allowed)
+        if facets is not None:
+            search_result["facets"] = facets
+        return search_result
+
+    def search(self, keyword: str, max_results: int = 10,
+               filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """增强的关键词搜索 - 使用多字段搜索和OR组合"""
+        query, expansions = self._keyword_query(keyword)
+        with self._searcher() as searcher:
+            search_result = self._query_results(searcher, query, max_results * 2, keyword, filters)  # 多取一些结果
+            if expansions:
+                search_result["pinyin_expansions"] = expansions
+            return search_result
+
+    def search_hybrid(self, keyword: str, max_results: int = 10, candidates: int = HYBRID_CANDIDATES,
+                      filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """
+        混合检索：BM25关键词结果与本地向量检索结果按倒数排名融合（RRF）
+
+        向量检索能召回用词不同但内容相近的文档；未安装numpy时只使用BM25结果。
+        结果的score为RRF融合得分，ranks记录文档在两路结果中的名次；分面计数只统计关键词查询的命中。
+        """
+        query, expansions = self._keyword_query(keyword)
+        candidates = max(candidates, max_results)
+        with self._searcher() as searcher:
+            allowed = self._allowed_docs(searcher, filters)
+            keyword_hits = self._search_hits(searcher, query, candidates, allowed)
+            facets = self._facet_counts(searcher, query, allowed)
+            vectors = self.vector_index()
+            vector_hits = vectors.search(keyword, candidates) if vectors is not None else []
+            if allowed is not None:
+                # 向量检索不经过分面过滤，只保留允许的文档
+                docnums = {url: searcher.document_number(url=url) for url, _ in vector_hits}
+                vector_hits = [(url, score) for url, score in vector_hits
+                               if docnums[url] is not None and docnums[url] in allowed]
+
+            keyword_ranking = [hit["url"] for hit in keyword_hits]
+            vector_ranking = [url for url, _ in vector_hits]
+            fused = reciprocal_rank_fusion([keyword_ranking, vector_ranking])
+
+            hits_by_url = {hit["url"]: hit for hit in keyword_hits}
+            keyword_ranks = {url: rank for rank, url in enumerate(keyword_ranking, start=1)}
+            vector_ranks = {url: rank for rank, url in enumerate(vector_ranking, start=1)}
+            formatted_results = []
+            for url, score in fused:
+                if len(formatted_results) >= max_results:
+                    break
+                if url in hits_by_url:
+                    entry = self._format_hit(hits_by_url[url])
+                else:
+                    # 只被向量检索召回的文档没有关键词命中，不做高亮
+                    fields = searcher.document(url=url)
+                    if fields is None:
+                        continue
+                    entry = self._format_document(fields)
+                entry["score"] = score
+                entry["ranks"] = {"bm25": keyword_ranks.get(url), "vector": vector_ranks.get(url)}
+                formatted_results.append(entry)
+
+        search_result = {
+            "query": keyword,
+            "total_hits": len(fused),
+            "results": formatted_results,
+            "mode": "hybrid" if vectors is not None else "bm25",
+        }
+        if facets is not None:
+            search_result["facets"] = facets
+        if expansions:
+            search_result["pinyin_expansions"] = expansions
+        return search_result
 
     def boolean_search(
-        self, query_string: str, max_results: int = 10
+        self, query_string: str, max_results: int = 10, filters: Optional[Dict[str, List[str]]] = None
     ) -> Dict[str, Any]:
         """布尔查询搜索"""
         try:
-            with self.index.searcher(weighting=self.scorer) as searcher:
+            with self._searcher() as searcher:
                 try:
                     # 使用MultifieldParser支持多字段布尔查询
                     parser = MultifieldParser(
@@ -455,8 +555,7 @@ class WhooshSearchEngine:
                     )
 
                     query = parser.parse(query_string)
-                    results = searcher.search(query, limit=max_results * 2)
-                    return self._format_results(list(results), query_string, searcher)  # type: ignore
+                    return self._query_results(searcher, query, max_results * 2, query_string, filters)
 
                 except Exception as e:
                     logger.warning(f"布尔查询解析失败: {query_string}, 错误: {e}")
@@ -476,12 +575,11 @@ class WhooshSearchEngine:
                             group=OrGroup,
                         )
                         simple_query = parser.parse(cleaned_query.strip())
-                        results = searcher.search(simple_query, limit=max_results * 2)
                         logger.info(
                             f"使用简化查询: '{cleaned_query.strip()}' 替代原查询"
                         )
-                        return self._format_results(
-                            list(results), query_string, searcher
+                        return self._query_results(
+                            searcher, simple_query, max_results * 2, query_string, filters
                         )
                     else:
                         return {
@@ -500,9 +598,10 @@ class WhooshSearchEngine:
                 "error": str(e),
             }
 
-    def phrase_search(self, phrase: str, max_results: int = 10) -> Dict[str, Any]:
+    def phrase_search(self, phrase: str, max_results: int = 10,
+                      filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
         """精确短语搜索 - 在多个字段中搜索"""
-        with self.index.searcher(weighting=self.scorer) as searcher:
+        with self._searcher() as searcher:
             # 在多个字段中进行短语搜索
             from whoosh.query import Phrase
 
@@ -517,36 +616,100 @@ class WhooshSearchEngine:
             # 使用OR组合多个字段的查询
             query = Or(queries)
 
-            results = searcher.search(query, limit=max_results * 2)
-            return self._format_results(list(results), phrase, searcher)
+            return self._query_results(searcher, query, max_results * 2, phrase, filters)
 
     def fuzzy_search(
-        self, term: str, max_distance: int = 2, max_results: int = 10
+        self, term: str, max_distance: int = 2, max_results: int = 10,
+        filters: Optional[Dict[str, List[str]]] = None
     ) -> Dict[str, Any]:
-        """模糊搜索 - 在多个字段中搜索"""
-        with self.index.searcher(weighting=self.scorer) as searcher:
-            from whoosh.query import FuzzyTerm
+        """
+        模糊搜索 - 在多个字段中搜索
 
-            # 在多个字段中创建模糊查询
-            queries = []
-            for field in ["title", "content", "headings", "code_blocks"]:
-                queries.append(FuzzyTerm(field, term, maxdist=max_distance))
+        先通过拼写纠错词典找出与各查询词编辑距离不超过max_distance的索引词（拼音查询展开为中文词），
+        再用这些词做精确的多词查询，避免FuzzyTerm逐个遍历词表计算编辑距离。
+        """
+        corrections = self._fuzzy_candidates(term, max_distance)
+
+        with self._searcher() as searcher:
+            # 在多个字段中查找候选词，使用OR组合
+            queries = [
+                Term(field, candidate)
+                for candidates in corrections.values()
+                for candidate in candidates
+                for field in SPELLING_FIELDS
+            ]
+            if queries:
+                search_result = self._query_results(searcher, Or(queries), max_results * 2, term, filters)
+            else:
+                search_result = self._format_results([], term, searcher)
+            search_result["corrections"] = corrections
+            return search_result
 
-            # 使用OR组合多个字段的查询
-            query = Or(queries)
+    def _index_version(self) -> Tuple[Optional[str], int]:
+        return self.generation, self.index.latest_generation()
+
+    def _term_frequencies(self) -> Dict[str, int]:
+        frequencies: Dict[str, int] = {}
+        with self.index.searcher() as searcher:
+            reader = searcher.reader()
+            for field in SPELLING_FIELDS:
+                for term_bytes, terminfo in reader.iter_field(field):
+                    text = self.schema[field].from_bytes(term_bytes)
+                    frequencies[text] = frequencies.get(text, 0) + terminfo.doc_frequency()
+        return frequencies
+
+    def _stored_documents(self) -> List[Dict[str, Any]]:
+        with self.index.searcher() as searcher:
+            return [dict(fields) for fields in searcher.all_stored_fields()]
+
+    def _vector_index_for(self, target_index: Index) -> Optional[VectorIndex]:
+        """索引对应的向量索引，未安装numpy时返回None"""
+        if not vectors_available():
+            return None
+        directory = Path(target_index.storage.folder) / VECTOR_DIR_NAME
+        with self._vector_lock:
+            vectors = self._vector_indexes.get(str(directory))
+            if vectors is None:
+                vectors = self._vector_indexes[str(directory)] = VectorIndex(directory)
+            return vectors
+
+    def vector_index(self) -> Optional[VectorIndex]:
+        """当前代的向量索引，升级前建立的索引在首次使用时从存储字段补建"""
+        current_index = self.index
+        vectors = self._vector_index_for(current_index)
+        if vectors is not None:
+            def load_documents() -> List[Dict[str, Any]]:
+                with current_index.searcher() as searcher:
+                    return [dict(fields) for fields in searcher.all_stored_fields()]
+
+            vectors.build_if_empty(load_documents)
+        return vectors
+
+    def _update_vectors(self, target_index: Index, documents: List[Dict[str, Any]], deleted_urls: List[str]) -> None:
+        """提交后同步写入向量索引，失败时只记录日志，不影响已提交的文档"""
+        vectors = self._vector_index_for(target_index)
+        if vectors is None:
+            return
+        try:
+            # 还没有向量的旧索引只写入这一批会导致补建被跳过，留到首次混合检索时整体建立
+            if not len(vectors) and target_index.doc_count() > len(documents):
+                return
+            vectors.write(documents, deleted_urls)
+        except Exception as e:
+            logger.error(f"更新向量索引失败: {e}")
 
-            results = searcher.search(query, limit=max_results * 2)
-            return self._format_results(list(results), term, searcher)
+    def _symbol_documents(self, key: str) -> List[Dict[str, Any]]:
+        # 通过symbols字段的词项直接定位文档
+        with self.index.searcher() as searcher:
+            return [searcher.stored_fields(docnum) for docnum in searcher.docs_for_query(Term("symbols", key))]
 
     def tag_search(
-        self, tag: str, keyword: str = "", max_results: int = 10
+        self, tag: str, keyword: str = "", max_results: int = 10,
+        filters: Optional[Dict[str, List[str]]] = None
     ) -> Dict[str, Any]:
-        """标签过滤搜索"""
-        with self.index.searcher(weighting=self.scorer) as searcher:
-            # 标签查询
-            parser = QueryParser("tags", self.schema)
-            tag_query = parser.parse(tag)
-
+        """标签过滤搜索：有关键词时标签作为分面过滤条件，在评分前过滤关键词查询的命中"""
+        tag = tag.strip()
+        with self._searcher() as searcher:
             if keyword:
                 # 标签 + 关键词组合搜索
                 content_parser = MultifieldParser(
@@ -554,86 +717,59 @@ class WhooshSearchEngine:
                     self.schema,
                     group=OrGroup,
                 )
-                content_query = content_parser.parse(keyword)
-                query = And([tag_query, content_query])
+                query = content_parser.parse(keyword)
+                filters = {**(filters or {}), "tags": [tag]}
             else:
-                # 仅标签搜索
-                query = tag_query
+                # 仅标签搜索：按tags字段评分，标签较少的文档排在前面
+                query = Term("tags", tag)
 
-            results = searcher.search(query, limit=max_results * 2)
-            return self._format_results(list(results), f"tag:{tag} {keyword}", searcher)
+            return self._query_results(searcher, query, max_results * 2, f"tag:{tag} {keyword}", filters)
 
     def _format_results(
         self, results: List[Any], original_query: str, searcher=None
     ) -> Dict[str, Any]:
         """格式化搜索结果，使用Whoosh的高亮功能"""
-        formatted_results = []
+        return {
+            "query": original_query,
+            "total_hits": len(results),
+            "results": [self._format_hit(hit) for hit in results],
+        }
 
-        for hit in results:
-            # 安全获取字段值
-            title = hit.get("title", "") or ""
-            content = hit.get("content", "") or ""
-            url = hit.get("url", "")
-            score = hit.score
+    def _format_hit(self, hit: Any) -> Dict[str, Any]:
+        """格式化单个命中结果，使用Whoosh的高亮功能"""
+        # 安全获取字段值
+        title = hit.get("title", "") or ""
+        content = hit.get("content", "") or ""
+        entry = self._format_document(hit, hit.score)
 
-            # 使用Whoosh的高亮功能
-            highlighted_title = title
-            highlighted_content = (
-                content[:300] + "..." if len(content) > 300 else content
-            )
+        try:
+            # 高亮标题
+            if title:
+                entry["highlights"]["title"] = hit.highlights("title", text=title, top=1) or title
+
+            # 高亮内容 - 显示最相关的片段
+            if content:
+                highlighted_content = hit.highlights("content", text=content, top=3)
+                if not highlighted_content:
+                    # 如果没有高亮片段，尝试其他字段
+                    headings = hit.get("headings", "")
+                    if headings:
+                        highlighted_content = hit.highlights(
+                            "headings", text=headings, top=2
+                        )
+                if highlighted_content:
+                    entry["highlights"]["content"] = highlighted_content
 
-            try:
-                # 高亮标题
-                if title:
-                    highlighted_title = hit.highlights("title", text=title, top=1)
-                    if not highlighted_title:
-                        highlighted_title = title
-
-                # 高亮内容 - 显示最相关的片段
-                if content:
-                    highlighted_content = hit.highlights("content", text=content, top=3)
-                    if not highlighted_content:
-                        # 如果没有高亮片段，尝试其他字段
-                        headings = hit.get("headings", "")
-                        if headings:
-                            highlighted_content = hit.highlights(
-                                "headings", text=headings, top=2
-                            )
-
-                        if not highlighted_content:
-                            # 使用内容的开头
-                            highlighted_content = content[:300] + (
-                                "..." if len(content) > 300 else ""
-                            )
-
-            except Exception as e:
-                logger.debug(f"高亮处理失败: {e}")
-                # 回退到简单截取
-                highlighted_content = content[:300] + (
-                    "..." if len(content) > 300 else ""
-                )
+        except Exception as e:
+            # 回退到简单截取
+            logger.debug(f"高亮处理失败: {e}")
 
-            formatted_results.append(
-                {
-                    "title": title,
-                    "content": content[:500],  # 返回更多原始内容
-                    "url": url,
-                    "score": score,
-                    "highlights": {
-                        "title": highlighted_title,
-                        "content": highlighted_content,
-                    },
-                }
-            )
+        return entry
 
-        return {
-            "query": original_query,
-            "total_hits": len(results),
-            "results": formatted_results,
-        }
 
     def get_index_stats(self) -> Dict[str, Any]:
         """获取索引统计信息"""
+        vectors = self._vector_index_for(self.index)
         with self.index.searcher() as searcher:
             doc_count = searcher.doc_count()
 
@@ -648,22 +784,213 @@ class WhooshSearchEngine:
             return {
                 "total_docs": doc_count,
                 "index_dir": str(self.index_dir),
+                "generation": self.generation,
+                "segment_count": len(self.index._segments()),
+                "vectors": vectors.get_stats() if vectors is not None else None,
                 "schema_fields": field_info,
                 "scorer": str(type(self.scorer).__name__),
             }
 
+    def segment_stats(self) -> Dict[str, Any]:
+        """获取当前代索引的段信息"""
+        segments = self.index._segments()
+        return {
+            "segment_count": len(segments),
+            "doc_count_all": sum(segment.doc_count_all() for segment in segments),
+            "deleted_count": sum(segment.deleted_count() for segment in segments),
+            "segments": [
+                {
+                    "id": segment.segment_id(),
+                    "doc_count": segment.doc_count_all(),
+                    "deleted_count": segment.deleted_count(),
+                }
+                for segment in segments
+            ],
+        }
+
+    def merge_segments(self, factor: int = INDEX_MERGE_FACTOR,
+                       deleted_ratio: float = INDEX_MERGE_DELETED_RATIO,
+                       optimize: bool = False) -> Dict[str, Any]:
+        """
+        按分层策略合并段
+
+        合并写入新段后一次提交，已打开的searcher继续读取旧段，不受影响。
+        调用方需保证没有其他writer（由索引写入任务在空闲时调用）。
+
+        Args:
+            optimize: 为True时把全部段合并为一个
+
+        Returns:
+            {"segments_before", "segments_after", "merged_segments", "merged_docs"}
+        """
+        target_index = self.index
+        segments = target_index._segments()
+        if optimize:
+            needs_optimize = len(segments) > 1 or any(segment.deleted_count() for segment in segments)
+            selected = list(segments) if needs_optimize else []
+        else:
+            selected = plan_tiered_merge(segments, factor, deleted_ratio)
+
+        result = {
+            "segments_before": len(segments),
+            "segments_after": len(segments),
+            "merged_segments": len(selected),
+            "merged_docs": sum(segment.doc_count() for segment in selected),
+        }
+        if not selected:
+            return result
+
+        from whoosh.reading import SegmentReader
+
+        selected_ids = {segment.segment_id() for segment in selected}
+
+        def merge_selected(writer, current_segments):
+            unchanged = []
+            for segment in current_segments:
+                if segment.segment_id() in selected_ids:
+                    reader = SegmentReader(writer.storage, writer.schema, segment)
+                    writer.add_reader(reader)
+                    reader.close()
+                else:
+                    unchanged.append(segment)
+            return unchanged
+
+        writer = target_index.writer()
+        writer.commit(mergetype=merge_selected)
+
+        result["segments_after"] = len(self.index._segments())
+        logger.info(f"索引段合并完成: {result['segments_before']} -> {result['segments_after']}个段, "
+                    f"合并{result['merged_segments']}个段共{result['merged_docs']}个文档")
+        return result
+
+    def indexed_urls(self) -> Set[str]:
+        """
+        索引中已有的文档URL集合
+
+        直接读取url字段的词项列表，不需要加载存储字段；段中存在已删除文档时，
+        词项可能只属于已删除的文档，需要再逐个确认。
+        """
+        with self.index.searcher() as searcher:
+            urls = {term.decode("utf-8") for term in searcher.lexicon("url")}
+            if searcher.reader().has_deletions():
+                urls = {url for url in urls if searcher.document_number(url=url) is not None}
+        return urls
+
+    def migrate_canonical_urls(self, file_path_for: Optional[Callable[[str], Any]] = None) -> Dict[str, int]:
+        """
+        将索引中的url字段迁移为规范化URL，合并同一页面的重复文档
+
+        Args:
+            file_path_for: 根据规范化URL返回新文件路径的函数，为None时保留原路径
+
+        Returns:
+            迁移统计：updated（更新URL的文档数）、merged（删除的重复文档数）
+        """
+        updated_count = 0
+        merged_count = 0
+
+        with self.index.searcher() as searcher:
+            stored_docs = list(searcher.all_stored_fields())
+
+        canonical_urls = {doc.get("url", "") for doc in stored_docs
+                          if doc.get("url", "") == canonicalize_url(doc.get("url", ""))}
+
+        with self.index.writer() as writer:
+            for doc in stored_docs:
+                url = doc.get("url", "")
+                canonical = canonicalize_url(url)
+                if url == canonical:
+                    continue
+
+                writer.delete_by_term("url", url)
+                if canonical in canonical_urls:
+                    merged_count += 1
+                    continue
+
+                # 存储字段包含全部索引字段，直接用于重新添加文档，无需重新解析HTML
+                migrated_doc = {**doc, "url": canonical}
+                if file_path_for is not None:
+                    migrated_doc["file_path"] = str(file_path_for(canonical))
+                writer.add_document(**migrated_doc)
+                canonical_urls.add(canonical)
+                updated_count += 1
+
+        logger.info(f"索引URL规范化完成: {updated_count}个文档更新, {merged_count}个重复文档删除")
+        return {"updated": updated_count, "merged": merged_count}
+
+    def last_modified(self) -> float:
+        """获取索引最后一次提交的时间戳"""
+        return self.index.last_modified()
+
     def rebuild_index(self, file_url_pairs: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """重建索引"""
-        # 删除旧索引
-        if self.index_dir.exists():
-            for file in self.index_dir.glob("*"):
+        """
+        重建索引
+
+        在新的代目录中建立完整索引，成功后原子切换CURRENT指针；重建期间的搜索
+        继续使用旧的代，重建中途失败时旧索引保持不变。
+        """
+        migrating = self.generation is None
+        generation, new_index = self._create_generation()
+        logger.info(f"开始重建索引: {self.index_dir / generation}")
+        try:
+            result = self.write_batch([("add", file_url_pairs)], target=new_index)[0]
+        except Exception:
+            shutil.rmtree(self.index_dir / generation, ignore_errors=True)
+            raise
+
+        self._write_pointer(generation)
+        logger.info(f"索引已切换到新的代: {generation}")
+        # 立即在本进程内切换，旧代上已打开的searcher仍可读完
+        self._index = new_index
+        self.generation = generation
+        self._pointer_mtime = self.pointer_file.stat().st_mtime_ns
+        self._rebuild_derived_indexes()
+
+        if migrating:
+            self._remove_legacy_index()
+        self.gc_generations()
+        return result
+
+    def _remove_legacy_index(self) -> None:
+        """首个代发布后删除分代之前直接存放在index_dir中的旧版索引文件和向量索引"""
+        for path in self.index_dir.iterdir():
+            if path.is_file() and (path.name.startswith("MAIN_") or path.name.startswith("_MAIN_")):
                 try:
-                    file.unlink()
-                except Exception as e:
-                    logger.error(f"删除索引文件失败: {file}, 错误: {e}")
+                    path.unlink()
+                except OSError as e:
+                    logger.warning(f"删除旧版索引文件失败: {path}, 错误: {e}")
+        shutil.rmtree(self.index_dir / VECTOR_DIR_NAME, ignore_errors=True)
+        logger.info(f"旧版索引已迁移到代目录: {self.generation}")
+
+    def gc_generations(self, keep: int = INDEX_KEEP_GENERATIONS) -> List[str]:
+        """
+        清理旧的索引代
+
+        保留当前代及其之前最近的keep-1个代（供切换瞬间仍在读取的其他进程使用），
+        比当前代新的目录可能是其他进程正在进行的重建，不做清理。
 
-        # 创建新索引
-        self.index = self._get_or_create_index()
+        Returns:
+            已删除的代目录名列表
+        """
+        current = self._read_pointer()
+        if current is None:
+            return []
+
+        older = sorted(
+            path.name for path in self.index_dir.iterdir()
+            if path.is_dir() and path.name.startswith(GENERATION_PREFIX) and path.name < current
+        )
+        expired = older[:max(0, len(older) - (keep - 1))]
 
-        # 添加文档
-        return self.add_documents(file_url_pairs)
+        removed = []
+        for name in expired:
+            try:
+                shutil.rmtree(self.index_dir / name)
+                removed.append(name)
+            except OSError as e:
+                # Windows上仍被打开的文件无法删除，留到下次清理
+                logger.warning(f"删除旧索引代失败: {name}, 错误: {e}")
+
+        if removed:
+            logger.info(f"已清理旧索引代: {removed}")
+        return removed
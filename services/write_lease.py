@@ -0,0 +1,115 @@
+import json
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from config import (
+    INDEX_LEASE_FILE,
+    INDEX_LEASE_RETRY_INTERVAL,
+    INDEX_LEASE_TIMEOUT,
+    INDEX_SPOOL_DIR,
+)
+from utils import logger, FileLock
+
+
+class WriterLease:
+    """
+    多进程共享索引时的写入租约
+
+    每个MCP客户端都会启动独立的mcp_server.py进程，它们共用同一个索引目录。
+    写入前需要在限定时间内取得文件锁；取不到时把写请求转存到转交目录，
+    由下一个取得租约的进程在同一次提交中代为写入，等待的进程不会被长时间阻塞。
+    其他进程的搜索每次都会打开最新的索引版本，提交后即可见。
+    """
+
+    def __init__(self, lock_file: Path = INDEX_LEASE_FILE,
+                 spool_dir: Path = INDEX_SPOOL_DIR,
+                 timeout: float = INDEX_LEASE_TIMEOUT,
+                 retry_interval: float = INDEX_LEASE_RETRY_INTERVAL):
+        self.lock = FileLock(lock_file)
+        self.spool_dir = spool_dir
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+
+        self.acquired_count = 0
+        self.timeout_count = 0
+        self.spooled_count = 0
+        self.drained_count = 0
+
+    def acquire(self) -> bool:
+        """在限定时间内获取租约"""
+        if self.lock.acquire(self.timeout, self.retry_interval):
+            self.acquired_count += 1
+            return True
+        self.timeout_count += 1
+        return False
+
+    def release(self) -> None:
+        """释放租约"""
+        self.lock.release()
+
+    def spool(self, operations: List[Tuple[str, List[Any]]]) -> Path:
+        """将写请求转存到转交目录，由租约持有者代为写入"""
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        spool_file = self.spool_dir / f"{os.getpid()}-{uuid.uuid4().hex}.json"
+        tmp_file = spool_file.with_suffix('.tmp')
+
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'pid': os.getpid(),
+                'created_at': datetime.now().isoformat(),
+                'operations': operations,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_file, spool_file)
+
+        self.spooled_count += 1
+        logger.info(f"未取得索引写入租约，写请求已转交: {spool_file.name}")
+        return spool_file
+
+    def has_spooled(self) -> bool:
+        """转交目录中是否有待写入的请求"""
+        return self.spool_dir.exists() and any(self.spool_dir.glob("*.json"))
+
+    def load_spooled(self) -> Tuple[List[Path], List[Tuple[str, List[Any]]]]:
+        """读取转交目录中的写请求，需持有租约时调用"""
+        spool_files = []
+        operations = []
+
+        if not self.spool_dir.exists():
+            return spool_files, operations
+
+        for spool_file in sorted(self.spool_dir.glob("*.json"), key=lambda path: path.stat().st_mtime):
+            try:
+                with open(spool_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.error(f"转交文件解析失败: {spool_file}, 错误: {e}")
+                continue
+
+            spool_files.append(spool_file)
+            operations.extend((operation, items) for operation, items in data['operations'])
+
+        return spool_files, operations
+
+    def clear_spooled(self, spool_files: List[Path]) -> None:
+        """删除已写入索引的转交文件"""
+        for spool_file in spool_files:
+            try:
+                spool_file.unlink()
+                self.drained_count += 1
+            except FileNotFoundError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取租约统计信息"""
+        return {
+            'held': self.lock.is_locked,
+            'acquired': self.acquired_count,
+            'timeouts': self.timeout_count,
+            'spooled': self.spooled_count,
+            'drained': self.drained_count,
+            'pending_spool_files': len(list(self.spool_dir.glob("*.json"))) if self.spool_dir.exists() else 0,
+            'lock_file': str(self.lock.path),
+        }
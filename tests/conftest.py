@@ -14,19 +14,23 @@ def project_root():
     return Path(__file__).parent.parent
 
 @pytest.fixture(scope="session")
-def data_dir(project_root):
-    """返回数据目录"""
-    return project_root / "data"
+def data_dir(tmp_path_factory):
+    """返回临时数据目录，测试不写入仓库中的data目录"""
+    return tmp_path_factory.mktemp("data")
 
 @pytest.fixture(scope="session")
 def docs_dir(data_dir):
     """返回文档目录"""
-    return data_dir / "docs"
+    docs_dir = data_dir / "docs"
+    docs_dir.mkdir(exist_ok=True)
+    return docs_dir
 
 @pytest.fixture(scope="session")
 def index_dir(data_dir):
     """返回索引目录"""
-    return data_dir / "index"
+    index_dir = data_dir / "index"
+    index_dir.mkdir(exist_ok=True)
+    return index_dir
 
 @pytest.fixture(scope="function")
 def mock_requests():
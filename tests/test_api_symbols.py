@@ -0,0 +1,110 @@
+from urllib.parse import quote
+
+import pytest
+from bs4 import BeautifulSoup
+
+from services.api_symbols import extract_symbols, sdk_language, symbol_key
+from services.whoosh_service import WhooshSearchEngine
+from utils import canonicalize_url
+
+API_HTML = """
+<html><head><title>数据查询函数</title></head>
+<body><div class="theme-default-content">
+<h1>数据查询函数</h1>
+<h2 id="history-查询历史行情"><a class="header-anchor" href="#history-查询历史行情">#</a> history - 查询历史行情</h2>
+<p>查询指定时间段的历史行情数据</p>
+<p><strong>函数原型：</strong></p>
+<pre><code>history(symbol, frequency, start_time, end_time, fields=None,
+        skip_suspended=True, df=False)
+</code></pre>
+<p><strong>参数：</strong></p>
+<table>
+<tr><th>参数名</th><th>类型</th><th>说明</th></tr>
+<tr><td>symbol</td><td>str or list</td><td>标的代码</td></tr>
+<tr><td>frequency</td><td>str</td><td>频率，支持 'tick', '60s', '1d'</td></tr>
+</table>
+<p><strong>返回值：</strong></p>
+<table>
+<tr><th>字段名</th><th>类型</th><th>说明</th></tr>
+<tr><td>open</td><td>float</td><td>开盘价</td></tr>
+</table>
+<h2 id="注意事项">注意事项</h2>
+<p>history(...) 最多返回33000条数据</p>
+<h2 id="order_volume-按指定量委托">order_volume（按指定量委托）</h2>
+<pre><code>order_volume(symbol, volume, side, order_type, position_effect, price=0)</code></pre>
+</div></body></html>
+"""
+
+
+class TestExtractSymbols:
+    """测试SDK符号提取"""
+
+    def test_extract_signature_and_tables(self):
+        """测试提取函数原型、参数表和返回值表"""
+        soup = BeautifulSoup(API_HTML, "html.parser")
+        symbols = extract_symbols(soup.body, "https://www.myquant.cn/docs2/sdk/python/API介绍/数据查询函数.html")
+
+        assert [symbol["name"] for symbol in symbols] == ["history", "order_volume"]
+
+        history = symbols[0]
+        assert history["language"] == "python"
+        assert history["signature"].startswith("history(symbol, frequency")
+        assert history["signature"].endswith("df=False)")
+        assert history["description"] == "查询历史行情"
+        assert history["anchor"] == "history-查询历史行情"
+        assert [param["name"] for param in history["parameters"]] == ["symbol", "frequency"]
+        assert history["parameters"][0]["type"] == "str or list"
+        assert history["returns"] == [{"name": "open", "type": "float", "description": "开盘价"}]
+
+        assert symbols[1]["description"] == "按指定量委托"
+
+    def test_sdk_language(self):
+        """测试从URL推断SDK语言"""
+        assert sdk_language("https://www.myquant.cn/docs2/sdk/cSharp/x.html") == "csharp"
+        assert sdk_language("https://www.myquant.cn/docs2/faq/x.html") == ""
+
+    def test_symbol_key(self):
+        """测试带模块前缀的名称"""
+        assert symbol_key("gm.api.History") == "history"
+
+
+class TestLookupSymbol:
+    """测试符号精确查找"""
+
+    @pytest.fixture
+    def engine(self, tmp_path):
+        index_dir = tmp_path / "index"
+        index_dir.mkdir()
+        engine = WhooshSearchEngine(index_dir)
+        for language in ["python", "cpp"]:
+            file_path = tmp_path / f"{language}.html"
+            file_path.write_text(API_HTML, encoding="utf-8")
+            engine.add_documents([{"file_path": str(file_path),
+                                   "url": f"https://www.myquant.cn/docs2/sdk/{language}/数据查询函数.html"}])
+        return engine
+
+    def test_lookup_by_name_and_language(self, engine):
+        """测试按名称和语言查找，返回带锚点的链接"""
+        result = engine.lookup_symbol("History", language="python")
+
+        assert result["total_hits"] == 1
+        symbol = result["symbols"][0]
+        assert symbol["url"] == canonicalize_url(
+            "https://www.myquant.cn/docs2/sdk/python/数据查询函数.html") + "#" + quote("history-查询历史行情")
+        assert symbol["title"] == "数据查询函数"
+
+        assert engine.lookup_symbol("gm.api.history")["total_hits"] == 2
+        assert engine.lookup_symbol("注意事项")["total_hits"] == 0
+
+    def test_upgrade_old_index(self, tmp_path):
+        """测试旧版本索引打开时补充符号字段"""
+        from whoosh import index
+        from whoosh.fields import ID, Schema
+
+        index_dir = tmp_path / "legacy"
+        index_dir.mkdir()
+        index.create_in(index_dir, Schema(url=ID(stored=True, unique=True)))
+
+        engine = WhooshSearchEngine(index_dir)
+        assert "symbols" in engine.index.schema
+        assert engine.lookup_symbol("history")["total_hits"] == 0
@@ -0,0 +1,60 @@
+import time
+import pytest
+import requests
+from services.discovery_cache import DiscoveryCache
+from services.myquant_api import EnhancedMyQuantAPIService
+from utils.circuit_breaker import CircuitBreaker
+
+
+class TestCircuitBreaker:
+    """测试熔断器"""
+
+    def test_opens_after_threshold(self):
+        """测试连续失败达到阈值后打开"""
+        breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=60)
+
+        breaker.record_failure()
+        assert breaker.allow_request()
+        breaker.record_failure()
+
+        assert breaker.is_open
+        assert not breaker.allow_request()
+        assert breaker.get_state()["state"] == CircuitBreaker.OPEN
+        assert breaker.get_state()["rejected_requests"] == 1
+
+    def test_half_open_single_probe(self):
+        """测试半开状态只放行一个探测请求，探测成功后恢复"""
+        breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+
+        assert not breaker.is_open
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+
+        breaker.record_success()
+        assert breaker.get_state()["state"] == CircuitBreaker.CLOSED
+        assert breaker.allow_request()
+
+    def test_failed_probe_reopens(self):
+        """测试探测失败后重新打开"""
+        breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=0.01)
+        for _ in range(3):
+            breaker.record_failure()
+        time.sleep(0.02)
+
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.is_open
+
+    def test_api_skips_requests_while_open(self, tmp_path, mock_requests):
+        """测试API熔断后不再发起网络请求"""
+        mock_requests.side_effect = requests.exceptions.ConnectionError("offline")
+        service = EnhancedMyQuantAPIService(cache=DiscoveryCache(tmp_path, negative_ttl=0))
+        service.breaker = CircuitBreaker("myquant_api", failure_threshold=2, recovery_timeout=60)
+
+        for keyword in ["a", "b", "c", "d"]:
+            assert service.search(keyword).hits == []
+
+        assert mock_requests.call_count == 2
+        assert service.breaker.is_open
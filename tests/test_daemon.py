@@ -0,0 +1,96 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from core.daemon import DaemonClient, SearchDaemon, daemon_supported
+
+pytestmark = pytest.mark.skipif(not daemon_supported(), reason="当前平台不支持Unix域套接字")
+
+
+def _make_search_flow():
+    """构建模拟的搜索流程"""
+    async def search(keyword, max_results, filters=None):
+        await asyncio.sleep(0.05)
+        return {"query": keyword, "total_hits": 0, "results": []}
+
+    search_flow = MagicMock()
+    search_flow.search.side_effect = search
+    search_flow.get_stats.return_value = {"search_engine": {"total_docs": 0}}
+    search_flow.index_writer.stop = AsyncMock()
+    return search_flow
+
+
+@pytest_asyncio.fixture
+async def daemon(tmp_path):
+    """启动监听临时套接字的守护进程"""
+    daemon = SearchDaemon(_make_search_flow(), tmp_path / "daemon.sock")
+    await daemon.start()
+    yield daemon
+    await daemon.stop()
+
+
+class TestSearchDaemon:
+    """测试搜索守护进程和代理客户端"""
+
+    @pytest.mark.asyncio
+    async def test_forward_tool_call(self, daemon):
+        """测试通过守护进程执行工具调用"""
+        client = DaemonClient(daemon.socket_path)
+
+        result = await client.call("search_documents_local", {"keyword": "行情"})
+        stats = await client.call("get_system_stats", {})
+
+        assert result["query"] == "行情"
+        assert stats["daemon"]["requests"] == 2
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_connection(self, daemon):
+        """测试同一连接上的并发请求各自收到对应的响应"""
+        client = DaemonClient(daemon.socket_path)
+        keywords = [f"关键词{i}" for i in range(10)]
+
+        results = await asyncio.gather(*[
+            client.call("search_documents_local", {"keyword": keyword}) for keyword in keywords
+        ])
+
+        assert [result["query"] for result in results] == keywords
+        assert daemon.get_stats()["connections"] == 1
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_tool_error(self, daemon):
+        """测试工具调用错误传回代理"""
+        client = DaemonClient(daemon.socket_path)
+
+        with pytest.raises(RuntimeError, match="Unknown tool"):
+            await client.call("no_such_tool", {})
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_single_instance(self, daemon):
+        """测试同一套接字上只能运行一个守护进程"""
+        with pytest.raises(RuntimeError):
+            await SearchDaemon(_make_search_flow(), daemon.socket_path).start()
+
+    @pytest.mark.asyncio
+    async def test_stale_socket_replaced(self, tmp_path):
+        """测试异常退出遗留的套接字文件会被替换"""
+        socket_path = tmp_path / "daemon.sock"
+        socket_path.touch()
+
+        daemon = SearchDaemon(_make_search_flow(), socket_path)
+        await daemon.start()
+        assert await DaemonClient(socket_path).ping()
+        await daemon.stop()
+        assert not socket_path.exists()
+
+    @pytest.mark.asyncio
+    async def test_no_daemon(self, tmp_path):
+        """测试守护进程未运行时代理无法连接"""
+        client = DaemonClient(tmp_path / "missing.sock")
+
+        assert await client.connect() is False
+        with pytest.raises(ConnectionError):
+            await client.call("get_system_stats", {})
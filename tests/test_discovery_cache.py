@@ -0,0 +1,76 @@
+import time
+import pytest
+import requests
+from unittest.mock import MagicMock
+from services.discovery_cache import DiscoveryCache, normalize_keyword
+from services.myquant_api import EnhancedMyQuantAPIService
+
+
+def _api_payload(urls):
+    """构建模拟的MeiliSearch响应"""
+    return {
+        "hits": [
+            {"objectID": str(i), "url": url, "content": "内容", "hierarchy_lvl0": "API文档"}
+            for i, url in enumerate(urls)
+        ],
+        "query": "测试",
+        "processingTimeMs": 3,
+        "limit": 50,
+        "offset": 0,
+        "estimatedTotalHits": len(urls),
+    }
+
+
+class TestDiscoveryCache:
+    """测试发现结果磁盘缓存"""
+
+    def test_normalize_keyword(self):
+        """测试关键词规范化"""
+        assert normalize_keyword("  Python   SDK ") == "python sdk"
+
+    def test_make_key_normalizes_filters(self, tmp_path):
+        """测试缓存键忽略关键词空白和过滤条件顺序"""
+        cache = DiscoveryCache(tmp_path)
+        key1 = cache.make_key("行情 数据", 50, {"language": ["python"], "category": ["data", "api"]})
+        key2 = cache.make_key(" 行情  数据 ", 50, {"category": ["api", "data"], "language": ["python"]})
+
+        assert key1 == key2
+        assert key1 != cache.make_key("行情 数据", 100)
+
+    def test_get_set_and_expire(self, tmp_path):
+        """测试缓存读写与过期"""
+        cache = DiscoveryCache(tmp_path, ttl=60, negative_ttl=0)
+        cache.set("positive", {"hits": [1]})
+        cache.set("negative", {"hits": []}, negative=True)
+
+        assert cache.get("positive") == {"hits": [1]}
+        time.sleep(0.01)
+        assert cache.get("negative") is None
+        assert cache.get("missing") is None
+        assert cache.get_stats()["hits"] == 1
+
+    def test_api_search_uses_cache(self, tmp_path, mock_requests):
+        """测试重复的API搜索只发起一次网络请求"""
+        mock_requests.return_value = MagicMock(
+            status_code=200,
+            text="",
+            json=MagicMock(return_value=_api_payload(["https://www.example.com/a"]))
+        )
+        service = EnhancedMyQuantAPIService(cache=DiscoveryCache(tmp_path))
+
+        first = service.search("测试", limit=50)
+        second = service.search(" 测试 ", limit=50)
+
+        assert mock_requests.call_count == 1
+        assert [hit.url for hit in second.hits] == [hit.url for hit in first.hits]
+
+    def test_api_failure_is_negative_cached(self, tmp_path, mock_requests):
+        """测试请求失败时返回空响应并写入负缓存"""
+        mock_requests.side_effect = requests.exceptions.ConnectionError("offline")
+        service = EnhancedMyQuantAPIService(cache=DiscoveryCache(tmp_path, negative_ttl=60))
+
+        first = service.search("测试", limit=50)
+        second = service.search("测试", limit=50)
+
+        assert first.hits == [] and second.hits == []
+        assert mock_requests.call_count == 1
@@ -0,0 +1,113 @@
+import pytest
+
+from services import NumpyBM25FEngine, SQLiteSearchEngine, WhooshSearchEngine
+from services.facets import FacetBitsets, normalize_filters
+
+PAGE_HTML = """
+<html><head><title>{title}</title><meta name="keywords" content="{tags}"></head>
+<body><div class="content"><h1>{title}</h1><p>{content}</p></div></body></html>
+"""
+
+
+def _page(tmp_path, name, path, title, content, tags="行情"):
+    file_path = tmp_path / f"{name}.html"
+    file_path.write_text(PAGE_HTML.format(title=title, content=content, tags=tags), encoding="utf-8")
+    return {"file_path": str(file_path), "url": f"https://www.myquant.cn/docs2/{path}"}
+
+
+def _urls(result):
+    return sorted(item["url"].rsplit("/docs2/", 1)[-1] for item in result["results"])
+
+
+def _docnums(mask):
+    return [docnum for docnum in range(len(mask) * 8) if mask[docnum // 8] >> (docnum % 8) & 1]
+
+
+class TestFacetBitsets:
+    """测试分面位图的过滤和计数"""
+
+    @pytest.fixture
+    def bitsets(self):
+        return FacetBitsets(10, {
+            "language": {"python": [0, 1, 2], "cpp": [3, 9]},
+            "section": {"sdk": [0, 1, 2, 3, 9], "faq": [5]},
+            "tags": {"行情": [0, 3, 5], "交易": [1]},
+        })
+
+    def test_allowed(self, bitsets):
+        """测试同一分面内OR、不同分面之间AND，未知取值不匹配文档"""
+        assert _docnums(bitsets.allowed({"language": ["python", "cpp"], "tags": ["行情"]})) == [0, 3]
+        assert _docnums(bitsets.allowed({"section": ["faq", "sdk"]})) == [0, 1, 2, 3, 5, 9]
+        assert _docnums(bitsets.allowed({"language": ["java"]})) == []
+
+    def test_counts(self, bitsets):
+        """测试计数按文档数降序，只统计过滤后的命中文档"""
+        assert bitsets.counts([0, 1, 3, 5, 9]) == {
+            "language": {"cpp": 2, "python": 2},
+            "section": {"sdk": 4, "faq": 1},
+            "tags": {"行情": 3, "交易": 1},
+        }
+        allowed = bitsets.allowed({"language": ["cpp"]})
+        assert bitsets.counts([0, 1, 3, 5, 9], allowed)["tags"] == {"行情": 1}
+        assert bitsets.counts([0, 1, 3, 5, 9], limit=1)["section"] == {"sdk": 4}
+
+    def test_normalize_filters(self):
+        """测试单个字符串视为一个取值，语言和栏目转为小写，未知分面报错"""
+        assert normalize_filters({"language": "Python", "section": [], "tags": ["行情", ""]}) == {
+            "language": ["python"], "tags": ["行情"]
+        }
+        with pytest.raises(ValueError):
+            normalize_filters({"category": ["api"]})
+
+
+@pytest.fixture(params=[WhooshSearchEngine, NumpyBM25FEngine, SQLiteSearchEngine])
+def engine(request, tmp_path):
+    engine = request.param(tmp_path / "index")
+    engine.add_documents([
+        _page(tmp_path, "py", "sdk/python/history.html", "历史行情", "查询历史行情数据"),
+        _page(tmp_path, "cpp", "sdk/cpp/history.html", "历史行情", "查询历史行情数据", tags="行情,数据查询"),
+        _page(tmp_path, "faq", "faq/quote.html", "行情常见问题", "行情数据的常见问题", tags="问答"),
+    ])
+    return engine
+
+
+class TestSearchFacets:
+    """测试各后端按URL路径得到的分面过滤和计数"""
+
+    def test_facet_counts(self, engine):
+        """测试搜索结果附带命中文档的分面计数"""
+        facets = engine.search("行情")["facets"]
+        assert facets["language"] == {"cpp": 1, "python": 1}
+        assert facets["section"] == {"sdk": 2, "faq": 1}
+        assert facets["tags"]["行情"] == 2
+
+    def test_filters(self, engine):
+        """测试各查询方式按语言和栏目过滤，计数只统计过滤后的命中"""
+        result = engine.search("行情", filters={"language": ["python"]})
+        assert _urls(result) == ["sdk/python/history.html"]
+        assert result["facets"]["section"] == {"sdk": 1}
+
+        assert _urls(engine.phrase_search("历史行情", filters={"language": "cpp"})) == ["sdk/cpp/history.html"]
+        assert _urls(engine.boolean_search("行情 AND 数据", filters={"section": "faq"})) == ["faq/quote.html"]
+        assert _urls(engine.fuzzy_search("行情", filters={"section": "sdk"})) == [
+            "sdk/cpp/history.html", "sdk/python/history.html"
+        ]
+        assert engine.search("行情", filters={"language": ["java"]})["results"] == []
+
+    def test_tag_filter(self, engine):
+        """测试标签与关键词组合时标签在评分前过滤"""
+        assert _urls(engine.tag_search("数据查询", "历史")) == ["sdk/cpp/history.html"]
+        assert _urls(engine.tag_search("行情", filters={"language": "python"})) == ["sdk/python/history.html"]
+
+    def test_batch_filters(self, engine):
+        """测试批量查询的各查询可以分别指定过滤条件"""
+        result = engine.search_batch([{"query": "行情", "section": "faq"}, {"query": "行情", "language": "cpp"}])
+        assert [_urls(item) for item in result["results"]] == [["faq/quote.html"], ["sdk/cpp/history.html"]]
+
+    def test_counts_follow_updates(self, engine, tmp_path):
+        """测试新的提交后分面位图随索引版本更新"""
+        engine.write_batch([("delete", ["https://www.myquant.cn/docs2/sdk/cpp/history.html"])])
+        assert engine.search("行情")["facets"]["language"] == {"python": 1}
+
+        engine.add_documents([_page(tmp_path, "cs", "sdk/csharp/history.html", "历史行情", "C#历史行情")])
+        assert engine.search("行情")["facets"]["language"] == {"csharp": 1, "python": 1}
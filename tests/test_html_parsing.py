@@ -5,9 +5,9 @@ from pathlib import Path
 class TestHTMLParsing:
     """测试HTML解析的各种边缘情况"""
     
-    def test_parse_html_without_p_tags(self):
+    def test_parse_html_without_p_tags(self, tmp_path):
         """测试没有p标签的HTML解析"""
-        search_engine = WhooshSearchEngine()
+        search_engine = WhooshSearchEngine(tmp_path / "index")
         
         # HTML内容没有p标签，只有div和span
         html_content = """
@@ -40,9 +40,9 @@ class TestHTMLParsing:
         # 清理临时文件
         tmp_file.unlink()
     
-    def test_parse_html_with_main_content_div(self):
+    def test_parse_html_with_main_content_div(self, tmp_path):
         """测试主要内容在main-content div中的HTML解析"""
-        search_engine = WhooshSearchEngine()
+        search_engine = WhooshSearchEngine(tmp_path / "index")
         
         # HTML内容主要在main-content div中，没有p标签，测试main-content div提取
         html_content = """
@@ -80,9 +80,9 @@ class TestHTMLParsing:
         # 清理临时文件
         tmp_file.unlink()
     
-    def test_parse_html_with_theme_default_content(self):
+    def test_parse_html_with_theme_default_content(self, tmp_path):
         """测试主要内容在theme-default-content div中的HTML解析"""
-        search_engine = WhooshSearchEngine()
+        search_engine = WhooshSearchEngine(tmp_path / "index")
         
         # HTML内容主要在theme-default-content div中（常见于VuePress等静态网站）
         html_content = """
@@ -118,9 +118,9 @@ class TestHTMLParsing:
         # 清理临时文件
         tmp_file.unlink()
     
-    def test_parse_html_only_body(self):
+    def test_parse_html_only_body(self, tmp_path):
         """测试只有body内容的HTML解析"""
-        search_engine = WhooshSearchEngine()
+        search_engine = WhooshSearchEngine(tmp_path / "index")
         
         # HTML内容只有body标签，没有p标签和特定的content div
         html_content = """
@@ -154,9 +154,9 @@ class TestHTMLParsing:
         # 清理临时文件
         tmp_file.unlink()
     
-    def test_parse_html_empty_content(self):
+    def test_parse_html_empty_content(self, tmp_path):
         """测试空内容的HTML解析"""
-        search_engine = WhooshSearchEngine()
+        search_engine = WhooshSearchEngine(tmp_path / "index")
         
         # HTML内容只有标题，没有实际内容
         html_content = """
@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+
+from core.http_transport import ConcurrencyLimitMiddleware, RequestTimingMiddleware
+
+
+def _scope(session_id=None, method="POST", path="/mcp"):
+    headers = [(b"mcp-session-id", session_id.encode())] if session_id else []
+    return {"type": "http", "method": method, "path": path, "headers": headers, "client": ("127.0.0.1", 5000)}
+
+
+async def _call(app, scope):
+    """调用ASGI应用，返回响应状态码和响应头"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = next(message for message in messages if message["type"] == "http.response.start")
+    return start["status"], dict(start["headers"])
+
+
+def _slow_app(delay=0.1):
+    """模拟处理耗时的ASGI应用，记录最大并发数"""
+    state = {"active": 0, "max_active": 0}
+
+    async def app(scope, receive, send):
+        state["active"] += 1
+        state["max_active"] = max(state["max_active"], state["active"])
+        await asyncio.sleep(delay)
+        state["active"] -= 1
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    return app, state
+
+
+class TestConcurrencyLimit:
+    """测试按客户端会话的并发限制"""
+
+    @pytest.mark.asyncio
+    async def test_per_client_limit(self):
+        """测试单个客户端的并发请求排队执行"""
+        app, state = _slow_app(0.05)
+        limiter = ConcurrencyLimitMiddleware(app, per_client=2, total=10, queue_timeout=5)
+
+        results = await asyncio.gather(*[_call(limiter, _scope("a")) for _ in range(6)])
+
+        assert all(status == 200 for status, _ in results)
+        assert state["max_active"] == 2
+        assert limiter.get_stats()["active_clients"] == 0
+
+    @pytest.mark.asyncio
+    async def test_clients_are_isolated(self):
+        """测试不同客户端的名额互不影响"""
+        app, state = _slow_app(0.05)
+        limiter = ConcurrencyLimitMiddleware(app, per_client=1, total=10, queue_timeout=5)
+
+        await asyncio.gather(*[_call(limiter, _scope(f"client{i}")) for i in range(4)])
+
+        assert state["max_active"] == 4
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout_rejects(self):
+        """测试等待超时返回429"""
+        app, _ = _slow_app(0.2)
+        limiter = ConcurrencyLimitMiddleware(app, per_client=1, total=10, queue_timeout=0.05)
+
+        statuses = sorted(status for status, _ in await asyncio.gather(
+            _call(limiter, _scope("a")), _call(limiter, _scope("a"))
+        ))
+
+        assert statuses == [200, 429]
+        assert limiter.get_stats()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_get_stream_not_limited(self):
+        """测试GET推送流不占用名额"""
+        app, state = _slow_app(0.05)
+        limiter = ConcurrencyLimitMiddleware(app, per_client=1, total=1, queue_timeout=0.01)
+
+        results = await asyncio.gather(*[_call(limiter, _scope("a", method="GET")) for _ in range(3)])
+
+        assert all(status == 200 for status, _ in results)
+        assert state["max_active"] == 3
+
+
+class TestRequestTiming:
+    """测试请求级耗时统计"""
+
+    @pytest.mark.asyncio
+    async def test_records_timing(self):
+        """测试记录耗时并附带Server-Timing响应头"""
+        app, _ = _slow_app(0.02)
+        timing = RequestTimingMiddleware(app)
+
+        status, headers = await _call(timing, _scope("a"))
+
+        assert status == 200
+        assert headers[b"server-timing"].startswith(b"app;dur=")
+        stats = timing.tracker.get_stats()["POST /mcp"]
+        assert stats["count"] == 1
+        assert stats["p50_ms"] >= 20
@@ -0,0 +1,137 @@
+import pytest
+from whoosh import index
+
+from services.whoosh_service import CURRENT_POINTER, WhooshSearchEngine
+
+PAGE_HTML = """
+<html><head><title>{title}</title></head>
+<body><h1>{title}</h1><p>{title} 文档内容</p></body></html>
+"""
+
+
+@pytest.fixture
+def pages(tmp_path):
+    """创建3个本地页面，返回文件-URL对"""
+    pages_dir = tmp_path / "pages"
+    pages_dir.mkdir()
+    pairs = []
+    for name in ["alpha", "beta", "gamma"]:
+        file_path = pages_dir / f"{name}.html"
+        file_path.write_text(PAGE_HTML.format(title=name), encoding="utf-8")
+        pairs.append({"file_path": str(file_path), "url": f"https://www.myquant.cn/docs2/{name}.html"})
+    return pairs
+
+
+class TestIndexGenerations:
+    """测试分代索引的重建和切换"""
+
+    def test_new_index_uses_generation(self, tmp_path):
+        """测试新建索引写入代目录并记录CURRENT指针"""
+        index_dir = tmp_path / "index"
+        index_dir.mkdir()
+        engine = WhooshSearchEngine(index_dir)
+
+        assert (index_dir / CURRENT_POINTER).read_text(encoding="utf-8") == engine.generation
+        assert index.exists_in(index_dir / engine.generation)
+        assert engine.get_index_stats()["generation"] == engine.generation
+
+    def test_rebuild_switches_generation(self, tmp_path, pages):
+        """测试重建写入新代，旧代上已打开的searcher不受影响"""
+        index_dir = tmp_path / "index"
+        index_dir.mkdir()
+        engine = WhooshSearchEngine(index_dir)
+        engine.add_documents(pages[:1])
+        old_generation = engine.generation
+
+        with engine.index.searcher() as old_searcher:
+            result = engine.rebuild_index(pages)
+
+            assert result["success_count"] == 3
+            assert engine.generation != old_generation
+            assert old_searcher.doc_count() == 1
+
+        assert engine.get_index_stats()["total_docs"] == 3
+        assert (index_dir / CURRENT_POINTER).read_text(encoding="utf-8") == engine.generation
+
+    def test_other_engine_hot_swaps(self, tmp_path, pages):
+        """测试其他实例（模拟其他进程）在下次访问时切换到新代"""
+        index_dir = tmp_path / "index"
+        index_dir.mkdir()
+        reader = WhooshSearchEngine(index_dir)
+        rebuilder = WhooshSearchEngine(index_dir)
+
+        rebuilder.rebuild_index(pages)
+
+        assert reader.generation != rebuilder.generation
+        assert reader.get_index_stats()["total_docs"] == 3
+        assert reader.generation == rebuilder.generation
+
+    def test_failed_rebuild_keeps_old_index(self, tmp_path, pages, monkeypatch):
+        """测试重建中途失败时旧索引保持不变，未完成的代目录被删除"""
+        index_dir = tmp_path / "index"
+        index_dir.mkdir()
+        engine = WhooshSearchEngine(index_dir)
+        engine.add_documents(pages[:1])
+        old_generation = engine.generation
+
+        def fail(*args, **kwargs):
+            raise RuntimeError("磁盘已满")
+
+        monkeypatch.setattr(engine, "write_batch", fail)
+        with pytest.raises(RuntimeError):
+            engine.rebuild_index(pages)
+
+        assert engine.generation == old_generation
+        assert (index_dir / CURRENT_POINTER).read_text(encoding="utf-8") == old_generation
+        assert [path.name for path in index_dir.iterdir() if path.is_dir()] == [old_generation]
+        assert engine.get_index_stats()["total_docs"] == 1
+
+    def test_gc_keeps_previous_generation(self, tmp_path, pages):
+        """测试清理时保留当前代和上一代"""
+        index_dir = tmp_path / "index"
+        index_dir.mkdir()
+        engine = WhooshSearchEngine(index_dir)
+        first = engine.generation
+
+        engine.rebuild_index(pages)
+        second = engine.generation
+        engine.rebuild_index(pages)
+
+        generations = sorted(path.name for path in index_dir.iterdir() if path.is_dir())
+        assert first not in generations
+        assert generations == sorted([second, engine.generation])
+
+    def test_legacy_index_migrated_on_rebuild(self, tmp_path, pages):
+        """测试分代之前的旧版索引可继续使用，重建后迁移到代目录"""
+        index_dir = tmp_path / "index"
+        index_dir.mkdir()
+        legacy = WhooshSearchEngine(index_dir)
+        # 模拟旧版布局：索引文件直接存放在index_dir中
+        (index_dir / CURRENT_POINTER).unlink()
+        index.create_in(index_dir, legacy.schema)
+
+        engine = WhooshSearchEngine(index_dir)
+        assert engine.generation is None
+
+        engine.rebuild_index(pages)
+
+        assert engine.generation is not None
+        assert not index.exists_in(index_dir)
+        assert engine.get_index_stats()["total_docs"] == 3
+
+    def test_legacy_cleanup_only_on_migration(self, tmp_path, pages, monkeypatch):
+        """测试旧版索引只在迁移时清理一次，之后的重建和清理不再扫描index_dir"""
+        engine = WhooshSearchEngine(tmp_path / "index")
+        monkeypatch.setattr(engine, "_remove_legacy_index", lambda: pytest.fail("已分代的索引不应清理旧版文件"))
+
+        engine.rebuild_index(pages)
+        engine.gc_generations()
+
+    def test_add_document_replaces_existing(self, tmp_path, pages):
+        """测试单个文档的添加走批量写入路径，重复添加时替换而不是重复写入"""
+        engine = WhooshSearchEngine(tmp_path / "index")
+
+        assert engine.add_document(pages[0]["file_path"], pages[0]["url"])
+        assert engine.add_document(pages[0]["file_path"], pages[0]["url"])
+
+        assert engine.get_index_stats()["total_docs"] == 1
@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+
+from services.index_writer import IndexWriterActor
+from services.whoosh_service import WhooshSearchEngine
+
+PAGE_HTML = """
+<html><head><title>{title}</title></head>
+<body><h1>{title}</h1><p>{body}</p></body></html>
+"""
+
+
+def _write_pages(tmp_path, count, body="行情数据"):
+    """生成测试页面，返回file_url_pairs"""
+    pairs = []
+    for i in range(count):
+        file_path = tmp_path / f"page{i}.html"
+        file_path.write_text(PAGE_HTML.format(title=f"页面{i}", body=body), encoding="utf-8")
+        pairs.append({"file_path": str(file_path), "url": f"https://www.myquant.cn/docs2/page{i}.html"})
+    return pairs
+
+
+class TestIndexWriterActor:
+    """测试索引写入任务"""
+
+    @pytest.fixture
+    def engine(self, tmp_path):
+        index_dir = tmp_path / "index"
+        index_dir.mkdir()
+        return WhooshSearchEngine(index_dir)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_adds_coalesced(self, tmp_path, engine):
+        """测试并发添加合并为一次提交，返回时文档已对搜索可见"""
+        pairs = _write_pages(tmp_path, 10)
+        actor = IndexWriterActor(engine, batch_size=50, flush_interval=0.1)
+
+        results = await asyncio.gather(*[actor.add([pair]) for pair in pairs])
+
+        assert all(result["success_count"] == 1 for result in results)
+        assert actor.get_stats()["commits"] == 1
+        assert engine.indexed_urls() == {pair["url"] for pair in pairs}
+
+        # 同一URL重复添加时跳过
+        again = await actor.add(pairs[:1])
+        assert again["skipped_count"] == 1
+        await actor.stop()
+
+    @pytest.mark.asyncio
+    async def test_commit_by_count(self, tmp_path, engine):
+        """测试累积文档数达到批量大小时立即提交"""
+        pairs = _write_pages(tmp_path, 4)
+        actor = IndexWriterActor(engine, batch_size=2, flush_interval=10)
+
+        await asyncio.wait_for(asyncio.gather(*[actor.add([pair]) for pair in pairs]), timeout=5)
+
+        assert actor.get_stats()["commits"] == 2
+        await actor.stop()
+
+    @pytest.mark.asyncio
+    async def test_update_and_delete(self, tmp_path, engine):
+        """测试更新和删除请求"""
+        pairs = _write_pages(tmp_path, 2)
+        actor = IndexWriterActor(engine, flush_interval=0.01)
+        await actor.add(pairs)
+
+        _write_pages(tmp_path, 1, body="交易接口")
+        update_result, delete_result = await asyncio.gather(
+            actor.update(pairs[:1]), actor.delete([pairs[1]["url"]])
+        )
+
+        assert update_result["success_count"] == 1
+        assert delete_result["deleted_count"] == 1
+        assert engine.indexed_urls() == {pairs[0]["url"]}
+        assert engine.search("交易接口")["total_hits"] == 1
+        await actor.stop()
+
+    @pytest.mark.asyncio
+    async def test_failed_commit_propagates(self):
+        """测试提交失败时所有等待方都收到异常，写入任务继续运行"""
+        engine = MagicMock()
+        engine.write_batch.side_effect = RuntimeError("LockError")
+        actor = IndexWriterActor(engine, flush_interval=0.01)
+
+        results = await asyncio.gather(actor.add([]), actor.delete([]), return_exceptions=True)
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert actor.get_stats()["failed_commits"] == 1
+        assert actor.get_stats()["running"] is True
+        await actor.stop()
+        assert actor.get_stats()["running"] is False
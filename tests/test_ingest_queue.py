@@ -0,0 +1,112 @@
+import pytest
+from unittest.mock import MagicMock
+
+from services.downloader import SmartDownloader
+from services.ingest_queue import IndexReconciler, IngestQueue
+from services.whoosh_service import WhooshSearchEngine
+from services.write_lease import WriterLease
+
+PAGE_HTML = """
+<html><head><title>{title}</title></head>
+<body><h1>{title}</h1><p>{title} 文档内容</p></body></html>
+"""
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    """创建包含3个已下载页面的文档目录"""
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    downloader = SmartDownloader(docs_dir)
+    for name in ["a", "b", "c"]:
+        url = f"https://www.myquant.cn/docs2/{name}.html"
+        downloader.get_file_path(url).write_text(PAGE_HTML.format(title=name), encoding="utf-8")
+        downloader.url_map[downloader.url_to_filename(url)] = {"url": url}
+    return downloader
+
+
+class TestIngestQueue:
+    """测试索引补录队列"""
+
+    def test_persistence(self, tmp_path):
+        """测试队列持久化和失败计数"""
+        queue = IngestQueue(tmp_path / "queue.json")
+        assert queue.add(["https://www.myquant.cn/docs2/a.html#x", "https://www.myquant.cn/docs2/a.html"]) == 1
+        queue.record_failures(["https://www.myquant.cn/docs2/a.html"])
+
+        reloaded = IngestQueue(tmp_path / "queue.json")
+        assert "https://www.myquant.cn/docs2/a.html" in reloaded
+        assert reloaded.get_stats()["failed_attempts"] == 1
+
+        reloaded.remove(["https://www.myquant.cn/docs2/a.html"])
+        assert len(IngestQueue(tmp_path / "queue.json")) == 0
+
+    def test_save_merges_other_processes(self, tmp_path):
+        """测试多个进程共用队列文件时保存不覆盖其他进程的入队和出队"""
+        first = IngestQueue(tmp_path / "queue.json")
+        second = IngestQueue(tmp_path / "queue.json")
+        first.add(["https://www.myquant.cn/docs2/a.html", "https://www.myquant.cn/docs2/b.html"])
+        second.add(["https://www.myquant.cn/docs2/c.html"])
+        assert second.pending() == [
+            "https://www.myquant.cn/docs2/a.html",
+            "https://www.myquant.cn/docs2/b.html",
+            "https://www.myquant.cn/docs2/c.html",
+        ]
+
+        # first中仍有a，保存时不应把second移除的页面写回
+        second.remove(["https://www.myquant.cn/docs2/a.html", "https://www.myquant.cn/docs2/c.html"])
+        first.record_failures(["https://www.myquant.cn/docs2/b.html"])
+
+        reloaded = IngestQueue(tmp_path / "queue.json")
+        assert reloaded.pending() == ["https://www.myquant.cn/docs2/b.html"]
+        assert reloaded.get_stats()["failed_attempts"] == 1
+        assert not list(tmp_path.glob("*.tmp"))
+
+
+class TestIndexReconciler:
+    """测试下载目录与索引的对账"""
+
+    def test_reconcile_only_missing(self, tmp_path, catalog):
+        """测试只补录索引中缺失的页面"""
+        engine = WhooshSearchEngine(tmp_path)
+        engine.add_documents([{"file_path": str(catalog.get_file_path("https://www.myquant.cn/docs2/a.html")),
+                               "url": "https://www.myquant.cn/docs2/a.html"}])
+
+        reconciler = IndexReconciler(catalog, engine, IngestQueue(tmp_path / "queue.json"),
+                                     lease=WriterLease(tmp_path / "writer.lock", tmp_path / "spool"))
+        result = reconciler.reconcile()
+
+        assert result == {"catalog": 3, "missing": 2, "indexed": 2, "failed": 0}
+        assert engine.indexed_urls() == reconciler.catalog_urls()
+        assert len(reconciler.queue) == 0
+
+        # 再次对账时没有缺失页面
+        assert reconciler.reconcile()["missing"] == 0
+
+    def test_failed_pages_stay_queued(self, tmp_path, catalog):
+        """测试索引失败的页面保留在队列中"""
+        engine = MagicMock()
+        engine.indexed_urls.return_value = set()
+        engine.add_documents.side_effect = lambda pairs: {
+            "total_count": len(pairs), "success_count": len(pairs) - 1, "failure_count": 1,
+            "skipped_count": 0, "failed_urls": [pairs[0]["url"]],
+        }
+
+        reconciler = IndexReconciler(catalog, engine, IngestQueue(tmp_path / "queue.json"),
+                                     lease=WriterLease(tmp_path / "writer.lock", tmp_path / "spool"))
+        result = reconciler.reconcile()
+
+        assert result["indexed"] == 2
+        assert result["failed"] == 1
+        assert reconciler.queue.pending() == ["https://www.myquant.cn/docs2/a.html"]
+
+    def test_indexed_urls_ignores_deleted(self, tmp_path, catalog):
+        """测试已删除文档的URL不计入索引"""
+        engine = WhooshSearchEngine(tmp_path)
+        url = "https://www.myquant.cn/docs2/b.html"
+        engine.add_documents([{"file_path": str(catalog.get_file_path(url)), "url": url}])
+
+        with engine.index.writer() as writer:
+            writer.delete_by_term("url", url)
+
+        assert url not in engine.indexed_urls()
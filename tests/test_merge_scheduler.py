@@ -0,0 +1,109 @@
+import asyncio
+import pytest
+
+from services.index_writer import IndexWriterActor
+from services.merge_scheduler import SegmentMergeScheduler
+from services.whoosh_service import WhooshSearchEngine, plan_tiered_merge
+
+PAGE_HTML = """
+<html><head><title>{title}</title></head>
+<body><h1>{title}</h1><p>行情数据</p></body></html>
+"""
+
+
+class FakeSegment:
+    """只提供文档计数的测试段"""
+
+    def __init__(self, doc_count, deleted_count=0):
+        self._doc_count = doc_count
+        self._deleted_count = deleted_count
+
+    def doc_count_all(self):
+        return self._doc_count
+
+    def deleted_count(self):
+        return self._deleted_count
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """创建包含6个小段的索引（每个文档单独提交且不自动合并）"""
+    index_dir = tmp_path / "index"
+    index_dir.mkdir()
+    engine = WhooshSearchEngine(index_dir)
+    for i in range(6):
+        file_path = tmp_path / f"page{i}.html"
+        file_path.write_text(PAGE_HTML.format(title=f"页面{i}"), encoding="utf-8")
+        writer = engine.index.writer()
+        writer.add_document(**engine._parse_html(file_path, f"https://www.myquant.cn/docs2/page{i}.html"))
+        writer.commit(merge=False)
+    return engine
+
+
+class TestTieredMergePlan:
+    """测试分层合并策略"""
+
+    def test_merges_full_tier_only(self):
+        """测试只合并段数达到factor的层"""
+        small = [FakeSegment(5) for _ in range(3)]
+        large = [FakeSegment(500), FakeSegment(800)]
+
+        assert plan_tiered_merge(small + large, factor=3) == small
+        assert plan_tiered_merge(small[:2] + large, factor=3) == []
+
+    def test_rewrites_segment_with_many_deletions(self):
+        """测试已删除文档过多的段单独重写"""
+        segment = FakeSegment(100, deleted_count=40)
+        assert plan_tiered_merge([segment, FakeSegment(100)], factor=10, deleted_ratio=0.3) == [segment]
+
+
+class TestSegmentMerge:
+    """测试段合并"""
+
+    def test_merge_reduces_segments(self, engine):
+        """测试合并减少段数，合并前打开的searcher不受影响"""
+        assert engine.segment_stats()["segment_count"] == 6
+
+        with engine.index.searcher() as old_searcher:
+            result = engine.merge_segments(factor=3)
+            assert old_searcher.doc_count() == 6
+
+        assert result["segments_before"] == 6
+        assert result["segments_after"] == 1
+        assert engine.get_index_stats()["total_docs"] == 6
+        assert engine.search("行情")["total_hits"] == 6
+
+    def test_no_merge_needed(self, engine):
+        """测试没有满层时不打开writer"""
+        result = engine.merge_segments(factor=10)
+        assert result["merged_segments"] == 0
+        assert engine.segment_stats()["segment_count"] == 6
+
+    def test_scheduler_history(self, engine):
+        """测试调度器记录合并历史"""
+        scheduler = SegmentMergeScheduler(engine, factor=3)
+
+        assert scheduler.maybe_merge()["segments_after"] == 1
+        assert scheduler.maybe_merge() is None
+
+        stats = scheduler.get_stats()
+        assert stats["checks"] == 2
+        assert stats["merges"] == 1
+        assert stats["segment_count"] == 1
+        assert len(stats["history"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_writer_merges_when_idle(self, engine):
+        """测试写入任务空闲时执行段合并"""
+        scheduler = SegmentMergeScheduler(engine, idle_seconds=0.05, factor=3)
+        actor = IndexWriterActor(engine, merge_scheduler=scheduler)
+
+        actor._ensure_started()
+        for _ in range(50):
+            if scheduler.merge_count:
+                break
+            await asyncio.sleep(0.05)
+        await actor.stop()
+
+        assert scheduler.merge_count == 1
+        assert actor.get_stats()["merge"]["segment_count"] == 1
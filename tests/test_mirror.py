@@ -0,0 +1,86 @@
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from services.downloader import SmartDownloader
+from services.mirror import SiteMirror
+from services.whoosh_service import WhooshSearchEngine
+from services.write_lease import WriterLease
+
+# 本地站点的测试页面：首页链接到a、b，a再链接到c
+FIXTURE_PAGES = {
+    "index.html": '<html><head><title>首页</title></head><body><p>文档首页</p>'
+                  '<a href="a.html">A</a><a href="b.html#anchor">B</a>'
+                  '<a href="https://other.example.com/x.html">外部</a></body></html>',
+    "a.html": '<html><head><title>行情接口</title></head><body><p>订阅行情数据</p>'
+              '<a href="sub/c.html">C</a></body></html>',
+    "b.html": '<html><head><title>交易接口</title></head><body><p>下单和撤单</p>'
+              '<a href="index.html">首页</a></body></html>',
+    "sub/c.html": '<html><head><title>回测</title></head><body><p>策略回测说明</p></body></html>',
+}
+
+
+@pytest_asyncio.fixture
+async def doc_site():
+    """启动本地HTTP服务，模拟文档站点"""
+    async def handle(request):
+        page = FIXTURE_PAGES.get(request.match_info["path"])
+        if page is None:
+            raise web.HTTPNotFound()
+        return web.Response(text=page, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/docs2/{path:.*}", handle)
+    server = TestServer(app)
+    await server.start_server()
+    yield str(server.make_url("/docs2/"))
+    await server.close()
+
+
+def _make_mirror(tmp_path, url_prefix):
+    """构建使用临时目录的镜像实例"""
+    docs_dir = tmp_path / "docs"
+    index_dir = tmp_path / "index"
+    docs_dir.mkdir(exist_ok=True)
+    index_dir.mkdir(exist_ok=True)
+
+    return SiteMirror(
+        downloader=SmartDownloader(docs_dir, request_delay=0),
+        search_engine=WhooshSearchEngine(index_dir),
+        state_file=tmp_path / "mirror_state.json",
+        url_prefix=url_prefix,
+        max_concurrent=2,
+        index_batch_size=2,
+        lease=WriterLease(tmp_path / "writer.lock", tmp_path / "spool"),
+    )
+
+
+class TestSiteMirror:
+    """测试全站镜像"""
+
+    @pytest.mark.asyncio
+    async def test_mirror_follows_links(self, tmp_path, doc_site):
+        """测试跟随站内链接镜像全部页面并建立索引"""
+        mirror = _make_mirror(tmp_path, doc_site)
+
+        stats = await mirror.run(seed_urls=[doc_site + "index.html"])
+
+        assert stats["done"] == 4
+        assert stats["pending"] == 0
+        assert mirror.search_engine.search("回测")["total_hits"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_mirror_resumes_after_interrupt(self, tmp_path, doc_site):
+        """测试中断后从持久化的队列继续爬取"""
+        first = _make_mirror(tmp_path, doc_site)
+        stats = await first.run(seed_urls=[doc_site + "index.html"], max_pages=1)
+
+        assert stats["done"] == 1
+        assert stats["pending"] == 2
+
+        resumed = _make_mirror(tmp_path, doc_site)
+        stats = await resumed.run()
+
+        assert stats["done"] == 4
+        assert stats["pending"] == 0
+        assert resumed.search_engine.get_index_stats()["total_docs"] == 4
@@ -0,0 +1,102 @@
+import pytest
+from unittest.mock import MagicMock
+from config import DISCOVERY_ATTRIBUTES
+from services.discovery_cache import DiscoveryCache
+from services.myquant_api import EnhancedMyQuantAPIService, HitRecord, MeiliSearchResponse
+
+TOTAL_HITS = 250
+
+
+def _paged_api(*args, json=None, **kwargs):
+    """模拟按offset/limit分页返回的MeiliSearch接口"""
+    offset, limit = json["offset"], json["limit"]
+    hits = [
+        {"objectID": str(i), "url": f"https://www.example.com/{i}.html", "hierarchy_lvl0": "API文档"}
+        for i in range(offset, min(offset + limit, TOTAL_HITS))
+    ]
+    payload = {
+        "hits": hits, "query": json["q"], "processingTimeMs": 1,
+        "limit": limit, "offset": offset, "estimatedTotalHits": TOTAL_HITS,
+    }
+    return MagicMock(status_code=200, text="", json=MagicMock(return_value=payload))
+
+
+class TestPaginatedDiscovery:
+    """测试分页并发发现"""
+
+    def test_large_limit_is_paginated(self, tmp_path, mock_requests):
+        """测试大limit按偏移分页请求并合并结果"""
+        mock_requests.side_effect = _paged_api
+        service = EnhancedMyQuantAPIService(cache=DiscoveryCache(tmp_path))
+
+        response = service.search("", limit=500)
+
+        offsets = sorted(call.kwargs["json"]["offset"] for call in mock_requests.call_args_list)
+        assert offsets == [0, 100, 200]
+        assert len(response.hits) == TOTAL_HITS
+        assert len(service.extract_unique_urls(response)) == TOTAL_HITS
+
+    def test_request_only_needed_attributes(self, tmp_path, mock_requests):
+        """测试只请求发现流程用到的属性"""
+        mock_requests.side_effect = _paged_api
+        service = EnhancedMyQuantAPIService(cache=DiscoveryCache(tmp_path))
+
+        service.search("行情", limit=50)
+
+        request_data = mock_requests.call_args.kwargs["json"]
+        assert request_data["attributesToRetrieve"] == DISCOVERY_ATTRIBUTES
+        assert "attributesToHighlight" not in request_data
+
+    def test_filters_sent_with_every_page(self, tmp_path, mock_requests):
+        """测试过滤条件转换为MeiliSearch过滤表达式，随每个分页请求发送"""
+        mock_requests.side_effect = _paged_api
+        service = EnhancedMyQuantAPIService(cache=DiscoveryCache(tmp_path))
+
+        service.search("", limit=500, filters={"document_type": ["api"], "language": ["python", "cpp"], "category": [""]})
+
+        expected = [['document_type = "api"'], ['language = "python"', 'language = "cpp"']]
+        assert [call.kwargs["json"]["filter"] for call in mock_requests.call_args_list] == [expected] * 3
+
+
+class TestHitRecord:
+    """测试轻量搜索结果记录"""
+
+    def test_from_dict_and_round_trip(self):
+        """测试从字典构建并通过响应模型序列化往返"""
+        response = MeiliSearchResponse(
+            hits=[{"objectID": "1", "url": "https://www.example.com/a", "anchor": "sec",
+                   "hierarchy_lvl0": "API文档", "hierarchy_lvl1": "数据查询", "extra": "ignored"}],
+            query="q", processingTimeMs=1, limit=1, offset=0, estimatedTotalHits=1,
+        )
+        hit = response.hits[0]
+
+        assert isinstance(hit, HitRecord)
+        assert hit.title == "数据查询"
+        assert hit.hierarchy == ["API文档", "数据查询"]
+        assert not hasattr(hit, "__dict__")
+
+        restored = MeiliSearchResponse.model_validate(response.model_dump())
+        assert restored.hits[0].anchor == "sec"
+
+    def test_extract_url_metadata(self):
+        """测试按页面汇总层级、锚点和分类元数据"""
+        response = MeiliSearchResponse(
+            hits=[
+                {"objectID": "2", "url": "https://www.example.com/a.html#history",
+                 "hierarchy_lvl0": "API文档", "hierarchy_lvl1": "数据查询", "hierarchy_lvl2": "history",
+                 "language": "python"},
+                {"objectID": "1", "url": "https://www.example.com/a.html",
+                 "hierarchy_lvl0": "API文档", "hierarchy_lvl1": "数据查询", "document_type": "api"},
+            ],
+            query="q", processingTimeMs=1, limit=2, offset=0, estimatedTotalHits=2,
+        )
+
+        metadata = EnhancedMyQuantAPIService(cache=MagicMock()).extract_url_metadata(response)
+
+        assert list(metadata) == ["https://www.example.com/a.html"]
+        page = metadata["https://www.example.com/a.html"]
+        assert page["title"] == "数据查询"
+        assert page["hierarchy"] == ["API文档", "数据查询"]
+        assert page["anchors"] == ["history"]
+        assert page["document_type"] == "api"
+        assert page["language"] == "python"
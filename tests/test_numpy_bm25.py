@@ -0,0 +1,90 @@
+import pytest
+
+from services import NumpyBM25FEngine, WhooshSearchEngine, create_search_engine
+from services.numpy_bm25 import ScoredHit
+
+PAGE_HTML = """
+<html><head><title>{title}</title><meta name="keywords" content="{tags}"></head>
+<body><div class="content"><h1>{title}</h1><p>{content}</p></div></body></html>
+"""
+
+PAGES = [
+    ("bars", "历史行情", "行情", "查询股票的历史K线数据，支持日线和分钟线"),
+    ("tick", "实时行情", "行情", "订阅实时行情推送，回调中处理逐笔数据"),
+    ("order", "下单委托", "交易", "按指定数量委托下单，支持限价和市价委托"),
+    ("cancel", "撤单", "交易", "撤销未成交的委托，查询委托状态"),
+]
+
+
+class TestNumpyBM25FEngine:
+    """测试numpy BM25F搜索后端"""
+
+    @staticmethod
+    def _page(tmp_path, name, title, tags, content):
+        file_path = tmp_path / f"{name}.html"
+        file_path.write_text(PAGE_HTML.format(title=title, tags=tags, content=content), encoding="utf-8")
+        return {"file_path": str(file_path), "url": f"https://www.myquant.cn/docs2/{name}.html"}
+
+    @pytest.fixture
+    def engines(self, tmp_path):
+        index_dir = tmp_path / "index"
+        index_dir.mkdir()
+        whoosh_engine = WhooshSearchEngine(index_dir)
+        # 分两次提交，产生多个段
+        whoosh_engine.add_documents([self._page(tmp_path, *page) for page in PAGES[:2]])
+        whoosh_engine.add_documents([self._page(tmp_path, *page) for page in PAGES[2:]])
+        return whoosh_engine, NumpyBM25FEngine(index_dir)
+
+    @staticmethod
+    def _ranking(result):
+        return [(item["url"], pytest.approx(item["score"], rel=1e-5)) for item in result["results"]]
+
+    def test_scores_match_whoosh(self, engines):
+        """测试关键词搜索和模糊搜索的排名和得分与Whoosh一致"""
+        whoosh_engine, numpy_engine = engines
+
+        for keyword in ["行情", "委托 K线", "实时行情 撤单"]:
+            assert self._ranking(numpy_engine.search(keyword)) == self._ranking(whoosh_engine.search(keyword))
+        assert self._ranking(numpy_engine.fuzzy_search("委讬")) == self._ranking(whoosh_engine.fuzzy_search("委讬"))
+
+    def test_hits_support_highlights(self, engines):
+        """测试结果格式与高亮和Whoosh后端相同"""
+        whoosh_engine, numpy_engine = engines
+        with numpy_engine.index.searcher(weighting=numpy_engine.scorer) as searcher:
+            query, _ = numpy_engine._keyword_query("委托")
+            hits = numpy_engine._search_hits(searcher, query, 10)
+            assert all(isinstance(hit, ScoredHit) for hit in hits)
+
+        result = numpy_engine.search("委托")
+        assert result["results"][0]["url"] == "https://www.myquant.cn/docs2/order.html"
+        assert result["results"][0]["highlights"] == whoosh_engine.search("委托")["results"][0]["highlights"]
+
+    def test_deleted_documents_excluded(self, engines):
+        """测试删除后的文档不再返回（段的倒排表已缓存时）"""
+        whoosh_engine, numpy_engine = engines
+        numpy_engine.search("行情")
+
+        whoosh_engine.write_batch([("delete", ["https://www.myquant.cn/docs2/tick.html"])])
+        urls = [item["url"] for item in numpy_engine.search("行情")["results"]]
+        assert urls == ["https://www.myquant.cn/docs2/bars.html"]
+        assert self._ranking(numpy_engine.search("行情")) == self._ranking(whoosh_engine.search("行情"))
+
+    def test_other_queries_use_whoosh(self, engines):
+        """测试短语、布尔和标签查询交给Whoosh执行"""
+        whoosh_engine, numpy_engine = engines
+
+        assert self._ranking(numpy_engine.phrase_search("实时行情")) == self._ranking(whoosh_engine.phrase_search("实时行情"))
+        assert self._ranking(numpy_engine.boolean_search("委托 AND 撤销")) == \
+            self._ranking(whoosh_engine.boolean_search("委托 AND 撤销"))
+        assert self._ranking(numpy_engine.tag_search("交易")) == self._ranking(whoosh_engine.tag_search("交易"))
+
+
+class TestCreateSearchEngine:
+    """测试按配置选择搜索后端"""
+
+    def test_backends(self, tmp_path):
+        """测试创建对应的后端，未知后端报错"""
+        assert type(create_search_engine("whoosh", tmp_path)) is WhooshSearchEngine
+        assert type(create_search_engine("numpy", tmp_path)) is NumpyBM25FEngine
+        with pytest.raises(ValueError):
+            create_search_engine("lucene", tmp_path)
@@ -0,0 +1,96 @@
+import pytest
+
+from services.whoosh_service import WhooshSearchEngine
+from utils import PinyinIndex, is_latin_query
+
+pytest.importorskip("pypinyin")
+
+PAGE_HTML = """
+<html><head><title>{title}</title></head>
+<body><h1>{title}</h1><p>{body}</p></body></html>
+"""
+
+
+class TestPinyinIndex:
+    """测试拼音/首字母映射"""
+
+    def test_full_pinyin_and_initials(self):
+        """测试全拼和首字母都能查到中文词"""
+        pinyin = PinyinIndex()
+        assert pinyin.add("回测", 3)
+        assert pinyin.add("K线", 1)
+
+        assert pinyin.lookup("huice") == ["回测"]
+        assert pinyin.lookup("Hui'ce") == ["回测"]
+        assert pinyin.lookup("hc") == ["回测"]
+        assert pinyin.lookup("kxian") == ["K线"]
+
+    def test_skips_latin_and_single_char(self):
+        """测试不为英文词和单字建立索引"""
+        pinyin = PinyinIndex()
+        assert not pinyin.add("history")
+        assert not pinyin.add("策")
+        assert len(pinyin) == 0
+
+    def test_orders_by_frequency(self):
+        """测试同音词按词频排序"""
+        pinyin = PinyinIndex()
+        pinyin.add("策略", 1)
+        pinyin.add("测量", 5)
+        assert pinyin.lookup("cl") == ["测量", "策略"]
+
+    def test_is_latin_query(self):
+        """测试纯拉丁字母查询的判断"""
+        assert is_latin_query("huice")
+        assert is_latin_query("hui ce")
+        assert not is_latin_query("回测")
+        assert not is_latin_query("get_history_bars")
+
+
+class TestPinyinSearch:
+    """测试拼音查询展开"""
+
+    @pytest.fixture
+    def engine(self, tmp_path):
+        index_dir = tmp_path / "index"
+        index_dir.mkdir()
+        engine = WhooshSearchEngine(index_dir)
+        file_path = tmp_path / "page.html"
+        file_path.write_text(PAGE_HTML.format(title="策略回测", body="使用历史数据进行回测"), encoding="utf-8")
+        engine.add_documents([{"file_path": str(file_path), "url": "https://www.myquant.cn/docs2/page.html"}])
+        return engine
+
+    def test_search_expands_pinyin(self, engine):
+        """测试拼音和首字母查询能搜到中文文档"""
+        result = engine.search("huice")
+        assert result["total_hits"] == 1
+        assert "回测" in result["pinyin_expansions"]["huice"]
+
+        assert engine.search("hc")["total_hits"] == 1
+
+    def test_fuzzy_search_bridges_scripts(self, engine):
+        """测试模糊搜索支持拼音"""
+        assert engine.fuzzy_search("celue")["total_hits"] == 1
+
+    def test_index_updated_incrementally(self, engine, tmp_path):
+        """测试新文档的词加入拼音索引"""
+        engine.search("huice")
+
+        file_path = tmp_path / "new.html"
+        file_path.write_text(PAGE_HTML.format(title="实时行情", body="订阅行情"), encoding="utf-8")
+        engine.add_documents([{"file_path": str(file_path), "url": "https://www.myquant.cn/docs2/new.html"}])
+
+        assert "行情" in engine._pinyin.lookup("hangqing")
+        assert engine.search("hangqing")["total_hits"] == 1
+
+    def test_commit_does_not_rescan_lexicon(self, engine, tmp_path, monkeypatch):
+        """测试提交后拼音展开只使用新文档的词，不重新扫描整个词表"""
+        engine.search("huice")
+        monkeypatch.setattr(engine, "_term_frequencies", lambda: pytest.fail("提交后不应重新扫描词表"))
+
+        file_path = tmp_path / "new.html"
+        file_path.write_text(PAGE_HTML.format(title="实时行情", body="订阅行情"), encoding="utf-8")
+        engine.add_documents([{"file_path": str(file_path), "url": "https://www.myquant.cn/docs2/new.html"}])
+
+        assert "行情" in engine.expand_pinyin("hangqing")["hangqing"]
+        assert "vocabulary" not in engine._background_refreshes
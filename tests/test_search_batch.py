@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from services import SQLiteSearchEngine, WhooshSearchEngine
+
+PAGE_HTML = """
+<html><head><title>{title}</title><meta name="keywords" content="{tags}"></head>
+<body><div class="content"><h1>{title}</h1><p>{content}</p></div></body></html>
+"""
+
+
+def _page(tmp_path, name, title, content, tags="行情"):
+    file_path = tmp_path / f"{name}.html"
+    file_path.write_text(PAGE_HTML.format(title=title, content=content, tags=tags), encoding="utf-8")
+    return {"file_path": str(file_path), "url": f"https://www.myquant.cn/docs2/{name}.html"}
+
+
+@pytest.fixture(params=[WhooshSearchEngine, SQLiteSearchEngine])
+def engine(request, tmp_path):
+    engine = request.param(tmp_path / "index")
+    engine.add_documents([
+        _page(tmp_path, "bars", "历史行情", "查询股票的历史K线数据"),
+        _page(tmp_path, "tick", "实时行情订阅", "订阅实时行情推送", tags="行情,订阅"),
+        _page(tmp_path, "order", "下单委托", "按指定数量委托下单", tags="交易"),
+    ])
+    return engine
+
+
+class TestSearchBatch:
+    """测试在同一个索引快照上执行批量查询"""
+
+    def test_modes_in_order(self, engine):
+        """测试各查询按各自的方式执行，结果与查询一一对应"""
+        result = engine.search_batch([
+            {"query": "K线"},
+            {"mode": "phrase", "query": "委托下单"},
+            {"mode": "tag", "tag": "订阅"},
+            {"mode": "fuzzy", "query": "下担"},
+        ])
+
+        assert result["total_queries"] == 4
+        assert [item["mode"] for item in result["results"]] == ["keyword", "phrase", "tag", "fuzzy"]
+        urls = [[hit["url"].rsplit("/", 1)[-1] for hit in item["results"]] for item in result["results"]]
+        assert urls[:3] == [["bars.html"], ["order.html"], ["tick.html"]]
+
+    def test_dedupe(self, engine):
+        """测试去重时后面的查询只列出已返回过的文档"""
+        result = engine.search_batch([{"query": "历史行情"}, {"query": "行情"}], dedupe=True)
+
+        first, second = result["results"]
+        first_urls = {hit["url"] for hit in first["results"]}
+        assert second["duplicate_urls"] and set(second["duplicate_urls"]) <= first_urls
+        assert not first_urls & {hit["url"] for hit in second["results"]}
+        assert result["unique_urls"] == len(first_urls) + len(second["results"])
+
+    def test_invalid_mode(self, engine):
+        """测试单个查询失败不影响其他查询"""
+        result = engine.search_batch([{"mode": "regex", "query": "K线"}, {"query": "K线"}])
+
+        assert "error" in result["results"][0]
+        assert result["results"][1]["total_hits"] == 1
+
+    def test_snapshot_isolation(self, engine, tmp_path):
+        """测试快照期间其他线程的提交不可见"""
+        with engine.snapshot():
+            asyncio.run(asyncio.to_thread(engine.add_documents, [_page(tmp_path, "fund", "基金净值", "基金")]))
+            assert engine.search("基金")["total_hits"] == 0
+        assert engine.search("基金")["total_hits"] == 1
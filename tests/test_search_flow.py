@@ -0,0 +1,395 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from core.search_flow import SearchFlow
+from services.write_lease import WriterLease
+from services.myquant_api import MeiliSearchResponse
+from utils.circuit_breaker import CircuitBreaker
+
+
+def _make_flow(tmp_path, urls, api_delay=0.0, download_delay=0.0):
+    """构建使用模拟服务的SearchFlow，写入租约使用临时目录"""
+    api_service = MagicMock()
+
+    def search(keyword, limit):
+        if api_delay:
+            import time
+            time.sleep(api_delay)
+        return MeiliSearchResponse(
+            hits=[{"objectID": str(i), "url": url} for i, url in enumerate(urls)],
+            query=keyword, processingTimeMs=1, limit=limit, offset=0,
+            estimatedTotalHits=len(urls)
+        )
+
+    api_service.search.side_effect = search
+    api_service.extract_unique_urls.return_value = urls
+    api_service.breaker = CircuitBreaker("myquant_api")
+
+    async def download_url(url):
+        await asyncio.sleep(download_delay)
+        return True
+
+    downloader = MagicMock()
+    downloader.download_url.side_effect = download_url
+    downloader.breaker = CircuitBreaker("document_host")
+
+    search_engine = MagicMock()
+    search_engine.add_documents.return_value = {
+        "total_count": 1, "success_count": 1, "failure_count": 0, "skipped_count": 0,
+        "failed_urls": []
+    }
+    search_engine.write_batch.side_effect = lambda operations: [
+        search_engine.add_documents(items) for _, items in operations
+    ]
+    search_engine.search.side_effect = lambda keyword, max_results, filters=None: {
+        "query": keyword, "total_hits": 0, "results": []
+    }
+    search_engine.suggest_queries.return_value = []
+    search_engine.last_modified.return_value = 0
+
+    lease = WriterLease(tmp_path / "writer.lock", tmp_path / "spool")
+    return SearchFlow(api_service, downloader, search_engine, ingest_queue=MagicMock(), lease=lease)
+
+
+class TestStaleSearch:
+    """测试stale-while-revalidate搜索模式"""
+
+    @pytest.mark.asyncio
+    async def test_stale_search_returns_immediately(self, tmp_path):
+        """测试立即返回本地结果并在后台刷新"""
+        flow = _make_flow(tmp_path, ["https://www.example.com/a"], download_delay=0.2)
+
+        result = await flow.stale_search("测试")
+
+        assert result["refresh_scheduled"] is True
+        assert result["refresh_in_progress"] is True
+        assert result["staleness"]["last_refreshed_at"] is None
+        assert flow.search_engine.add_documents.call_count == 0
+
+        # 刷新进行中不会重复调度
+        again = await flow.stale_search("测试")
+        assert again["refresh_scheduled"] is False
+
+        await asyncio.gather(*flow._background_tasks)
+        assert flow.search_engine.add_documents.call_count == 1
+
+        # 刷新完成后在CACHE_TTL内不会再次调度，且返回数据陈旧程度
+        fresh = await flow.stale_search("测试")
+        assert fresh["refresh_scheduled"] is False
+        assert fresh["staleness"]["age_seconds"] is not None
+
+    @pytest.mark.asyncio
+    async def test_empty_discovery_marks_fresh(self, tmp_path):
+        """测试发现成功但没有相关文档时也记录刷新时间，不在每次搜索时重新调度"""
+        flow = _make_flow(tmp_path, [])
+
+        await flow.stale_search("测试")
+        await asyncio.gather(*flow._background_tasks)
+
+        assert (await flow.stale_search("测试"))["refresh_scheduled"] is False
+
+    @pytest.mark.asyncio
+    async def test_failed_discovery_not_marked_fresh(self, tmp_path):
+        """测试API失败返回的空响应不记录刷新时间"""
+        flow = _make_flow(tmp_path, [])
+        flow.api_service.search.side_effect = lambda keyword, limit: MeiliSearchResponse(
+            hits=[], query=keyword, processingTimeMs=0, limit=limit, offset=0, estimatedTotalHits=0,
+            succeeded=False
+        )
+
+        await flow.stale_search("测试")
+        await asyncio.gather(*flow._background_tasks)
+
+        assert (await flow.stale_search("测试"))["refresh_scheduled"] is True
+
+
+class TestDeadlineSearch:
+    """测试带延迟预算的完整搜索"""
+
+    @pytest.mark.asyncio
+    async def test_deadline_returns_partial_results(self, tmp_path):
+        """测试超过延迟预算时返回本地结果并报告截断阶段"""
+        flow = _make_flow(tmp_path, ["https://www.example.com/a"], download_delay=0.3)
+
+        result = await flow.full_search("测试", deadline=0.1)
+
+        assert result["deadline_exceeded"] is True
+        assert result["truncated_stages"] == ["download_index"]
+        assert result["pending_urls"] == 1
+        assert flow.search_engine.add_documents.call_count == 0
+
+        # 剩余的下载和索引在后台继续完成
+        await asyncio.gather(*flow._background_tasks)
+        assert flow.search_engine.add_documents.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_slow_discovery_is_truncated(self, tmp_path):
+        """测试API发现阶段过慢时两个阶段都被截断"""
+        flow = _make_flow(tmp_path, ["https://www.example.com/a"], api_delay=0.3)
+
+        result = await flow.full_search("测试", deadline=0.05)
+
+        assert result["truncated_stages"] == ["discovery", "download_index"]
+        await asyncio.gather(*flow._background_tasks)
+
+    @pytest.mark.asyncio
+    async def test_within_deadline(self, tmp_path):
+        """测试在延迟预算内完成时返回完整统计"""
+        flow = _make_flow(tmp_path, ["https://www.example.com/a"])
+
+        result = await flow.full_search("测试", deadline=5)
+
+        assert result["deadline_exceeded"] is False
+        assert result["newly_downloaded"] == 1
+
+
+class TestCircuitBreakerFallback:
+    """测试熔断时的本地降级"""
+
+    @pytest.mark.asyncio
+    async def test_open_breaker_falls_back_to_local(self, tmp_path):
+        """测试熔断器打开时不调用API，直接返回本地结果"""
+        flow = _make_flow(tmp_path, ["https://www.example.com/a"])
+        flow.api_service.breaker = CircuitBreaker("myquant_api", failure_threshold=1)
+        flow.api_service.breaker.record_failure()
+
+        result = await flow.full_search("测试")
+
+        assert result["circuit_open"] == ["myquant_api"]
+        assert flow.api_service.search.call_count == 0
+        assert flow.get_stats()["circuit_breakers"]["myquant_api"]["state"] == "open"
+
+
+class TestLocalDiscover:
+    """测试基于本地文档元数据的发现"""
+
+    URL = "https://www.myquant.cn/docs2/sdk/python/API.html"
+
+    @pytest.fixture
+    def flow(self, tmp_path, mock_requests):
+        """构建已下载一个文档、远程API不可用的SearchFlow"""
+        from requests.exceptions import ConnectionError
+        from services.discovery_cache import DiscoveryCache
+        from services.downloader import SmartDownloader
+        from services.ingest_queue import IngestQueue
+        from services.myquant_api import AdvancedMyQuantAPIService
+
+        mock_requests.side_effect = ConnectionError("network unreachable")
+
+        downloader = SmartDownloader(tmp_path)
+        downloader.url_map[downloader.url_to_filename(self.URL)] = {"url": self.URL}
+        downloader.record_metadata({self.URL: {
+            "title": "行情数据查询", "hierarchy": ["API文档", "Python", "数据查询"],
+            "anchors": ["history"], "document_type": "api", "language": "python", "category": None,
+        }})
+
+        search_engine = MagicMock()
+        search_engine.search.return_value = {
+            "query": "history", "total_hits": 1,
+            "results": [{"title": "API", "content": "history 查询历史行情", "url": self.URL, "score": 3.2}],
+        }
+
+        api_service = AdvancedMyQuantAPIService(cache=DiscoveryCache(tmp_path / "cache"))
+        return SearchFlow(api_service, downloader, search_engine, IngestQueue(tmp_path / "queue.json"),
+                          lease=WriterLease(tmp_path / "writer.lock", tmp_path / "spool"))
+
+    @pytest.mark.asyncio
+    async def test_local_answer_without_network(self, flow, mock_requests):
+        """测试本地命中时不调用远程API，断网时仍返回本地结果"""
+        result = await flow.discover("history", limit=1)
+
+        assert result["source"] == "local"
+        assert mock_requests.call_count == 0
+        summary = result["document_summaries"][0]
+        assert summary["title"] == "行情数据查询"
+        assert summary["anchors"] == ["history"]
+        assert result["document_categories"]["languages"] == {"python": 1}
+
+        # 本地命中不足时尝试远程API，API不可用时回退到本地结果
+        result = await flow.discover("history", limit=10)
+        assert mock_requests.call_count > 0
+        assert result["source"] == "local"
+        assert "message" in result
+
+    @pytest.mark.asyncio
+    async def test_filters_use_metadata(self, flow):
+        """测试索引无法过滤的条件基于持久化的文档元数据，并多取命中"""
+        result = await flow.discover("history", limit=1, filters={"document_type": ["faq"]})
+
+        assert result["total_hits"] == 0
+        assert flow.search_engine.search.call_args.kwargs == {"max_results": 5, "filters": None}
+
+    @pytest.mark.asyncio
+    async def test_index_filters_pushed_down(self, flow):
+        """测试索引分面能表达的条件交给索引过滤"""
+        await flow.discover("history", limit=1, filters={"language": ["cpp"]})
+
+        assert flow.search_engine.search.call_args.kwargs == {"max_results": 1, "filters": {"language": ["cpp"]}}
+
+    @pytest.mark.asyncio
+    async def test_missing_metadata_not_excluded(self, flow):
+        """测试没有记录元数据的文档不被过滤条件排除"""
+        result = await flow.discover("history", limit=1, filters={"category": ["data"]})
+
+        assert result["total_hits"] == 1
+        assert result["unique_urls"] == [self.URL]
+
+    def test_pending_metadata_applied_on_record(self, flow):
+        """测试未下载页面的元数据在写入URL映射前暂存"""
+        other = "https://www.myquant.cn/docs2/other.html"
+        assert flow.downloader.record_metadata({other: {"title": "其他", "anchors": []}}) == 0
+        assert flow.downloader.get_metadata(other) is None
+        assert other in flow.downloader._pending_metadata
+
+
+class TestIngestRetry:
+    """测试索引失败页面的补录"""
+
+    @pytest.mark.asyncio
+    async def test_failed_index_retried_on_next_request(self, tmp_path):
+        """测试索引失败的页面在后续请求中即使已下载也会重新索引"""
+        from services.ingest_queue import IngestQueue
+
+        url = "https://www.example.com/a"
+        flow = _make_flow(tmp_path, [url])
+        flow.ingest_queue = IngestQueue(tmp_path / "queue.json")
+        flow.search_engine.add_documents.return_value = {
+            "total_count": 1, "success_count": 0, "failure_count": 1, "skipped_count": 0,
+            "failed_urls": [url]
+        }
+
+        await flow._download_and_index_url(url)
+        assert url in flow.ingest_queue
+
+        # 第二次请求时文件已存在（下载返回None），但仍在队列中，需要重新索引
+        async def already_downloaded(url):
+            return None
+
+        flow.downloader.download_url.side_effect = already_downloaded
+        flow.search_engine.add_documents.return_value = {
+            "total_count": 1, "success_count": 1, "failure_count": 0, "skipped_count": 0,
+            "failed_urls": []
+        }
+
+        result = await flow._download_and_index_url(url)
+
+        assert result["index"]["success_count"] == 1
+        assert url not in flow.ingest_queue
+
+    @pytest.mark.asyncio
+    async def test_spooled_page_stays_queued(self, tmp_path):
+        """测试转交给租约持有者的页面保留在补录队列中，由代写结果移出或记录失败"""
+        from services.ingest_queue import IngestQueue
+
+        urls = ["https://www.example.com/a", "https://www.example.com/b"]
+        flow = _make_flow(tmp_path, urls)
+        flow.ingest_queue = IngestQueue(tmp_path / "queue.json")
+
+        async def add(file_url_pairs):
+            return {
+                "total_count": 1, "success_count": 0, "failure_count": 0, "skipped_count": 0,
+                "failed_urls": [], "spooled_count": 1
+            }
+
+        flow.index_writer.add = add
+        result = await flow._download_and_index([urls[0]])
+        assert result["newly_indexed"] == 0
+        assert result["pending_spooled"] == 1
+        assert flow.ingest_queue.pending() == [urls[0]]
+
+        # 其他进程转交的页面b由本进程代写失败，a代写成功
+        IngestQueue(tmp_path / "queue.json").add([urls[1]])
+        flow._on_spooled_written([
+            (("add", [{"file_path": "a.html", "url": urls[0]}, {"file_path": "b.html", "url": urls[1]}]),
+             {"success_count": 1, "failed_urls": [urls[1]]}),
+            (("delete", [urls[0]]), {"deleted_count": 1}),
+        ])
+
+        assert flow.ingest_queue.pending() == [urls[1]]
+        assert IngestQueue(tmp_path / "queue.json").get_stats()["failed_attempts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_queue_drained_at_startup(self, tmp_path):
+        """测试上次运行遗留在补录队列中的页面通过写入任务在后台补录"""
+        from services.ingest_queue import IngestQueue
+
+        url = "https://www.example.com/a"
+        flow = _make_flow(tmp_path, [url])
+        assert flow.schedule_ingest_drain() is None
+
+        flow.ingest_queue = IngestQueue(tmp_path / "queue.json")
+        flow.reconciler.queue = flow.ingest_queue
+        flow.ingest_queue.add([url])
+
+        result = await flow.schedule_ingest_drain()
+
+        assert result == {"indexed": 1, "failed": 0}
+        assert flow.index_writer.get_stats()["requests"] == 1
+        assert len(flow.ingest_queue) == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_commit_only_fails_its_url(self, tmp_path):
+        """测试一个URL的索引提交失败时其他URL照常完成，失败的页面记录在补录队列中"""
+        from services.ingest_queue import IngestQueue
+
+        urls = ["https://www.example.com/a", "https://www.example.com/b"]
+        flow = _make_flow(tmp_path, urls)
+        flow.ingest_queue = IngestQueue(tmp_path / "queue.json")
+
+        async def add(file_url_pairs):
+            if file_url_pairs[0]["url"] == urls[0]:
+                raise OSError("磁盘已满")
+            return {
+                "total_count": 1, "success_count": 1, "failure_count": 0, "skipped_count": 0,
+                "failed_urls": []
+            }
+
+        flow.index_writer.add = add
+        result = await flow._download_and_index(urls)
+
+        assert result["index_results"]["success_count"] == 1
+        assert result["index_results"]["failed_urls"] == [urls[0]]
+        assert flow.ingest_queue.pending() == [urls[0]]
+        assert flow.ingest_queue.get_stats()["failed_attempts"] == 1
+
+
+class TestDidYouMean:
+    """测试本地搜索无结果时的纠错建议"""
+
+    @pytest.mark.asyncio
+    async def test_suggestions_on_empty_result(self, tmp_path):
+        """测试无结果时附带纠错建议"""
+        flow = _make_flow(tmp_path, [])
+        flow.search_engine.suggest_queries.return_value = ["history"]
+
+        result = await flow.search("histroy")
+
+        assert result["did_you_mean"] == ["history"]
+        flow.search_engine.suggest_queries.assert_called_once_with("histroy")
+
+
+class TestBatchSearch:
+    """测试批量搜索流程"""
+
+    @pytest.mark.asyncio
+    async def test_full_mode_refreshes_distinct_keywords(self, tmp_path):
+        """测试完整模式下每个不同的关键词只发现一次，再整体执行批量查询"""
+        flow = _make_flow(tmp_path, [])
+        flow.search_engine.search_batch.return_value = {"total_queries": 3, "unique_urls": 0, "results": []}
+        queries = [{"query": "history"}, {"mode": "boolean", "query": "history AND NOT tick"},
+                   {"mode": "tag", "tag": "行情"}]
+
+        await flow.batch_search(queries, dedupe=True, mode="full")
+
+        keywords = sorted(call.args[0] for call in flow.api_service.search.call_args_list)
+        assert keywords == ["history", "history tick"]
+        flow.search_engine.search_batch.assert_called_once_with(queries, True)
+
+    @pytest.mark.asyncio
+    async def test_too_many_queries(self, tmp_path):
+        """测试超过查询数上限时直接返回错误"""
+        flow = _make_flow(tmp_path, [])
+        result = await flow.batch_search([{"query": "history"}] * 100)
+
+        assert "error" in result
+        flow.search_engine.search_batch.assert_not_called()
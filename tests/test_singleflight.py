@@ -0,0 +1,101 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import MagicMock
+from core.search_flow import SearchFlow
+from services.myquant_api import MeiliSearchResponse
+from services.write_lease import WriterLease
+from utils.circuit_breaker import CircuitBreaker
+from utils.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """测试进行中请求合并"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_result(self):
+        """测试相同key的并发调用只执行一次"""
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "result"
+
+        results = await asyncio.gather(*[flight.do("key", work) for _ in range(5)])
+
+        assert calls == 1
+        assert [result for result, _ in results] == ["result"] * 5
+        assert sum(1 for _, shared in results if shared) == 4
+        assert not flight.in_flight("key")
+
+    @pytest.mark.asyncio
+    async def test_exception_is_shared(self):
+        """测试执行失败时等待方收到同样的异常"""
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(
+            flight.do("key", fail), flight.do("key", fail), return_exceptions=True
+        )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+
+class TestSearchFlowCoalescing:
+    """测试SearchFlow的并发full_search合并"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_full_search(self, tmp_path):
+        """测试并发的相同关键词只调用一次API，相同URL只下载一次"""
+        urls = ["https://www.example.com/a", "https://www.example.com/b"]
+
+        api_service = MagicMock()
+
+        def slow_search(keyword, limit):
+            time.sleep(0.05)
+            return MeiliSearchResponse(
+                hits=[{"objectID": str(i), "url": url} for i, url in enumerate(urls)],
+                query=keyword, processingTimeMs=1, limit=limit, offset=0,
+                estimatedTotalHits=len(urls)
+            )
+
+        api_service.search.side_effect = slow_search
+        api_service.extract_unique_urls.return_value = urls
+        api_service.breaker = CircuitBreaker("myquant_api")
+
+        downloaded = []
+
+        async def download_url(url):
+            downloaded.append(url)
+            await asyncio.sleep(0.05)
+            return True
+
+        downloader = MagicMock()
+        downloader.download_url.side_effect = download_url
+        downloader.breaker = CircuitBreaker("document_host")
+        search_engine = MagicMock()
+        search_engine.add_documents.return_value = {
+            "total_count": 1, "success_count": 1, "failure_count": 0, "skipped_count": 0,
+            "failed_urls": []
+        }
+        search_engine.write_batch.side_effect = lambda operations: [
+            search_engine.add_documents(items) for _, items in operations
+        ]
+        search_engine.search.side_effect = lambda keyword, max_results: {
+            "query": keyword, "total_hits": 0, "results": []
+        }
+
+        flow = SearchFlow(api_service, downloader, search_engine, ingest_queue=MagicMock(),
+                          lease=WriterLease(tmp_path / "writer.lock", tmp_path / "spool"))
+        results = await asyncio.gather(*[flow.full_search("测试") for _ in range(3)])
+
+        assert api_service.search.call_count == 1
+        assert sorted(downloaded) == sorted(urls)
+        assert search_engine.add_documents.call_count == len(urls)
+        assert sum(result["newly_downloaded"] for result in results) == len(urls)
@@ -0,0 +1,118 @@
+import pytest
+
+from services.whoosh_service import WhooshSearchEngine
+from utils import SymSpellIndex, edit_distance, max_distance_for
+
+PAGE_HTML = """
+<html><head><title>{title}</title></head>
+<body><h1>{title}</h1><p>{body}</p></body></html>
+"""
+
+
+class TestSymSpellIndex:
+    """测试删除邻域拼写纠错词典"""
+
+    def test_edit_distance(self):
+        """测试编辑距离（含相邻换位）和提前终止"""
+        assert edit_distance("history", "history", 2) == 0
+        assert edit_distance("histroy", "history", 2) == 1
+        assert edit_distance("hstory", "history", 2) == 1
+        assert edit_distance("abc", "xyz", 1) == 2
+
+    def test_lookup_orders_by_distance_and_frequency(self):
+        """测试候选按距离优先、词频其次排序"""
+        spelling = SymSpellIndex(max_distance=2)
+        spelling.add("history", 10)
+        spelling.add("histor", 50)
+        spelling.add("mystery", 100)
+
+        assert [term for term, _, _ in spelling.lookup("histroy")] == ["history", "histor"]
+        assert spelling.lookup("histroy", max_distance=1) == [("history", 1, 10)]
+
+    def test_long_terms_use_prefix(self):
+        """测试超过前缀长度的词仍能纠错"""
+        spelling = SymSpellIndex(max_distance=2, prefix_length=7)
+        spelling.add("get_history_bars")
+        assert spelling.lookup("get_histroy_bars")[0][0] == "get_history_bars"
+
+    def test_add_updates_frequency(self):
+        """测试重复添加只更新词频"""
+        spelling = SymSpellIndex()
+        assert spelling.add("行情数据", 1)
+        assert not spelling.add("行情数据", 5)
+        assert len(spelling) == 1
+        assert spelling.lookup("行情数据") == [("行情数据", 0, 5)]
+
+    def test_short_terms_limited(self):
+        """测试短词收紧编辑距离"""
+        assert max_distance_for("行情", 2) == 0
+        assert max_distance_for("历史行情", 2) == 1
+        assert max_distance_for("subscribe", 2) == 2
+
+
+class TestSpellingSearch:
+    """测试模糊搜索和纠错建议"""
+
+    @pytest.fixture
+    def engine(self, tmp_path):
+        index_dir = tmp_path / "index"
+        index_dir.mkdir()
+        engine = WhooshSearchEngine(index_dir)
+        file_path = tmp_path / "page.html"
+        file_path.write_text(PAGE_HTML.format(title="subscribe", body="history 数据查询"), encoding="utf-8")
+        engine.add_documents([{"file_path": str(file_path), "url": "https://www.myquant.cn/docs2/page.html"}])
+        return engine
+
+    def test_fuzzy_search_uses_corrections(self, engine):
+        """测试模糊搜索通过纠错词典找到拼写错误的词"""
+        result = engine.fuzzy_search("subscirbe")
+        assert result["total_hits"] == 1
+        assert result["corrections"]["subscirbe"] == ["subscribe"]
+
+    def test_dictionary_updated_on_commit(self, engine, tmp_path):
+        """测试提交后词典补充新文档的词"""
+        assert "unsubscribe" not in engine.spelling_index()
+
+        file_path = tmp_path / "new.html"
+        file_path.write_text(PAGE_HTML.format(title="unsubscribe", body="取消订阅"), encoding="utf-8")
+        engine.add_documents([{"file_path": str(file_path), "url": "https://www.myquant.cn/docs2/new.html"}])
+
+        assert "unsubscribe" in engine._spelling
+        assert engine.fuzzy_search("unsubscirbe")["total_hits"] == 1
+
+    def test_commit_does_not_rescan_lexicon(self, engine, tmp_path, monkeypatch):
+        """测试本进程提交后只加入新文档的词，查询时不再读取整个词表"""
+        engine.spelling_index()
+
+        def full_scan():
+            raise AssertionError("不应扫描整个词表")
+
+        monkeypatch.setattr(engine, "_term_frequencies", full_scan)
+        file_path = tmp_path / "new.html"
+        file_path.write_text(PAGE_HTML.format(title="subscribe", body="unsubscribe"), encoding="utf-8")
+        engine.add_documents([{"file_path": str(file_path), "url": "https://www.myquant.cn/docs2/new.html"}])
+
+        assert engine.correct_terms("unsubscirbe")["unsubscirbe"] == ["unsubscribe"]
+        assert "vocabulary" not in engine._background_refreshes
+
+        # 增量累加的文档频率与重新扫描词表的结果一致
+        monkeypatch.undo()
+        assert engine.spelling_index().frequency("subscribe") == engine._term_frequencies()["subscribe"]
+
+    def test_other_process_commit_rebuilds_in_background(self, engine, tmp_path):
+        """测试其他进程的提交在后台重建词典，查询继续使用已有的词典"""
+        engine.spelling_index()
+        other = WhooshSearchEngine(engine.index_dir)
+        file_path = tmp_path / "other.html"
+        file_path.write_text(PAGE_HTML.format(title="unsubscribe", body="取消订阅"), encoding="utf-8")
+        other.add_documents([{"file_path": str(file_path), "url": "https://www.myquant.cn/docs2/other.html"}])
+
+        engine.correct_terms("unsubscirbe")
+        engine._background_refreshes["vocabulary"].join(5)
+        assert "unsubscribe" in engine.spelling_index()
+
+    def test_suggest_queries(self, engine):
+        """测试无结果时的纠错建议"""
+        assert engine.search("histroy")["total_hits"] == 0
+        assert engine.suggest_queries("histroy") == ["history"]
+        assert engine.suggest_queries("history") == []
@@ -0,0 +1,123 @@
+import threading
+
+import pytest
+
+from config import HIGHLIGHT_PRE
+from services import SQLiteSearchEngine, create_search_engine
+
+PAGE_HTML = """
+<html><head><title>{title}</title><meta name="keywords" content="{tags}"></head>
+<body><div class="content"><h1>{title}</h1><p>{content}</p>
+<pre><code>{code}</code></pre></div></body></html>
+"""
+
+
+def _page(tmp_path, name, title, content, tags="行情", code="pass"):
+    file_path = tmp_path / f"{name}.html"
+    file_path.write_text(PAGE_HTML.format(title=title, content=content, tags=tags, code=code), encoding="utf-8")
+    return {"file_path": str(file_path), "url": f"https://www.myquant.cn/docs2/{name}.html"}
+
+
+def _urls(result):
+    return [item["url"].rsplit("/", 1)[-1] for item in result["results"]]
+
+
+class TestSQLiteSearchEngine:
+    """测试SQLite FTS5搜索后端"""
+
+    @pytest.fixture
+    def engine(self, tmp_path):
+        engine = SQLiteSearchEngine(tmp_path / "index")
+        engine.add_documents([
+            _page(tmp_path, "bars", "历史行情", "查询股票的历史K线数据，支持日线和分钟线", tags="行情,数据查询",
+                  code="history(symbol='SHSE.600000', frequency='1d')"),
+            _page(tmp_path, "order", "下单委托", "按指定数量委托下单，支持限价和市价", tags="交易",
+                  code="order_volume(symbol, volume, side)"),
+            _page(tmp_path, "tick", "实时行情订阅", "订阅实时行情推送，回调中处理分笔数据", tags="行情"),
+        ])
+        return engine
+
+    def test_single_file_in_wal_mode(self, engine):
+        """测试索引是WAL模式的单个数据库文件"""
+        stats = engine.get_index_stats()
+        assert stats["total_docs"] == 3
+        assert stats["journal_mode"] == "wal"
+        assert engine.path.is_file()
+
+    def test_title_weight_and_highlight(self, engine):
+        """测试标题命中的文档排在正文命中之前，高亮还原原文"""
+        result = engine.search("K线 行情")
+
+        assert _urls(result)[0] == "bars.html"
+        top = result["results"][0]
+        assert top["title"] == "历史行情"
+        assert HIGHLIGHT_PRE in top["highlights"]["content"]
+        assert "\u200b" not in top["highlights"]["content"]
+
+    def test_subword_recall(self, engine):
+        """测试搜索模式的子词（实时行情中的行情）也能召回"""
+        assert "tick.html" in _urls(engine.search("行情"))
+
+    def test_update_and_delete(self, engine, tmp_path):
+        """测试更新替换旧内容，删除后不再返回"""
+        engine.write_batch([("update", [_page(tmp_path, "order", "撤单", "撤销未成交的委托")])])
+        assert _urls(engine.search("撤销")) == ["order.html"]
+        assert engine.search("限价")["results"] == []
+
+        results = engine.write_batch([("delete", ["https://www.myquant.cn/docs2/order.html"])])
+        assert results == [{"deleted_count": 1}]
+        assert "https://www.myquant.cn/docs2/order.html" not in engine.indexed_urls()
+
+    def test_skip_existing(self, engine, tmp_path):
+        """测试已存在的文档跳过，不增加提交序号"""
+        version = engine._index_version()
+        result = engine.add_documents([_page(tmp_path, "bars", "历史行情", "重复")])
+        assert result["skipped_count"] == 1
+        assert engine._index_version() == version
+
+    def test_phrase_boolean_and_tag(self, engine):
+        """测试短语、布尔和标签过滤查询"""
+        assert _urls(engine.phrase_search("委托下单")) == ["order.html"]
+        assert _urls(engine.phrase_search("下单委托数量")) == []
+
+        assert _urls(engine.boolean_search("行情 AND NOT 历史")) == ["tick.html"]
+        assert set(_urls(engine.boolean_search("K线 OR 限价"))) == {"bars.html", "order.html"}
+        assert _urls(engine.boolean_search("title:委托")) == ["order.html"]
+        # 无法解析的查询降级为关键词OR搜索
+        assert "order.html" in _urls(engine.boolean_search("NOT 限价"))
+
+        assert set(_urls(engine.tag_search("行情"))) == {"bars.html", "tick.html"}
+        assert _urls(engine.tag_search("行情", "分笔")) == ["tick.html"]
+
+    def test_fuzzy_and_suggest(self, engine):
+        """测试拼写纠错词典基于FTS5词表，补全基于存储字段"""
+        result = engine.fuzzy_search("histroy")
+        assert result["corrections"]["histroy"][0] == "history"
+        assert _urls(result) == ["bars.html"]
+
+        texts = [item["text"] for item in engine.suggest("order")["suggestions"]]
+        assert "order_volume" in texts
+
+    def test_rebuild(self, engine, tmp_path):
+        """测试重建后只保留新文档并更换索引代"""
+        generation, _ = engine._index_version()
+        result = engine.rebuild_index([_page(tmp_path, "new", "新文档", "重建后的内容")])
+
+        assert result["success_count"] == 1
+        assert engine.indexed_urls() == {"https://www.myquant.cn/docs2/new.html"}
+        assert engine._index_version()[0] != generation
+
+    def test_concurrent_reader(self, engine, tmp_path):
+        """测试另一个实例（进程）和其他线程读取已提交的内容"""
+        reader = SQLiteSearchEngine(engine.index_dir)
+        engine.add_documents([_page(tmp_path, "fund", "基金净值", "查询基金净值")])
+
+        results = []
+        thread = threading.Thread(target=lambda: results.append(reader.search("基金净值")))
+        thread.start()
+        thread.join()
+        assert _urls(results[0]) == ["fund.html"]
+
+    def test_create_from_config(self, tmp_path):
+        """测试按配置创建SQLite后端"""
+        assert type(create_search_engine("sqlite", tmp_path)) is SQLiteSearchEngine
@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+from services.whoosh_service import WhooshSearchEngine
+from utils import PrefixIndex
+
+PAGE_HTML = """
+<html><head><title>{title}</title><meta name="keywords" content="行情,数据"></head>
+<body><div class="content"><h1>{title}</h1><h2>{heading}</h2><p>文档内容</p>
+<pre><code>{code}</code></pre></div></body></html>
+"""
+
+
+class TestPrefixIndex:
+    """测试有序数组前缀补全"""
+
+    def test_complete_ranked_by_doc_count(self):
+        """测试按文档频率降序、长度升序排列"""
+        completions = PrefixIndex()
+        completions.add("get_history_bars", ["code"])
+        completions.add("get_history", ["symbol"], count=3)
+        completions.add("get_fundamentals", ["symbol"], count=2)
+        completions.add("history", ["symbol"], count=5)
+        completions.publish()
+
+        assert [item["text"] for item in completions.complete("GET_")] == [
+            "get_history", "get_fundamentals", "get_history_bars"
+        ]
+        assert completions.complete("get_his", limit=1) == [
+            {"text": "get_history", "types": ["symbol"], "doc_count": 3}
+        ]
+
+    def test_short_prefix_precomputed(self):
+        """测试短前缀使用预计算结果，发布时合并新增项"""
+        completions = PrefixIndex(short_prefix_length=2)
+        completions.add("subscribe", ["symbol"])
+        completions.add("schedule", ["symbol"], count=2)
+        completions.publish()
+        assert [item["text"] for item in completions.complete("s")] == ["schedule", "subscribe"]
+
+        completions.add("subscribe", ["code"], count=5)
+        completions.add("set_token", ["symbol"], count=3)
+        # 发布前查询仍读取上一个快照
+        assert completions.complete("s")[0]["text"] == "schedule"
+
+        completions.publish()
+        assert completions.complete("s")[0] == {"text": "subscribe", "types": ["code", "symbol"], "doc_count": 6}
+        assert [item["text"] for item in completions.complete("s")] == ["subscribe", "set_token", "schedule"]
+        assert [item["text"] for item in completions.complete("se", limit=30)] == ["set_token"]
+        assert completions.complete("") == []
+
+
+class TestSuggest:
+    """测试索引的前缀补全"""
+
+    @pytest.fixture
+    def engine(self, tmp_path):
+        index_dir = tmp_path / "index"
+        index_dir.mkdir()
+        engine = WhooshSearchEngine(index_dir)
+        engine.add_documents([self._page(tmp_path, "a", "订阅行情", "subscribe - 订阅行情", "subscribe(symbols)")])
+        return engine
+
+    @staticmethod
+    def _page(tmp_path, name, title, heading, code):
+        file_path = tmp_path / f"{name}.html"
+        file_path.write_text(PAGE_HTML.format(title=title, heading=heading, code=code), encoding="utf-8")
+        return {"file_path": str(file_path), "url": f"https://www.myquant.cn/docs2/{name}.html"}
+
+    def test_sources(self, engine):
+        """测试标题、小节标题、标签和代码标识符都可补全"""
+        assert engine.suggest("订阅")["suggestions"][0]["types"] == ["heading", "title"]
+        assert engine.suggest("subscribe -")["suggestions"][0]["types"] == ["heading"]
+        assert engine.suggest("subs")["suggestions"][0] == {"text": "subscribe", "types": ["code", "symbol"], "doc_count": 1}
+        assert engine.suggest("行")["suggestions"][0]["text"] == "行情"
+
+    def test_incremental_on_commit(self, engine, tmp_path, monkeypatch):
+        """测试本进程提交后立即可补全，频率累加，查询时不重新读取存储字段"""
+        engine.suggest("x")
+        monkeypatch.setattr(engine, "_stored_documents", lambda: pytest.fail("提交后不应重新构建补全索引"))
+        engine.add_documents([self._page(tmp_path, "b", "退订行情", "unsubscribe", "subscribe(symbols)")])
+
+        assert engine.suggest("退订")["suggestions"][0]["text"] == "退订行情"
+        assert engine.suggest("subscribe")["suggestions"][0]["doc_count"] == 2
+        assert "completions" not in engine._background_refreshes
+
+    def test_other_process_commit_rebuilds(self, engine, tmp_path, monkeypatch):
+        """测试其他进程的提交在检查间隔后触发重建"""
+        engine.suggest("x")
+        other = WhooshSearchEngine(engine.index_dir)
+        other.add_documents([self._page(tmp_path, "c", "下单函数", "order_volume", "order_volume(symbol)")])
+
+        assert engine.suggest("下单")["suggestions"] == []
+
+        engine._completions_checked_at = time.monotonic() - 60
+        assert engine.suggest("下单")["suggestions"] == []
+        engine._background_refreshes["completions"].join(5)
+        assert engine.suggest("下单")["suggestions"][0]["text"] == "下单函数"
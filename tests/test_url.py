@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+from services.downloader import SmartDownloader
+from utils.url import canonicalize_url, doc_section, split_anchor
+
+
+class TestCanonicalizeUrl:
+    """测试URL规范化"""
+
+    def test_strip_fragment_and_query(self):
+        """测试去除锚点和查询参数"""
+        url = "https://www.myquant.cn/docs2/sdk/python/API.html?v=1#history"
+        assert canonicalize_url(url) == "https://www.myquant.cn/docs2/sdk/python/API.html"
+
+    def test_normalize_percent_encoding(self):
+        """测试统一百分号编码"""
+        encoded = "https://www.myquant.cn/docs2/%E6%95%B0%E6%8D%AE.html"
+        raw = "https://www.myquant.cn/docs2/数据.html"
+        lower = "https://www.myquant.cn/docs2/%e6%95%b0%e6%8d%ae.html"
+        assert canonicalize_url(encoded) == canonicalize_url(raw) == canonicalize_url(lower)
+
+    def test_lowercase_host_and_default_port(self):
+        """测试主机名小写和去除默认端口"""
+        url = "HTTPS://WWW.MyQuant.cn:443/docs2/index.html"
+        assert canonicalize_url(url) == "https://www.myquant.cn/docs2/index.html"
+        assert canonicalize_url("http://localhost:8080/a.html") == "http://localhost:8080/a.html"
+
+    def test_split_anchor(self):
+        """测试拆分锚点"""
+        url, anchor = split_anchor("https://www.myquant.cn/docs2/a.html#%E5%8E%86%E5%8F%B2")
+        assert url == "https://www.myquant.cn/docs2/a.html"
+        assert anchor == "历史"
+        assert split_anchor("https://www.myquant.cn/docs2/a.html")[1] is None
+
+
+class TestDocSection:
+    """测试从URL路径得到文档栏目"""
+
+    def test_first_directory_after_docs_root(self):
+        """测试取文档根目录之后的第一段目录"""
+        assert doc_section("https://www.myquant.cn/docs2/sdk/python/API介绍/数据查询函数.html") == "sdk"
+        assert doc_section("https://www.myquant.cn/docs2/FAQ/%E8%A1%8C%E6%83%85.html") == "faq"
+
+    def test_no_section(self):
+        """测试直接位于文档根目录下或不在文档根目录下的页面没有栏目"""
+        assert doc_section("https://www.myquant.cn/docs2/index.html") == ""
+        assert doc_section("https://www.myquant.cn/other/sdk/a.html") == ""
+
+
+class TestCanonicalMigration:
+    """测试下载目录的URL规范化迁移"""
+
+    @pytest.fixture
+    def legacy_downloader(self, tmp_path):
+        """创建包含旧格式（按原始URL命名）记录的下载器"""
+        base = "https://www.myquant.cn/docs2/a.html"
+        variants = [base, base + "#x", base + "?v=2"]
+        url_map = {}
+        for i, url in enumerate(variants):
+            filename = f"legacy{i}.html"
+            (tmp_path / filename).write_text(f"<html>{i}</html>", encoding="utf-8")
+            url_map[filename] = {"url": url, "downloaded_at": "2024-01-01"}
+        (tmp_path / "url_map.json").write_text(json.dumps(url_map), encoding="utf-8")
+        return SmartDownloader(tmp_path)
+
+    def test_merge_duplicates(self, legacy_downloader, tmp_path):
+        """测试同一页面的多个下载合并为一个文件"""
+        result = legacy_downloader.migrate_canonical_urls()
+
+        assert result == {"renamed": 1, "merged": 2}
+        url_map = legacy_downloader.get_url_map()
+        assert len(url_map) == 1
+
+        filename, info = next(iter(url_map.items()))
+        assert info["url"] == "https://www.myquant.cn/docs2/a.html"
+        assert filename == legacy_downloader.url_to_filename(info["url"])
+        assert sorted(p.name for p in tmp_path.glob("*.html")) == [filename]
+
+    def test_migration_is_idempotent(self, legacy_downloader):
+        """测试重复迁移不会改变结果"""
+        legacy_downloader.migrate_canonical_urls()
+        assert legacy_downloader.migrate_canonical_urls() == {"renamed": 0, "merged": 0}
+
+    def test_anchor_variants_share_file(self, tmp_path):
+        """测试带锚点的URL与页面URL映射到同一文件"""
+        downloader = SmartDownloader(tmp_path)
+        assert downloader.get_file_path("https://www.myquant.cn/docs2/a.html#x") == \
+            downloader.get_file_path("https://www.myquant.cn/docs2/a.html")
+
+    def test_index_migration(self, tmp_path):
+        """测试索引中的重复文档合并为规范化URL"""
+        from services.whoosh_service import WhooshSearchEngine
+
+        engine = WhooshSearchEngine(tmp_path)
+        with engine.index.writer() as writer:
+            for url in ["https://www.myquant.cn/docs2/a.html#x", "https://www.myquant.cn/docs2/a.html?v=2"]:
+                writer.add_document(title="行情", content="行情数据", url=url, file_path="old.html")
+
+        result = engine.migrate_canonical_urls(file_path_for=lambda url: "new.html")
+
+        assert result == {"updated": 1, "merged": 1}
+        with engine.index.searcher() as searcher:
+            docs = list(searcher.all_stored_fields())
+        assert len(docs) == 1
+        assert docs[0]["url"] == "https://www.myquant.cn/docs2/a.html"
+        assert docs[0]["file_path"] == "new.html"
@@ -0,0 +1,110 @@
+import pytest
+
+from services.vector_index import VectorIndex, reciprocal_rank_fusion
+from services.whoosh_service import VECTOR_DIR_NAME, WhooshSearchEngine
+
+PAGE_HTML = """
+<html><head><title>{title}</title></head>
+<body><div class="content"><h1>{title}</h1><p>{content}</p></div></body></html>
+"""
+
+
+class TestReciprocalRankFusion:
+    """测试倒数排名融合"""
+
+    def test_documents_in_both_rankings_first(self):
+        """测试两路都召回的文档排在前面，得分相同时保持先出现的顺序"""
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], k=60)
+
+        assert [key for key, _ in fused] == ["c", "a", "b", "d"]
+        assert fused[0][1] == pytest.approx(1 / 63 + 1 / 61)
+
+
+class TestVectorIndex:
+    """测试内存映射向量索引"""
+
+    def test_search_by_similarity(self, tmp_path):
+        """测试按余弦相似度返回最相近的文档"""
+        vectors = VectorIndex(tmp_path / "vectors")
+        vectors.write([
+            {"url": "a", "title": "历史行情", "content": "查询股票的历史K线数据"},
+            {"url": "b", "title": "下单委托", "content": "按指定数量委托下单，支持限价和市价"},
+        ])
+
+        hits = vectors.search("K线历史数据", limit=2)
+        assert hits[0][0] == "a"
+        assert vectors.search("xyz", limit=2) == []
+
+    def test_update_and_delete(self, tmp_path):
+        """测试更新替换旧行，删除后不再返回"""
+        vectors = VectorIndex(tmp_path / "vectors")
+        vectors.write([{"url": "a", "title": "历史行情", "content": "K线数据"}])
+        vectors.write([{"url": "a", "title": "下单委托", "content": "限价委托"}])
+
+        assert len(vectors) == 1
+        assert vectors.get_stats()["rows"] == 2
+        assert [url for url, _ in vectors.search("限价委托")] == ["a"]
+        assert vectors.search("K线数据") == []
+
+        vectors.write([], deleted_urls=["a"])
+        assert len(vectors) == 0
+        assert vectors.search("限价委托") == []
+
+    def test_reload_from_other_instance(self, tmp_path):
+        """测试其他实例（进程）写入后重新加载"""
+        reader = VectorIndex(tmp_path / "vectors")
+        assert reader.search("行情") == []
+
+        VectorIndex(tmp_path / "vectors").write([{"url": "a", "title": "实时行情", "content": "订阅行情推送"}])
+        assert [url for url, _ in reader.search("行情")] == ["a"]
+
+
+class TestHybridSearch:
+    """测试索引的混合检索"""
+
+    @staticmethod
+    def _page(tmp_path, name, title, content):
+        file_path = tmp_path / f"{name}.html"
+        file_path.write_text(PAGE_HTML.format(title=title, content=content), encoding="utf-8")
+        return {"file_path": str(file_path), "url": f"https://www.myquant.cn/docs2/{name}.html"}
+
+    @pytest.fixture
+    def engine(self, tmp_path):
+        index_dir = tmp_path / "index"
+        index_dir.mkdir()
+        engine = WhooshSearchEngine(index_dir)
+        engine.add_documents([
+            self._page(tmp_path, "bars", "历史行情", "查询股票的历史K线数据"),
+            self._page(tmp_path, "order", "下单委托", "按指定数量委托下单"),
+        ])
+        return engine
+
+    def test_vectors_written_on_commit(self, engine):
+        """测试提交时同步写入当前代的向量索引，删除时同步删除"""
+        vectors = engine.vector_index()
+        assert vectors.directory == engine.index_dir / engine.generation / VECTOR_DIR_NAME
+        assert len(vectors) == 2
+
+        engine.write_batch([("delete", ["https://www.myquant.cn/docs2/order.html"])])
+        assert len(vectors) == 1
+
+    def test_fused_results(self, engine):
+        """测试融合结果包含两路的名次"""
+        result = engine.search_hybrid("历史K线", max_results=5)
+
+        assert result["mode"] == "hybrid"
+        top = result["results"][0]
+        assert top["url"] == "https://www.myquant.cn/docs2/bars.html"
+        assert top["ranks"]["bm25"] == 1 and top["ranks"]["vector"] == 1
+        assert top["highlights"]["content"]
+
+    def test_build_for_existing_index(self, engine):
+        """测试没有向量的旧索引在首次混合检索时补建"""
+        vectors_dir = engine.index_dir / engine.generation / VECTOR_DIR_NAME
+        for path in vectors_dir.iterdir():
+            path.unlink()
+
+        reopened = WhooshSearchEngine(engine.index_dir)
+        result = reopened.search_hybrid("委托下单")
+        assert result["results"][0]["url"] == "https://www.myquant.cn/docs2/order.html"
+        assert len(reopened.vector_index()) == 2
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import threading
+import pytest
+
+from services.downloader import SmartDownloader
+from services.index_writer import IndexWriterActor
+from services.ingest_queue import IndexReconciler, IngestQueue
+from services.mirror import SiteMirror
+from services.whoosh_service import WhooshSearchEngine
+from services.write_lease import WriterLease
+from utils.file_lock import FileLock
+
+PAGE_HTML = "<html><head><title>{title}</title></head><body><p>{title} 行情数据</p></body></html>"
+
+
+class TestFileLock:
+    """测试跨进程文件锁"""
+
+    def test_exclusive(self, tmp_path):
+        """测试同一锁文件同时只能被一个持有者获取"""
+        first = FileLock(tmp_path / "test.lock")
+        second = FileLock(tmp_path / "test.lock")
+
+        assert first.acquire(timeout=0.1)
+        assert not second.acquire(timeout=0.1)
+
+        first.release()
+        assert second.acquire(timeout=0.1)
+        second.release()
+
+
+class TestWriterLease:
+    """测试多进程共享索引的写入租约"""
+
+    @pytest.fixture
+    def engine(self, tmp_path):
+        index_dir = tmp_path / "index"
+        index_dir.mkdir()
+        return WhooshSearchEngine(index_dir)
+
+    def _lease(self, tmp_path):
+        return WriterLease(tmp_path / "writer.lock", tmp_path / "spool", timeout=0.1, retry_interval=0.01)
+
+    def _page(self, tmp_path, name):
+        file_path = tmp_path / f"{name}.html"
+        file_path.write_text(PAGE_HTML.format(title=name), encoding="utf-8")
+        return {"file_path": str(file_path), "url": f"https://www.myquant.cn/docs2/{name}.html"}
+
+    @pytest.mark.asyncio
+    async def test_spool_when_lease_held(self, tmp_path, engine):
+        """测试租约被其他进程持有时转交写请求，由下一个持有者代为写入"""
+        other_process = FileLock(tmp_path / "writer.lock")
+        assert other_process.acquire(timeout=0.1)
+
+        waiting = IndexWriterActor(engine, flush_interval=0.01, lease=self._lease(tmp_path))
+        result = await waiting.add([self._page(tmp_path, "a")])
+
+        assert result["spooled_count"] == 1
+        assert waiting.lease.has_spooled()
+        assert engine.indexed_urls() == set()
+        other_process.release()
+
+        holder = IndexWriterActor(engine, flush_interval=0.01, lease=self._lease(tmp_path))
+        await holder.add([self._page(tmp_path, "b")])
+
+        assert engine.indexed_urls() == {
+            "https://www.myquant.cn/docs2/a.html", "https://www.myquant.cn/docs2/b.html"
+        }
+        assert not holder.lease.has_spooled()
+        assert holder.get_stats()["lease"]["drained"] == 1
+        await waiting.stop()
+        await holder.stop()
+
+    @pytest.mark.asyncio
+    async def test_spooled_results_reported(self, tmp_path, engine):
+        """测试代写转交的请求后报告各请求的结果，包括写入失败的文档"""
+        other_process = FileLock(tmp_path / "writer.lock")
+        assert other_process.acquire(timeout=0.1)
+        missing = {"file_path": str(tmp_path / "missing.html"), "url": "https://www.myquant.cn/docs2/missing.html"}
+
+        waiting = IndexWriterActor(engine, flush_interval=0.01, lease=self._lease(tmp_path))
+        await waiting.add([self._page(tmp_path, "a"), missing])
+        other_process.release()
+
+        reported = []
+        holder = IndexWriterActor(engine, flush_interval=0.01, lease=self._lease(tmp_path),
+                                  on_spooled_written=reported.extend)
+        await holder.add([self._page(tmp_path, "b")])
+
+        assert len(reported) == 1
+        (operation, items), result = reported[0]
+        assert operation == "add"
+        assert [item["url"] for item in items] == ["https://www.myquant.cn/docs2/a.html", missing["url"]]
+        assert result["failed_urls"] == [missing["url"]]
+        await waiting.stop()
+        await holder.stop()
+
+    @pytest.mark.asyncio
+    async def test_idle_writer_drains_spool(self, tmp_path, engine):
+        """测试空闲的写入任务定期代写转交的请求"""
+        lease = self._lease(tmp_path)
+        lease.spool([("add", [self._page(tmp_path, "c")])])
+
+        actor = IndexWriterActor(engine, lease=lease, spool_poll_interval=0.05)
+        await actor.delete([])  # 启动写入任务
+        for _ in range(50):
+            if not lease.has_spooled():
+                break
+            await asyncio.sleep(0.05)
+
+        assert "https://www.myquant.cn/docs2/c.html" in engine.indexed_urls()
+        await actor.stop()
+
+
+class TestCommandLineWriters:
+    """测试命令行工具的索引写入等待写入租约"""
+
+    URL = "https://www.myquant.cn/docs2/a.html"
+
+    @pytest.fixture
+    def downloader(self, tmp_path):
+        (tmp_path / "docs").mkdir()
+        downloader = SmartDownloader(tmp_path / "docs")
+        downloader.get_file_path(self.URL).write_text(PAGE_HTML.format(title="a"), encoding="utf-8")
+        return downloader
+
+    def _wait_for_lease(self, tmp_path, engine, write):
+        """租约被其他进程持有时写入应等待，租约释放后完成"""
+        other_process = FileLock(tmp_path / "writer.lock")
+        assert other_process.acquire(timeout=0.1)
+
+        errors = []
+
+        def run():
+            try:
+                write()
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join(0.3)
+        assert thread.is_alive()
+        assert engine.indexed_urls() == set()
+
+        other_process.release()
+        thread.join(5)
+        assert not thread.is_alive()
+        assert errors == []
+        assert engine.indexed_urls() == {self.URL}
+
+    def test_reconciler_waits(self, tmp_path, downloader):
+        """测试补录队列的写入等待租约"""
+        engine = WhooshSearchEngine(tmp_path / "index")
+        queue = IngestQueue(tmp_path / "queue.json")
+        queue.add([self.URL])
+        reconciler = IndexReconciler(downloader, engine, queue,
+                                     lease=WriterLease(tmp_path / "writer.lock", tmp_path / "spool"))
+
+        self._wait_for_lease(tmp_path, engine, reconciler.drain)
+        assert len(queue) == 0
+
+    def test_mirror_waits(self, tmp_path, downloader):
+        """测试镜像的批量索引等待租约"""
+        engine = WhooshSearchEngine(tmp_path / "index")
+        mirror = SiteMirror(downloader, engine, state_file=tmp_path / "mirror_state.json",
+                            lease=WriterLease(tmp_path / "writer.lock", tmp_path / "spool"))
+        mirror._index_batch.append({"file_path": str(downloader.get_file_path(self.URL)), "url": self.URL})
+
+        self._wait_for_lease(tmp_path, engine, mirror._flush_index_batch)
+        assert mirror.indexed_count == 1
+
+
+class TestSharedUrlMap:
+    """测试多个进程共用URL映射文件"""
+
+    def test_save_merges_other_writers(self, tmp_path):
+        """测试保存时合并其他进程写入的记录，且不恢复本进程删除的记录"""
+        first = SmartDownloader(tmp_path)
+        second = SmartDownloader(tmp_path)
+
+        first.url_map["a.html"] = {"url": "https://www.myquant.cn/docs2/a.html"}
+        first._save_url_map()
+        second.url_map["b.html"] = {"url": "https://www.myquant.cn/docs2/b.html"}
+        second._save_url_map()
+
+        with open(tmp_path / "url_map.json", encoding="utf-8") as f:
+            assert set(json.load(f)) == {"a.html", "b.html"}
+
+        del second.url_map["a.html"]
+        second._removed_filenames.add("a.html")
+        second._save_url_map()
+
+        with open(tmp_path / "url_map.json", encoding="utf-8") as f:
+            assert set(json.load(f)) == {"b.html"}
+
+    @pytest.mark.asyncio
+    async def test_async_save_does_not_block_loop(self, tmp_path):
+        """测试下载后的保存在线程中等待文件锁，期间的新记录保留在内存中"""
+        downloader = SmartDownloader(tmp_path)
+        other_process = FileLock(tmp_path / "url_map.lock")
+        assert other_process.acquire(timeout=0.1)
+
+        downloader.url_map["a.html"] = {"url": "https://www.myquant.cn/docs2/a.html"}
+        save = asyncio.create_task(downloader._save_url_map_async())
+        await asyncio.sleep(0.1)
+        assert not save.done()
+
+        # 保存等待期间事件循环仍可处理其他下载
+        downloader.url_map["b.html"] = {"url": "https://www.myquant.cn/docs2/b.html"}
+        other_process.release()
+        await asyncio.wait_for(save, 5)
+
+        assert set(downloader.url_map) == {"a.html", "b.html"}
+        with open(tmp_path / "url_map.json", encoding="utf-8") as f:
+            assert set(json.load(f)) == {"a.html"}
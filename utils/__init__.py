@@ -6,4 +6,12 @@ from .logger import (
     log_search_result,
     log_api_call,
     log_api_result
-)
\ No newline at end of file
+)
+from .singleflight import SingleFlight
+from .circuit_breaker import CircuitBreaker
+from .url import canonicalize_url, doc_section, split_anchor
+from .file_lock import FileLock
+from .timing import LatencyTracker
+from .spelling import SymSpellIndex, edit_distance, max_distance_for
+from .pinyin import PinyinIndex, is_latin_query, pinyin_available
+from .prefix import PrefixIndex
@@ -0,0 +1,98 @@
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_TIMEOUT
+from .logger import logger
+
+
+class CircuitBreaker:
+    """
+    熔断器，支持半开探测
+
+    状态说明：
+    - closed: 正常放行请求，连续失败达到阈值后进入open
+    - open: 直接拒绝请求，经过恢复时间后进入half_open
+    - half_open: 只放行一个探测请求，成功则恢复closed，失败则重新open
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 recovery_timeout: float = CIRCUIT_RECOVERY_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._rejected_count = 0
+
+    @property
+    def is_open(self) -> bool:
+        """熔断器是否处于拒绝请求的状态（已打开且尚未到达探测时间）"""
+        with self._lock:
+            if self._state == self.OPEN:
+                return time.time() - self._opened_at < self.recovery_timeout
+            return self._state == self.HALF_OPEN and self._probe_in_flight
+
+    def allow_request(self) -> bool:
+        """判断是否放行一次请求，半开状态下只放行一个探测请求"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+
+            if self._state == self.OPEN and time.time() - self._opened_at >= self.recovery_timeout:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+                logger.info(f"熔断器进入半开状态，开始探测: {self.name}")
+
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+
+            self._rejected_count += 1
+            return False
+
+    def record_success(self) -> None:
+        """记录一次成功请求"""
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"熔断器恢复: {self.name}")
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """记录一次失败请求，达到阈值或探测失败时打开熔断器"""
+        with self._lock:
+            self._consecutive_failures += 1
+            self._probe_in_flight = False
+
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(
+                        f"熔断器打开: {self.name}, 连续失败 {self._consecutive_failures} 次, "
+                        f"{self.recovery_timeout}秒后探测"
+                    )
+                self._state = self.OPEN
+                self._opened_at = time.time()
+
+    def get_state(self) -> Dict[str, Any]:
+        """获取熔断器状态"""
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "recovery_timeout": self.recovery_timeout,
+                "opened_at": datetime.fromtimestamp(self._opened_at).isoformat() if self._opened_at else None,
+                "rejected_requests": self._rejected_count,
+            }
@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    跨进程文件锁（Unix使用fcntl.flock，Windows使用msvcrt.locking）
+
+    进程退出（包括异常退出）时操作系统会自动释放锁，不会留下需要手动清理的锁文件。
+
+    使用示例：
+    lock = FileLock(Path("data/index_writer.lock"))
+    if lock.acquire(timeout=2.0):
+        try:
+            ...
+        finally:
+            lock.release()
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fd: Optional[int] = None
+        self._thread_lock = threading.Lock()
+
+    @property
+    def is_locked(self) -> bool:
+        """当前对象是否持有锁"""
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """尝试获取锁，不等待"""
+        if not self._thread_lock.acquire(blocking=False):
+            return False
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(fd)
+            self._thread_lock.release()
+            return False
+
+        self._fd = fd
+        return True
+
+    def acquire(self, timeout: Optional[float] = None, poll_interval: float = 0.05) -> bool:
+        """
+        获取锁
+
+        Args:
+            timeout: 最长等待时间（秒），None表示一直等待
+            poll_interval: 重试间隔（秒）
+
+        Returns:
+            是否获取成功
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.try_acquire():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(poll_interval)
+        return True
+
+    def release(self) -> None:
+        """释放锁"""
+        if self._fd is None:
+            return
+
+        fd, self._fd = self._fd, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+            self._thread_lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.release()
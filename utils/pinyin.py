@@ -0,0 +1,93 @@
+import re
+import threading
+from typing import Dict, List, Set
+
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:  # 未安装pypinyin时不提供拼音检索
+    lazy_pinyin = None
+
+# 含有中文字符的词才建立拼音索引
+_CJK_PATTERN = re.compile(r"[\u4e00-\u9fff]")
+
+# 含ü的音节（pypinyin写作v）及其u写法
+_V_SYLLABLES = {"lv": "lu", "lve": "lue", "nv": "nu", "nve": "nue"}
+
+# 只由拉丁字母、空格和拼音分隔符组成的查询
+_LATIN_QUERY_PATTERN = re.compile(r"^[A-Za-z][A-Za-z' ]*$")
+
+
+def pinyin_available() -> bool:
+    """是否安装了pypinyin"""
+    return lazy_pinyin is not None
+
+
+def is_latin_query(text: str) -> bool:
+    """查询是否只包含拉丁字母（可能是拼音或首字母缩写）"""
+    return bool(_LATIN_QUERY_PATTERN.match(text.strip()))
+
+
+def normalize_pinyin(text: str) -> str:
+    """统一为小写并去掉空格和拼音分隔符，如 "Hui'ce" -> "huice" """
+    return re.sub(r"[\s']", "", text).lower()
+
+
+class PinyinIndex:
+    """
+    拼音/首字母到中文词的映射
+
+    为每个中文词预先计算全拼（"huice"）和首字母（"hc"）两个键，查询时直接按键查表，
+    英文字母和数字原样保留（"K线" -> "kxian" / "kx"）。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._terms: Dict[str, int] = {}
+        self._keys: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    @staticmethod
+    def keys_for(term: str) -> List[str]:
+        """计算词的全拼和首字母键，非中文词或单字返回空列表"""
+        if lazy_pinyin is None or len(term) < 2 or not _CJK_PATTERN.search(term):
+            return []
+
+        syllables = lazy_pinyin(term)
+        full = normalize_pinyin("".join(syllables))
+        initials = normalize_pinyin("".join(lazy_pinyin(term, style=Style.FIRST_LETTER)))
+        keys = [full]
+        # pypinyin用v表示ü，输入时也常写作u（"celue"）
+        if any(syllable in _V_SYLLABLES for syllable in syllables):
+            keys.append(normalize_pinyin("".join(_V_SYLLABLES.get(syllable, syllable) for syllable in syllables)))
+        if len(initials) >= 2 and initials != full:
+            keys.append(initials)
+        return keys
+
+    def add(self, term: str, frequency: int = 1) -> bool:
+        """
+        添加词或更新词频
+
+        Returns:
+            是否为新加入拼音索引的词
+        """
+        with self._lock:
+            if term in self._terms:
+                self._terms[term] = frequency
+                return False
+
+            keys = self.keys_for(term)
+            if not keys:
+                return False
+
+            self._terms[term] = frequency
+            for key in keys:
+                self._keys.setdefault(key, set()).add(term)
+            return True
+
+    def lookup(self, text: str, limit: int = 5) -> List[str]:
+        """查找全拼或首字母与text相同的词，按词频降序排列"""
+        with self._lock:
+            terms = self._keys.get(normalize_pinyin(text), ())
+            return sorted(terms, key=lambda term: (-self._terms[term], term))[:limit]
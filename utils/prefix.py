@@ -0,0 +1,111 @@
+import heapq
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, NamedTuple, Set, Tuple
+
+
+class _Snapshot(NamedTuple):
+    """发布后不再修改的补全数据，查询只读取当前快照"""
+    # 按小写键排序的数组
+    keys: List[str]
+    # 小写键 -> (显示文本, 来源类型, 文档频率)
+    entries: Dict[str, Tuple[str, Tuple[str, ...], int]]
+    # 短前缀 -> 排名靠前的键
+    short_prefixes: Dict[str, List[str]]
+
+
+class PrefixIndex:
+    """
+    按前缀补全的有序数组
+
+    补全项按小写键排序存放，查询时二分定位前缀区间后按文档频率取前几个。
+    很短的前缀（如单个字母）匹配的区间很大，其结果在发布时预先计算。
+    新增补全项先暂存，publish()时把暂存的键归并进有序数组并只重算受影响的短前缀，
+    生成新的快照后整体替换；查询只读取已发布的快照，不排序也不加锁。
+    """
+
+    def __init__(self, short_prefix_length: int = 2, short_prefix_limit: int = 20):
+        self.short_prefix_length = short_prefix_length
+        self.short_prefix_limit = short_prefix_limit
+        self._lock = threading.Lock()
+        # 待发布的补全项：小写键 -> [显示文本, 来源类型集合, 新增文档频率]
+        self._pending: Dict[str, List[Any]] = {}
+        self._snapshot = _Snapshot([], {}, {})
+
+    def __len__(self) -> int:
+        return len(self._snapshot.entries)
+
+    def add(self, text: str, kinds: Iterable[str], count: int = 1) -> None:
+        """暂存补全项，已存在时累加文档频率，publish()后可查询"""
+        text = text.strip()
+        if not text:
+            return
+        key = text.lower()
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                self._pending[key] = [text, set(kinds), count]
+            else:
+                entry[1].update(kinds)
+                entry[2] += count
+
+    def publish(self) -> None:
+        """把暂存的补全项合并为新的快照"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            old = self._snapshot
+
+            entries = dict(old.entries)
+            added: List[str] = []
+            for key, (text, kinds, count) in pending.items():
+                entry = entries.get(key)
+                if entry is None:
+                    entries[key] = (text, tuple(sorted(kinds)), count)
+                    added.append(key)
+                else:
+                    entries[key] = (entry[0], tuple(sorted(kinds.union(entry[1]))), entry[2] + count)
+            keys = list(heapq.merge(old.keys, sorted(added)))
+
+            def rank(key: str) -> Tuple[int, int, str]:
+                return -entries[key][2], len(key), key
+
+            # 频率只增不减，未变化的键排名只会后移，短前缀的新结果只能来自原结果和变化的键
+            changed: Dict[str, Set[str]] = {}
+            for key in pending:
+                for length in range(1, min(len(key), self.short_prefix_length) + 1):
+                    changed.setdefault(key[:length], set()).add(key)
+            short_prefixes = dict(old.short_prefixes)
+            for prefix, changed_keys in changed.items():
+                candidates = changed_keys.union(old.short_prefixes.get(prefix, []))
+                short_prefixes[prefix] = sorted(candidates, key=rank)[:self.short_prefix_limit]
+
+            self._snapshot = _Snapshot(keys, entries, short_prefixes)
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        查找以prefix开头的补全项
+
+        Returns:
+            [{"text", "types", "doc_count"}]，按文档频率降序、长度升序排列
+        """
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+
+        snapshot = self._snapshot
+        if len(prefix) <= self.short_prefix_length and limit <= self.short_prefix_limit:
+            keys = snapshot.short_prefixes.get(prefix, [])[:limit]
+        else:
+            matches = []
+            position = bisect_left(snapshot.keys, prefix)
+            while position < len(snapshot.keys) and snapshot.keys[position].startswith(prefix):
+                matches.append(snapshot.keys[position])
+                position += 1
+            keys = sorted(matches, key=lambda key: (-snapshot.entries[key][2], len(key), key))[:limit]
+
+        return [
+            {"text": snapshot.entries[key][0], "types": list(snapshot.entries[key][1]), "doc_count": snapshot.entries[key][2]}
+            for key in keys
+        ]
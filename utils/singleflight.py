@@ -0,0 +1,66 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    合并并发的相同请求
+
+    同一个key同时只会执行一次，执行期间到达的相同请求直接等待并共享该结果。
+
+    使用示例：
+    flight = SingleFlight()
+    result, shared = await flight.do(url, lambda: download(url))
+    """
+
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.executed_count = 0
+        self.shared_count = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        执行或加入一次请求
+
+        Args:
+            key: 请求去重键
+            func: 无参数的协程函数，仅在没有相同请求执行中时调用
+
+        Returns:
+            (结果, 是否共享了其他调用的结果)
+        """
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.shared_count += 1
+            # shield避免等待方被取消时连带取消正在执行的请求
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self.executed_count += 1
+
+        try:
+            result = await func()
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有等待方时标记异常已被获取，避免"exception was never retrieved"警告
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._in_flight[key]
+
+    def in_flight(self, key: Hashable) -> bool:
+        """检查某个key是否正在执行"""
+        return key in self._in_flight
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取合并统计信息"""
+        return {
+            "in_flight": len(self._in_flight),
+            "executed": self.executed_count,
+            "shared": self.shared_count,
+        }
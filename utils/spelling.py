@@ -0,0 +1,126 @@
+import threading
+from typing import Dict, List, Set, Tuple
+
+
+def edit_distance(source: str, target: str, max_distance: int) -> int:
+    """
+    计算两个词的编辑距离（允许相邻字符换位），超过max_distance时提前返回max_distance + 1
+    """
+    if source == target:
+        return 0
+    if abs(len(source) - len(target)) > max_distance:
+        return max_distance + 1
+
+    previous_previous = None
+    previous = list(range(len(target) + 1))
+    for i in range(1, len(source) + 1):
+        current = [i] + [0] * len(target)
+        for j in range(1, len(target) + 1):
+            cost = 0 if source[i - 1] == target[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and source[i - 1] == target[j - 2] and source[i - 2] == target[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def max_distance_for(term: str, requested: int) -> int:
+    """
+    按词长限制编辑距离：2个字符以内只做精确匹配，3-4个字符最多相差1
+
+    距离2对中文短词几乎能匹配任意词，因此需要随词长收紧。
+    """
+    if len(term) <= 2:
+        return 0
+    if len(term) <= 4:
+        return min(requested, 1)
+    return requested
+
+
+class SymSpellIndex:
+    """
+    删除邻域拼写纠错词典（SymSpell）
+
+    预先为每个词生成删除最多max_distance个字符得到的变体（只取前prefix_length个字符），
+    查询时对输入词生成同样的变体并在字典中查找，只对少量候选计算编辑距离，
+    查询耗时与词表大小基本无关。
+    """
+
+    def __init__(self, max_distance: int = 2, prefix_length: int = 7):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self._lock = threading.Lock()
+        self._terms: Dict[str, int] = {}
+        self._deletes: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._terms
+
+    def frequency(self, term: str) -> int:
+        """词频，词不在词典中时为0"""
+        return self._terms.get(term, 0)
+
+    @staticmethod
+    def _variants(word: str, max_distance: int) -> Set[str]:
+        """生成删除最多max_distance个字符的所有变体（包括原词）"""
+        variants = {word}
+        frontier = {word}
+        for _ in range(max_distance):
+            next_frontier = set()
+            for variant in frontier:
+                if len(variant) <= 1:
+                    continue
+                for i in range(len(variant)):
+                    next_frontier.add(variant[:i] + variant[i + 1:])
+            next_frontier -= variants
+            variants |= next_frontier
+            frontier = next_frontier
+        return variants
+
+    def add(self, term: str, frequency: int = 1) -> bool:
+        """
+        添加词或更新词频
+
+        Returns:
+            是否为新词
+        """
+        with self._lock:
+            if term in self._terms:
+                self._terms[term] = frequency
+                return False
+
+            self._terms[term] = frequency
+            for variant in self._variants(term[:self.prefix_length], self.max_distance):
+                self._deletes.setdefault(variant, []).append(term)
+            return True
+
+    def lookup(self, word: str, max_distance: int = None, limit: int = 5) -> List[Tuple[str, int, int]]:
+        """
+        查找编辑距离不超过max_distance的词
+
+        Returns:
+            [(词, 编辑距离, 词频)]，按距离升序、词频降序排列
+        """
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+
+        with self._lock:
+            seen = set()
+            matches = []
+            for variant in self._variants(word[:self.prefix_length], max_distance):
+                for term in self._deletes.get(variant, ()):
+                    if term in seen:
+                        continue
+                    seen.add(term)
+                    distance = edit_distance(word, term, max_distance)
+                    if distance <= max_distance:
+                        matches.append((term, distance, self._terms[term]))
+
+        matches.sort(key=lambda match: (match[1], -match[2], match[0]))
+        return matches[:limit]
@@ -0,0 +1,50 @@
+import threading
+from collections import deque
+from typing import Any, Deque, Dict
+
+
+class LatencyTracker:
+    """
+    按名称统计请求耗时
+
+    每个名称保留最近window次请求的耗时，用于计算分位数；总次数和错误数累计统计。
+    """
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._durations: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+
+    def record(self, name: str, seconds: float, ok: bool = True) -> None:
+        """记录一次请求耗时"""
+        with self._lock:
+            self._durations.setdefault(name, deque(maxlen=self.window)).append(seconds)
+            self._counts[name] = self._counts.get(name, 0) + 1
+            if not ok:
+                self._errors[name] = self._errors.get(name, 0) + 1
+
+    @staticmethod
+    def _percentile(sorted_values, percent: float) -> float:
+        index = min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))
+        return sorted_values[index]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各名称的耗时统计（毫秒）"""
+        with self._lock:
+            snapshot = {name: sorted(durations) for name, durations in self._durations.items()}
+            counts = dict(self._counts)
+            errors = dict(self._errors)
+
+        return {
+            name: {
+                'count': counts[name],
+                'errors': errors.get(name, 0),
+                'avg_ms': round(sum(values) / len(values) * 1000, 2),
+                'p50_ms': round(self._percentile(values, 50) * 1000, 2),
+                'p95_ms': round(self._percentile(values, 95) * 1000, 2),
+                'max_ms': round(values[-1] * 1000, 2),
+            }
+            for name, values in snapshot.items()
+        }
@@ -0,0 +1,63 @@
+from typing import Optional, Tuple
+from urllib.parse import quote, unquote, urlsplit, urlunsplit
+
+from config import MIRROR_URL_PREFIX
+
+# 百分号编码时保留的字符（RFC 3986 路径中允许直接出现的字符）
+_PATH_SAFE_CHARS = "/:@!$&'()*+,;=-._~"
+
+_DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+# 文档根目录的路径段（docs2），文档栏目取其后的第一段目录
+_DOCS_ROOT_SEGMENTS = [segment for segment in urlsplit(MIRROR_URL_PREFIX).path.split("/") if segment]
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    规范化文档URL，同一页面的不同写法得到相同结果
+
+    - 去除锚点（#anchor）和查询参数
+    - 统一百分号编码（先解码再按统一规则编码）
+    - 协议和主机名转为小写，去除默认端口
+
+    Args:
+        url: 原始URL
+
+    Returns:
+        规范化后的URL
+    """
+    parts = urlsplit(url.strip())
+
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    host, _, port = netloc.rpartition(":")
+    if host and _DEFAULT_PORTS.get(scheme) == port:
+        netloc = host
+
+    path = quote(unquote(parts.path), safe=_PATH_SAFE_CHARS) or "/"
+
+    return urlunsplit((scheme, netloc, path, "", ""))
+
+
+def split_anchor(url: str) -> Tuple[str, Optional[str]]:
+    """
+    拆分URL为规范化页面地址和锚点
+
+    Returns:
+        (规范化URL, 锚点)，没有锚点时锚点为None
+    """
+    fragment = urlsplit(url.strip()).fragment
+    return canonicalize_url(url), unquote(fragment) or None
+
+
+def doc_section(url: str) -> str:
+    """
+    文档栏目：URL路径中文档根目录之后的第一段目录（如 sdk、faq），转为小写
+
+    页面不在文档根目录下或直接位于文档根目录下时返回空字符串。
+    """
+    segments = [unquote(segment) for segment in urlsplit(url.strip()).path.split("/") if segment]
+    root = len(_DOCS_ROOT_SEGMENTS)
+    if segments[:root] != _DOCS_ROOT_SEGMENTS or len(segments) < root + 2:
+        return ""
+    return segments[root].lower()